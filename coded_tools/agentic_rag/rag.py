@@ -14,16 +14,28 @@
 from typing import Any
 from typing import Dict
 from typing import List
+from typing import Optional
 
 from langchain_community.document_loaders import PyPDFLoader
 from langchain_community.vectorstores import InMemoryVectorStore
 from langchain_core.documents import Document
 from langchain_core.vectorstores.base import VectorStoreRetriever
-from langchain_openai import OpenAIEmbeddings
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from neuro_san.interfaces.coded_tool import CodedTool
 
+from coded_tools.embedding_cache import get_embedding_cache
+from coded_tools.embedding_pipeline import EmbeddingPipeline
+from coded_tools.embedding_providers import create_embeddings
+from coded_tools.embedding_providers import get_default_config
+from coded_tools.http_fetch_cache import HTTP_FETCH_CACHE
+from coded_tools.query_cache import QUERY_CACHE
+from coded_tools.query_cache import get_index_version
+from coded_tools.token_chunker import get_token_chunker
+from coded_tools.vector_store_registry import VECTOR_STORE_REGISTRY
+from coded_tools.vector_store_registry import make_registry_key
+
 PDF_FILE_URL = "https://www.replicon.com/wp-content/uploads/2016/06/RFP-Template_Replicon.pdf"
+CHUNK_SIZE = 100
+CHUNK_OVERLAP = 50
 
 
 class Rag(CodedTool):
@@ -79,32 +91,40 @@ class Rag(CodedTool):
         if not query:
             return "Error: No query provided."
 
-        # Build the vector store and run the query
-        vectorstore: InMemoryVectorStore = await self.generate_vector_store(PDF_FILE_URL)
+        # Build the vector store once per process and run the query
+        registry_key = make_registry_key(
+            self.__class__.__name__, PDF_FILE_URL, CHUNK_SIZE, CHUNK_OVERLAP, get_default_config()
+        )
+        vectorstore: InMemoryVectorStore = await VECTOR_STORE_REGISTRY.get_or_build(
+            registry_key, lambda: self.generate_vector_store(PDF_FILE_URL)
+        )
         return await self.query_vectorstore(vectorstore, query)
 
     async def generate_vector_store(self, url: str) -> InMemoryVectorStore:
         """
         Asynchronously loads web documents from given URLs, split them into
-        chunks, and build an in-memory vector store using OpenAI embeddings.
+        chunks, and build an in-memory vector store using the embedding model of the EMBEDDING_PROVIDER
+        environment variable, OpenAI by default.
 
         :param urls: List of URLs to fetch and embed
         :return: In-memory vector store containing the embedded document chunks
         """
 
-        loader = PyPDFLoader(file_path=url)
+        # The PDF is read from the HTTP cache, and only downloaded again if the server reports it changed
+        loader = PyPDFLoader(file_path=(await HTTP_FETCH_CACHE.fetch(url)).path)
         docs: List[Document] = await loader.aload()
+        for doc in docs:
+            doc.metadata["source"] = url
 
         # Split documents into smaller chunks for better embedding and
         # retrieval
-        text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(chunk_size=100, chunk_overlap=50)
-        doc_chunks: List[Document] = text_splitter.split_documents(docs)
+        doc_chunks: List[Document] = get_token_chunker(CHUNK_SIZE, CHUNK_OVERLAP).split_documents(docs)
 
         # Create an in-memory vector store with embeddings
         vectorstore: InMemoryVectorStore = await InMemoryVectorStore.afrom_documents(
             documents=doc_chunks,
             collection_name="rag-in-memory",
-            embedding=OpenAIEmbeddings(),
+            embedding=EmbeddingPipeline(create_embeddings(get_default_config(), get_embedding_cache())),
         )
 
         return vectorstore
@@ -113,11 +133,17 @@ class Rag(CodedTool):
         """
         Query the given vector store using the provided query string
         and return the combined content of retrieved documents.
+        Results of queries asked before against the same vector store are served from the query cache.
 
         :param vectorstore: The in-memory vector store to query
         :param query: The user query to search for relevant documents
         :return: Concatenated text content of the retrieved documents
         """
+        scope = make_registry_key(self.__class__.__name__, get_index_version(vectorstore))
+        cached_result: Optional[str] = QUERY_CACHE.get(scope, query)
+        if cached_result is not None:
+            return cached_result
+
         # Create a retriever interface from the vector store
         retriever: VectorStoreRetriever = vectorstore.as_retriever()
 
@@ -125,4 +151,6 @@ class Rag(CodedTool):
         results: List[Document] = await retriever.ainvoke(query)
 
         # Concatenate the content of all retrieved documents
-        return "\n\n".join(doc.page_content for doc in results)
+        result: str = "\n\n".join(doc.page_content for doc in results)
+        QUERY_CACHE.put(scope, query, result)
+        return result
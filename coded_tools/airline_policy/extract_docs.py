@@ -10,10 +10,12 @@
 import os
 from typing import Any
 from typing import Dict
+from typing import List
 from typing import Union
 
 from neuro_san.interfaces.coded_tool import CodedTool
-from pypdf import PdfReader
+
+from coded_tools.pdf_parser import ParallelPdfParser
 
 
 class ExtractDocs(CodedTool):
@@ -75,23 +77,31 @@ class ExtractDocs(CodedTool):
             raise TypeError(f"Expected str, bytes, or os.PathLike object, got {type(directory).__name__} instead")
 
         docs = {}
+        pdf_paths = []
         for root, dirs, files in os.walk(directory):
             for file in files:
                 # Build the full path to the file
                 file_path = os.path.join(root, file)
 
                 if file.lower().endswith(".pdf"):
-                    # Extract PDF content
-                    content = self.extract_pdf_content(file_path)
-                    # Store in the dictionary using a relative path (relative to the main directory)
-                    rel_path = os.path.relpath(file_path, directory)
-                    docs[rel_path] = content
+                    # PDFs are extracted together below, in parallel
+                    pdf_paths.append(file_path)
                 elif file.lower().endswith(".txt"):
                     # Extract text file content
                     content = self.extract_txt_content(file_path)
                     # Store in the dictionary using a relative path
                     rel_path = os.path.relpath(file_path, directory)
                     docs[rel_path] = content
+
+        # Extract PDF content in a process pool, as text extraction is CPU-bound
+        for parsed_pdf in ParallelPdfParser(engine="pypdf").parse(pdf_paths):
+            # Store in the dictionary using a relative path (relative to the main directory)
+            rel_path = os.path.relpath(parsed_pdf.path, directory)
+            if parsed_pdf.error:
+                print(f"Error reading PDF {parsed_pdf.path}: {parsed_pdf.error}")
+                docs[rel_path] = ""
+            else:
+                docs[rel_path] = self.format_pdf_pages(parsed_pdf.pages)
         print("############### Documents extraction done ###############")
         if not docs:
             print("No PDF or text files found in the directory.")
@@ -106,20 +116,28 @@ class ExtractDocs(CodedTool):
         :param pdf_path: Full path to the PDF file.
         :return: Extracted text from the PDF.
         """
-        text_output = []
-        try:
-            reader = PdfReader(pdf_path)
-            for page_num, page in enumerate(reader.pages):
-                # Add a page header for pagination
-                text_output.append(f"\n\n--- Page {page_num + 1} ---\n\n")
-                # Extract text from the page (fall back to empty string if None)
-                page_text = page.extract_text() or ""
-                text_output.append(page_text)
-        except Exception as e:
+        parsed_pdf = next(ParallelPdfParser(engine="pypdf").parse([pdf_path]))
+        if parsed_pdf.error:
             # In case there's an issue with reading the PDF
-            print(f"Error reading PDF {pdf_path}: {e}")
+            print(f"Error reading PDF {pdf_path}: {parsed_pdf.error}")
             return ""
 
+        return self.format_pdf_pages(parsed_pdf.pages)
+
+    @staticmethod
+    def format_pdf_pages(pages: List[str]) -> str:
+        """
+        Join the text of the pages of a PDF, inserting page headers to preserve pagination.
+
+        :param pages: Text of each page
+        :return: Text of the PDF
+        """
+        text_output = []
+        for page_num, page_text in enumerate(pages):
+            # Add a page header for pagination
+            text_output.append(f"\n\n--- Page {page_num + 1} ---\n\n")
+            text_output.append(page_text)
+
         return "".join(text_output)
 
     def extract_txt_content(self, txt_path: str) -> str:
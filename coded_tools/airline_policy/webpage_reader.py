@@ -7,14 +7,17 @@
 # Purchase of a commercial license is mandatory for any use of the
 # neuro-san-studio SDK Software in commercial settings.
 #
+import asyncio
 from typing import Any
 from typing import Dict
+from typing import List
 from typing import Union
 
-import requests
 from bs4 import BeautifulSoup
 from neuro_san.interfaces.coded_tool import CodedTool
 
+from coded_tools.http_fetch_cache import HTTP_FETCH_CACHE
+
 
 class WebPageReader(CodedTool):
     """
@@ -51,6 +54,26 @@ class WebPageReader(CodedTool):
 
     def invoke(self, args: Dict[str, Any]) -> Union[str, Dict[str, Any]]:
         """
+        Synchronous version of async_invoke(), for callers without an event loop.
+
+        :param args: See async_invoke()
+        :return: See async_invoke()
+        """
+
+        async def read() -> Union[str, Dict[str, Any]]:
+            try:
+                return await self.async_invoke(args, {})
+            finally:
+                # The client of the fetch cache is bound to this event loop
+                await HTTP_FETCH_CACHE.aclose()
+
+        return asyncio.run(read())
+
+    async def async_invoke(self, args: Dict[str, Any], sly_data: Dict[str, Any]) -> Union[str, Dict[str, Any]]:
+        """
+        Pages are fetched concurrently through the shared HTTP cache, and only downloaded again
+        when the server reports they changed.
+
         :param args: An argument dictionary whose keys are the parameters
                 to the coded tool and whose values are the values passed for them
                 by the calling agent. This dictionary is to be treated as read-only.
@@ -91,19 +114,28 @@ class WebPageReader(CodedTool):
             headers = {
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"  # noqa E501
             }
-            results = {}
-            for url in urls:
-                try:
-                    response = requests.get(url, headers=headers)
-                    response.raise_for_status()
-
-                    soup = BeautifulSoup(response.text, "html.parser")
-                    texts = soup.stripped_strings
-                    full_text = " ".join(texts)
-                    results[url] = full_text
-                except Exception as e:
-                    results[url] = f"Error: Unable to process the URL. {str(e)}"
+            texts: List[str] = await asyncio.gather(*(self.read_page(url, headers) for url in urls))
+            results = dict(zip(urls, texts))
             print(">>>>>>>>>>>>>>>>>>> Done! >>>>>>>>>>>>>>>>>>")
             return results
         except Exception as e:
             return f"Error: Unable to process the request. {str(e)}"
+
+    @staticmethod
+    async def read_page(url: str, headers: Dict[str, str]) -> str:
+        """
+        :param url: URL of the webpage
+        :param headers: Request headers
+        :return: The visible text of the webpage, or an error message
+        """
+        try:
+            result = await HTTP_FETCH_CACHE.fetch(url, headers=headers)
+
+            def extract_text() -> str:
+                with open(result.path, "rb") as page_file:
+                    soup = BeautifulSoup(page_file.read(), "html.parser")
+                return " ".join(soup.stripped_strings)
+
+            return await asyncio.to_thread(extract_text)
+        except Exception as e:
+            return f"Error: Unable to process the URL. {str(e)}"
@@ -14,6 +14,7 @@ from typing import Any
 from neuro_san.interfaces.coded_tool import CodedTool
 
 from coded_tools.anthropic_tool import AnthropicTool
+from coded_tools.search_cache import SEARCH_CACHE
 
 WEB_SEARCH_TOOL_TYPE = "web_search_20250305"
 
@@ -37,6 +38,8 @@ class AnthropicWebSearch(CodedTool):
                 - from user
                     - "anthropic_model" (str): Anthropic model to call the tool. Default to claude-3-7-sonnet-20250219.
                     - "additional_kwargs" (dict): Any additional arguments for the tool.
+                    - "cache_ttl_seconds" (float): Seconds the results are served from the search cache.
+                      0 to always search.
 
         :param sly_data: A dictionary whose keys are defined by the agent hierarchy,
                 but whose values are meant to be kept out of the chat stream.
@@ -73,11 +76,17 @@ class AnthropicWebSearch(CodedTool):
         # See https://docs.anthropic.com/en/docs/agents-and-tools/tool-use/web-search-tool
         additional_kwargs: dict[str, Any] = args.get("additional_kwargs", {})
 
-        return await AnthropicTool.arun(
-            query=query,
-            tool_type=WEB_SEARCH_TOOL_TYPE,
-            tool_name="web_search",
-            anthropic_model=anthropic_model,
-            betas=None,
-            **additional_kwargs
+        return await SEARCH_CACHE.get_or_search(
+            "anthropic_web_search",
+            query,
+            {"anthropic_model": anthropic_model, "additional_kwargs": additional_kwargs},
+            lambda: AnthropicTool.arun(
+                query=query,
+                tool_type=WEB_SEARCH_TOOL_TYPE,
+                tool_name="web_search",
+                anthropic_model=anthropic_model,
+                betas=None,
+                **additional_kwargs
+            ),
+            args.get("cache_ttl_seconds"),
         )
@@ -13,10 +13,13 @@ import logging
 from typing import Any
 from typing import Dict
 
-from langchain_community.retrievers import ArxivRetriever
 from neuro_san.interfaces.coded_tool import CodedTool
 
 from .base_rag import BaseRag
+from .research_cache import DEFAULT_TTL
+from .research_cache import RESEARCH_CACHE
+from .research_cache import ArxivSource
+from .research_cache import CachedResearchRetriever
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -38,6 +41,10 @@ class ArxivRag(CodedTool):
             "doc_content_chars_max": maximum number of characters to keep in each document (default is 4000)
             "load_all_available_meta": whether to load all available metadata (default is False)
             "continue_on_failure": whether to continue processing if an error occurs (default is True)
+            "cache_ttl_seconds": seconds the search results and papers are served from the local cache
+                before they are fetched again (default is RESEARCH_CACHE_TTL_SECONDS or one day)
+            "prefetch": whether to refresh, in the background, the cached papers frequently returned
+                with the ones of the query before they expire (default is False)
 
         :param sly_data: A dictionary whose keys are defined by the agent
             hierarchy, but whose values are meant to be kept out of the
@@ -63,12 +70,18 @@ class ArxivRag(CodedTool):
             logger.error("Missing required input: 'query' (retrieval question).")
             return "❌ Missing required1 input: 'query'."
 
-        # Initialize ArxivRetriever with the provided arguments
-        retriever = ArxivRetriever(
+        # Search arXiv through the persistent cache, fetching the papers that are not cached concurrently
+        source = ArxivSource(
             top_k_results=int(args.get("top_k_results", 3)),
             get_full_documents=bool(args.get("get_full_documents", True)),
             doc_content_chars_max=int(args.get("doc_content_chars_max", 4000)),
             load_all_available_meta=bool(args.get("load_all_available_meta", False)),
+        )
+        retriever = CachedResearchRetriever(
+            source=source,
+            cache=RESEARCH_CACHE,
+            ttl=float(args.get("cache_ttl_seconds", DEFAULT_TTL)),
+            prefetch=bool(args.get("prefetch", False)),
             continue_on_failure=bool(args.get("continue_on_failure", True)),
         )
 
@@ -0,0 +1,149 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+# END COPYRIGHT
+
+import asyncio
+import importlib.util
+import logging
+import os
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import Any
+from typing import Dict
+from typing import Optional
+
+import httpx
+
+# HTTP/2 needs the optional h2 package, e.g. from pip install httpx[http2]
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+# Maximum number of concurrent requests to the same provider, e.g. one search API
+DEFAULT_PROVIDER_CONCURRENCY = int(os.getenv("HTTP_PROVIDER_CONCURRENCY") or 8)
+# Maximum number of connections of the shared client, and of idle connections kept alive
+MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS") or 100)
+MAX_KEEPALIVE_CONNECTIONS = 20
+# Seconds an idle connection is kept alive
+KEEPALIVE_EXPIRY = 60.0
+# Seconds to wait for a connection to a server
+CONNECT_TIMEOUT = 10.0
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Session:
+    """HTTP client and per-provider limits of one event loop, as asyncio objects cannot be shared across loops."""
+
+    client: httpx.AsyncClient
+    provider_semaphores: Dict[str, asyncio.Semaphore]
+
+
+class AsyncHttpClient:
+    """
+    Process-wide pooled HTTP client for the tools calling web APIs, such as the search tools.
+
+    Requests go through one asynchronous client per event loop, which keeps connections alive so that
+    repeated calls to the same API do not pay a new TLS handshake, and uses HTTP/2 when the h2 package is installed.
+    Every provider has a limit of concurrent requests, and every request a deadline covering both the wait
+    for the limit and the request itself. No worker thread is held while waiting.
+    """
+
+    def __init__(self, provider_concurrency: int = DEFAULT_PROVIDER_CONCURRENCY, http2: bool = HTTP2_AVAILABLE):
+        """
+        :param provider_concurrency: Maximum number of concurrent requests to the same provider
+        :param http2: True to use HTTP/2 with the servers supporting it. Requires the h2 package.
+        """
+        self.provider_concurrency: int = max(1, provider_concurrency)
+        self.http2: bool = http2
+        self._sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _Session]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    # pylint: disable=too-many-arguments
+    async def get_json(
+        self,
+        provider: str,
+        url: str,
+        deadline: float,
+        *,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Any:
+        """
+        Send a GET request and parse its JSON response.
+
+        :param provider: Name of the provider, whose requests share a concurrency limit
+        :param url: URL of the request
+        :param deadline: Seconds the request may take in total, including waiting for the limit of the provider
+        :param params: Query parameters
+        :param headers: Request headers
+        :return: The parsed JSON response
+        :raises httpx.HTTPError: If the request failed or the response has an error status
+        :raises asyncio.TimeoutError: If the request did not complete before the deadline
+        :raises ValueError: If the response is not valid JSON
+        """
+        response: httpx.Response = await asyncio.wait_for(self._get(provider, url, params, headers), deadline)
+        return response.json()
+
+    async def aclose(self):
+        """Close the HTTP client of the running event loop."""
+        with self._lock:
+            session: Optional[_Session] = self._sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None:
+            await session.client.aclose()
+
+    async def _get(
+        self, provider: str, url: str, params: Optional[Dict[str, Any]], headers: Optional[Dict[str, str]]
+    ) -> httpx.Response:
+        """Send a GET request within the limit of its provider."""
+        session: _Session = self._get_session()
+        semaphore: asyncio.Semaphore = session.provider_semaphores.setdefault(
+            provider, asyncio.Semaphore(self.provider_concurrency)
+        )
+        async with semaphore:
+            # Like requests, parameters and headers without a value, e.g. an unset API key, are not sent
+            response: httpx.Response = await session.client.get(
+                url, params=_without_none(params), headers=_without_none(headers)
+            )
+        logger.debug("%s %s %s\n", response.http_version, response.status_code, provider)
+        response.raise_for_status()
+        return response
+
+    def _get_session(self) -> _Session:
+        """Get the HTTP client of the running event loop, creating it on first use."""
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        with self._lock:
+            session: Optional[_Session] = self._sessions.get(loop)
+            if session is None:
+                session = _Session(
+                    client=httpx.AsyncClient(
+                        http2=self.http2,
+                        follow_redirects=True,
+                        # The deadline of every request bounds its total time, the client only bounds connecting
+                        timeout=httpx.Timeout(None, connect=CONNECT_TIMEOUT),
+                        limits=httpx.Limits(
+                            max_connections=MAX_CONNECTIONS,
+                            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                            keepalive_expiry=KEEPALIVE_EXPIRY,
+                        ),
+                    ),
+                    provider_semaphores={},
+                )
+                self._sessions[loop] = session
+            return session
+
+
+def _without_none(values: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Drop the entries of a dictionary whose value is None."""
+    if values is None:
+        return None
+    return {key: value for key, value in values.items() if value is not None}
+
+
+ASYNC_HTTP_CLIENT = AsyncHttpClient()
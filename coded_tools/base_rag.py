@@ -9,17 +9,25 @@
 #
 # END COPYRIGHT
 
+# pylint: disable=too-many-lines
+
 import asyncio
+import hashlib
+import json
 import logging
 import os
 import re
+import tempfile
 from abc import ABC
 from abc import abstractmethod
 from dataclasses import dataclass
 from typing import Any
+from typing import AsyncIterator
+from typing import Dict
 from typing import List
 from typing import Literal
 from typing import Optional
+from typing import Tuple
 
 # pylint: disable=import-error
 from asyncpg import InvalidCatalogNameError
@@ -27,19 +35,96 @@ from asyncpg import InvalidPasswordError
 from langchain_community.vectorstores import InMemoryVectorStore
 from langchain_core.documents import Document
 from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
 from langchain_core.vectorstores import VectorStore
-from langchain_core.vectorstores.base import VectorStoreRetriever
-from langchain_openai import OpenAIEmbeddings
 from langchain_postgres import PGEngine
 from langchain_postgres import PGVectorStore
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from sqlalchemy.exc import ProgrammingError
 
+from coded_tools.embedding_cache import PRECISIONS
+from coded_tools.embedding_cache import CachedEmbeddings
+from coded_tools.embedding_cache import get_embedding_cache
+from coded_tools.embedding_pipeline import EmbeddingPipeline
+from coded_tools.embedding_providers import PCA_TRAINING_SIZE
+from coded_tools.embedding_providers import EmbeddingConfig
+from coded_tools.embedding_providers import ReducedEmbeddings
+from coded_tools.embedding_providers import create_embeddings
+from coded_tools.embedding_providers import get_default_config
+from coded_tools.embedding_providers import get_pca_path
+from coded_tools.embedding_providers import get_vector_size
+from coded_tools.hybrid_retriever import DEFAULT_RRF_K
+from coded_tools.hybrid_retriever import HybridRetriever
+from coded_tools.hybrid_retriever import get_postgres_hybrid_search_config
+from coded_tools.index_manifest import IndexManifest
+from coded_tools.index_manifest import SourcesUnreachableError
+from coded_tools.index_manifest import chunk_id
+from coded_tools.ivf_vector_store import IvfVectorStore
+from coded_tools.lexical_index import BM25Index
+from coded_tools.lexical_index import get_lexical_index
+from coded_tools.lexical_index import get_lexical_index_path
+from coded_tools.lexical_index import get_store_texts
+from coded_tools.lexical_index import supports_lexical_index
+from coded_tools.numpy_vector_store import NumpyVectorStore
+from coded_tools.pg_engine_cache import create_full_text_index
+from coded_tools.pg_engine_cache import create_namespace_index
+from coded_tools.pg_engine_cache import get_pg_engine
+from coded_tools.pg_engine_cache import open_existing_vector_store
+from coded_tools.quantized_vector_store import Int8VectorStore
+from coded_tools.quantized_vector_store import PqVectorStore
+from coded_tools.query_cache import QUERY_CACHE
+from coded_tools.query_cache import bump_index_version
+from coded_tools.query_cache import get_index_version
+from coded_tools.reranker import DEFAULT_RERANK_CANDIDATES
+from coded_tools.reranker import RerankingRetriever
+from coded_tools.reranker import get_scorer
+from coded_tools.result_packer import pack_results
+from coded_tools.token_chunker import get_token_chunker
+from coded_tools.vector_store_registry import VECTOR_STORE_REGISTRY
+from coded_tools.vector_store_registry import make_registry_key
+from coded_tools.vector_store_shards import NAMESPACE_METADATA_KEY
+from coded_tools.vector_store_shards import SHARD_CACHE
+from coded_tools.vector_store_shards import MultiShardRetriever
+from coded_tools.vector_store_shards import ShardManifest
+from coded_tools.vector_store_shards import get_shard_path
+from coded_tools.vector_store_shards import get_shards_manifest_path
+from coded_tools.vector_store_shards import validate_namespace
+
 # Invalid file path character pattern
 INVALID_PATH_PATTERN = r"[<>:\"|?*\x00-\x1F]"
 DEFAULT_TABLE_NAME = "vectorstore"
-EMBEDDINGS_MODEL = "text-embedding-3-small"
-VECTOR_SIZE = 1536
+# Default number of tokens per chunk, and shared by consecutive chunks
+CHUNK_SIZE = 100
+CHUNK_OVERLAP = 50
+# Streaming ingestion: documents buffered between loading and splitting,
+# batches of chunks buffered between splitting and upserting, and chunks per upserted batch
+STREAM_DOCUMENT_QUEUE_SIZE = 16
+STREAM_BATCH_QUEUE_SIZE = 4
+STREAM_BATCH_SIZE = 256
+MANIFEST_SUFFIX = ".manifest.json"
+# Directory of the index manifests of PostgreSQL tables, which have no vector store file to sit next to
+POSTGRES_MANIFEST_DIR = os.getenv("POSTGRES_MANIFEST_DIR") or os.path.join(
+    tempfile.gettempdir(), "neuro_san_index_manifests"
+)
+# File extensions of the vector store file: a JSON dump, or a binary float32 matrix with a side file
+VECTOR_STORE_EXTENSIONS = (".json", ".npy")
+
+VectorStoreType = Literal["in_memory", "numpy", "ivf", "int8", "pq", "postgres"]
+# "dense" only runs a similarity search, "hybrid" fuses it with a lexical search by reciprocal rank fusion
+RetrievalMode = Literal["dense", "hybrid"]
+# Rescores retrieved candidates with a local cross-encoder model, or with BM25 over the candidates
+RerankerType = Literal["cross_encoder", "lexical"]
+# Number of documents returned by a query if the search arguments do not set "k"
+DEFAULT_TOP_K = 4
+# In-process vector store classes, by vector store type
+LOCAL_VECTOR_STORE_CLASSES: Dict[str, type] = {
+    "in_memory": InMemoryVectorStore,
+    "numpy": NumpyVectorStore,
+    "ivf": IvfVectorStore,
+    "int8": Int8VectorStore,
+    "pq": PqVectorStore,
+}
+# In-process vector stores persisted as a binary matrix with side files
+MATRIX_VECTOR_STORE_TYPES = ("numpy", "ivf", "int8", "pq")
 
 logger = logging.getLogger(__name__)
 
@@ -62,16 +147,47 @@ class PostgresConfig:
         return f"postgresql+asyncpg://{self.user}:{self.password}@{self.host}:{self.port}/{self.database}"
 
 
-class BaseRag(ABC):
+class BaseRag(ABC):  # pylint: disable=too-many-instance-attributes
     """
     Abstract Base Class for different types of RAG implementations.
     """
 
     def __init__(self):
-        # Save the generated vector store as a JSON file if True
+        # Save the generated vector store to the vector store file if True
         self.save_vector_store: bool = False
         self.abs_vector_store_path: Optional[str] = None
-        self.embeddings: Embeddings = OpenAIEmbeddings(model=EMBEDDINGS_MODEL, dimensions=VECTOR_SIZE)
+        # Only re-index the sources that changed since the last run if True
+        self.incremental_indexing: bool = False
+        # Load, split, embed and upsert documents as concurrent stages instead of one after the other if True
+        self.streaming_ingestion: bool = False
+        # Number of tokens per chunk, and shared by consecutive chunks
+        self.chunk_size: int = CHUNK_SIZE
+        self.chunk_overlap: int = CHUNK_OVERLAP
+        # Extra arguments of the similarity searches, e.g. the number of lists probed by the ivf vector store
+        self.search_kwargs: Dict[str, Any] = {}
+        # Fuse the similarity search with a lexical search if "hybrid", with the given reciprocal rank fusion constant
+        self.retrieval_mode: RetrievalMode = "dense"
+        self.rrf_k: int = DEFAULT_RRF_K
+        # Rescore the given number of candidates and keep the best ones if a reranker is set
+        self.reranker: Optional[RerankerType] = None
+        self.rerank_candidates: int = DEFAULT_RERANK_CANDIDATES
+        # Serve results of queries asked before from the query cache, also for similar queries given a threshold.
+        # By default only for in-process vector stores, as other processes may write to a PostgreSQL table.
+        self.query_cache_enabled: Optional[bool] = None
+        self.semantic_cache_threshold: Optional[float] = None
+        # Maximum number of tokens of the retrieved passages returned by a query, unlimited if None
+        self.max_result_tokens: Optional[int] = None
+        # Namespace the documents are indexed into, and namespaces searched by queries
+        self.namespace: Optional[str] = None
+        self.namespaces: List[str] = []
+        # Vector store file the shards of the namespaces are next to, if namespaced
+        self.root_vector_store_path: Optional[str] = None
+        # Chunks are embedded in concurrent, rate-limit-aware batches, and embeddings of chunks
+        # that were embedded before are served from a content-addressed cache
+        self.embedding_config: EmbeddingConfig = get_default_config()
+        self.embeddings: Embeddings = EmbeddingPipeline(
+            create_embeddings(self.embedding_config, get_embedding_cache())
+        )
 
     @abstractmethod
     async def load_documents(self, loader_args: Any) -> List[Document]:
@@ -80,11 +196,58 @@ class BaseRag(ABC):
         """
         raise NotImplementedError
 
+    async def lazy_load_documents(self, loader_args: Any) -> AsyncIterator[Document]:
+        """
+        Load documents one by one, for streaming ingestion.
+        Subclasses whose loader can yield documents before the whole data source is loaded should override this.
+
+        :param loader_args: Arguments specific to the document loader
+        :return: Asynchronous iterator over the loaded documents
+        """
+        for doc in await self.load_documents(loader_args):
+            yield doc
+
+    # pylint: disable=unused-argument
+    async def fingerprint_sources(self, loader_args: Any) -> Dict[str, Optional[str]]:
+        """
+        Compute a fingerprint for each source described by the loader arguments.
+        The fingerprint of a source must change whenever its content changes.
+        Subclasses supporting incremental indexing override this method together with select_sources().
+
+        :param loader_args: Arguments specific to the document loader
+        :return: Dictionary of every existing source to its fingerprint, None if the source could not be reached
+            for now. Sources left out are taken for removed. Empty if incremental indexing is not supported.
+        :raises SourcesUnreachableError: If the sources could not be listed, so that the indexed ones are kept
+        """
+        return {}
+
+    def select_sources(self, loader_args: Any, sources: List[str]) -> Any:
+        """
+        Restrict the loader arguments to the given sources, so that only those are loaded.
+
+        :param loader_args: Arguments specific to the document loader
+        :param sources: Sources as returned by fingerprint_sources()
+        :return: Loader arguments for load_documents()
+        """
+        raise NotImplementedError
+
+    def get_document_source(self, doc: Document) -> str:
+        """
+        Get the source a loaded document came from, as keyed in fingerprint_sources().
+
+        :param doc: A loaded document or one of its chunks
+        :return: The source of the document
+        """
+        return doc.metadata.get("source", "")
+
     def configure_vector_store_path(self, vector_store_path: Optional[str]):
         """
         Validate the vector store file path and set it as an absolute path.
 
-        :param vector_store_path: Relative or absolute path to the vector store JSON file.
+        :param vector_store_path: Relative or absolute path to the vector store file.
+            A ".json" file is a JSON dump of an InMemoryVectorStore.
+            A ".npy" file is a float32 matrix, memory-mapped when loaded, with a ".docs.jsonl" side file
+            holding the text and metadata of the chunks.
         :raises ValueError: If the path contains invalid characters or has an incorrect file extension.
         """
         if not vector_store_path:
@@ -96,23 +259,241 @@ class BaseRag(ABC):
             raise ValueError(f"Invalid vector_store_path: '{vector_store_path}'")
 
         # Check file extension
-        if not vector_store_path.endswith(".json"):
-            logger.error("vector_store_path must be a .json file, got: '%s'\n", vector_store_path)
-            raise ValueError(f"vector_store_path must be a .json file, got: '{vector_store_path}'")
+        if not vector_store_path.endswith(VECTOR_STORE_EXTENSIONS):
+            logger.error("vector_store_path must be a .json or .npy file, got: '%s'\n", vector_store_path)
+            raise ValueError(f"vector_store_path must be a .json or .npy file, got: '{vector_store_path}'")
+
+        self.abs_vector_store_path = self._get_abs_path(vector_store_path)
+
+    def configure_chunking(self, chunk_size: Optional[int], chunk_overlap: Optional[int]):
+        """
+        Set the number of tokens per chunk and shared by consecutive chunks.
+
+        :param chunk_size: Number of tokens per chunk. Keeps the default if None.
+        :param chunk_overlap: Number of tokens shared by consecutive chunks. Keeps the default if None.
+        :raises ValueError: If the chunk size is not positive or the overlap is not smaller than the chunk size.
+        """
+        chunk_size = int(chunk_size) if chunk_size is not None else self.chunk_size
+        chunk_overlap = int(chunk_overlap) if chunk_overlap is not None else self.chunk_overlap
+        if chunk_size <= 0 or not 0 <= chunk_overlap < chunk_size:
+            logger.error("Invalid chunk_size %s and chunk_overlap %s\n", chunk_size, chunk_overlap)
+            raise ValueError(
+                f"chunk_size must be positive and chunk_overlap between 0 and chunk_size - 1, "
+                f"got {chunk_size} and {chunk_overlap}"
+            )
+
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+
+    def configure_retrieval(self, retrieval_mode: Optional[str], rrf_k: Optional[int] = None):
+        """
+        Set how the vector store is searched.
+
+        :param retrieval_mode: "dense" for a similarity search only, or "hybrid" to fuse it with a lexical
+            search, BM25 for the in-process vector stores and full-text search for PostgreSQL.
+            Falls back to "dense" if None or unknown.
+        :param rrf_k: Constant of reciprocal rank fusion. Keeps the default if None.
+        :raises ValueError: If the constant is not positive.
+        """
+        if retrieval_mode not in (None, "dense", "hybrid"):
+            logger.warning(
+                "Received %s as 'retrieval_mode'. Available modes are 'dense' and 'hybrid'\n", retrieval_mode
+            )
+        self.retrieval_mode = "hybrid" if retrieval_mode == "hybrid" else "dense"
+
+        rrf_k = int(rrf_k) if rrf_k is not None else self.rrf_k
+        if rrf_k <= 0:
+            logger.error("Invalid rrf_k %s\n", rrf_k)
+            raise ValueError(f"rrf_k must be positive, got {rrf_k}")
+        self.rrf_k = rrf_k
+
+    def configure_reranking(self, reranker: Optional[str], rerank_candidates: Optional[int] = None):
+        """
+        Set how retrieved candidates are reranked.
+
+        :param reranker: "cross_encoder" to rescore the candidates with a local cross-encoder model, falling back
+            to "lexical" if sentence-transformers is not installed, or "lexical" to rescore them with BM25 over the
+            candidates. Candidates are not reranked if None or unknown.
+        :param rerank_candidates: Number of candidates fetched and rescored. Keeps the default if None.
+        :raises ValueError: If the number of candidates is not positive.
+        """
+        if reranker not in (None, "cross_encoder", "lexical"):
+            logger.warning(
+                "Received %s as 'reranker'. Available rerankers are 'cross_encoder' and 'lexical'\n", reranker
+            )
+        self.reranker = reranker if reranker in ("cross_encoder", "lexical") else None
+
+        rerank_candidates = int(rerank_candidates) if rerank_candidates is not None else self.rerank_candidates
+        if rerank_candidates <= 0:
+            logger.error("Invalid rerank_candidates %s\n", rerank_candidates)
+            raise ValueError(f"rerank_candidates must be positive, got {rerank_candidates}")
+        self.rerank_candidates = rerank_candidates
+
+    def configure_query_cache(self, enabled: Optional[bool], semantic_threshold: Optional[float] = None):
+        """
+        Set how query results are cached.
+
+        :param enabled: Serve the results of queries asked before from the cache. Keeps the default if None,
+            which is to cache the results of in-process vector stores only. Only enable it for a PostgreSQL
+            vector store if no other process writes to its table, as the cache cannot see those writes.
+        :param semantic_threshold: Minimum cosine similarity between the embeddings of a query and of a cached query
+            to serve the result of the cached query. Only identical queries, ignoring case, whitespace and
+            surrounding punctuation, are served if None.
+        :raises ValueError: If the threshold is not between 0 and 1.
+        """
+        if enabled is not None:
+            self.query_cache_enabled = bool(enabled)
+        if semantic_threshold is not None and not 0.0 < float(semantic_threshold) <= 1.0:
+            logger.error("Invalid semantic_cache_threshold %s\n", semantic_threshold)
+            raise ValueError(f"semantic_cache_threshold must be between 0 and 1, got {semantic_threshold}")
+        self.semantic_cache_threshold = float(semantic_threshold) if semantic_threshold is not None else None
+
+    def configure_result_packing(self, max_result_tokens: Optional[int]):
+        """
+        Set the token budget of the retrieved passages returned by a query.
+
+        :param max_result_tokens: Maximum number of tokens of the passages, sources included. Unlimited if None.
+        :raises ValueError: If the budget is not positive.
+        """
+        if max_result_tokens is not None and int(max_result_tokens) <= 0:
+            logger.error("Invalid max_result_tokens %s\n", max_result_tokens)
+            raise ValueError(f"max_result_tokens must be positive, got {max_result_tokens}")
+        self.max_result_tokens = int(max_result_tokens) if max_result_tokens is not None else None
+
+    def configure_namespaces(self, namespace: Optional[str], namespaces: Optional[List[str]] = None):
+        """
+        Index the documents into a namespace, e.g. one per tenant or data source, and set the namespaces
+        searched by queries. Call after configure_vector_store_path().
+
+        In-process vector stores keep every namespace in a shard file next to the vector store file,
+        e.g. "store.docs.npy" for the namespace "docs" of "store.npy", listed in a ".shards.json" manifest.
+        PostgreSQL vector stores keep all the namespaces in one table, with the namespace in the indexed
+        metadata of the chunks.
+
+        :param namespace: Namespace of the indexed documents. Documents are not namespaced if None.
+        :param namespaces: Namespaces searched by queries, whose results are merged. Defaults to the namespace.
+        :raises ValueError: If a namespace is invalid, or namespaces are given without a namespace.
+        """
+        if not namespace:
+            if namespaces:
+                logger.error("namespaces %s given without a namespace\n", namespaces)
+                raise ValueError("namespaces can only be searched when a namespace is set")
+            return
+
+        self.namespace = validate_namespace(namespace)
+        self.namespaces = list(dict.fromkeys(validate_namespace(name) for name in namespaces or [namespace]))
+        if self.abs_vector_store_path:
+            self.root_vector_store_path = self.abs_vector_store_path
+            self.abs_vector_store_path = get_shard_path(self.root_vector_store_path, self.namespace)
+
+    def configure_embeddings(
+        self,
+        provider: Optional[str],
+        model: Optional[str] = None,
+        dimensions: Optional[int] = None,
+        reduction: Optional[str] = None,
+        precision: Optional[str] = None,
+    ):
+        # pylint: disable=too-many-arguments,too-many-positional-arguments
+        """
+        Set the embedding model of the documents and queries. Call after configure_namespaces().
+
+        :param provider: "openai", or "local" to embed on the CPU with a sentence-transformers model
+            without network access. Falls back to the EMBEDDING_PROVIDER environment variable, then "openai".
+        :param model: Name of the embedding model. Defaults to the default model of the provider.
+        :param dimensions: Number of dimensions of the vectors. OpenAI models return them natively,
+            local vectors are reduced to them with the reduction, which is then required.
+        :param reduction: "matryoshka" to keep the first dimensions of local vectors,
+            or "pca" to project them on the principal components of the first documents indexed.
+            The PCA projection is saved next to the vector store file, which is then required.
+        :param precision: "float32", "float16" or "int8" precision of the vectors in the embedding cache
+        :raises ValueError: If an argument is invalid.
+        """
+        provider = provider or os.getenv("EMBEDDING_PROVIDER") or "openai"
+        if provider not in ("openai", "local"):
+            logger.error("Invalid embedding provider %s\n", provider)
+            raise ValueError(f"embedding_provider must be 'openai' or 'local', got '{provider}'")
+        if dimensions is not None and int(dimensions) <= 0:
+            logger.error("Invalid embedding dimensions %s\n", dimensions)
+            raise ValueError(f"embedding_dimensions must be positive, got {dimensions}")
+        if reduction not in (None, "matryoshka", "pca"):
+            logger.error("Invalid dimension reduction %s\n", reduction)
+            raise ValueError(f"dimension_reduction must be 'matryoshka' or 'pca', got '{reduction}'")
+        if precision not in (None, *PRECISIONS):
+            logger.error("Invalid embedding precision %s\n", precision)
+            raise ValueError(f"embedding_precision must be one of {PRECISIONS}, got '{precision}'")
+        if provider == "local" and reduction and not dimensions:
+            raise ValueError(f"dimension_reduction '{reduction}' needs embedding_dimensions")
+        if provider == "local" and dimensions and not reduction:
+            raise ValueError("embedding_dimensions needs dimension_reduction for local models")
+
+        # The PCA projection of the namespaces of a store is shared, as queries search them together
+        pca_path: Optional[str] = get_pca_path(self.root_vector_store_path or self.abs_vector_store_path)
+        if provider == "local" and reduction == "pca" and not pca_path:
+            raise ValueError("dimension_reduction 'pca' needs a vector_store_path to save its projection next to")
+
+        default_config: EmbeddingConfig = get_default_config(provider)
+        self.embedding_config = EmbeddingConfig(
+            provider=default_config.provider,
+            model=model or default_config.model,
+            dimensions=int(dimensions) if dimensions else default_config.dimensions,
+            reduction=reduction if provider == "local" else None,
+            precision=precision or default_config.precision,
+        )
+        self.embeddings = EmbeddingPipeline(
+            create_embeddings(
+                self.embedding_config, get_embedding_cache(precision=self.embedding_config.precision), pca_path
+            )
+        )
+
+    def configure_embedding_cache(self, embedding_cache_path: Optional[str]):
+        """
+        Persist embeddings of document chunks to a SQLite file so that unchanged chunks
+        are not embedded again when the vector store is rebuilt.
+
+        :param embedding_cache_path: Relative or absolute path to the SQLite file.
+            Falls back to the EMBEDDING_CACHE_PATH environment variable.
+            If neither is set, embeddings are only cached in memory, so an interrupted ingest does not resume.
+        :raises ValueError: If the path contains invalid characters.
+        """
+        embedding_cache_path = embedding_cache_path or os.getenv("EMBEDDING_CACHE_PATH")
+        if not embedding_cache_path:
+            logger.info("No embedding_cache_path: an interrupted ingest will embed every chunk again\n")
+            return
+
+        if re.search(INVALID_PATH_PATTERN, embedding_cache_path):
+            logger.error("Invalid characters in embedding_cache_path: '%s'\n", embedding_cache_path)
+            raise ValueError(f"Invalid embedding_cache_path: '{embedding_cache_path}'")
+
+        cached_embeddings: Embeddings = self.embeddings
+        while isinstance(cached_embeddings, (EmbeddingPipeline, ReducedEmbeddings)):
+            cached_embeddings = cached_embeddings.embeddings
+        if isinstance(cached_embeddings, CachedEmbeddings):
+            cached_embeddings.cache = get_embedding_cache(
+                self._get_abs_path(embedding_cache_path), self.embedding_config.precision
+            )
+
+    @staticmethod
+    def _get_abs_path(path: str) -> str:
+        """
+        Resolve a path relative to this file into an absolute path.
 
-        if os.path.isabs(vector_store_path):
+        :param path: Relative or absolute path
+        :return: Absolute path
+        """
+        if os.path.isabs(path):
             # It's already an absolute path — use it directly
-            self.abs_vector_store_path = vector_store_path
-        else:
-            # Combine to relative path to base path to make absolute path
-            base_path: str = os.path.dirname(__file__)
-            self.abs_vector_store_path = os.path.abspath(os.path.join(base_path, vector_store_path))
+            return path
+
+        # Combine to relative path to base path to make absolute path
+        base_path: str = os.path.dirname(__file__)
+        return os.path.abspath(os.path.join(base_path, path))
 
     async def generate_vector_store(
         self,
         loader_args: Any,
         postgres_config: Optional[PostgresConfig] = None,
-        vector_store_type: Literal["in_memory", "postgres"] = "in_memory",
+        vector_store_type: VectorStoreType = "in_memory",
     ) -> Optional[VectorStore]:
         """
         Asynchronously loads documents from a given data source, splits them into
@@ -125,20 +506,86 @@ class BaseRag(ABC):
         """
 
         # If vector store type is unsupported, fallback to in-memory vector store
-        if vector_store_type not in {"in_memory", "postgres"}:
+        if vector_store_type not in LOCAL_VECTOR_STORE_CLASSES and vector_store_type != "postgres":
             logger.warning(
-                "Received %s as 'vector_store_typ'. Available types are 'in_memory' and 'postgres'\n",
+                "Received %s as 'vector_store_type'. Available types are %s and 'postgres'\n",
                 vector_store_type,
+                list(LOCAL_VECTOR_STORE_CLASSES),
             )
             vector_store_type = "in_memory"
 
+        # The numpy, ivf and quantized vector stores are persisted as a binary matrix, not as a JSON dump
+        if (
+            vector_store_type in MATRIX_VECTOR_STORE_TYPES
+            and self.abs_vector_store_path
+            and self.abs_vector_store_path.endswith(".json")
+        ):
+            raise ValueError(
+                f"vector_store_path must end with '.npy' when vector_store_type is '{vector_store_type}'\n"
+            )
+
         # Validate postgres config if needed
         if vector_store_type == "postgres" and postgres_config is None:
             raise ValueError("postgres_config is required when vector_store_type is 'postgres'\n")
 
-        # Try to load existing vector store for in-memory vector store
-        if vector_store_type == "in_memory":
-            existing_store = await self._load_existing_vector_store()
+        # Built vector stores are shared across invocations, and concurrent requests wait on one build
+        registry_key = make_registry_key(
+            self.__class__.__name__,
+            loader_args,
+            vector_store_type,
+            postgres_config,
+            self.abs_vector_store_path,
+            self.namespace,
+            self.chunk_size,
+            self.chunk_overlap,
+            self.embedding_config,
+        )
+        return await VECTOR_STORE_REGISTRY.get_or_build(
+            registry_key, lambda: self._build_indexes(loader_args, postgres_config, vector_store_type)
+        )
+
+    async def _build_indexes(
+        self,
+        loader_args: Any,
+        postgres_config: Optional[PostgresConfig],
+        vector_store_type: VectorStoreType,
+    ) -> Optional[VectorStore]:
+        """Build the vector store, and its lexical index along with it for hybrid retrieval."""
+        vectorstore: Optional[VectorStore] = await self._build_vector_store(
+            loader_args, postgres_config, vector_store_type
+        )
+        if self.retrieval_mode == "hybrid" and supports_lexical_index(vectorstore):
+            await asyncio.to_thread(self._get_lexical_index, vectorstore)
+        return vectorstore
+
+    def _get_lexical_index(self, vectorstore: VectorStore, store_path: Optional[str] = None) -> BM25Index:
+        """Get the lexical index of an in-process vector store, persisted next to the vector store file if saved."""
+        store_path = store_path or self.abs_vector_store_path
+        index_path: Optional[str] = get_lexical_index_path(store_path) if store_path else None
+        return get_lexical_index(vectorstore, index_path, save=self.save_vector_store)
+
+    async def _build_vector_store(
+        self,
+        loader_args: Any,
+        postgres_config: Optional[PostgresConfig],
+        vector_store_type: VectorStoreType,
+    ) -> Optional[VectorStore]:
+        """Load, update or create the vector store."""
+
+        # Only re-index the sources that changed if configured and supported by the loader
+        if self.incremental_indexing and self._get_manifest_path(postgres_config, vector_store_type):
+            try:
+                fingerprints: Optional[Dict[str, Optional[str]]] = await self.fingerprint_sources(loader_args)
+            except SourcesUnreachableError as error:
+                logger.error("Failed to list the sources: %s. Keeping the indexed sources.\n", error)
+                fingerprints = None
+            if fingerprints is None or fingerprints:
+                return await self._update_vector_store(loader_args, fingerprints, postgres_config, vector_store_type)
+            logger.info("Incremental indexing is not available. Building the whole vector store.\n")
+
+        # Try to load existing vector store for in-process vector stores
+        if vector_store_type in LOCAL_VECTOR_STORE_CLASSES:
+            existing_store = await self._load_existing_vector_store(vector_store_type)
             if existing_store:
                 return existing_store
 
@@ -150,64 +597,296 @@ class BaseRag(ABC):
 
         return vectorstore
 
-    async def _load_existing_vector_store(self) -> Optional[VectorStore]:
+    async def _load_existing_vector_store(self, vector_store_type: VectorStoreType) -> Optional[VectorStore]:
         """Try to load existing vector store from file."""
 
         if not self.abs_vector_store_path:
             return None
 
         try:
-            vector_store: VectorStore = InMemoryVectorStore.load(
-                path=self.abs_vector_store_path, embedding=self.embeddings
+            # Loading reads the side files, and trains the index of the approximate stores if it is stale
+            vector_store: VectorStore = await asyncio.to_thread(
+                self._get_local_store_class(vector_store_type).load,
+                path=self.abs_vector_store_path,
+                embedding=self.embeddings,
             )
             logger.info("Loaded vector store from: %s\n", self.abs_vector_store_path)
             return vector_store
         except FileNotFoundError:
             logger.info("Vector store not found at: %s. Creating from source.\n", self.abs_vector_store_path)
             return None
+        except ValueError as value_error:
+            logger.error(
+                "Invalid vector store at %s: %s. Creating from source.\n", self.abs_vector_store_path, value_error
+            )
+            return None
+
+    def _get_local_store_class(self, vector_store_type: VectorStoreType) -> type:
+        """Get the in-process vector store class of the type, or matching the format of the vector store file."""
+        if (
+            vector_store_type == "in_memory"
+            and self.abs_vector_store_path
+            and self.abs_vector_store_path.endswith(".npy")
+        ):
+            return NumpyVectorStore
+        return LOCAL_VECTOR_STORE_CLASSES[vector_store_type]
 
     async def _create_new_vector_store(
         self,
         loader_args: Any,
         postgres_config: Optional[PostgresConfig],
-        vector_store_type: Literal["in_memory", "postgres"],
+        vector_store_type: VectorStoreType,
     ) -> Optional[VectorStore]:
         """Create a new vector store."""
 
-        if vector_store_type == "in_memory":
-            return await self._create_in_memory_vector_store(loader_args)
+        if vector_store_type in LOCAL_VECTOR_STORE_CLASSES:
+            return await self._create_in_memory_vector_store(loader_args, vector_store_type)
 
         return await self._create_postgres_vector_store(loader_args, postgres_config)
 
+    def _get_manifest_path(
+        self, postgres_config: Optional[PostgresConfig], vector_store_type: VectorStoreType
+    ) -> Optional[str]:
+        """Get the path of the index manifest, or None if the vector store is not persisted."""
+        if vector_store_type == "postgres":
+            table_name: str = postgres_config.table_name or DEFAULT_TABLE_NAME
+            # Tables of the same name in other databases are other indexes, and every namespace is indexed on its own
+            key: str = json.dumps(
+                [
+                    postgres_config.host,
+                    postgres_config.port,
+                    postgres_config.database,
+                    postgres_config.user,
+                    table_name,
+                ]
+                + ([self.namespace] if self.namespace else [])
+            )
+            digest: str = hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+            return os.path.join(POSTGRES_MANIFEST_DIR, f"{table_name}.{digest}{MANIFEST_SUFFIX}")
+
+        if self.abs_vector_store_path:
+            return os.path.splitext(self.abs_vector_store_path)[0] + MANIFEST_SUFFIX
+
+        return None
+
+    async def _update_vector_store(
+        self,
+        loader_args: Any,
+        fingerprints: Optional[Dict[str, Optional[str]]],
+        postgres_config: Optional[PostgresConfig],
+        vector_store_type: VectorStoreType,
+    ) -> Optional[VectorStore]:
+        """
+        Bring a persisted vector store up to date by re-indexing only the sources
+        whose fingerprint changed and deleting the chunks of sources that vanished.
+        Sources which could not be reached, or all of them if fingerprints is None, are kept as they are.
+        """
+        manifest_path: str = self._get_manifest_path(postgres_config, vector_store_type)
+        manifest = IndexManifest.load(manifest_path)
+
+        if vector_store_type in LOCAL_VECTOR_STORE_CLASSES:
+            vectorstore: Optional[VectorStore] = await self._load_existing_vector_store(vector_store_type)
+            if vectorstore is None or not manifest.sources:
+                # Start from an empty store if the saved one is missing or was not built incrementally
+                manifest = IndexManifest(manifest_path)
+                vectorstore = self._get_local_store_class(vector_store_type)(embedding=self.embeddings)
+        else:
+            vectorstore = await self._open_postgres_vector_store(postgres_config)
+            if vectorstore is None:
+                return None
+            if not await self._has_chunks(vectorstore):
+                # A new or emptied table holds none of the chunks the manifest lists
+                manifest = IndexManifest(manifest_path)
+
+        if fingerprints is None:
+            fingerprints = dict.fromkeys(manifest.sources)
+        changed_sources: List[str] = manifest.changed_sources(fingerprints)
+        removed_sources: List[str] = manifest.removed_sources(fingerprints)
+        unreachable: int = sum(fingerprint is None for fingerprint in fingerprints.values())
+        logger.info(
+            "Incremental indexing: %d changed, %d removed, %d unreachable, %d unchanged sources\n",
+            len(changed_sources),
+            len(removed_sources),
+            unreachable,
+            len(fingerprints) - len(changed_sources) - unreachable,
+        )
+
+        # Delete the chunks of sources that changed or vanished
+        stale_ids: List[str] = manifest.chunk_ids(changed_sources + removed_sources)
+        if stale_ids:
+            await vectorstore.adelete(ids=stale_ids)
+            bump_index_version(vectorstore)
+        manifest.forget(changed_sources + removed_sources)
+
+        if changed_sources:
+            await self._index_sources(vectorstore, manifest, loader_args, changed_sources, fingerprints)
+
+        # The manifest only lists what the saved store holds, so it is not saved if saving the store failed
+        if vector_store_type == "postgres" or await self._save_vector_store(vectorstore, vector_store_type):
+            manifest.save()
+        return vectorstore
+
+    # pylint: disable=too-many-arguments
+    # pylint: disable=too-many-positional-arguments
+    async def _index_sources(
+        self,
+        vectorstore: VectorStore,
+        manifest: IndexManifest,
+        loader_args: Any,
+        sources: List[str],
+        fingerprints: Dict[str, Optional[str]],
+    ):
+        """Load, split and add the given sources to the vector store, recording their chunks in the manifest."""
+        docs: List[Document] = await self.load_documents(self.select_sources(loader_args, sources))
+        chunks_by_source: Dict[str, List[Document]] = {}
+        for doc_chunk in self._split_documents(docs):
+            chunks_by_source.setdefault(self.get_document_source(doc_chunk), []).append(doc_chunk)
+
+        doc_chunks: List[Document] = []
+        ids: List[str] = []
+        for source in sources:
+            source_chunks: List[Document] = chunks_by_source.pop(source, [])
+            if not source_chunks:
+                # Not recorded, so that the source is retried on the next run
+                logger.warning("No chunks loaded from source %s\n", source)
+                continue
+            # Namespaces sharing a table may index the same source
+            id_source: str = f"{self.namespace}/{source}" if self.namespace else source
+            source_ids: List[str] = [chunk_id(id_source, index) for index in range(len(source_chunks))]
+            doc_chunks.extend(source_chunks)
+            ids.extend(source_ids)
+            manifest.record(source, fingerprints[source], source_ids)
+
+        for source in chunks_by_source:
+            logger.warning("Ignoring chunks of unexpected source %s\n", source)
+
+        if doc_chunks:
+            await self._fit_embeddings(doc_chunks)
+            await vectorstore.aadd_documents(doc_chunks, ids=ids)
+            bump_index_version(vectorstore)
+
     async def _process_documents(self, loader_args: Any) -> List[Document]:
         """Load and split documents"""
         # Load documents and build the vector store
         docs: List[Document] = await self.load_documents(loader_args)
 
-        # Split documents into smaller chunks for better embedding and retrieval
-        text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(chunk_size=100, chunk_overlap=50)
+        doc_chunks: List[Document] = self._split_documents(docs)
+        await self._fit_embeddings(doc_chunks)
+        return doc_chunks
+
+    def _get_unfitted_reduction(self) -> Optional[ReducedEmbeddings]:
+        """Get the dimension reduction of the embeddings if it must be fitted before anything is embedded."""
+        embeddings: Embeddings = self.embeddings
+        while isinstance(embeddings, EmbeddingPipeline):
+            embeddings = embeddings.embeddings
+        if isinstance(embeddings, ReducedEmbeddings) and not embeddings.is_fitted:
+            return embeddings
+        return None
+
+    async def _fit_embeddings(self, doc_chunks: List[Document]):
+        """Fit the dimension reduction of the embeddings on the first chunks indexed, if it is not fitted yet."""
+        reduction: Optional[ReducedEmbeddings] = self._get_unfitted_reduction()
+        if reduction is not None and doc_chunks:
+            await reduction.afit([doc_chunk.page_content for doc_chunk in doc_chunks[:PCA_TRAINING_SIZE]])
 
-        doc_chunks: List[Document] = text_splitter.split_documents(docs)
+    def _split_documents(self, docs: List[Document]) -> List[Document]:
+        """Split documents into chunks"""
+        # Split documents into smaller chunks for better embedding and retrieval.
+        # The chunker and its encoder are shared, and each document is encoded once.
+        doc_chunks: List[Document] = get_token_chunker(self.chunk_size, self.chunk_overlap).split_documents(docs)
         logger.info("Processed %d document chunks\n", len(doc_chunks))
 
+        if self.namespace:
+            for doc_chunk in doc_chunks:
+                doc_chunk.metadata[NAMESPACE_METADATA_KEY] = self.namespace
+
         return doc_chunks
 
-    async def _create_in_memory_vector_store(self, loader_args) -> VectorStore:
+    async def _stream_documents(self, vectorstore: VectorStore, loader_args: Any) -> int:
+        """
+        Load, split, embed and upsert documents into a vector store as concurrent stages
+        connected by bounded queues, so that memory does not grow with the size of the data source
+        and chunks are searchable before the last document is loaded.
+
+        :param vectorstore: Vector store to add the chunks to
+        :param loader_args: Arguments specific to the document loader
+        :return: Number of chunks added
+        """
+        # None marks the end of a queue
+        documents: asyncio.Queue = asyncio.Queue(maxsize=STREAM_DOCUMENT_QUEUE_SIZE)
+        batches: asyncio.Queue = asyncio.Queue(maxsize=STREAM_BATCH_QUEUE_SIZE)
+
+        async def load():
+            async for doc in self.lazy_load_documents(loader_args):
+                await documents.put(doc)
+            await documents.put(None)
+
+        async def split():
+            doc_chunks: List[Document] = []
+            while (doc := await documents.get()) is not None:
+                doc_chunks.extend(self._split_documents([doc]))
+                while len(doc_chunks) >= STREAM_BATCH_SIZE:
+                    await batches.put(doc_chunks[:STREAM_BATCH_SIZE])
+                    doc_chunks = doc_chunks[STREAM_BATCH_SIZE:]
+            if doc_chunks:
+                await batches.put(doc_chunks)
+            await batches.put(None)
+
+        async def add(batch: List[Document]) -> int:
+            await self._fit_embeddings(batch)
+            await vectorstore.aadd_documents(batch)
+            bump_index_version(vectorstore)
+            return len(batch)
+
+        async def upsert() -> int:
+            count: int = 0
+            # Chunks held back until there are enough of them to fit the dimension reduction of the embeddings
+            held: List[Document] = []
+            while (batch := await batches.get()) is not None:
+                if self._get_unfitted_reduction() is not None:
+                    held.extend(batch)
+                    if len(held) < PCA_TRAINING_SIZE:
+                        continue
+                    batch, held = held, []
+                count += await add(batch)
+                logger.info("Streamed %d document chunks into the vector store\n", count)
+            if held:
+                count += await add(held)
+            return count
+
+        tasks: List[asyncio.Future] = [asyncio.ensure_future(stage()) for stage in (load, split, upsert)]
+        try:
+            results: List[Any] = await asyncio.gather(*tasks)
+        except BaseException:
+            # A failed stage would leave the others blocked on their queues
+            for task in tasks:
+                task.cancel()
+            raise
+        return results[-1]
+
+    async def _create_in_memory_vector_store(self, loader_args, vector_store_type: VectorStoreType) -> VectorStore:
         """Create an in-memory vector store."""
+        if self.streaming_ingestion:
+            logger.info("Streaming documents into in-memory vector store.")
+            vectorstore: VectorStore = self._get_local_store_class(vector_store_type)(embedding=self.embeddings)
+            await self._stream_documents(vectorstore, loader_args)
+            return vectorstore
+
         doc_chunks: List[Document] = await self._process_documents(loader_args)
         logger.info("Creating in-memory vector store.")
-        return await InMemoryVectorStore.afrom_documents(
+        return await self._get_local_store_class(vector_store_type).afrom_documents(
             documents=doc_chunks,
             embedding=self.embeddings,
         )
 
+    # pylint: disable=too-many-return-statements
     async def _create_postgres_vector_store(
         self, loader_args: Any, postgres_config: PostgresConfig
     ) -> Optional[VectorStore]:
         """Create a PostgreSQL vector store."""
 
-        # Create engine and table
-        pg_engine = PGEngine.from_connection_string(url=postgres_config.connection_string)
+        # Reuse the warm connection pool of the database
+        pg_engine: PGEngine = get_pg_engine(postgres_config.connection_string)
         table_name: str = postgres_config.table_name or DEFAULT_TABLE_NAME
 
         logger.info(
@@ -223,11 +902,38 @@ class BaseRag(ABC):
         )
 
         try:
+            # Steady state: the table exists, open it without any DDL
+            existing_vectorstore: Optional[VectorStore] = await open_existing_vector_store(
+                pg_engine, table_name, self.embeddings
+            )
+            if existing_vectorstore is not None:
+                logger.info("Table %s already exists.\n", table_name)
+                if self.namespace and not await self._has_namespace(existing_vectorstore):
+                    # A new namespace of a shared table
+                    logger.info("Indexing namespace %s into existing table.\n", self.namespace)
+                    await create_namespace_index(pg_engine, table_name, NAMESPACE_METADATA_KEY)
+                    await self._add_documents(existing_vectorstore, loader_args)
+                    return existing_vectorstore
+                logger.info("Creating postgres vector store from existing table.\n")
+                return existing_vectorstore
+
             # Initiaize vector store table
             await pg_engine.ainit_vectorstore_table(
                 table_name=table_name,
-                vector_size=VECTOR_SIZE,
+                vector_size=await asyncio.to_thread(get_vector_size, self.embedding_config),
             )
+            await create_full_text_index(pg_engine, table_name, self.embeddings)
+            await create_namespace_index(pg_engine, table_name, NAMESPACE_METADATA_KEY)
+
+            if self.streaming_ingestion:
+                logger.info("Streaming documents into postgres vector store.")
+                vectorstore: VectorStore = await PGVectorStore.create(
+                    engine=pg_engine,
+                    table_name=table_name,
+                    embedding_service=self.embeddings,
+                )
+                await self._stream_documents(vectorstore, loader_args)
+                return vectorstore
 
             doc_chunks: List[Document] = await self._process_documents(loader_args)
 
@@ -241,7 +947,7 @@ class BaseRag(ABC):
             )
 
         except ProgrammingError:
-            # Table already exists. Create vector store from it.
+            # Table was created concurrently. Create vector store from it.
             logger.info("Table %s already exists.\n", table_name)
             logger.info("Creating postgres vector store from existing table.\n")
             return await PGVectorStore.create(
@@ -267,38 +973,253 @@ class BaseRag(ABC):
             logger.error("Fail to create vector store due to invalid DB name. %s\n", invalid_catalog_error)
             return None
 
-    async def _save_vector_store(self, vectorstore: VectorStore, vector_store_type: Literal["in_memory", "postgres"]):
-        """Save vector store to file if configured."""
-        should_save: bool = self.save_vector_store and self.abs_vector_store_path and vector_store_type == "in_memory"
+    async def _open_postgres_vector_store(self, postgres_config: PostgresConfig) -> Optional[VectorStore]:
+        """Open a PostgreSQL vector store, creating its table if it does not exist."""
 
-        if not should_save:
+        pg_engine: PGEngine = get_pg_engine(postgres_config.connection_string)
+        table_name: str = postgres_config.table_name or DEFAULT_TABLE_NAME
+
+        try:
+            existing_vectorstore: Optional[VectorStore] = await open_existing_vector_store(
+                pg_engine, table_name, self.embeddings
+            )
+            if existing_vectorstore is not None:
+                return existing_vectorstore
+            await pg_engine.ainit_vectorstore_table(
+                table_name=table_name,
+                vector_size=await asyncio.to_thread(get_vector_size, self.embedding_config),
+            )
+            await create_full_text_index(pg_engine, table_name, self.embeddings)
+            await create_namespace_index(pg_engine, table_name, NAMESPACE_METADATA_KEY)
+        except ProgrammingError:
+            # Table already exists
+            logger.info("Table %s already exists.\n", table_name)
+        except (OSError, InvalidPasswordError, InvalidCatalogNameError) as connection_error:
+            logger.error("Fail to open vector store due to connection error. %s\n", connection_error)
             return None
 
+        return await PGVectorStore.create(
+            engine=pg_engine,
+            table_name=table_name,
+            embedding_service=self.embeddings,
+        )
+
+    async def _has_namespace(self, vectorstore: PGVectorStore) -> bool:
+        """True if the table of the vector store holds chunks of the namespace."""
+        rows: Dict[str, List] = await vectorstore.aget(
+            where={NAMESPACE_METADATA_KEY: self.namespace}, limit=1, include=[]
+        )
+        return bool(rows["ids"])
+
+    async def _has_chunks(self, vectorstore: PGVectorStore) -> bool:
+        """True if the table of the vector store holds chunks, of the namespace if there is one."""
+        if self.namespace:
+            return await self._has_namespace(vectorstore)
+        rows: Dict[str, List] = await vectorstore.aget(limit=1, include=[])
+        return bool(rows["ids"])
+
+    async def _add_documents(self, vectorstore: VectorStore, loader_args: Any):
+        """Load, split and add documents to an existing vector store."""
+        if self.streaming_ingestion:
+            await self._stream_documents(vectorstore, loader_args)
+            return
+        doc_chunks: List[Document] = await self._process_documents(loader_args)
+        if doc_chunks:
+            await vectorstore.aadd_documents(doc_chunks)
+            bump_index_version(vectorstore)
+
+    async def _save_vector_store(self, vectorstore: VectorStore, vector_store_type: VectorStoreType) -> bool:
+        """Save vector store to file if configured, returning True if it was saved."""
+        should_save: bool = (
+            self.save_vector_store and self.abs_vector_store_path and vector_store_type in LOCAL_VECTOR_STORE_CLASSES
+        )
+
+        if not should_save:
+            return False
+
         try:
             os.makedirs(os.path.dirname(self.abs_vector_store_path), exist_ok=True)
             vectorstore.dump(path=self.abs_vector_store_path)
             logger.info("Vector store saved to: %s\n", self.abs_vector_store_path)
+            if self.namespace and self.root_vector_store_path:
+                self._record_shard(vectorstore)
         except OSError as os_error:
             logger.error("Failed to save vector store to %s: %s\n", self.abs_vector_store_path, os_error)
+            return False
+        return True
+
+    def _record_shard(self, vectorstore: VectorStore):
+        """Record the saved shard of the namespace in the shard manifest, and serve it to the other namespaces."""
+        manifest = ShardManifest.load(get_shards_manifest_path(self.root_vector_store_path))
+        manifest.record(self.namespace, self.abs_vector_store_path, len(get_store_texts(vectorstore)[0]))
+        manifest.save()
+        SHARD_CACHE.put(self.abs_vector_store_path, vectorstore)
 
     async def query_vectorstore(self, vectorstore: VectorStore, query: str) -> str:
         """
         Query the given vector store using the provided query string
         and return the combined content of retrieved documents.
+        Results of queries asked before against the same index are served from the query cache.
 
         :param vectorstore: The in-memory vector store to query
         :param query: The user query to search for relevant documents
-        :return: Concatenated text content of the retrieved documents
+        :return: Retrieved passages with their source, packed within the result token budget
         """
         try:
-            # Create a retriever interface from the vector store
-            retriever: VectorStoreRetriever = vectorstore.as_retriever()
+            if vectorstore is not None and self._is_query_cache_enabled(vectorstore):
+                return await self._query_with_cache(vectorstore, query)
+
+            # Create a retriever interface from the vector store of every queried namespace
+            retriever: BaseRetriever = await self._get_shards_retriever(await self._get_shards(vectorstore))
 
-            return await self.query_retriever(retriever, query)
+            return self.pack_documents(await self.retrieve_documents(retriever, query))
 
         except AttributeError:
             return "Failed to create vector store. Please check the log for more information.\n"
 
+        except asyncio.TimeoutError as e:
+            return f"Timed out while querying retriever: {e}"
+
+    def _is_query_cache_enabled(self, vectorstore: VectorStore) -> bool:
+        """True if query results are cached, by default for in-process vector stores only."""
+        if self.query_cache_enabled is None:
+            return not isinstance(vectorstore, PGVectorStore)
+        return self.query_cache_enabled
+
+    async def _query_with_cache(self, vectorstore: VectorStore, query: str) -> str:
+        """Query the vector store, serving and recording the result in the query cache."""
+        shards: List[Tuple[VectorStore, Optional[str]]] = await self._get_shards(vectorstore)
+        # Results are only valid for these versions of the indexes and this retrieval configuration
+        scope = make_registry_key(
+            self.__class__.__name__,
+            [get_index_version(shard) for shard, _ in shards],
+            self.namespaces,
+            self.embedding_config,
+            self.retrieval_mode,
+            self.rrf_k,
+            self.reranker,
+            self.rerank_candidates,
+            self.search_kwargs,
+            self.max_result_tokens,
+        )
+        # On a miss the retriever embeds the query again, unless the vector store shares these embeddings,
+        # whose pipeline remembers recent queries. A vector store from the registry has the embeddings of its builder.
+        vector: Optional[List[float]] = (
+            await self.embeddings.aembed_query(query) if self.semantic_cache_threshold is not None else None
+        )
+        cached_result: Optional[str] = QUERY_CACHE.get(scope, query, vector, self.semantic_cache_threshold)
+        if cached_result is not None:
+            logger.info("Serving query from the query cache. %s\n", QUERY_CACHE.stats)
+            return cached_result
+
+        retriever: BaseRetriever = await self._get_shards_retriever(shards)
+        result: str = self.pack_documents(await self.retrieve_documents(retriever, query))
+        QUERY_CACHE.put(scope, query, result, vector)
+        return result
+
+    def pack_documents(self, docs: List[Document]) -> str:
+        """
+        Merge overlapping chunks of the same document, drop near-duplicates and keep the best passages
+        that fit in the result token budget, so that the prompt does not pay for the same text twice.
+
+        :param docs: Retrieved chunks, best first
+        :return: The passages, each preceded by its source
+        """
+        return pack_results(docs, self.max_result_tokens).text
+
+    async def _get_shards(self, vectorstore: VectorStore) -> List[Tuple[VectorStore, Optional[str]]]:
+        """
+        Get the vector store of every queried namespace, with the path of its file. Only in-process vector stores
+        are sharded, the namespaces of a PostgreSQL vector store being filtered in its table.
+        """
+        if (
+            vectorstore is None
+            or isinstance(vectorstore, PGVectorStore)
+            or not self.namespace
+            or self.namespaces == [self.namespace]
+        ):
+            return [(vectorstore, self.abs_vector_store_path)]
+        if not self.root_vector_store_path:
+            logger.warning("Other namespaces can only be queried with a vector_store_path\n")
+            return [(vectorstore, self.abs_vector_store_path)]
+
+        shards: List[Tuple[VectorStore, Optional[str]]] = []
+        for namespace in self.namespaces:
+            shard_path: str = get_shard_path(self.root_vector_store_path, namespace)
+            if shard_path == self.abs_vector_store_path:
+                shards.append((vectorstore, shard_path))
+                continue
+            try:
+                # Shards of the other namespaces are loaded on demand, and evicted under memory pressure
+                shard: Optional[VectorStore] = await asyncio.to_thread(
+                    SHARD_CACHE.get,
+                    shard_path,
+                    lambda path: type(vectorstore).load(path=path, embedding=self.embeddings),
+                )
+            except ValueError as value_error:
+                logger.error("Invalid shard of namespace %s at %s: %s\n", namespace, shard_path, value_error)
+                continue
+            if shard is not None:
+                shards.append((shard, shard_path))
+        return shards
+
+    async def _get_shards_retriever(self, shards: List[Tuple[VectorStore, Optional[str]]]) -> BaseRetriever:
+        """
+        Get the retriever of a single vector store, or merging the results of the shards of several namespaces,
+        followed by the reranker if any.
+        """
+        top_k: int = int(self.search_kwargs.get("k", DEFAULT_TOP_K))
+        # The reranker rescores more candidates than it keeps
+        k: int = max(self.rerank_candidates, top_k) if self.reranker else top_k
+
+        retriever: BaseRetriever
+        if len(shards) == 1:
+            retriever = await self._get_retriever(*shards[0], k=k)
+        else:
+            retriever = MultiShardRetriever(
+                retrievers=[await self._get_retriever(shard, shard_path, k=k) for shard, shard_path in shards],
+                k=k,
+                rrf_k=self.rrf_k,
+            )
+
+        if not self.reranker:
+            return retriever
+        return RerankingRetriever(
+            retriever=retriever, scorer=get_scorer(self.reranker), k=top_k, tool_name=self.__class__.__name__
+        )
+
+    async def _get_retriever(
+        self, vectorstore: VectorStore, store_path: Optional[str] = None, k: Optional[int] = None
+    ) -> BaseRetriever:
+        """Get the retriever of the vector store for the retrieval mode, returning k documents."""
+        search_kwargs: Dict[str, Any] = {**self.search_kwargs, "k": k or self.search_kwargs.get("k", DEFAULT_TOP_K)}
+        if self.namespaces and isinstance(vectorstore, PGVectorStore):
+            # Filtered on the indexed namespace of the chunks
+            search_kwargs = {**search_kwargs, "filter": {NAMESPACE_METADATA_KEY: {"$in": self.namespaces}}}
+
+        if self.retrieval_mode == "hybrid" and vectorstore is not None:
+            if isinstance(vectorstore, PGVectorStore):
+                # Fused with a PostgreSQL full-text search
+                return vectorstore.as_retriever(
+                    search_kwargs={
+                        **search_kwargs,
+                        "hybrid_search_config": get_postgres_hybrid_search_config(search_kwargs["k"], self.rrf_k),
+                    }
+                )
+            if supports_lexical_index(vectorstore):
+                # The similarity search of the hybrid retriever fetches its own number of candidates
+                hybrid_k: int = search_kwargs.pop("k")
+                return HybridRetriever(
+                    vectorstore=vectorstore,
+                    lexical_index=await asyncio.to_thread(self._get_lexical_index, vectorstore, store_path),
+                    k=hybrid_k,
+                    rrf_k=self.rrf_k,
+                    search_kwargs=search_kwargs,
+                )
+            logger.warning("Hybrid retrieval is not available for this vector store. Using dense retrieval.\n")
+
+        return vectorstore.as_retriever(search_kwargs=search_kwargs)
+
     @staticmethod
     async def query_retriever(retriever: Any, query: str) -> str:
         """
@@ -309,14 +1230,28 @@ class BaseRag(ABC):
         :return: Concatenated text content of the retrieved documents
         """
         try:
-            # Perform an asynchronous similarity search
-            results: List[Document] = await retriever.ainvoke(query)
-
-            if results:
-                logger.info("Retrieval completed!\n")
+            results: List[Document] = await BaseRag.retrieve_documents(retriever, query)
 
             # Concatenate the content of all retrieved documents
             return "\n\n".join(doc.page_content for doc in results)
 
         except asyncio.TimeoutError as e:
             return f"Timed out while querying retriever: {e}"
+
+    @staticmethod
+    async def retrieve_documents(retriever: Any, query: str) -> List[Document]:
+        """
+        Query the retriever with the given query string.
+
+        :param retriever: The retriever interface to query
+        :param query: The user query to search for relevant documents
+        :return: The retrieved documents
+        :raises asyncio.TimeoutError: If the retriever timed out
+        """
+        # Perform an asynchronous similarity search
+        results: List[Document] = await retriever.ainvoke(query)
+
+        if results:
+            logger.info("Retrieval completed!\n")
+
+        return results
@@ -17,14 +17,21 @@ from typing import Any
 from typing import Dict
 from typing import List
 from typing import Optional
+from typing import Tuple
 from typing import Union
 
+import httpx
 import requests
 from neuro_san.interfaces.coded_tool import CodedTool
 from requests import HTTPError
 from requests import JSONDecodeError
 from requests import RequestException
 
+from coded_tools.async_http_client import ASYNC_HTTP_CLIENT
+from coded_tools.page_fetcher import add_page_contents
+from coded_tools.page_fetcher import add_page_contents_sync
+from coded_tools.search_cache import SEARCH_CACHE
+
 BRAVE_URL = "https://api.search.brave.com/res/v1/web/search"
 BRAVE_TIMEOUT = 30.0
 # The following parameters are from https://api-dashboard.search.brave.com/app/documentation/web-search/query.
@@ -68,6 +75,13 @@ class BraveSearch(CodedTool):
                 The argument dictionary expects the following keys:
                     "search_terms"
 
+                The following keys are optional:
+                    "cache_ttl_seconds" seconds the results are served from the search cache, 0 to always search
+                    "fetch" true to also fetch the pages of the top results, and add their main text as "content"
+                    "fetch_top_n" number of top results whose page is fetched, default 3
+                    "fetch_max_tokens" maximum number of tokens of the text of all the pages, default 4000
+                    "fetch_timeout" seconds to fetch all the pages, default 15
+
         :param sly_data: A dictionary whose keys are defined by the agent hierarchy,
                 but whose values are meant to be kept out of the chat stream.
 
@@ -89,6 +103,50 @@ class BraveSearch(CodedTool):
                 "Error: <error message>"
         """
 
+        request: Union[Tuple[Dict[str, Any], str, float], str] = self.prepare_request(args)
+        if isinstance(request, str):
+            return request
+        brave_search_params, brave_url, brave_timeout = request
+
+        results: Dict[str, Any] = SEARCH_CACHE.get_or_search_sync(
+            "brave_search",
+            brave_search_params["q"],
+            self.get_cache_params(brave_search_params, brave_url),
+            lambda: self.brave_search(brave_search_params, brave_url, brave_timeout),
+            args.get("cache_ttl_seconds"),
+        )
+        results_list: List[Dict[str, Any]] = self.get_results_list(results)
+        if bool(args.get("fetch", False)):
+            add_page_contents_sync(results_list, "url", args)
+        return results_list
+
+    async def async_invoke(self, args: Dict[str, Any], sly_data: Dict[str, Any]) -> Union[List[Dict[str, Any]], str]:
+        """
+        Search natively on the event loop, through the pooled HTTP client shared by the process.
+        See invoke() for the arguments and the return value.
+        """
+        request: Union[Tuple[Dict[str, Any], str, float], str] = self.prepare_request(args)
+        if isinstance(request, str):
+            return request
+        brave_search_params, brave_url, brave_timeout = request
+
+        results: Dict[str, Any] = await SEARCH_CACHE.get_or_search(
+            "brave_search",
+            brave_search_params["q"],
+            self.get_cache_params(brave_search_params, brave_url),
+            lambda: self.async_brave_search(brave_search_params, brave_url, brave_timeout),
+            args.get("cache_ttl_seconds"),
+        )
+        results_list: List[Dict[str, Any]] = self.get_results_list(results)
+        if bool(args.get("fetch", False)):
+            await add_page_contents(results_list, "url", args)
+        return results_list
+
+    def prepare_request(self, args: Dict[str, Any]) -> Union[Tuple[Dict[str, Any], str, float], str]:
+        """
+        :param args: The argument dictionary of invoke()
+        :return: The query parameters, URL and timeout of the search request, or an error message
+        """
         # Extract URL and timeout from args, then environment variables, then fall back to defaults
         brave_url: str = args.get("brave_url") or os.getenv("BRAVE_URL") or BRAVE_URL
         brave_timeout: float = float(args.get("brave_timeout") or os.getenv("BRAVE_TIMEOUT") or BRAVE_TIMEOUT)
@@ -111,7 +169,26 @@ class BraveSearch(CodedTool):
         logger.info("BraveSearch URL: %s", brave_url)
         logger.info("BraveSearch Timeout: %s", brave_timeout)
 
-        results: Dict[str, Any] = self.brave_search(brave_search_params, brave_url, brave_timeout)
+        return brave_search_params, brave_url, brave_timeout
+
+    def get_cache_params(self, brave_search_params: Dict[str, Any], brave_url: str) -> Dict[str, Any]:
+        """
+        :param brave_search_params: The query parameters of the search request
+        :param brave_url: The Brave Search API endpoint of the search request
+        :return: The parameters changing the results of a query, for the search cache
+        """
+        cache_params: Dict[str, Any] = {
+            param: param_value for param, param_value in brave_search_params.items() if param not in ("q",)
+        }
+        cache_params["url"] = brave_url
+        return cache_params
+
+    def get_results_list(self, results: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        :param results: The parsed JSON response from the Brave Search API
+        :return: The title, url, description and extra snippets of every search result
+        """
+        logger = logging.getLogger(self.__class__.__name__)
         logger.info("BraveSearch Results: %s", json.dumps(results, indent=4))
 
         results_list: List[Dict[str, Any]] = []
@@ -128,10 +205,6 @@ class BraveSearch(CodedTool):
 
         return results_list
 
-    async def async_invoke(self, args: Dict[str, Any], sly_data: Dict[str, Any]) -> Union[Dict[str, Any], str]:
-        """Run invoke asynchronously."""
-        return await asyncio.to_thread(self.invoke, args, sly_data)
-
     def brave_search(
         self,
         brave_search_params: Dict[str, Any],
@@ -147,10 +220,7 @@ class BraveSearch(CodedTool):
 
         :return: The parsed JSON response from the Brave Search API as a dictionary.
         """
-        headers = {
-            "Accept": "application/json",
-            "X-Subscription-Token": self.brave_api_key,
-        }
+        headers = self.get_headers()
         results: Dict[str, Any] = {}
         try:
             response = requests.get(brave_url, headers=headers, params=brave_search_params, timeout=brave_timeout)
@@ -164,3 +234,44 @@ class BraveSearch(CodedTool):
             logging.error("Request error: %s", req_err)
 
         return results
+
+    async def async_brave_search(
+        self,
+        brave_search_params: Dict[str, Any],
+        brave_url: Optional[str] = BRAVE_URL,
+        brave_timeout: Optional[float] = BRAVE_TIMEOUT,
+    ) -> Dict[str, Any]:
+        """
+        Perform a search request to the Brave Search API without blocking the event loop.
+
+        :param brave_search_params: Dictionary of query parameters to include in the search request.
+        :param brave_url: The Brave Search API endpoint to send the request to (default: BRAVE_URL).
+        :param brave_timeout: Total time of the request in seconds, including waiting for a connection
+            (default: BRAVE_TIMEOUT).
+
+        :return: The parsed JSON response from the Brave Search API as a dictionary.
+        """
+        results: Dict[str, Any] = {}
+        try:
+            results = await ASYNC_HTTP_CLIENT.get_json(
+                "brave_search", brave_url, brave_timeout, params=brave_search_params, headers=self.get_headers()
+            )
+        except httpx.HTTPStatusError as http_err:
+            logging.error("HTTP error occurred: %s - Status code: %s", http_err, http_err.response.status_code)
+        except ValueError as json_err:
+            logging.error("JSON decode error: %s", json_err)
+        except httpx.HTTPError as req_err:
+            logging.error("Request error: %s", req_err)
+        except asyncio.TimeoutError:
+            logging.error("Request timed out after %s seconds", brave_timeout)
+
+        return results
+
+    def get_headers(self) -> Dict[str, str]:
+        """
+        :return: Headers of the requests to the Brave Search API
+        """
+        return {
+            "Accept": "application/json",
+            "X-Subscription-Token": self.brave_api_key,
+        }
@@ -0,0 +1,353 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+# END COPYRIGHT
+
+import asyncio
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from typing import Any
+from typing import AsyncIterator
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from urllib.parse import urlparse
+
+import pymupdf
+from bs4 import BeautifulSoup
+from langchain_core.documents import Document
+
+# Directory under which the Confluence spaces are mirrored
+DEFAULT_MIRROR_DIR = os.getenv("CONFLUENCE_MIRROR_DIR") or os.path.join(
+    tempfile.gettempdir(), "neuro_san_confluence_mirror"
+)
+# Number of pages fetched concurrently from Confluence
+DEFAULT_SYNC_CONCURRENCY = int(os.getenv("CONFLUENCE_SYNC_CONCURRENCY") or 8)
+# Seconds during which a mirror that was just synced is not listed again
+DEFAULT_SYNC_INTERVAL = float(os.getenv("CONFLUENCE_SYNC_INTERVAL_SECONDS") or 60)
+# Number of pages listed per request
+PAGE_LIST_LIMIT = 100
+# Bytes written at once when streaming an attachment to disk
+DOWNLOAD_BLOCK_SIZE = 1 << 16
+# Characters that cannot be used in file names
+INVALID_NAME_PATTERN = re.compile(r"[^A-Za-z0-9._-]+")
+
+logger = logging.getLogger(__name__)
+
+
+def list_pages(confluence: Any, space_key: Optional[str], page_ids: Optional[List[str]]) -> List[Dict[str, Any]]:
+    """
+    List the pages of a space and the given pages with their version information, without their bodies.
+
+    :param confluence: Confluence REST client, e.g. the one of a ConfluenceLoader
+    :param space_key: Key of the space to list, if any
+    :param page_ids: Ids of other pages to list, if any
+    :return: The pages, without the given pages which no longer exist
+    """
+    pages: List[Dict[str, Any]] = []
+    if space_key:
+        start = 0
+        while True:
+            batch = confluence.get_all_pages_from_space(
+                space=space_key, start=start, limit=PAGE_LIST_LIMIT, expand="version"
+            )
+            pages.extend(batch)
+            if len(batch) < PAGE_LIST_LIMIT:
+                break
+            start += len(batch)
+
+    for page_id in page_ids or []:
+        try:
+            pages.append(confluence.get_page_by_id(page_id, expand="version"))
+        except Exception as exception:  # pylint: disable=broad-exception-caught
+            # Only a page reported gone is left out, any other error fails the listing
+            if getattr(getattr(exception, "response", None), "status_code", None) != 404:
+                raise
+            logger.warning("Confluence page %s no longer exists\n", page_id)
+    return pages
+
+
+def get_page_fingerprint(page: Dict[str, Any]) -> str:
+    """
+    :param page: A Confluence page with its version information
+    :return: Fingerprint of the version of the page
+    """
+    return f"{page['version']['number']}|{page['version'].get('when')}"
+
+
+def get_mirror_path(url: str, space_key: Optional[str], root: str = DEFAULT_MIRROR_DIR) -> str:
+    """
+    :param url: Base URL of the Confluence site
+    :param space_key: Key of the mirrored space, or None for pages selected by id
+    :param root: Directory under which the spaces are mirrored
+    :return: Directory of the mirror of the space
+    """
+    host: str = urlparse(url).netloc or url
+    return os.path.join(root, _safe_name(host), _safe_name(space_key or "_pages"))
+
+
+def _safe_name(name: str) -> str:
+    """File name made of the characters of a name that are safe in file names."""
+    return INVALID_NAME_PATTERN.sub("_", name).strip("._") or "_"
+
+
+class ConfluenceMirror:  # pylint: disable=too-many-instance-attributes
+    """
+    Local mirror of the pages of a Confluence space, and of their attachments.
+
+    A sync lists the pages with their version numbers, and only fetches the pages that are new or changed since
+    the last sync, concurrently. Pages removed from the space are removed from the mirror. Attachments are
+    streamed to disk rather than held in memory, and only downloaded again when their version changes.
+    The pages are then loaded from the mirror, one by one.
+    """
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def __init__(
+        self,
+        confluence: Any,
+        base_url: str,
+        path: str,
+        concurrency: int = DEFAULT_SYNC_CONCURRENCY,
+        include_attachments: bool = False,
+        sync_interval: float = DEFAULT_SYNC_INTERVAL,
+    ):
+        """
+        :param confluence: Confluence REST client, e.g. the one of a ConfluenceLoader
+        :param base_url: Base URL of the Confluence site, e.g. https://your-domain.atlassian.net/wiki
+        :param path: Directory of the mirror
+        :param concurrency: Number of pages fetched concurrently
+        :param include_attachments: True to mirror the attachments of the pages, and append their text to the pages
+        :param sync_interval: Seconds during which a mirror that was just synced is not listed again
+        """
+        self.confluence: Any = confluence
+        self.base_url: str = base_url.rstrip("/")
+        self.path: str = path
+        self.concurrency: int = max(1, concurrency)
+        self.include_attachments: bool = include_attachments
+        self.sync_interval: float = sync_interval
+        self.manifest: Dict[str, Any] = self._read_manifest()
+        self._lock = threading.Lock()
+
+    async def sync(
+        self, space_key: Optional[str] = None, page_ids: Optional[List[str]] = None
+    ) -> Dict[str, Optional[str]]:
+        """
+        Bring the mirror up to date with Confluence.
+
+        :param space_key: Key of the space to mirror, if any
+        :param page_ids: Ids of other pages to mirror, if any
+        :return: Dictionary of the id of every listed page to the fingerprint of its mirrored version,
+            None for the pages that failed to sync and were never mirrored
+        """
+        listing_key: str = json.dumps([space_key, sorted(page_ids or [])])
+        listing: Optional[Dict[str, Any]] = self.manifest["listings"].get(listing_key)
+        if listing is not None and time.time() - listing["synced"] < self.sync_interval:
+            return listing["pages"]
+
+        pages: List[Dict[str, Any]] = await asyncio.to_thread(list_pages, self.confluence, space_key, page_ids)
+        fingerprints: Dict[str, str] = {
+            str(page["id"]): get_page_fingerprint(page) for page in pages if page.get("version")
+        }
+        changed: List[str] = [
+            page_id
+            for page_id, fingerprint in fingerprints.items()
+            if self.manifest["pages"].get(page_id, {}).get("fingerprint") != fingerprint
+            or not os.path.exists(self._get_page_path(page_id))
+        ]
+        logger.info("Syncing %d of %d Confluence pages to %s\n", len(changed), len(fingerprints), self.path)
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def sync_page(page_id: str):
+            async with semaphore:
+                await asyncio.to_thread(self._sync_page, page_id)
+
+        await asyncio.gather(*(sync_page(page_id) for page_id in changed))
+
+        if space_key:
+            self._remove_deleted(set(fingerprints))
+
+        # Pages that failed to sync keep their previous version, or have none until the next sync
+        fingerprints = {
+            page_id: self.manifest["pages"].get(page_id, {}).get("fingerprint") for page_id in fingerprints
+        }
+        # A listing with failed pages is not reused, so that they are retried by the next sync
+        if None not in fingerprints.values():
+            self.manifest["listings"][listing_key] = {"pages": fingerprints, "synced": time.time()}
+        self._write_manifest()
+        return fingerprints
+
+    def load(self, page_ids: List[str]) -> Iterator[Document]:
+        """
+        Load mirrored pages, one at a time.
+
+        :param page_ids: Ids of the pages to load
+        :return: Iterator over the pages that are mirrored
+        """
+        for page_id in page_ids:
+            try:
+                with open(self._get_page_path(page_id), "r", encoding="utf-8") as page_file:
+                    yield Document(**json.load(page_file))
+            except FileNotFoundError:
+                logger.warning("Confluence page %s is not mirrored\n", page_id)
+            except (OSError, ValueError) as error:
+                logger.error("Invalid mirrored Confluence page %s: %s\n", page_id, error)
+
+    async def aload(self, page_ids: List[str]) -> AsyncIterator[Document]:
+        """
+        Asynchronously load mirrored pages, one at a time, reading them in a thread
+        so that the event loop is not blocked.
+
+        :param page_ids: Ids of the pages to load
+        :return: Asynchronous iterator over the pages that are mirrored
+        """
+        documents: Iterator[Document] = self.load(page_ids)
+        while (document := await asyncio.to_thread(next, documents, None)) is not None:
+            yield document
+
+    def get_attachment_dir(self, page_id: str) -> str:
+        """
+        :param page_id: Id of a page
+        :return: Directory holding the attachments of the page
+        """
+        return os.path.join(self.path, "attachments", _safe_name(page_id))
+
+    def _sync_page(self, page_id: str):
+        """Fetch a page and its attachments, and write them to the mirror."""
+        try:
+            page: Dict[str, Any] = self.confluence.get_page_by_id(page_id, expand="body.storage,version")
+            entry: Dict[str, Any] = {"fingerprint": get_page_fingerprint(page), "attachments": {}}
+            with self._lock:
+                previous: Dict[str, Any] = self.manifest["pages"].get(page_id, {})
+
+            text: str = BeautifulSoup(page["body"]["storage"]["value"], "lxml").get_text(" ", strip=True)
+            if self.include_attachments:
+                attachment_texts: List[str] = self._sync_attachments(page_id, previous.get("attachments", {}), entry)
+                text = "\n\n".join([text] + attachment_texts)
+
+            metadata: Dict[str, Any] = {
+                "title": page["title"],
+                "id": str(page["id"]),
+                "source": self.base_url + page["_links"]["webui"],
+                "when": page["version"].get("when"),
+            }
+            _write_json(self._get_page_path(page_id), {"page_content": text, "metadata": metadata})
+        except Exception as exception:  # pylint: disable=broad-exception-caught
+            logger.error("Failed to sync Confluence page %s: %s\n", page_id, exception)
+            return
+
+        with self._lock:
+            self.manifest["pages"][page_id] = entry
+
+    def _sync_attachments(self, page_id: str, previous: Dict[str, Any], entry: Dict[str, Any]) -> List[str]:
+        """
+        Download the new and changed attachments of a page, remove the deleted ones, and extract their text.
+
+        :param page_id: Id of the page
+        :param previous: Attachments of the page at the last sync
+        :param entry: Manifest entry of the page, to which the attachments are added
+        :return: Title and text of every attachment with text, the title on its own line
+        """
+        attachment_dir: str = self.get_attachment_dir(page_id)
+        os.makedirs(attachment_dir, exist_ok=True)
+        texts: List[str] = []
+        for attachment in self.confluence.get_attachments_from_content(page_id)["results"]:
+            attachment_id: str = str(attachment["id"])
+            version: int = attachment.get("version", {}).get("number", 0)
+            file_name: str = _safe_name(f"{attachment_id}_{attachment['title']}")
+            path: str = os.path.join(attachment_dir, file_name)
+            if previous.get(attachment_id, {}).get("version") != version or not os.path.exists(path):
+                self._download(self.base_url + attachment["_links"]["download"], path)
+            entry["attachments"][attachment_id] = {"version": version, "file": file_name}
+
+            text: Optional[str] = _extract_text(path, attachment.get("metadata", {}).get("mediaType", ""))
+            if text:
+                texts.append(f"{attachment['title']}\n{text}")
+
+        kept: set = {attachment["file"] for attachment in entry["attachments"].values()}
+        for file_name in os.listdir(attachment_dir):
+            if file_name not in kept:
+                os.remove(os.path.join(attachment_dir, file_name))
+        return texts
+
+    def _download(self, url: str, path: str):
+        """Stream a file to a temporary file next to its path, then move it to its path."""
+        with self.confluence.session.get(url, stream=True) as response:
+            response.raise_for_status()
+            with open(path + ".tmp", "wb") as download_file:
+                for block in response.iter_content(DOWNLOAD_BLOCK_SIZE):
+                    download_file.write(block)
+        os.replace(path + ".tmp", path)
+
+    def _remove_deleted(self, listed: set):
+        """Remove from the mirror the pages that are no longer in the space."""
+        for page_id in set(self.manifest["pages"]) - listed:
+            entry: Dict[str, Any] = self.manifest["pages"].pop(page_id)
+            for path in [self._get_page_path(page_id)] + [
+                os.path.join(self.get_attachment_dir(page_id), attachment["file"])
+                for attachment in entry.get("attachments", {}).values()
+            ]:
+                if os.path.exists(path):
+                    os.remove(path)
+            logger.info("Removed deleted Confluence page %s from the mirror\n", page_id)
+
+    def _get_page_path(self, page_id: str) -> str:
+        """Path of the file holding the text and metadata of a page."""
+        return os.path.join(self.path, "pages", _safe_name(page_id) + ".json")
+
+    def _get_manifest_path(self) -> str:
+        return os.path.join(self.path, "manifest.json")
+
+    def _read_manifest(self) -> Dict[str, Any]:
+        """Read the versions of the mirrored pages, or start an empty manifest."""
+        manifest: Dict[str, Any] = {"pages": {}, "listings": {}}
+        try:
+            with open(self._get_manifest_path(), "r", encoding="utf-8") as manifest_file:
+                manifest.update(json.load(manifest_file))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as error:
+            logger.error("Failed to read Confluence mirror manifest %s: %s. Starting a new one.\n", self.path, error)
+        return manifest
+
+    def _write_manifest(self):
+        with self._lock:
+            _write_json(self._get_manifest_path(), self.manifest)
+
+
+def _write_json(path: str, content: Dict[str, Any]):
+    """Write JSON to a temporary file, then replace the file with it."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with tempfile.NamedTemporaryFile("w", dir=os.path.dirname(path), suffix=".tmp", delete=False) as json_file:
+        json.dump(content, json_file)
+    os.replace(json_file.name, path)
+
+
+def _extract_text(path: str, media_type: str) -> Optional[str]:
+    """
+    :param path: Path of an attachment
+    :param media_type: Media type of the attachment
+    :return: Text of a PDF or text attachment, or None for other types
+    """
+    try:
+        if media_type == "application/pdf":
+            with pymupdf.open(path) as pdf:
+                return "".join(page.get_text() for page in pdf)
+        if media_type.startswith("text/"):
+            with open(path, "r", encoding="utf-8", errors="replace") as text_file:
+                return text_file.read()
+    except Exception as exception:  # pylint: disable=broad-exception-caught
+        logger.warning("Failed to extract the text of attachment %s: %s\n", path, exception)
+    return None
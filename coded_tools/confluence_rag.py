@@ -11,12 +11,15 @@
 #
 # END COPYRIGHT
 
+import asyncio
 import inspect
 import logging
 import os
 from typing import Any
+from typing import AsyncIterator
 from typing import Dict
 from typing import List
+from typing import Optional
 
 # pylint: disable=import-error
 from atlassian.errors import ApiPermissionError
@@ -26,8 +29,16 @@ from neuro_san.interfaces.coded_tool import CodedTool
 from requests.exceptions import HTTPError
 
 from .base_rag import BaseRag
+from .confluence_mirror import DEFAULT_SYNC_CONCURRENCY
+from .confluence_mirror import ConfluenceMirror
+from .confluence_mirror import get_mirror_path
+from .confluence_mirror import get_page_fingerprint
+from .confluence_mirror import list_pages
+from .index_manifest import SourcesUnreachableError
 
 INVALID_PATH_PATTERN = r"[<>:\"|?*\x00-\x1F]"
+# Loader argument holding the ids of the mirrored pages to load, when indexing only the changed pages
+MIRROR_PAGE_IDS = "mirror_page_ids"
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -38,12 +49,40 @@ class ConfluenceRag(CodedTool, BaseRag):
     CodedTool implementation which provides a way to do RAG on confluence pages
     """
 
+    def __init__(self):
+        super().__init__()
+        # Local mirror of the Confluence pages, which the pages are loaded from if set
+        self.mirror: Optional[ConfluenceMirror] = None
+
     async def async_invoke(self, args: Dict[str, Any], sly_data: Dict[str, Any]) -> str:
         """
         Load confluence pages from URLs, build a vector store, and run a query against it.
 
         :param args: Dictionary containing:
           "query": search string
+          "incremental_indexing": only re-index the pages that changed if True
+          "streaming_ingestion": load, split, embed and store documents as concurrent stages if True
+          "chunk_size": number of tokens per chunk
+          "chunk_overlap": number of tokens shared by consecutive chunks
+          "retrieval_mode": "dense", or "hybrid" to fuse the similarity search with a lexical search
+          "rrf_k": constant of the reciprocal rank fusion of the hybrid retrieval mode
+          "reranker": "cross_encoder" or "lexical" to rescore the retrieved candidates
+          "rerank_candidates": number of candidates fetched and rescored by the reranker
+          "query_cache": serve the results of queries asked before from the query cache if True,
+              by default for in-process vector stores only
+          "semantic_cache_threshold": minimum cosine similarity of a cached query to serve its result
+          "max_result_tokens": maximum number of tokens of the retrieved passages returned
+          "namespace": namespace the documents are indexed into, e.g. one per tenant or source
+          "namespaces": list of namespaces searched by queries, defaults to the namespace
+          "embedding_provider": "openai", or "local" to embed on the CPU with a sentence-transformers model
+          "embedding_model": name of the embedding model, defaults to the default model of the provider
+          "embedding_dimensions": number of dimensions of the vectors
+          "dimension_reduction": "matryoshka" or "pca" to reduce local vectors to the dimensions
+          "embedding_precision": "float32", "float16" or "int8" precision of the cached vectors
+          "use_mirror": sync the pages to a local mirror, fetching only the changed ones, and index from it if True
+          "mirror_path": directory of the local mirror, defaults to one per site and space
+              under CONFLUENCE_MIRROR_DIR or the temporary directory
+          "sync_concurrency": number of pages fetched concurrently when syncing the mirror
 
         :param sly_data: A dictionary whose keys are defined by the agent
             hierarchy, but whose values are meant to be kept out of the
@@ -97,12 +136,53 @@ class ConfluenceRag(CodedTool, BaseRag):
                 "https://your-domain.atlassian.net/wiki/spaces/<space_key>/pages/<page_id>/<title>"
             )
 
-        # Save the generated vector store as a JSON file if True
+        # Save the generated vector store to the vector store file if True
         self.save_vector_store = args.get("save_vector_store", False)
 
+        # Only re-index the sources that changed since the vector store was built if True
+        self.incremental_indexing = args.get("incremental_indexing", False)
+
+        # Stream documents through loading, splitting, embedding and storage instead of loading them all first
+        self.streaming_ingestion = args.get("streaming_ingestion", False)
+
+        # Number of tokens per chunk and shared by consecutive chunks
+        self.configure_chunking(args.get("chunk_size"), args.get("chunk_overlap"))
+
+        # Fuse the similarity search with a lexical search to find exact terms such as identifiers
+        self.configure_retrieval(args.get("retrieval_mode"), args.get("rrf_k"))
+
+        # Rescore over-fetched candidates and keep the best ones
+        self.configure_reranking(args.get("reranker"), args.get("rerank_candidates"))
+
+        # Serve the results of queries asked before, or similar to queries asked before, from the query cache
+        self.configure_query_cache(args.get("query_cache"), args.get("semantic_cache_threshold"))
+
+        # Merge overlapping chunks, drop near-duplicates and fit the passages in a token budget
+        self.configure_result_packing(args.get("max_result_tokens"))
+
         # Configure the vector store path
         self.configure_vector_store_path(args.get("vector_store_path"))
 
+        # Index into the shard of a namespace, and search the shards of the given namespaces
+        self.configure_namespaces(args.get("namespace"), args.get("namespaces"))
+
+        # Embed with OpenAI or a local model, reducing the vectors to fewer dimensions if set
+        self.configure_embeddings(
+            args.get("embedding_provider"),
+            args.get("embedding_model"),
+            args.get("embedding_dimensions"),
+            args.get("dimension_reduction"),
+            args.get("embedding_precision"),
+        )
+
+        # Persist chunk embeddings so that unchanged chunks are not embedded again
+        self.configure_embedding_cache(args.get("embedding_cache_path"))
+
+        # Mirror the pages to a local directory, only fetching the changed ones, and load the pages from it
+        self.configure_mirror(
+            loader_args, args.get("use_mirror", False), args.get("mirror_path"), args.get("sync_concurrency")
+        )
+
         # Prepare the vector store
         vectorstore = await self.generate_vector_store(loader_args=loader_args)
 
@@ -119,6 +199,9 @@ class ConfluenceRag(CodedTool, BaseRag):
         url = loader_args.get("url")
         docs: List[Document] = []
         try:
+            if self.mirror is not None:
+                page_ids: List[str] = await self._get_mirrored_page_ids(loader_args)
+                return await asyncio.to_thread(list, self.mirror.load(page_ids))
             loader = ConfluenceLoader(**loader_args)
             docs = await loader.aload()
             logger.info("Successfully loaded Confluence pages from %s", url)
@@ -129,3 +212,117 @@ class ConfluenceRag(CodedTool, BaseRag):
             logger.error("API Permission error while loading from %s: %s", url, api_error)
 
         return docs
+
+    async def lazy_load_documents(self, loader_args: Dict[str, Any]) -> AsyncIterator[Document]:
+        """
+        Load Confluence pages one by one from the provided loader arguments.
+
+        :param loader_args: Dictionary containing 'url', 'space_key', and/or 'page_ids' of the Confluence pages to load
+        :return: Asynchronous iterator over the loaded Confluence pages
+        """
+        url = loader_args.get("url")
+        try:
+            if self.mirror is not None:
+                async for doc in self.mirror.aload(await self._get_mirrored_page_ids(loader_args)):
+                    yield doc
+                return
+            loader = ConfluenceLoader(**loader_args)
+            async for doc in loader.alazy_load():
+                yield doc
+            logger.info("Successfully loaded Confluence pages from %s", url)
+        except HTTPError as http_error:
+            logger.error("HTTP error while loading from %s: %s", url, http_error)
+        except ApiPermissionError as api_error:
+            logger.error("API Permission error while loading from %s: %s", url, api_error)
+
+    async def fingerprint_sources(self, loader_args: Dict[str, Any]) -> Dict[str, str]:
+        """
+        Fingerprint each Confluence page from its version, without downloading page bodies.
+
+        :param loader_args: Dictionary containing 'url', 'space_key', and/or 'page_ids' of the Confluence pages to load
+        :return: Dictionary of page id to fingerprint, None for the pages that failed to sync
+        :raises SourcesUnreachableError: If the pages could not be listed
+        """
+        if self.mirror is not None:
+            # The mirror is synced first, so that the changed pages are then loaded from it
+            try:
+                return await self.mirror.sync(loader_args.get("space_key"), loader_args.get("page_ids"))
+            except (HTTPError, ApiPermissionError) as error:
+                raise SourcesUnreachableError(
+                    f"Failed to sync Confluence pages from {loader_args.get('url')}: {error}"
+                ) from error
+        return await asyncio.to_thread(self._fingerprint_pages, loader_args)
+
+    def select_sources(self, loader_args: Dict[str, Any], sources: List[str]) -> Dict[str, Any]:
+        """
+        Restrict the loader arguments to the given Confluence pages.
+
+        :param loader_args: Dictionary containing 'url', 'space_key', and/or 'page_ids' of the Confluence pages to load
+        :param sources: Ids of the pages to load
+        :return: Loader arguments with only the given page ids
+        """
+        if self.mirror is not None:
+            return {**loader_args, MIRROR_PAGE_IDS: sources}
+        return {**loader_args, "space_key": None, "page_ids": sources}
+
+    def get_document_source(self, doc: Document) -> str:
+        """
+        :param doc: A loaded Confluence page or one of its chunks
+        :return: The id of the Confluence page
+        """
+        return str(doc.metadata.get("id", ""))
+
+    @staticmethod
+    def _fingerprint_pages(loader_args: Dict[str, Any]) -> Dict[str, str]:
+        """
+        List the pages of the space and the given page ids with their version information.
+
+        :raises SourcesUnreachableError: If the pages could not be listed
+        """
+        url = loader_args.get("url")
+        try:
+            confluence = ConfluenceLoader(**loader_args).confluence
+            pages: List[Dict[str, Any]] = list_pages(
+                confluence, loader_args.get("space_key"), loader_args.get("page_ids")
+            )
+
+        except HTTPError as http_error:
+            raise SourcesUnreachableError(f"HTTP error while listing pages from {url}: {http_error}") from http_error
+        except ApiPermissionError as api_error:
+            raise SourcesUnreachableError(
+                f"API Permission error while listing pages from {url}: {api_error}"
+            ) from api_error
+
+        return {str(page["id"]): get_page_fingerprint(page) for page in pages if page.get("version")}
+
+    def configure_mirror(
+        self, loader_args: Dict[str, Any], use_mirror: bool, mirror_path: Optional[str], sync_concurrency: Any
+    ):
+        """
+        Load the pages from a local mirror of Confluence, which only fetches the pages that changed.
+
+        :param loader_args: Dictionary containing 'url', 'space_key', and/or 'page_ids' of the Confluence pages to load
+        :param use_mirror: True to load the pages from the mirror
+        :param mirror_path: Directory of the mirror. Defaults to one per site and space.
+        :param sync_concurrency: Number of pages fetched concurrently. Defaults to CONFLUENCE_SYNC_CONCURRENCY or 8.
+        """
+        self.mirror = None
+        if not use_mirror:
+            return
+        url: str = loader_args["url"]
+        self.mirror = ConfluenceMirror(
+            ConfluenceLoader(**loader_args).confluence,
+            url,
+            mirror_path or get_mirror_path(url, loader_args.get("space_key")),
+            concurrency=int(sync_concurrency or DEFAULT_SYNC_CONCURRENCY),
+            include_attachments=bool(loader_args.get("include_attachments", False)),
+        )
+
+    async def _get_mirrored_page_ids(self, loader_args: Dict[str, Any]) -> List[str]:
+        """
+        :param loader_args: Dictionary containing 'url', 'space_key', and/or 'page_ids' of the Confluence pages to load
+        :return: Ids of the mirrored pages to load, syncing the mirror unless they were selected after a sync
+        """
+        if MIRROR_PAGE_IDS in loader_args:
+            return loader_args[MIRROR_PAGE_IDS]
+        return list(await self.mirror.sync(loader_args.get("space_key"), loader_args.get("page_ids")))
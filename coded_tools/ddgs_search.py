@@ -17,6 +17,8 @@ from typing import Union
 from ddgs import DDGS
 from neuro_san.interfaces.coded_tool import CodedTool
 
+from coded_tools.search_cache import SEARCH_CACHE
+
 # The following parameters are from https://github.com/deedy5/ddgs?tab=readme-ov-file#1-text.
 DDGS_QUERY_PARAMS = [
     "query",
@@ -43,6 +45,9 @@ class DdgsSearch(CodedTool):
                 The argument dictionary expects the following keys:
                     "search_terms"
 
+                The following keys are optional:
+                    "cache_ttl_seconds" seconds the results are served from the search cache, 0 to always search
+
         :param sly_data: A dictionary whose keys are defined by the agent hierarchy,
                 but whose values are meant to be kept out of the chat stream.
 
@@ -78,7 +83,13 @@ class DdgsSearch(CodedTool):
         logger.info(">>>>>>>>>>>>>>>>>>>DDGS Search>>>>>>>>>>>>>>>>>>")
         logger.info("Search Terms: %s", ddgs_search_params.get("query"))
 
-        results: list[dict[str, str]] = DDGS().text(**ddgs_search_params)
+        results: list[dict[str, str]] = SEARCH_CACHE.get_or_search_sync(
+            "ddgs_search",
+            ddgs_search_params["query"],
+            {param: param_value for param, param_value in ddgs_search_params.items() if param != "query"},
+            lambda: DDGS().text(**ddgs_search_params),
+            args.get("cache_ttl_seconds"),
+        )
         # This returns a list of dictionary with keys; "title", "href", "body".
 
         logger.info(">>>>>>>>>>>>>>>>>>>DONE !!!>>>>>>>>>>>>>>>>>>")
@@ -12,6 +12,8 @@
 import logging
 import os
 from typing import Any
+from typing import AsyncIterator
+from typing import Optional
 
 from langchain_core.documents import Document
 from langchain_core.vectorstores import VectorStore
@@ -23,6 +25,7 @@ from requests.exceptions import HTTPError
 
 from coded_tools.base_rag import BaseRag
 from coded_tools.base_rag import PostgresConfig
+from coded_tools.index_manifest import fingerprint_locations
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -42,8 +45,31 @@ class DoclingRag(CodedTool, BaseRag):
         :param args: Dictionary containing:
           "query": search string
           "urls": list of pdf files
-          "save_vector_store": save to JSON file if True
-          "vector_store_path": relative path to this file
+          "vector_store_type": "in_memory", "numpy", "ivf", "int8", "pq" or "postgres"
+          "ivf_n_probe": number of lists probed per query by the "ivf" vector store
+          "rescore_factor": candidates rescored with full precision per result by the "int8" and "pq" vector stores
+          "save_vector_store": save to the vector store file if True
+          "vector_store_path": ".json" or ".npy" file, relative path to this file
+          "embedding_cache_path": SQLite file caching chunk embeddings, relative path to this file
+          "incremental_indexing": only re-index the sources that changed if True
+          "streaming_ingestion": load, split, embed and store documents as concurrent stages if True
+          "chunk_size": number of tokens per chunk
+          "chunk_overlap": number of tokens shared by consecutive chunks
+          "retrieval_mode": "dense", or "hybrid" to fuse the similarity search with a lexical search
+          "rrf_k": constant of the reciprocal rank fusion of the hybrid retrieval mode
+          "reranker": "cross_encoder" or "lexical" to rescore the retrieved candidates
+          "rerank_candidates": number of candidates fetched and rescored by the reranker
+          "query_cache": serve the results of queries asked before from the query cache if True,
+              by default for in-process vector stores only
+          "semantic_cache_threshold": minimum cosine similarity of a cached query to serve its result
+          "max_result_tokens": maximum number of tokens of the retrieved passages returned
+          "namespace": namespace the documents are indexed into, e.g. one per tenant or source
+          "namespaces": list of namespaces searched by queries, defaults to the namespace
+          "embedding_provider": "openai", or "local" to embed on the CPU with a sentence-transformers model
+          "embedding_model": name of the embedding model, defaults to the default model of the provider
+          "embedding_dimensions": number of dimensions of the vectors
+          "dimension_reduction": "matryoshka" or "pca" to reduce local vectors to the dimensions
+          "embedding_precision": "float32", "float16" or "int8" precision of the cached vectors
 
         :param sly_data: A dictionary whose keys are defined by the agent
             hierarchy, but whose values are meant to be kept out of the
@@ -74,12 +100,56 @@ class DoclingRag(CodedTool, BaseRag):
         # Vector store type
         vector_store_type: str = args.get("vector_store_type", "in_memory")
 
-        # Save the generated vector store as a JSON file if True
+        # Save the generated vector store to the vector store file if True
         self.save_vector_store = args.get("save_vector_store", False)
 
+        # Only re-index the sources that changed since the vector store was built if True
+        self.incremental_indexing = args.get("incremental_indexing", False)
+
+        # Stream documents through loading, splitting, embedding and storage instead of loading them all first
+        self.streaming_ingestion = args.get("streaming_ingestion", False)
+
+        # Number of tokens per chunk and shared by consecutive chunks
+        self.configure_chunking(args.get("chunk_size"), args.get("chunk_overlap"))
+
+        # Fuse the similarity search with a lexical search to find exact terms such as identifiers
+        self.configure_retrieval(args.get("retrieval_mode"), args.get("rrf_k"))
+
+        # Rescore over-fetched candidates and keep the best ones
+        self.configure_reranking(args.get("reranker"), args.get("rerank_candidates"))
+
+        # Serve the results of queries asked before, or similar to queries asked before, from the query cache
+        self.configure_query_cache(args.get("query_cache"), args.get("semantic_cache_threshold"))
+
+        # Merge overlapping chunks, drop near-duplicates and fit the passages in a token budget
+        self.configure_result_packing(args.get("max_result_tokens"))
+
+        # Number of lists probed per query by the ivf vector store, trading latency for recall
+        if vector_store_type == "ivf" and args.get("ivf_n_probe"):
+            self.search_kwargs = {"n_probe": int(args.get("ivf_n_probe"))}
+
+        # Number of candidates rescored with full precision per result by the quantized vector stores, 0 to not rescore
+        if vector_store_type in ("int8", "pq") and args.get("rescore_factor") is not None:
+            self.search_kwargs = {"rescore_factor": int(args.get("rescore_factor"))}
+
         # Configure the vector store path
         self.configure_vector_store_path(args.get("vector_store_path"))
 
+        # Index into the shard of a namespace, and search the shards of the given namespaces
+        self.configure_namespaces(args.get("namespace"), args.get("namespaces"))
+
+        # Embed with OpenAI or a local model, reducing the vectors to fewer dimensions if set
+        self.configure_embeddings(
+            args.get("embedding_provider"),
+            args.get("embedding_model"),
+            args.get("embedding_dimensions"),
+            args.get("dimension_reduction"),
+            args.get("embedding_precision"),
+        )
+
+        # Persist chunk embeddings so that unchanged chunks are not embedded again
+        self.configure_embedding_cache(args.get("embedding_cache_path"))
+
         # For PostgreSQL vector store
         if vector_store_type == "postgres":
             postgres_config = PostgresConfig(
@@ -108,13 +178,21 @@ class DoclingRag(CodedTool, BaseRag):
         :param loader_args: Dictionary containing 'urls' (list of file URLs)
         :return: List of loaded documents
         """
-        docs: list[Document] = []
+        return [doc async for doc in self.lazy_load_documents(loader_args)]
+
+    async def lazy_load_documents(self, loader_args: dict[str, Any]) -> AsyncIterator[Document]:
+        """
+        Load documents from URLs one by one.
+
+        :param loader_args: Dictionary containing 'urls' (list of file URLs)
+        :return: Asynchronous iterator over the loaded documents
+        """
         urls: list[str] = loader_args.get("urls", [])
 
         loader = DoclingLoader(file_path=urls)
         async for doc in loader.alazy_load():
             try:
-                docs.append(doc)
+                yield doc
                 logger.info("Successfully loaded PDF file from %s", doc.metadata.get("source", "unknown source"))
             except HTTPError as http_e:
                 logger.error("HTTP error occurred: %s", http_e)
@@ -123,4 +201,21 @@ class DoclingRag(CodedTool, BaseRag):
             except ValueError as val_e:
                 logger.error("Value error: %s", val_e)
 
-        return docs
+    async def fingerprint_sources(self, loader_args: dict[str, Any]) -> dict[str, Optional[str]]:
+        """
+        Fingerprint each file from its HTTP validators, or from its modification time and size for local files.
+
+        :param loader_args: Dictionary containing 'urls' (list of file URLs)
+        :return: Dictionary of URL to fingerprint, None for the files that could not be reached, without the gone ones
+        """
+        return await fingerprint_locations(loader_args.get("urls", []))
+
+    def select_sources(self, loader_args: dict[str, Any], sources: list[str]) -> dict[str, Any]:
+        """
+        Restrict the loader arguments to the given file URLs.
+
+        :param loader_args: Dictionary containing 'urls' (list of file URLs)
+        :param sources: File URLs to load
+        :return: Loader arguments with only the given URLs
+        """
+        return {**loader_args, "urls": sources}
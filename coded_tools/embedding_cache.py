@@ -0,0 +1,265 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+# END COPYRIGHT
+
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# Number of vectors kept in the in-memory LRU in front of the on-disk store
+DEFAULT_MAX_MEMORY_ENTRIES = 50_000
+# Precisions of the cached vectors. int8 vectors are prefixed with their float32 scale.
+PRECISIONS: Tuple[str, ...] = ("float32", "float16", "int8")
+
+logger = logging.getLogger(__name__)
+
+
+def embedding_cache_key(model: str, dimensions: Optional[int], text: str) -> str:
+    """
+    Build the content address of an embedding.
+
+    :param model: Name of the embedding model
+    :param dimensions: Number of dimensions requested from the model, if any
+    :param text: The text that is embedded
+    :return: Hex digest identifying the (model, dimensions, text) triple
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{model}\x00{dimensions}\x00".encode("utf-8"))
+    digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def encode_vector(vector: List[float], precision: str = "float32") -> bytes:
+    """
+    Pack a vector at a precision.
+
+    :param vector: The vector
+    :param precision: "float32", "float16", or "int8" scaled by the largest absolute value of the vector
+    :return: The packed vector
+    """
+    values: np.ndarray = np.asarray(vector, dtype=np.float32)
+    if precision == "float16":
+        return values.astype(np.float16).tobytes()
+    if precision == "int8":
+        scale = np.float32(np.abs(values).max(initial=0.0) / 127.0 or 1.0)
+        return scale.tobytes() + np.round(values / scale).astype(np.int8).tobytes()
+    return values.tobytes()
+
+
+def decode_vector(blob: bytes, precision: str = "float32") -> List[float]:
+    """
+    Unpack a vector packed by encode_vector().
+
+    :param blob: The packed vector
+    :param precision: Precision it was packed at
+    :return: The vector, approximated to its precision
+    """
+    if precision == "float16":
+        return np.frombuffer(blob, dtype=np.float16).astype(np.float32).tolist()
+    if precision == "int8":
+        scale = np.frombuffer(blob[:4], dtype=np.float32)[0]
+        return (np.frombuffer(blob[4:], dtype=np.int8).astype(np.float32) * scale).tolist()
+    return np.frombuffer(blob, dtype=np.float32).tolist()
+
+
+class EmbeddingCache:
+    """
+    Content-addressed store of embedding vectors.
+
+    Vectors live in an LRU dictionary in memory and, if a path is given,
+    in a SQLite file so that they survive process restarts.
+    Vectors are kept packed, as float32 values by default. float16 halves the size of the cache
+    and int8 quarters it, at the cost of a small approximation of the vectors.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_memory_entries: int = DEFAULT_MAX_MEMORY_ENTRIES,
+        precision: str = "float32",
+    ):
+        """
+        :param path: Absolute path of the SQLite file. Memory-only cache if None.
+        :param max_memory_entries: Maximum number of vectors held in the in-memory LRU
+        :param precision: "float32", "float16" or "int8"
+        """
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown vector precision {precision}, expected one of {PRECISIONS}")
+        self.path: Optional[str] = path
+        self.max_memory_entries: int = max_memory_entries
+        self.precision: str = precision
+        # Vectors of every precision have their own table, float32 ones keeping the original table
+        self.table: str = "embeddings" if precision == "float32" else f"embeddings_{precision}"
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+
+        if path:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._connection = sqlite3.connect(path, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+            self._connection.commit()
+            logger.info("Using embedding cache at: %s\n", path)
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        """
+        Look up vectors for the given keys.
+
+        :param keys: Content addresses to look up
+        :return: Dictionary of the keys that were found and their vectors
+        """
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            missing: List[str] = []
+            for key in keys:
+                blob = self._memory.get(key)
+                if blob is None:
+                    missing.append(key)
+                else:
+                    self._memory.move_to_end(key)
+                    found[key] = decode_vector(blob, self.precision)
+
+            if missing and self._connection is not None:
+                for key, blob in self._select(missing):
+                    found[key] = decode_vector(blob, self.precision)
+                    self._remember(key, blob)
+
+        return found
+
+    def put_many(self, vectors: Dict[str, List[float]]) -> Dict[str, List[float]]:
+        """
+        Store vectors under their content addresses.
+
+        :param vectors: Dictionary of content address to vector
+        :return: The vectors at the precision of the cache, as they are read back
+        """
+        if not vectors:
+            return {}
+        blobs: Dict[str, bytes] = {key: encode_vector(vector, self.precision) for key, vector in vectors.items()}
+        with self._lock:
+            for key, blob in blobs.items():
+                self._remember(key, blob)
+
+            if self._connection is not None:
+                self._connection.executemany(
+                    f"INSERT OR REPLACE INTO {self.table} (key, vector) VALUES (?, ?)", list(blobs.items())
+                )
+                self._connection.commit()
+        return {key: decode_vector(blob, self.precision) for key, blob in blobs.items()}
+
+    def _select(self, keys: List[str]) -> List[tuple]:
+        """Fetch rows for the keys from SQLite, staying under the bound-parameter limit."""
+        rows: List[tuple] = []
+        batch_size = 500
+        for start in range(0, len(keys), batch_size):
+            batch = keys[start : start + batch_size]
+            placeholders = ",".join("?" * len(batch))
+            rows.extend(
+                self._connection.execute(
+                    f"SELECT key, vector FROM {self.table} WHERE key IN ({placeholders})", batch
+                ).fetchall()
+            )
+        return rows
+
+    def _remember(self, key: str, blob: bytes):
+        """Put a packed vector in the in-memory LRU, evicting the least recently used entries."""
+        self._memory[key] = blob
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+
+# Caches are shared per path and precision across all tools in the process
+_CACHES: Dict[Tuple[Optional[str], str], EmbeddingCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_embedding_cache(path: Optional[str] = None, precision: str = "float32") -> EmbeddingCache:
+    """
+    Get the process-wide embedding cache for the given path and precision.
+
+    :param path: Absolute path of the SQLite file, or None for a memory-only cache
+    :param precision: "float32", "float16" or "int8"
+    :return: The shared EmbeddingCache instance
+    """
+    with _CACHES_LOCK:
+        cache = _CACHES.get((path, precision))
+        if cache is None:
+            cache = EmbeddingCache(path, precision=precision)
+            _CACHES[(path, precision)] = cache
+        return cache
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper which only sends texts that are not in the cache
+    to the underlying embedding model.
+    """
+
+    def __init__(self, embeddings: Embeddings, model: str, dimensions: Optional[int], cache: EmbeddingCache):
+        """
+        :param embeddings: The underlying embedding model
+        :param model: Name of the embedding model, part of the cache key
+        :param dimensions: Number of dimensions of the embedding model, part of the cache key
+        :param cache: The cache to read from and write to
+        """
+        self.embeddings: Embeddings = embeddings
+        self.model: str = model
+        self.dimensions: Optional[int] = dimensions
+        self.cache: EmbeddingCache = cache
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents, using the cache for texts that were embedded before."""
+        keys: List[str] = [embedding_cache_key(self.model, self.dimensions, text) for text in texts]
+        found: Dict[str, List[float]] = self.cache.get_many(keys)
+
+        missing: Dict[str, str] = {key: text for key, text in zip(keys, texts) if key not in found}
+        if missing:
+            vectors: List[List[float]] = self.embeddings.embed_documents(list(missing.values()))
+            # Vectors are served at the precision of the cache, whether they were cached or not
+            found.update(self.cache.put_many(dict(zip(missing.keys(), vectors))))
+
+        logger.info("Embedding cache: %d hits, %d misses\n", len(texts) - len(missing), len(missing))
+        return [found[key] for key in keys]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Asynchronously embed documents, using the cache for texts that were embedded before."""
+        keys: List[str] = [embedding_cache_key(self.model, self.dimensions, text) for text in texts]
+        found: Dict[str, List[float]] = await asyncio.to_thread(self.cache.get_many, keys)
+
+        missing: Dict[str, str] = {key: text for key, text in zip(keys, texts) if key not in found}
+        if missing:
+            vectors: List[List[float]] = await self.embeddings.aembed_documents(list(missing.values()))
+            found.update(await asyncio.to_thread(self.cache.put_many, dict(zip(missing.keys(), vectors))))
+
+        logger.info("Embedding cache: %d hits, %d misses\n", len(texts) - len(missing), len(missing))
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Queries are embedded directly by the underlying model."""
+        return self.embeddings.embed_query(text)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Queries are embedded directly by the underlying model."""
+        return await self.embeddings.aembed_query(text)
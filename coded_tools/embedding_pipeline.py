@@ -0,0 +1,259 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+# END COPYRIGHT
+
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from dataclasses import field
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from langchain_core.embeddings import Embeddings
+from openai import RateLimitError
+
+# Maximum estimated number of tokens sent in one embedding request
+DEFAULT_MAX_BATCH_TOKENS = int(os.getenv("EMBEDDING_BATCH_TOKENS") or 100_000)
+# Maximum number of texts sent in one embedding request
+DEFAULT_MAX_BATCH_SIZE = 1000
+# Maximum number of embedding requests in flight
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY") or 4)
+# Number of times a rate-limited batch is retried before giving up
+DEFAULT_MAX_RETRIES = 8
+# Backoff of the first retry in seconds, doubled on every retry
+BASE_BACKOFF = 1.0
+MAX_BACKOFF = 60.0
+# Rough number of characters per token, to budget batches without loading a tokenizer
+CHARS_PER_TOKEN = 4
+# Number of recent query embeddings kept, so that a query looked up in the query cache is not embedded again
+QUERY_MEMO_SIZE = 256
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    :param text: Text to embed
+    :return: Rough number of tokens of the text
+    """
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def make_batches(
+    texts: List[str], max_batch_tokens: int = DEFAULT_MAX_BATCH_TOKENS, max_batch_size: int = DEFAULT_MAX_BATCH_SIZE
+) -> List[Tuple[int, int]]:
+    """
+    Group consecutive texts into batches within a token budget.
+    A text larger than the budget gets a batch of its own.
+
+    :param texts: Texts to embed
+    :param max_batch_tokens: Maximum estimated number of tokens per batch
+    :param max_batch_size: Maximum number of texts per batch
+    :return: List of (start, end) index ranges of the batches
+    """
+    batches: List[Tuple[int, int]] = []
+    start: int = 0
+    tokens: int = 0
+    for index, text in enumerate(texts):
+        text_tokens: int = estimate_tokens(text)
+        if index > start and (tokens + text_tokens > max_batch_tokens or index - start >= max_batch_size):
+            batches.append((start, index))
+            start, tokens = index, 0
+        tokens += text_tokens
+    if start < len(texts):
+        batches.append((start, len(texts)))
+    return batches
+
+
+def get_retry_after(error: Exception) -> Optional[float]:
+    """
+    :param error: Rate limit error
+    :return: Seconds to wait advised by the server in the Retry-After header, or None
+    """
+    response = getattr(error, "response", None)
+    retry_after: Optional[str] = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(retry_after) if retry_after else None
+    except ValueError:
+        return None
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """
+    :param error: Error raised by an embedding model
+    :return: True if the error is an HTTP 429 rate limit error
+    """
+    return isinstance(error, RateLimitError) or getattr(error, "status_code", None) == 429
+
+
+@dataclass
+class _Flight:
+    """Concurrency limit and number of batches in flight of one call, with a condition notified when they change."""
+
+    limit: int
+    in_flight: int = 0
+    condition: asyncio.Condition = field(default_factory=asyncio.Condition)
+
+
+class EmbeddingPipeline(Embeddings):
+    """
+    Embeddings wrapper which embeds large lists of documents in token-budgeted batches,
+    with several batches in flight at once.
+
+    On rate limit errors, the number of batches in flight is halved and the batch is retried
+    after the delay advised by the server, or an exponential backoff with jitter.
+    Each success lets one more batch in flight again, up to the maximum concurrency.
+
+    A batch failing with another error cancels the batches of the same call still in flight.
+
+    Wrap a CachedEmbeddings with a persistent cache so that every completed batch is committed
+    to the cache: an interrupted ingest then resumes where it stopped, as completed batches are cache hits.
+    Resuming needs that persistent cache: with the in-memory cache, which the RAG tools use
+    without an embedding_cache_path, an interrupted ingest embeds every chunk again.
+    """
+
+    # pylint: disable=too-many-arguments
+    # pylint: disable=too-many-positional-arguments
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        max_batch_tokens: int = DEFAULT_MAX_BATCH_TOKENS,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+    ):
+        """
+        :param embeddings: The underlying embedding model, usually a CachedEmbeddings
+        :param max_batch_tokens: Maximum estimated number of tokens per batch
+        :param max_batch_size: Maximum number of texts per batch
+        :param max_concurrency: Maximum number of batches in flight
+        :param max_retries: Number of times a rate-limited batch is retried before giving up
+        """
+        self.embeddings: Embeddings = embeddings
+        self.max_batch_tokens: int = max_batch_tokens
+        self.max_batch_size: int = max_batch_size
+        self.max_concurrency: int = max(1, max_concurrency)
+        self.max_retries: int = max_retries
+        self._queries: OrderedDict[str, List[float]] = OrderedDict()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents batch by batch, retrying rate-limited batches."""
+        vectors: List[List[float]] = []
+        for start, end in make_batches(texts, self.max_batch_tokens, self.max_batch_size):
+            for attempt in range(self.max_retries + 1):
+                try:
+                    vectors.extend(self.embeddings.embed_documents(texts[start:end]))
+                    break
+                except Exception as error:  # pylint: disable=broad-exception-caught
+                    if not is_rate_limit_error(error) or attempt == self.max_retries:
+                        raise
+                    time.sleep(self._get_backoff(error, attempt))
+        return vectors
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Asynchronously embed documents in concurrent batches, adapting the concurrency to rate limits."""
+        batches: List[Tuple[int, int]] = make_batches(texts, self.max_batch_tokens, self.max_batch_size)
+        flight = _Flight(limit=self.max_concurrency)
+        if len(batches) <= 1:
+            return await self._aembed_batch(texts, flight)
+
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+
+        async def run(start: int, end: int):
+            vectors[start:end] = await self._aembed_batch(texts[start:end], flight)
+
+        logger.info("Embedding %d texts in %d batches\n", len(texts), len(batches))
+        try:
+            # A batch failing cancels the others, rather than letting them spend the quota on a failed call
+            async with asyncio.TaskGroup() as group:
+                for start, end in batches:
+                    group.create_task(run(start, end))
+        except ExceptionGroup as errors:
+            raise errors.exceptions[0] from None
+        return vectors
+
+    async def _aembed_batch(self, texts: List[str], flight: "_Flight") -> List[List[float]]:
+        """
+        Embed one batch once fewer batches than the concurrency limit are in flight.
+
+        :param texts: Texts of the batch
+        :param flight: Batches in flight of the current call
+        :return: Embedding of each text
+        """
+        attempt: int = 0
+        while True:
+            async with flight.condition:
+                await flight.condition.wait_for(lambda: flight.in_flight < flight.limit)
+                flight.in_flight += 1
+
+            try:
+                vectors: List[List[float]] = await self.embeddings.aembed_documents(texts)
+            except Exception as error:  # pylint: disable=broad-exception-caught
+                if not is_rate_limit_error(error) or attempt >= self.max_retries:
+                    raise
+                backoff: float = self._get_backoff(error, attempt)
+                # Multiplicative decrease of the concurrency on rate limit
+                flight.limit = max(1, flight.limit // 2)
+            else:
+                # Additive increase of the concurrency on success
+                flight.limit = min(self.max_concurrency, flight.limit + 1)
+                return vectors
+            finally:
+                async with flight.condition:
+                    flight.in_flight -= 1
+                    flight.condition.notify_all()
+
+            logger.warning(
+                "Embedding rate limited. Retrying in %.1fs with at most %d batches in flight\n", backoff, flight.limit
+            )
+            await asyncio.sleep(backoff)
+            attempt += 1
+
+    @staticmethod
+    def _get_backoff(error: Exception, attempt: int) -> float:
+        """Seconds to wait before retrying: the server advice if any, else an exponential backoff with jitter."""
+        retry_after: Optional[float] = get_retry_after(error)
+        if retry_after is not None:
+            return retry_after
+        return random.uniform(0.5, 1.0) * min(MAX_BACKOFF, BASE_BACKOFF * 2**attempt)
+
+    def embed_query(self, text: str) -> List[float]:
+        """Queries are embedded directly by the underlying model, and recent ones are remembered."""
+        vector: Optional[List[float]] = self._get_query(text)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self._put_query(text, vector)
+        return vector
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Queries are embedded directly by the underlying model, and recent ones are remembered."""
+        vector: Optional[List[float]] = self._get_query(text)
+        if vector is None:
+            vector = await self.embeddings.aembed_query(text)
+            self._put_query(text, vector)
+        return vector
+
+    def _get_query(self, text: str) -> Optional[List[float]]:
+        """Get the embedding of a recent query."""
+        vector: Optional[List[float]] = self._queries.get(text)
+        if vector is not None:
+            self._queries.move_to_end(text)
+        return vector
+
+    def _put_query(self, text: str, vector: List[float]):
+        """Remember the embedding of a query, forgetting the least recent ones beyond the memo size."""
+        self._queries[text] = vector
+        while len(self._queries) > QUERY_MEMO_SIZE:
+            self._queries.popitem(last=False)
@@ -0,0 +1,359 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+# END COPYRIGHT
+
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Literal
+from typing import Optional
+from typing import Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+
+from coded_tools.embedding_cache import CachedEmbeddings
+from coded_tools.embedding_cache import EmbeddingCache
+
+# The local embedding models are optional, the OpenAI models being used without them
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    SentenceTransformer = None
+
+# "openai" embeds with the OpenAI API, "local" with a sentence-transformers model on the CPU
+EmbeddingProvider = Literal["openai", "local"]
+# "matryoshka" keeps the first dimensions of the vectors, "pca" projects them on their principal components
+DimensionReduction = Literal["matryoshka", "pca"]
+# Precision of the vectors persisted in the embedding cache
+VectorPrecision = Literal["float32", "float16", "int8"]
+
+DEFAULT_OPENAI_MODEL = "text-embedding-3-small"
+DEFAULT_OPENAI_DIMENSIONS = 1536
+# Small general-purpose model, fast on CPU
+DEFAULT_LOCAL_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL") or "sentence-transformers/all-MiniLM-L6-v2"
+# Number of texts encoded at once by a local model, and threads encoding batches concurrently
+LOCAL_BATCH_SIZE = 64
+DEFAULT_LOCAL_THREADS = int(os.getenv("LOCAL_EMBEDDING_THREADS") or min(4, os.cpu_count() or 1))
+# Suffix of the file holding the PCA projection, next to the vector store file
+PCA_SUFFIX = ".pca.npz"
+# Maximum number of documents of the training sample the PCA projection is fitted on
+PCA_TRAINING_SIZE = 2048
+# Smallest norm a vector is divided by when normalizing, so that zero vectors stay zero
+MIN_NORM = 1e-12
+
+logger = logging.getLogger(__name__)
+
+# Loaded local models, shared by all the tools, and the thread pool encoding their batches
+_LOCAL_MODELS: Dict[str, Any] = {}
+_LOCAL_MODELS_LOCK = threading.Lock()
+_LOCAL_EXECUTOR: Optional[ThreadPoolExecutor] = None
+
+
+@dataclass(frozen=True)
+class EmbeddingConfig:
+    """Embedding model of a RAG tool, and how its vectors are reduced and persisted."""
+
+    provider: EmbeddingProvider = "openai"
+    model: str = DEFAULT_OPENAI_MODEL
+    # Number of dimensions of the vectors, the native dimensions of the model if None
+    dimensions: Optional[int] = DEFAULT_OPENAI_DIMENSIONS
+    # How local vectors are reduced to the dimensions. OpenAI models reduce them natively.
+    reduction: Optional[DimensionReduction] = None
+    precision: VectorPrecision = "float32"
+
+
+def get_default_config(provider: Optional[str] = None) -> EmbeddingConfig:
+    """
+    :param provider: "openai" or "local". Falls back to the EMBEDDING_PROVIDER environment variable, then "openai".
+    :return: Configuration of the default model of the provider, at its native dimensions
+    """
+    provider = provider or os.getenv("EMBEDDING_PROVIDER") or "openai"
+    if provider == "local":
+        return EmbeddingConfig(provider="local", model=DEFAULT_LOCAL_MODEL, dimensions=None)
+    return EmbeddingConfig()
+
+
+def _get_local_executor() -> ThreadPoolExecutor:
+    """Thread pool encoding the batches of the local models, created on first use."""
+    global _LOCAL_EXECUTOR  # pylint: disable=global-statement
+    with _LOCAL_MODELS_LOCK:
+        if _LOCAL_EXECUTOR is None:
+            _LOCAL_EXECUTOR = ThreadPoolExecutor(max_workers=DEFAULT_LOCAL_THREADS, thread_name_prefix="embedding")
+        return _LOCAL_EXECUTOR
+
+
+def _get_local_model(model: str) -> Any:
+    """Load a sentence-transformers model once per process."""
+    if SentenceTransformer is None:
+        raise ImportError(
+            "The sentence-transformers package is not installed. "
+            "Please install it using 'pip install sentence-transformers'."
+        )
+    with _LOCAL_MODELS_LOCK:
+        encoder: Any = _LOCAL_MODELS.get(model)
+        if encoder is None:
+            logger.info("Loading local embedding model %s\n", model)
+            encoder = SentenceTransformer(model, device="cpu")
+            _LOCAL_MODELS[model] = encoder
+        return encoder
+
+
+def normalize_vectors(vectors: np.ndarray) -> np.ndarray:
+    """
+    :param vectors: Matrix of shape (number of vectors, dimensions)
+    :return: float32 matrix whose rows have a unit L2 norm. Zero rows stay zero.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), MIN_NORM)
+
+
+class LocalEmbeddings(Embeddings):
+    """
+    Embeddings computed on the CPU by a sentence-transformers model, which needs no network once downloaded.
+    Texts are encoded in batches, several batches at once in a shared thread pool.
+    """
+
+    def __init__(self, model: str = DEFAULT_LOCAL_MODEL, batch_size: int = LOCAL_BATCH_SIZE, encoder: Any = None):
+        """
+        :param model: Name or path of the sentence-transformers model
+        :param batch_size: Number of texts encoded at once
+        :param encoder: Loaded model with a sentence-transformers encode() method. Loaded on first use if None.
+        """
+        self.model: str = model
+        self.batch_size: int = batch_size
+        self._encoder: Any = encoder
+
+    @property
+    def encoder(self) -> Any:
+        """The loaded model."""
+        if self._encoder is None:
+            self._encoder = _get_local_model(self.model)
+        return self._encoder
+
+    @property
+    def dimensions(self) -> int:
+        """Number of dimensions of the vectors of the model."""
+        return int(self.encoder.get_sentence_embedding_dimension())
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        """Encode one batch of texts into normalized vectors."""
+        vectors = self.encoder.encode(
+            texts,
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+        return np.asarray(vectors, dtype=np.float32).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors: List[List[float]] = []
+        for start in range(0, len(texts), self.batch_size):
+            vectors.extend(self._encode(texts[start : start + self.batch_size]))
+        return vectors
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        loop = asyncio.get_running_loop()
+        executor: ThreadPoolExecutor = _get_local_executor()
+        batches: List[List[List[float]]] = await asyncio.gather(
+            *(
+                loop.run_in_executor(executor, self._encode, texts[start : start + self.batch_size])
+                for start in range(0, len(texts), self.batch_size)
+            )
+        )
+        return [vector for batch in batches for vector in batch]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode([text])[0]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        vectors = await asyncio.get_running_loop().run_in_executor(_get_local_executor(), self._encode, [text])
+        return vectors[0]
+
+
+class ReducedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper reducing the number of dimensions of the vectors, so that stores take less memory
+    and searches read less of it.
+
+    "matryoshka" keeps the first dimensions, for models trained so that these carry most of the meaning.
+    "pca" projects the vectors on the principal components of a training sample of documents, given to fit()
+    or afit() before anything is embedded. The projection is persisted so that the documents and the queries
+    of a store are always projected the same way.
+    """
+
+    def __init__(self, embeddings: Embeddings, dimensions: int, reduction: DimensionReduction, path: Optional[str]):
+        """
+        :param embeddings: The underlying embedding model
+        :param dimensions: Number of dimensions of the reduced vectors
+        :param reduction: "matryoshka" or "pca"
+        :param path: ".npz" file persisting the PCA projection, only kept in memory if None
+        """
+        self.embeddings: Embeddings = embeddings
+        self.dimensions: int = dimensions
+        self.reduction: DimensionReduction = reduction
+        self.path: Optional[str] = path
+
+    @property
+    def is_fitted(self) -> bool:
+        """True if vectors can be reduced, which for "pca" needs a projection fitted or persisted before."""
+        if self.reduction != "pca":
+            return True
+        try:
+            get_pca_projection(self.path, self.dimensions)
+            return True
+        except ValueError:
+            return False
+
+    def fit(self, texts: List[str]):
+        """
+        Fit the PCA projection on the embeddings of a training sample, unless it is fitted already.
+
+        :param texts: Training sample of at least as many documents as dimensions
+        :raises ValueError: If the sample is too small
+        """
+        if not self.is_fitted:
+            sample: np.ndarray = np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+            get_pca_projection(self.path, self.dimensions, sample)
+
+    async def afit(self, texts: List[str]):
+        """See fit(). The decomposition runs in a thread, as it takes seconds on large samples."""
+        if not self.is_fitted:
+            sample: np.ndarray = np.asarray(await self.embeddings.aembed_documents(texts), dtype=np.float32)
+            await asyncio.to_thread(get_pca_projection, self.path, self.dimensions, sample)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._reduce(self.embeddings.embed_documents(texts))
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._reduce(await self.embeddings.aembed_documents(texts))
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._reduce([self.embeddings.embed_query(text)])[0]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return self._reduce([await self.embeddings.aembed_query(text)])[0]
+
+    def _reduce(self, vectors: List[List[float]]) -> List[List[float]]:
+        """
+        Reduce and normalize vectors.
+
+        :raises ValueError: If the PCA projection was not fitted
+        """
+        if not vectors:
+            return []
+        matrix: np.ndarray = np.asarray(vectors, dtype=np.float32)
+        if self.reduction == "matryoshka":
+            return normalize_vectors(matrix[:, : self.dimensions]).tolist()
+
+        mean, components = get_pca_projection(self.path, self.dimensions)
+        return normalize_vectors((matrix - mean) @ components.T).tolist()
+
+
+# PCA projections by path and dimensions, so that every store is projected the same way across tools
+_PCA_PROJECTIONS: Dict[Tuple[Optional[str], int], Tuple[np.ndarray, np.ndarray]] = {}
+_PCA_PROJECTIONS_LOCK = threading.Lock()
+
+
+def get_pca_projection(
+    path: Optional[str], dimensions: int, sample: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Get the PCA projection persisted at a path, or fit it on a sample of vectors.
+
+    :param path: ".npz" file persisting the projection, only kept in memory if None
+    :param dimensions: Number of principal components
+    :param sample: Vectors to fit the projection on if it does not exist yet
+    :return: Mean vector and matrix of shape (dimensions, original dimensions) of the principal components
+    :raises ValueError: If the projection does not exist and cannot be fitted on the sample
+    """
+    key: Tuple[Optional[str], int] = (path, dimensions)
+    with _PCA_PROJECTIONS_LOCK:
+        projection: Optional[Tuple[np.ndarray, np.ndarray]] = _PCA_PROJECTIONS.get(key)
+        if projection is None and path and os.path.exists(path):
+            with np.load(path) as saved:
+                projection = (saved["mean"], saved["components"])
+        if projection is None:
+            if sample is None:
+                raise ValueError(
+                    f"PCA projection to {dimensions} dimensions is not fitted. "
+                    f"Fit it on a training sample of at least {dimensions} documents first."
+                )
+            if sample.shape[0] < dimensions:
+                raise ValueError(
+                    f"PCA to {dimensions} dimensions needs a training sample of at least {dimensions} documents, "
+                    f"got {sample.shape[0]}"
+                )
+            mean: np.ndarray = sample.mean(axis=0)
+            # Rows of vt are the principal directions, by decreasing variance
+            _, _, vt = np.linalg.svd(sample - mean, full_matrices=False)
+            projection = (mean.astype(np.float32), vt[:dimensions].astype(np.float32))
+            logger.info("Fitted PCA projection to %d dimensions on %d vectors\n", dimensions, sample.shape[0])
+            if path:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                np.savez(path, mean=projection[0], components=projection[1])
+        _PCA_PROJECTIONS[key] = projection
+        return projection
+
+
+def get_pca_path(vector_store_path: Optional[str]) -> Optional[str]:
+    """
+    :param vector_store_path: Path of the vector store file, if any
+    :return: Path of the file holding its PCA projection
+    """
+    return os.path.splitext(vector_store_path)[0] + PCA_SUFFIX if vector_store_path else None
+
+
+def create_embeddings(config: EmbeddingConfig, cache: EmbeddingCache, pca_path: Optional[str] = None) -> Embeddings:
+    """
+    Create the embedding model of a configuration, with a cache of the vectors of the model.
+    Reduced vectors are computed from the cached ones, so that changing the reduction does not embed anything again.
+
+    :param config: The embedding configuration
+    :param cache: Cache of the vectors of the model
+    :param pca_path: ".npz" file persisting the PCA projection, for the "pca" reduction
+    :return: The embedding model, wrapped to reduce its dimensions if configured
+    :raises ValueError: If dimensions are configured for a local model without a reduction to them
+    """
+    if config.provider == "local" and config.dimensions and not config.reduction:
+        raise ValueError("embedding_dimensions needs dimension_reduction for local models")
+    if config.provider == "openai":
+        # OpenAI text-embedding-3 models return fewer dimensions natively
+        return CachedEmbeddings(
+            embeddings=OpenAIEmbeddings(model=config.model, dimensions=config.dimensions),
+            model=config.model,
+            dimensions=config.dimensions,
+            cache=cache,
+        )
+
+    embeddings: Embeddings = CachedEmbeddings(
+        embeddings=LocalEmbeddings(model=config.model), model=config.model, dimensions=None, cache=cache
+    )
+    if config.dimensions:
+        embeddings = ReducedEmbeddings(embeddings, config.dimensions, config.reduction, pca_path)
+    return embeddings
+
+
+def get_vector_size(config: EmbeddingConfig) -> int:
+    """
+    :param config: The embedding configuration
+    :return: Number of dimensions of the vectors stored, loading the local model if needed
+    """
+    if config.provider == "local" and not config.dimensions:
+        return LocalEmbeddings(model=config.model).dimensions
+    return config.dimensions or DEFAULT_OPENAI_DIMENSIONS
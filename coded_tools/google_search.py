@@ -17,14 +17,21 @@ from typing import Any
 from typing import Dict
 from typing import List
 from typing import Optional
+from typing import Tuple
 from typing import Union
 
+import httpx
 import requests
 from neuro_san.interfaces.coded_tool import CodedTool
 from requests import HTTPError
 from requests import JSONDecodeError
 from requests import RequestException
 
+from coded_tools.async_http_client import ASYNC_HTTP_CLIENT
+from coded_tools.page_fetcher import add_page_contents
+from coded_tools.page_fetcher import add_page_contents_sync
+from coded_tools.search_cache import SEARCH_CACHE
+
 GOOGLE_SEARCH_URL = "https://www.googleapis.com/customsearch/v1"
 GOOGLE_SEARCH_TIMEOUT = 30.0
 # The following parameters are from https://developers.google.com/custom-search/v1/reference/rest/v1/cse/list#request.
@@ -87,6 +94,13 @@ class GoogleSearch(CodedTool):
                 The argument dictionary expects the following keys:
                     "search_terms"
 
+                The following keys are optional:
+                    "cache_ttl_seconds" seconds the results are served from the search cache, 0 to always search
+                    "fetch" true to also fetch the pages of the top results, and add their main text as "content"
+                    "fetch_top_n" number of top results whose page is fetched, default 3
+                    "fetch_max_tokens" maximum number of tokens of the text of all the pages, default 4000
+                    "fetch_timeout" seconds to fetch all the pages, default 15
+
         :param sly_data: A dictionary whose keys are defined by the agent hierarchy,
                 but whose values are meant to be kept out of the chat stream.
 
@@ -108,6 +122,50 @@ class GoogleSearch(CodedTool):
                 "Error: <error message>"
         """
 
+        request: Union[Tuple[Dict[str, Any], str, float], str] = self.prepare_request(args)
+        if isinstance(request, str):
+            return request
+        google_search_params, google_url, google_timeout = request
+
+        results: Dict[str, Any] = SEARCH_CACHE.get_or_search_sync(
+            "google_search",
+            google_search_params["q"],
+            self.get_cache_params(google_search_params, google_url),
+            lambda: self.google_search(google_search_params, google_url, google_timeout),
+            args.get("cache_ttl_seconds"),
+        )
+        results_list: List[Dict[str, Any]] = self.get_results_list(results)
+        if bool(args.get("fetch", False)):
+            add_page_contents_sync(results_list, "link", args)
+        return results_list
+
+    async def async_invoke(self, args: Dict[str, Any], sly_data: Dict[str, Any]) -> Union[List[Dict[str, Any]], str]:
+        """
+        Search natively on the event loop, through the pooled HTTP client shared by the process.
+        See invoke() for the arguments and the return value.
+        """
+        request: Union[Tuple[Dict[str, Any], str, float], str] = self.prepare_request(args)
+        if isinstance(request, str):
+            return request
+        google_search_params, google_url, google_timeout = request
+
+        results: Dict[str, Any] = await SEARCH_CACHE.get_or_search(
+            "google_search",
+            google_search_params["q"],
+            self.get_cache_params(google_search_params, google_url),
+            lambda: self.async_google_search(google_search_params, google_url, google_timeout),
+            args.get("cache_ttl_seconds"),
+        )
+        results_list: List[Dict[str, Any]] = self.get_results_list(results)
+        if bool(args.get("fetch", False)):
+            await add_page_contents(results_list, "link", args)
+        return results_list
+
+    def prepare_request(self, args: Dict[str, Any]) -> Union[Tuple[Dict[str, Any], str, float], str]:
+        """
+        :param args: The argument dictionary of invoke()
+        :return: The query parameters, URL and timeout of the search request, or an error message
+        """
         # Extract URL and timeout from args, then environment variables, then fall back to defaults
         google_url: str = args.get("google_url") or os.getenv("GOOGLE_SEARCH_URL") or GOOGLE_SEARCH_URL
         google_timeout: float = float(
@@ -136,7 +194,26 @@ class GoogleSearch(CodedTool):
         logger.info("GoogleSearch URL: %s", google_url)
         logger.info("GoogleSearch Timeout: %s", google_timeout)
 
-        results: Dict[str, Any] = self.google_search(google_search_params, google_url, google_timeout)
+        return google_search_params, google_url, google_timeout
+
+    def get_cache_params(self, google_search_params: Dict[str, Any], google_url: str) -> Dict[str, Any]:
+        """
+        :param google_search_params: The query parameters of the search request
+        :param google_url: The Google Search API endpoint of the search request
+        :return: The parameters changing the results of a query, for the search cache
+        """
+        cache_params: Dict[str, Any] = {
+            param: param_value for param, param_value in google_search_params.items() if param not in ("q", "key")
+        }
+        cache_params["url"] = google_url
+        return cache_params
+
+    def get_results_list(self, results: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        :param results: The parsed JSON response from the Google Search API
+        :return: The title, link and snippet of every search result
+        """
+        logger = logging.getLogger(self.__class__.__name__)
         logger.info("GoogleSearch Results: %s", json.dumps(results, indent=4))
 
         results_list: List[Dict[str, Any]] = []
@@ -153,10 +230,6 @@ class GoogleSearch(CodedTool):
 
         return results_list
 
-    async def async_invoke(self, args: Dict[str, Any], sly_data: Dict[str, Any]) -> Union[Dict[str, Any], str]:
-        """Run invoke asynchronously."""
-        return await asyncio.to_thread(self.invoke, args, sly_data)
-
     def google_search(
         self,
         google_search_params: Dict[str, Any],
@@ -185,3 +258,35 @@ class GoogleSearch(CodedTool):
             logging.error("Request error: %s", req_err)
 
         return results
+
+    async def async_google_search(
+        self,
+        google_search_params: Dict[str, Any],
+        google_url: Optional[str] = GOOGLE_SEARCH_URL,
+        google_timeout: Optional[float] = GOOGLE_SEARCH_TIMEOUT,
+    ) -> Dict[str, Any]:
+        """
+        Perform a search request to the Google Search API without blocking the event loop.
+
+        :param google_search_params: Dictionary of query parameters to include in the search request.
+        :param google_url: The Google Search API endpoint to send the request to (default: GOOGLE_URL).
+        :param google_timeout: Total time of the request in seconds, including waiting for a connection
+            (default: GOOGLE_TIMEOUT).
+
+        :return: The parsed JSON response from the Google Search API as a dictionary.
+        """
+        results: Dict[str, Any] = {}
+        try:
+            results = await ASYNC_HTTP_CLIENT.get_json(
+                "google_search", google_url, google_timeout, params=google_search_params
+            )
+        except httpx.HTTPStatusError as http_err:
+            logging.error("HTTP error occurred: %s - Status code: %s", http_err, http_err.response.status_code)
+        except ValueError as json_err:
+            logging.error("JSON decode error: %s", json_err)
+        except httpx.HTTPError as req_err:
+            logging.error("Request error: %s", req_err)
+        except asyncio.TimeoutError:
+            logging.error("Request timed out after %s seconds", google_timeout)
+
+        return results
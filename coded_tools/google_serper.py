@@ -16,6 +16,8 @@ from typing import Union
 from langchain_community.utilities import GoogleSerperAPIWrapper
 from neuro_san.interfaces.coded_tool import CodedTool
 
+from coded_tools.search_cache import SEARCH_CACHE
+
 # Default parameters for google serper
 K = 10  # number of search results
 GL = "us"  # country
@@ -37,6 +39,9 @@ class GoogleSerper(CodedTool):
                 The argument dictionary expects the following keys:
                     "query" the query to search for.
 
+                The following keys are optional:
+                    "cache_ttl_seconds" seconds the results are served from the search cache, 0 to always search
+
         :param sly_data: A dictionary whose keys are defined by the agent hierarchy,
                 but whose values are meant to be kept out of the chat stream.
 
@@ -79,7 +84,13 @@ class GoogleSerper(CodedTool):
         # Create search with the above parameters
         search = GoogleSerperAPIWrapper(gl=gl, hl=hl, k=k, type=search_type, tbs=tbs)
 
-        # Perform search asynchronously
-        results = await search.aresults(query)
+        # Perform search asynchronously, unless the same search was done recently or is already running
+        results = await SEARCH_CACHE.get_or_search(
+            "google_serper",
+            query,
+            {"gl": gl, "hl": hl, "k": k, "type": search_type, "tbs": tbs},
+            lambda: search.aresults(query),
+            args.get("cache_ttl_seconds"),
+        )
 
         return results
@@ -0,0 +1,360 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+# END COPYRIGHT
+
+import asyncio
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import tempfile
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+from urllib.parse import urlparse
+
+import httpx
+
+# Directory of the cached documents, shared by all the processes of the machine
+DEFAULT_CACHE_DIR = os.getenv("HTTP_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "neuro_san_http_cache")
+# Maximum number of concurrent requests to the same host
+DEFAULT_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST") or 4)
+# Maximum total size in bytes of the cached documents, and seconds a cached document is kept
+DEFAULT_MAX_CACHE_BYTES = int(os.getenv("HTTP_CACHE_MAX_BYTES") or 1 << 30)
+DEFAULT_MAX_AGE = float(os.getenv("HTTP_CACHE_MAX_AGE_SECONDS") or 30 * 24 * 3600)
+# Seconds to wait for a server to respond, and bytes written at once when downloading
+FETCH_TIMEOUT = 30.0
+FETCH_BLOCK_SIZE = 1 << 16
+# Seconds between two evictions of the cached documents, and seconds a document just used is never evicted
+PRUNE_INTERVAL = 60.0
+PRUNE_GRACE = 60.0
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class FetchResult:
+    """A document fetched from a URL and stored in the cache."""
+
+    url: str
+    # Local file holding the content. URLs with the same content share the same file.
+    path: str
+    content_hash: str
+    content_type: Optional[str]
+    # True if the cached copy was served, after the server confirmed it is current or could not be reached
+    from_cache: bool
+
+
+class ContentTooLargeError(httpx.HTTPError):
+    """Raised when a document is larger than the caller accepts, its download being aborted."""
+
+
+@dataclass
+class _InFlightFetch:
+    """A running download, and the number of callers waiting for it."""
+
+    future: asyncio.Future
+    waiters: int = 0
+
+
+@dataclass
+class _Session:
+    """HTTP client and per-host limits of one event loop, as asyncio objects cannot be shared across loops."""
+
+    client: httpx.AsyncClient
+    host_semaphores: Dict[str, asyncio.Semaphore]
+    in_flight: Dict[Tuple[str, Optional[int]], _InFlightFetch]
+
+
+class HttpFetchCache:  # pylint: disable=too-many-instance-attributes
+    """
+    Process-wide fetch layer for the documents loaded by URL.
+
+    Documents are stored on disk by the hash of their content, so that URLs serving the same content share one file,
+    with the ETag and Last-Modified validators of every URL. A document fetched before is revalidated with
+    a conditional GET, and its cached file served without download if the server answers 304 Not Modified.
+    Requests go through one pooled asynchronous client per event loop, with a limit of concurrent requests per host,
+    and concurrent fetches of the same URL share one request, which is cancelled once none of them waits for it.
+    The documents least recently used are evicted beyond a maximum total size, and the documents older than
+    a maximum age.
+    """
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def __init__(
+        self,
+        cache_dir: str = DEFAULT_CACHE_DIR,
+        max_connections_per_host: int = DEFAULT_MAX_CONNECTIONS_PER_HOST,
+        timeout: float = FETCH_TIMEOUT,
+        max_cache_bytes: int = DEFAULT_MAX_CACHE_BYTES,
+        max_age: float = DEFAULT_MAX_AGE,
+    ):
+        """
+        :param cache_dir: Directory of the cached documents
+        :param max_connections_per_host: Maximum number of concurrent requests to the same host
+        :param timeout: Seconds to wait for a server to respond
+        :param max_cache_bytes: Maximum total size in bytes of the cached documents
+        :param max_age: Seconds a cached document is kept
+        """
+        self.cache_dir: str = cache_dir
+        self.max_connections_per_host: int = max_connections_per_host
+        self.timeout: float = timeout
+        self.max_cache_bytes: int = max_cache_bytes
+        self.max_age: float = max_age
+        self._sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _Session]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._last_prune: float = 0.0
+
+    async def fetch(
+        self, url: str, headers: Optional[Dict[str, str]] = None, max_bytes: Optional[int] = None
+    ) -> FetchResult:
+        """
+        Fetch a document, serving the cached copy if the server confirms it did not change.
+
+        :param url: HTTP or HTTPS URL of the document
+        :param headers: Extra request headers, e.g. a User-Agent
+        :param max_bytes: Maximum size in bytes of the document, its download being aborted beyond it.
+            No limit if None.
+        :return: The fetched document
+        :raises httpx.HTTPError: If the document could not be fetched and was never cached,
+            ContentTooLargeError if it is larger than max_bytes
+        """
+        session: _Session = self._get_session()
+        key: Tuple[str, Optional[int]] = (url, max_bytes)
+        in_flight: Optional[_InFlightFetch] = session.in_flight.get(key)
+        if in_flight is None:
+            in_flight = _InFlightFetch(asyncio.ensure_future(self._fetch(session, url, headers or {}, max_bytes)))
+            session.in_flight[key] = in_flight
+            in_flight.future.add_done_callback(lambda _: _forget(session, key, in_flight))
+
+        in_flight.waiters += 1
+        try:
+            return await asyncio.shield(in_flight.future)
+        finally:
+            in_flight.waiters -= 1
+            if in_flight.waiters == 0 and not in_flight.future.done():
+                # Nobody waits for the download any more, so it stops and frees its slot of the host
+                _forget(session, key, in_flight)
+                in_flight.future.cancel()
+
+    async def aclose(self):
+        """Close the HTTP client of the running event loop."""
+        with self._lock:
+            session: Optional[_Session] = self._sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None:
+            await session.client.aclose()
+
+    def get_cached(self, url: str) -> Optional[FetchResult]:
+        """
+        :param url: URL of a document
+        :return: The cached copy of the document, without contacting the server, or None if it is not cached
+        """
+        metadata: Optional[Dict[str, Any]] = self._read_metadata(url)
+        if metadata is None:
+            return None
+        return _get_cached_result(url, metadata)
+
+    def _get_session(self) -> _Session:
+        """Get the HTTP client of the running event loop, creating it on first use."""
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        with self._lock:
+            session: Optional[_Session] = self._sessions.get(loop)
+            if session is None:
+                session = _Session(
+                    client=httpx.AsyncClient(follow_redirects=True, timeout=self.timeout),
+                    host_semaphores={},
+                    in_flight={},
+                )
+                self._sessions[loop] = session
+            return session
+
+    def prune(self):
+        """
+        Evict the cached documents older than the maximum age, then the least recently used ones
+        beyond the maximum total size. Documents used in the last minute are kept, as a caller may be reading them.
+        """
+        now: float = time.time()
+        blobs: List[Tuple[float, int, str]] = []
+        for directory in ("blobs", "urls"):
+            try:
+                entries: List[os.DirEntry] = list(os.scandir(os.path.join(self.cache_dir, directory)))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                try:
+                    stat: os.stat_result = entry.stat()
+                    if now - stat.st_mtime > self.max_age:
+                        os.remove(entry.path)
+                    elif directory == "blobs" and not entry.name.endswith(".tmp"):
+                        blobs.append((stat.st_mtime, stat.st_size, entry.path))
+                except OSError as os_error:
+                    logger.debug("Not evicting %s: %s\n", entry.path, os_error)
+
+        # URLs whose document was evicted are no longer cached, as their metadata points to a missing file
+        total_bytes: int = sum(size for _, size, _ in blobs)
+        for mtime, size, path in sorted(blobs):
+            if total_bytes <= self.max_cache_bytes or now - mtime < PRUNE_GRACE:
+                break
+            try:
+                os.remove(path)
+                total_bytes -= size
+            except OSError as os_error:
+                logger.debug("Not evicting %s: %s\n", path, os_error)
+
+    async def _fetch(
+        self, session: _Session, url: str, headers: Dict[str, str], max_bytes: Optional[int]
+    ) -> FetchResult:
+        """Fetch a document with a conditional GET if it is cached, within the limit of its host."""
+        metadata: Optional[Dict[str, Any]] = self._read_metadata(url)
+        request_headers: Dict[str, str] = dict(headers)
+        if metadata is not None:
+            if metadata.get("etag"):
+                request_headers["If-None-Match"] = metadata["etag"]
+            if metadata.get("last_modified"):
+                request_headers["If-Modified-Since"] = metadata["last_modified"]
+
+        host: str = urlparse(url).netloc
+        semaphore: asyncio.Semaphore = session.host_semaphores.setdefault(
+            host, asyncio.Semaphore(self.max_connections_per_host)
+        )
+        try:
+            async with semaphore:
+                async with session.client.stream("GET", url, headers=request_headers) as response:
+                    if response.status_code == httpx.codes.NOT_MODIFIED and metadata is not None:
+                        logger.info("Serving cached copy of %s, not modified\n", url)
+                        return self._serve_cached(url, metadata)
+                    response.raise_for_status()
+                    path, content_hash = await self._store(response, max_bytes)
+        except httpx.HTTPError as http_error:
+            if metadata is None:
+                raise
+            logger.warning("Failed to revalidate %s: %s. Serving cached copy.\n", url, http_error)
+            return self._serve_cached(url, metadata)
+
+        content_type: Optional[str] = response.headers.get("Content-Type")
+        self._write_metadata(
+            url,
+            {
+                "url": url,
+                "path": path,
+                "content_hash": content_hash,
+                "content_type": content_type,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "fetched": time.time(),
+            },
+        )
+        logger.info("Fetched %s\n", url)
+        if time.monotonic() - self._last_prune > PRUNE_INTERVAL:
+            self._last_prune = time.monotonic()
+            await asyncio.to_thread(self.prune)
+        return FetchResult(url, path, content_hash, content_type, False)
+
+    @staticmethod
+    def _serve_cached(url: str, metadata: Dict[str, Any]) -> FetchResult:
+        """Serve the cached copy of a URL, marking it as recently used so that it is evicted last."""
+        try:
+            os.utime(metadata["path"])
+        except OSError as os_error:
+            logger.debug("Failed to mark %s as used: %s\n", metadata["path"], os_error)
+        return _get_cached_result(url, metadata)
+
+    async def _store(self, response: httpx.Response, max_bytes: Optional[int]) -> Tuple[str, str]:
+        """Stream the body of a response to a temporary file, then move it to the file named by its hash."""
+        content_length: str = response.headers.get("Content-Length", "")
+        if max_bytes is not None and content_length.isdigit() and int(content_length) > max_bytes:
+            raise ContentTooLargeError(f"{response.url} has {content_length} bytes, more than {max_bytes}")
+
+        blob_dir: str = os.path.join(self.cache_dir, "blobs")
+        os.makedirs(blob_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        size: int = 0
+        with tempfile.NamedTemporaryFile(dir=blob_dir, suffix=".tmp", delete=False) as blob_file:
+            try:
+                async for block in response.aiter_bytes(FETCH_BLOCK_SIZE):
+                    size += len(block)
+                    if max_bytes is not None and size > max_bytes:
+                        raise ContentTooLargeError(f"{response.url} has more than {max_bytes} bytes")
+                    digest.update(block)
+                    blob_file.write(block)
+            except BaseException:
+                blob_file.close()
+                os.remove(blob_file.name)
+                raise
+
+        content_hash: str = digest.hexdigest()
+        path: str = os.path.join(blob_dir, content_hash + _get_extension(response))
+        if os.path.exists(path):
+            # Same content as a document fetched before
+            os.remove(blob_file.name)
+        else:
+            os.replace(blob_file.name, path)
+        return path, content_hash
+
+    def _get_metadata_path(self, url: str) -> str:
+        """Path of the file holding the validators and content hash of a URL."""
+        return os.path.join(self.cache_dir, "urls", hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+    def _read_metadata(self, url: str) -> Optional[Dict[str, Any]]:
+        """Read the metadata of a cached URL, or None if it is not cached or its content was removed."""
+        try:
+            with open(self._get_metadata_path(url), "r", encoding="utf-8") as metadata_file:
+                metadata: Dict[str, Any] = json.load(metadata_file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as error:
+            logger.error("Invalid HTTP cache entry of %s: %s\n", url, error)
+            return None
+        return metadata if os.path.exists(metadata.get("path", "")) else None
+
+    def _write_metadata(self, url: str, metadata: Dict[str, Any]):
+        """Write the metadata of a URL to a temporary file, then replace the metadata with it."""
+        path: str = self._get_metadata_path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # A temporary file of its own, as other processes sharing the cache may write the same URL
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=os.path.dirname(path), suffix=".tmp", delete=False
+        ) as metadata_file:
+            try:
+                json.dump(metadata, metadata_file)
+            except BaseException:
+                metadata_file.close()
+                os.remove(metadata_file.name)
+                raise
+        os.replace(metadata_file.name, path)
+
+
+def _forget(session: _Session, key: Tuple[str, Optional[int]], in_flight: _InFlightFetch):
+    """Stop sharing a download with new callers, unless another download of the URL replaced it."""
+    if session.in_flight.get(key) is in_flight:
+        del session.in_flight[key]
+
+
+def _get_cached_result(url: str, metadata: Dict[str, Any]) -> FetchResult:
+    """Result serving the cached copy of a URL."""
+    return FetchResult(url, metadata["path"], metadata["content_hash"], metadata.get("content_type"), True)
+
+
+def _get_extension(response: httpx.Response) -> str:
+    """File extension of a response, from its URL or its content type, so that loaders recognize the file."""
+    extension: str = os.path.splitext(urlparse(str(response.url)).path)[1]
+    if extension and len(extension) <= 8:
+        return extension.lower()
+    content_type: str = response.headers.get("Content-Type", "").split(";")[0].strip()
+    return mimetypes.guess_extension(content_type) or ""
+
+
+HTTP_FETCH_CACHE = HttpFetchCache()
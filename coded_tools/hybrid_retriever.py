@@ -0,0 +1,108 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+# END COPYRIGHT
+
+from typing import Any
+from typing import Dict
+from typing import List
+
+# pylint: disable=import-error
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.vectorstores import VectorStore
+from langchain_postgres.v2.hybrid_search_config import HybridSearchConfig
+from langchain_postgres.v2.hybrid_search_config import reciprocal_rank_fusion as postgres_reciprocal_rank_fusion
+from pydantic import ConfigDict
+from pydantic import Field
+
+from coded_tools.lexical_index import BM25Index
+
+# Constant of reciprocal rank fusion. Higher values flatten the weight of the top ranks.
+DEFAULT_RRF_K = 60
+# Number of documents taken from each ranking before fusing them, unless more are to be returned
+HYBRID_CANDIDATES = 20
+
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], k: int = 4, rrf_k: int = DEFAULT_RRF_K) -> List[Document]:
+    """
+    Fuse rankings of documents by summing 1 / (rrf_k + rank) over the rankings each document appears in.
+    Only ranks are used, so the scores of the rankings do not need to be comparable.
+
+    :param rankings: Rankings of documents, best first
+    :param k: Number of documents to return
+    :param rrf_k: Constant of reciprocal rank fusion
+    :return: The k documents with the highest fused score, best first
+    """
+    scores: Dict[str, float] = {}
+    docs: Dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            key: str = doc.id or doc.page_content
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            docs.setdefault(key, doc)
+    return [docs[key] for key in sorted(scores, key=scores.get, reverse=True)[:k]]
+
+
+def get_postgres_hybrid_search_config(k: int = 4, rrf_k: int = DEFAULT_RRF_K) -> HybridSearchConfig:
+    """
+    Configure a PGVectorStore search to fuse the vector search with a PostgreSQL full-text search.
+    PGVectorStore records the query in the configuration, so a new one is needed for every query.
+
+    :param k: Number of documents to return
+    :param rrf_k: Constant of reciprocal rank fusion
+    :return: Configuration to pass as the "hybrid_search_config" search argument
+    """
+    return HybridSearchConfig(
+        fusion_function=postgres_reciprocal_rank_fusion,
+        fusion_function_parameters={"rrf_k": rrf_k},
+        primary_top_k=max(HYBRID_CANDIDATES, k),
+        secondary_top_k=max(HYBRID_CANDIDATES, k),
+    )
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Retriever fusing the similarity search of an in-process vector store
+    with the BM25 search of its lexical index, by reciprocal rank fusion.
+    """
+
+    vectorstore: VectorStore
+    lexical_index: BM25Index
+    # Number of documents to return
+    k: int = 4
+    rrf_k: int = DEFAULT_RRF_K
+    # Extra arguments of the similarity search
+    search_kwargs: Dict[str, Any] = Field(default_factory=dict)
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        dense: List[Document] = self.vectorstore.similarity_search(
+            query, k=max(HYBRID_CANDIDATES, self.k), **self.search_kwargs
+        )
+        return self._fuse(query, dense)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        dense: List[Document] = await self.vectorstore.asimilarity_search(
+            query, k=max(HYBRID_CANDIDATES, self.k), **self.search_kwargs
+        )
+        return self._fuse(query, dense)
+
+    def _fuse(self, query: str, dense: List[Document]) -> List[Document]:
+        """Fuse the similarity search results with the lexical search results."""
+        lexical_ids: List[str] = [
+            doc_id for doc_id, _ in self.lexical_index.search(query, max(HYBRID_CANDIDATES, self.k))
+        ]
+        lexical: List[Document] = self.vectorstore.get_by_ids(lexical_ids) if lexical_ids else []
+        return reciprocal_rank_fusion([dense, lexical], self.k, self.rrf_k)
@@ -0,0 +1,202 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+# END COPYRIGHT
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import uuid
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from urllib.parse import urlparse
+
+import requests
+from requests import RequestException
+
+FINGERPRINT_TIMEOUT = 30.0
+# HTTP status codes of documents which no longer exist, rather than could not be reached
+GONE_STATUS_CODES = (404, 410)
+
+logger = logging.getLogger(__name__)
+
+
+def chunk_id(source: str, index: int) -> str:
+    """
+    Deterministic id of the index-th chunk of a source, so that the chunks of a source
+    can be deleted from a vector store without querying it.
+
+    :param source: Identifier of the source the chunk was split from
+    :param index: Position of the chunk within the source
+    :return: UUID string, as required by PGVectorStore
+    """
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{source}#{index}"))
+
+
+def _fingerprint_url(url: str) -> Optional[str]:
+    """
+    Fingerprint a remote document from its validators, falling back to a hash of its content.
+
+    :raises FileNotFoundError: If the server reports the document is gone
+    """
+    try:
+        response = requests.head(url, allow_redirects=True, timeout=FINGERPRINT_TIMEOUT)
+        response.raise_for_status()
+        etag: Optional[str] = response.headers.get("ETag")
+        last_modified: Optional[str] = response.headers.get("Last-Modified")
+        if etag or last_modified:
+            return f"{etag}|{last_modified}|{response.headers.get('Content-Length')}"
+
+        response = requests.get(url, timeout=FINGERPRINT_TIMEOUT)
+        response.raise_for_status()
+        return hashlib.sha256(response.content).hexdigest()
+    except RequestException as request_error:
+        if getattr(request_error.response, "status_code", None) in GONE_STATUS_CODES:
+            raise FileNotFoundError(f"{url} is gone: {request_error}") from request_error
+        logger.error("Failed to fingerprint %s: %s", url, request_error)
+        return None
+
+
+def _fingerprint_file(path: str) -> Optional[str]:
+    """
+    Fingerprint a local file from its modification time and size.
+
+    :raises FileNotFoundError: If the file does not exist
+    """
+    try:
+        stat = os.stat(path)
+        return f"{stat.st_mtime_ns}|{stat.st_size}"
+    except FileNotFoundError:
+        raise
+    except OSError as os_error:
+        logger.error("Failed to fingerprint %s: %s", path, os_error)
+        return None
+
+
+async def fingerprint_location(location: str) -> Optional[str]:
+    """
+    Compute a fingerprint which changes whenever the document at a URL or file path changes.
+
+    :param location: URL or local file path of the document
+    :return: Fingerprint string, or None if the document could not be reached
+    :raises FileNotFoundError: If the document no longer exists
+    """
+    if urlparse(location).scheme in {"http", "https"}:
+        return await asyncio.to_thread(_fingerprint_url, location)
+    return await asyncio.to_thread(_fingerprint_file, location)
+
+
+async def fingerprint_locations(locations: List[str]) -> Dict[str, Optional[str]]:
+    """
+    Fingerprint several documents concurrently.
+
+    :param locations: URLs or local file paths of the documents
+    :return: Dictionary of location to fingerprint for the documents that exist,
+        the fingerprint being None for the documents that could not be reached
+    """
+    results: List[Any] = await asyncio.gather(
+        *(fingerprint_location(location) for location in locations), return_exceptions=True
+    )
+    fingerprints: Dict[str, Optional[str]] = {}
+    for location, result in zip(locations, results):
+        if isinstance(result, FileNotFoundError):
+            logger.warning("Source %s no longer exists: %s\n", location, result)
+        elif isinstance(result, BaseException):
+            raise result
+        else:
+            fingerprints[location] = result
+    return fingerprints
+
+
+class SourcesUnreachableError(Exception):
+    """
+    Raised by the fingerprinting of sources when they could not be listed,
+    so that the indexed sources are kept rather than taken for removed.
+    """
+
+
+class IndexManifest:
+    """
+    Record of which sources were indexed into a vector store, with the fingerprint
+    each source had at indexing time and the ids of the chunks it was split into.
+    It is persisted as a JSON file next to the vector store.
+
+    The current fingerprints compared with the manifest list the sources that exist. A source whose
+    fingerprint is None could not be reached: it keeps its chunks, and is neither removed nor indexed again.
+    """
+
+    def __init__(self, path: str, sources: Optional[Dict[str, Dict[str, Any]]] = None):
+        """
+        :param path: Absolute path of the manifest JSON file
+        :param sources: Dictionary of source to {"fingerprint": str, "chunk_ids": list}
+        """
+        self.path: str = path
+        self.sources: Dict[str, Dict[str, Any]] = sources or {}
+
+    @classmethod
+    def load(cls, path: str) -> "IndexManifest":
+        """
+        Load a manifest from a file. An empty manifest is returned if the file does not exist.
+
+        :param path: Absolute path of the manifest JSON file
+        :return: The manifest
+        """
+        try:
+            with open(path, "r", encoding="utf-8") as manifest_file:
+                return cls(path, json.load(manifest_file).get("sources", {}))
+        except FileNotFoundError:
+            return cls(path)
+        except json.JSONDecodeError as json_error:
+            logger.warning("Ignoring unreadable index manifest %s: %s\n", path, json_error)
+            return cls(path)
+
+    def save(self):
+        """Write the manifest to its file."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as manifest_file:
+            json.dump({"sources": self.sources}, manifest_file, indent=2)
+        logger.info("Index manifest saved to: %s\n", self.path)
+
+    def changed_sources(self, fingerprints: Dict[str, Optional[str]]) -> List[str]:
+        """
+        :param fingerprints: Dictionary of source to its current fingerprint, None if it could not be reached
+        :return: Sources that are new or whose fingerprint differs from the recorded one
+        """
+        return [
+            source
+            for source, fingerprint in fingerprints.items()
+            if fingerprint is not None and self.sources.get(source, {}).get("fingerprint") != fingerprint
+        ]
+
+    def removed_sources(self, fingerprints: Dict[str, Optional[str]]) -> List[str]:
+        """
+        :param fingerprints: Dictionary of source to its current fingerprint, None if it could not be reached
+        :return: Recorded sources that are no longer present
+        """
+        return [source for source in self.sources if source not in fingerprints]
+
+    def chunk_ids(self, sources: List[str]) -> List[str]:
+        """
+        :param sources: Sources to get the chunk ids of
+        :return: Ids of all chunks recorded for the sources
+        """
+        return [chunk for source in sources for chunk in self.sources.get(source, {}).get("chunk_ids", [])]
+
+    def record(self, source: str, fingerprint: str, chunk_ids: List[str]):
+        """Record that a source was indexed with the given fingerprint into the given chunks."""
+        self.sources[source] = {"fingerprint": fingerprint, "chunk_ids": chunk_ids}
+
+    def forget(self, sources: List[str]):
+        """Remove sources from the manifest."""
+        for source in sources:
+            self.sources.pop(source, None)
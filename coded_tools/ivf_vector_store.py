@@ -0,0 +1,382 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+# END COPYRIGHT
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from coded_tools.numpy_vector_store import MetadataFilter
+from coded_tools.numpy_vector_store import NumpyVectorStore
+from coded_tools.numpy_vector_store import normalize_rows
+
+# Suffix of the file holding the centroids and the list of every row
+INDEX_SUFFIX = ".ivf.npz"
+# Number of lists probed per query. Higher is slower but finds more of the exact nearest neighbours.
+DEFAULT_N_PROBE = int(os.getenv("IVF_N_PROBE") or 8)
+# Below this number of rows, searches scan all the rows, which is fast enough and exact
+DEFAULT_MIN_TRAIN_SIZE = 4096
+# Number of k-means iterations when training the centroids
+TRAINING_ITERATIONS = 10
+# Number of rows sampled per list to train the centroids
+TRAINING_SAMPLE_PER_LIST = 256
+# The centroids are trained again once the store grew by this factor since they were trained
+RETRAIN_GROWTH = 4
+# Number of rows assigned to their nearest centroid per matrix product, to bound memory
+ASSIGN_BLOCK_SIZE = 65536
+
+logger = logging.getLogger(__name__)
+
+
+def get_index_path(path: str) -> str:
+    """
+    :param path: Path of the ".npy" matrix file
+    :return: Path of the file holding the centroids and the list of every row
+    """
+    return os.path.splitext(path)[0] + INDEX_SUFFIX
+
+
+@dataclass
+class RecallBenchmark:
+    """Recall of approximate searches against exact searches, and the search time of both."""
+
+    n_probe: int
+    recall: float
+    approximate_seconds: float
+    exact_seconds: float
+
+
+class IvfVectorStore(NumpyVectorStore):  # pylint: disable=too-many-instance-attributes
+    """
+    NumpyVectorStore with an inverted file (IVF-flat) index for large corpora.
+
+    Rows are clustered around centroids trained with spherical k-means. A query only scores
+    the rows of the n_probe lists whose centroids are most similar to it, instead of all the rows.
+    n_probe trades latency for recall: probing all the lists is an exact search.
+
+    The centroids are trained once the store holds min_train_size rows, and trained again once
+    it grew by RETRAIN_GROWTH. Rows added in between are assigned to their nearest centroid.
+    The index is persisted next to the matrix, so a loaded store does not retrain.
+    """
+
+    # pylint: disable=too-many-arguments
+    # pylint: disable=too-many-positional-arguments
+    def __init__(
+        self,
+        embedding: Embeddings,
+        vectors: Optional[np.ndarray] = None,
+        ids: Optional[List[str]] = None,
+        texts: Optional[List[str]] = None,
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        n_lists: Optional[int] = None,
+        n_probe: int = DEFAULT_N_PROBE,
+        min_train_size: int = DEFAULT_MIN_TRAIN_SIZE,
+    ):
+        """
+        :param embedding: Embedding model used for the documents and the queries
+        :param vectors: L2-normalized matrix of shape (number of documents, dimensions), possibly memory-mapped
+        :param ids: Id of each row
+        :param texts: Text of each row
+        :param metadatas: Metadata of each row
+        :param n_lists: Number of lists. Defaults to the square root of the number of rows when trained.
+        :param n_probe: Default number of lists probed per query
+        :param min_train_size: Number of rows from which the index is trained
+        """
+        super().__init__(embedding, vectors, ids, texts, metadatas)
+        self.n_lists: Optional[int] = n_lists
+        self.n_probe: int = n_probe
+        self.min_train_size: int = min_train_size
+        self.centroids: Optional[np.ndarray] = None
+        self.assignments: Optional[np.ndarray] = None
+        self._trained_size: int = 0
+        # Rows of every list, built from the assignments when searching
+        self._lists: Optional[List[np.ndarray]] = None
+        self._training: bool = False
+
+    @property
+    def is_trained(self) -> bool:
+        """True if searches use the index rather than scanning all the rows."""
+        return self.centroids is not None
+
+    def train(self, seed: int = 0):
+        """
+        Train the centroids with spherical k-means on a sample of the rows, and assign every row to a list.
+
+        :param seed: Seed of the sampling and of the initial centroids
+        """
+        vectors: Optional[np.ndarray] = self.vectors
+        if len(self) > 0:
+            self._set_index(vectors, *self._fit(vectors, seed))
+
+    async def atrain(self, seed: int = 0):
+        """
+        Train the index like train(), in a thread so that the event loop is not blocked.
+        Only one training runs at once, and rows added or deleted meanwhile are assigned once it is done.
+
+        :param seed: Seed of the sampling and of the initial centroids
+        """
+        vectors: Optional[np.ndarray] = self.vectors
+        if len(self) == 0 or self._training:
+            return
+        self._training = True
+        try:
+            self._set_index(vectors, *await asyncio.to_thread(self._fit, vectors, seed))
+        finally:
+            self._training = False
+
+    def _fit(self, vectors: np.ndarray, seed: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Train the centroids on a sample of rows, and assign the rows to them, without changing the store.
+
+        :param vectors: L2-normalized rows
+        :param seed: Seed of the sampling and of the initial centroids
+        :return: The centroids, and the index of the nearest centroid of each row
+        """
+        n_rows: int = vectors.shape[0]
+        n_lists: int = min(self.n_lists or max(1, int(np.sqrt(n_rows))), n_rows)
+        rng = np.random.default_rng(seed)
+        sample_size: int = min(n_rows, n_lists * TRAINING_SAMPLE_PER_LIST)
+        sample: np.ndarray = np.asarray(vectors[np.sort(rng.choice(n_rows, sample_size, replace=False))])
+
+        centroids: np.ndarray = sample[rng.choice(sample_size, n_lists, replace=False)]
+        for _ in range(TRAINING_ITERATIONS):
+            labels: np.ndarray = np.argmax(sample @ centroids.T, axis=1)
+            sums: np.ndarray = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            counts: np.ndarray = np.bincount(labels, minlength=n_lists)
+            # Restart empty lists from random rows of the sample
+            empty: np.ndarray = np.flatnonzero(counts == 0)
+            sums[empty] = sample[rng.choice(sample_size, empty.size)]
+            centroids = normalize_rows(sums)
+        return centroids, self._assign(vectors, centroids)
+
+    def _set_index(self, vectors: np.ndarray, centroids: np.ndarray, assignments: np.ndarray):
+        """
+        Search with trained centroids.
+
+        :param vectors: Rows the centroids were trained on
+        :param centroids: The trained centroids
+        :param assignments: Index of the nearest centroid of each of the rows
+        """
+        if self.vectors is not vectors:
+            # Rows were added or deleted while training
+            assignments = self._assign(self.vectors, centroids)
+        self.centroids = centroids
+        self.assignments = assignments
+        self._trained_size = len(self)
+        self._lists = None
+        logger.info("Trained IVF index with %d lists over %d rows\n", centroids.shape[0], len(self))
+
+    def add_vectors(
+        self,
+        vectors: Sequence[Sequence[float]],
+        texts: List[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        ids: Optional[List[str]] = None,
+    ) -> List[str]:
+        """
+        Add already embedded texts to the store, replacing rows with the same ids,
+        and insert them in the lists of their nearest centroids.
+        """
+        added_ids: List[str] = super().add_vectors(vectors, texts, metadatas, ids)
+        if self._index_added_rows(len(added_ids)):
+            self.train()
+        return added_ids
+
+    async def aadd_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        *,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        """Asynchronously embed texts and add them to the store, training the index in a thread when it is due."""
+        texts = list(texts)
+        vectors: List[List[float]] = await self.embedding.aembed_documents(texts)
+        added_ids: List[str] = super().add_vectors(vectors, texts, metadatas, ids)
+        if self._index_added_rows(len(added_ids)):
+            await self.atrain()
+        return added_ids
+
+    def _index_added_rows(self, count: int) -> bool:
+        """
+        Insert the rows just added in the lists of their nearest centroids, if trained, so that every row
+        has a list even while the index is trained again.
+
+        :param count: Number of rows just added, at the end of the matrix
+        :return: True if the index is due to be trained
+        """
+        if count == 0:
+            return False
+        if self.is_trained:
+            new_assignments: np.ndarray = self._assign(self.vectors[len(self) - count :], self.centroids)
+            self.assignments = np.concatenate([self.assignments, new_assignments])
+            self._lists = None
+            return len(self) >= self._trained_size * RETRAIN_GROWTH
+        return len(self) >= self.min_train_size
+
+    def _keep_rows(self, keep: List[int]):
+        super()._keep_rows(keep)
+        if self.assignments is not None:
+            self.assignments = self.assignments[keep]
+            self._lists = None
+
+    @staticmethod
+    def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        """
+        :param vectors: L2-normalized vectors
+        :param centroids: L2-normalized centroids
+        :return: Index of the nearest centroid of each vector
+        """
+        blocks: List[np.ndarray] = [
+            np.argmax(vectors[start : start + ASSIGN_BLOCK_SIZE] @ centroids.T, axis=1)
+            for start in range(0, vectors.shape[0], ASSIGN_BLOCK_SIZE)
+        ]
+        return np.concatenate(blocks).astype(np.int32) if blocks else np.empty(0, dtype=np.int32)
+
+    def _get_lists(self) -> List[np.ndarray]:
+        """Get the rows of every list, sorted by row."""
+        if self._lists is None:
+            order: np.ndarray = np.argsort(self.assignments, kind="stable")
+            bounds: np.ndarray = np.searchsorted(self.assignments[order], np.arange(self.centroids.shape[0] + 1))
+            self._lists = [order[bounds[index] : bounds[index + 1]] for index in range(self.centroids.shape[0])]
+        return self._lists
+
+    def similarity_search_with_score_by_vectors(
+        self,
+        embeddings: Sequence[Sequence[float]],
+        k: int = 4,
+        filter: Optional[MetadataFilter] = None,  # pylint: disable=redefined-builtin
+        n_probe: Optional[int] = None,
+        **kwargs: Any,
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        Find the rows most similar to each of several query vectors, only scoring the rows of the probed lists.
+
+        :param embeddings: Query vectors
+        :param k: Number of documents to return per query
+        :param filter: Optional metadata filter the documents must match, see MetadataFilter
+        :param n_probe: Number of lists probed per query. Defaults to the n_probe of the store.
+        :return: For each query, a list of (document, cosine similarity) pairs, most similar first
+        """
+        if not self.is_trained or self.vectors is None or len(embeddings) == 0:
+            return super().similarity_search_with_score_by_vectors(embeddings, k, filter, **kwargs)
+
+        queries: np.ndarray = normalize_rows(embeddings)
+        mask: Optional[np.ndarray] = self._filter_mask(filter) if filter else None
+        lists: List[np.ndarray] = self._get_lists()
+        n_probe = min(n_probe or self.n_probe, len(lists))
+
+        results: List[List[Tuple[Document, float]]] = []
+        for query, centroid_scores in zip(queries, queries @ self.centroids.T):
+            probes: np.ndarray = np.argpartition(-centroid_scores, n_probe - 1)[:n_probe]
+            rows: np.ndarray = np.concatenate([lists[probe] for probe in probes])
+            if mask is not None:
+                rows = rows[mask[rows]]
+            results.extend(self._score_rows(query[np.newaxis], rows, k))
+        return results
+
+    def dump(self, path: str):
+        """
+        Persist the store as a float32 ".npy" matrix, a JSON lines side file and, if trained, the index.
+
+        :param path: Path of the ".npy" file
+        """
+        super().dump(path)
+
+        index_path: str = get_index_path(path)
+        if not self.is_trained:
+            if os.path.exists(index_path):
+                os.remove(index_path)
+            return
+
+        with open(index_path + ".tmp", "wb") as index_file:
+            np.savez(
+                index_file,
+                centroids=self.centroids,
+                assignments=self.assignments,
+                trained_size=np.asarray(self._trained_size),
+            )
+        os.replace(index_path + ".tmp", index_path)
+
+    def _load_index(self, path: str):
+        """
+        Load the index persisted by dump(). It is trained again if it is missing or stale.
+
+        :param path: Path of the ".npy" file
+        """
+        try:
+            with np.load(get_index_path(path)) as index:
+                if index["assignments"].shape[0] == len(self):
+                    self.centroids = index["centroids"]
+                    self.assignments = index["assignments"]
+                    self._trained_size = int(index["trained_size"])
+        except FileNotFoundError:
+            pass
+
+        if not self.is_trained and len(self) >= self.min_train_size:
+            logger.info("IVF index of %s is missing or stale. Training it.\n", path)
+            self.train()
+
+
+def benchmark_recall(
+    store: IvfVectorStore, queries: Sequence[Sequence[float]], k: int = 4, n_probes: Sequence[int] = (1, 4, 8, 16)
+) -> List[RecallBenchmark]:
+    """
+    Measure the recall of approximate searches against exact searches over all the rows,
+    to choose n_probe for a corpus.
+
+    :param store: Trained store
+    :param queries: Query vectors, e.g. embeddings of typical questions
+    :param k: Number of documents returned per query
+    :param n_probes: Values of n_probe to measure
+    :return: Recall and search time of every value of n_probe
+    """
+    start: float = time.perf_counter()
+    exact: List[List[Tuple[Document, float]]] = NumpyVectorStore.similarity_search_with_score_by_vectors(
+        store, queries, k
+    )
+    exact_seconds: float = time.perf_counter() - start
+    expected: List[set] = [{doc.id for doc, _ in results} for results in exact]
+
+    benchmarks: List[RecallBenchmark] = []
+    for n_probe in n_probes:
+        start = time.perf_counter()
+        approximate: List[List[Tuple[Document, float]]] = store.similarity_search_with_score_by_vectors(
+            queries, k, n_probe=n_probe
+        )
+        approximate_seconds: float = time.perf_counter() - start
+
+        found: int = sum(len(ids & {doc.id for doc, _ in results}) for ids, results in zip(expected, approximate))
+        recall: float = found / max(1, sum(len(ids) for ids in expected))
+        benchmarks.append(RecallBenchmark(n_probe, recall, approximate_seconds, exact_seconds))
+        logger.info(
+            "n_probe=%d: recall@%d %.3f, %.2f ms vs %.2f ms exact\n",
+            n_probe,
+            k,
+            recall,
+            approximate_seconds * 1000,
+            exact_seconds * 1000,
+        )
+    return benchmarks
@@ -0,0 +1,267 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+# END COPYRIGHT
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import weakref
+from collections import Counter
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import numpy as np
+from langchain_core.vectorstores import VectorStore
+
+from coded_tools.numpy_vector_store import NumpyVectorStore
+from coded_tools.numpy_vector_store import top_k_rows
+
+# Suffix of the file holding the lexical index, next to the vector store file
+LEXICAL_INDEX_SUFFIX = ".bm25.json"
+# BM25 term frequency saturation and document length normalization
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Words, and identifiers such as "ERR-404", "SKU_1234" or "v2.1.0" kept whole
+TOKEN_PATTERN = re.compile(r"\w+(?:[-./:]\w+)*")
+# Separators of the parts of an identifier, which are indexed too
+IDENTIFIER_SEPARATOR_PATTERN = re.compile(r"[-./:_]")
+
+logger = logging.getLogger(__name__)
+
+# Lexical index of every vector store, built once per store
+_INDEXES: "weakref.WeakKeyDictionary[VectorStore, BM25Index]" = weakref.WeakKeyDictionary()
+_INDEXES_LOCK = threading.Lock()
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split a text into lowercase terms. Identifiers are indexed whole and by their parts,
+    so that "ERR-404" matches both "ERR-404" and "404".
+
+    :param text: Text to split
+    :return: Terms of the text
+    """
+    terms: List[str] = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        terms.append(token)
+        parts: List[str] = [part for part in IDENTIFIER_SEPARATOR_PATTERN.split(token) if part]
+        if len(parts) > 1:
+            terms.extend(parts)
+    return terms
+
+
+def fingerprint_texts(ids: List[str], texts: List[str]) -> str:
+    """
+    :param ids: Id of every document
+    :param texts: Text of every document
+    :return: Hash changing whenever a document is added, removed or changed
+    """
+    digest = hashlib.sha256()
+    for doc_id, text in zip(ids, texts):
+        digest.update(doc_id.encode("utf-8") + b"\0" + text.encode("utf-8") + b"\0")
+    return digest.hexdigest()
+
+
+def get_lexical_index_path(path: str) -> str:
+    """
+    :param path: Path of the vector store file
+    :return: Path of the file holding the lexical index of the vector store
+    """
+    return os.path.splitext(path)[0] + LEXICAL_INDEX_SUFFIX
+
+
+def supports_lexical_index(vectorstore: Optional[VectorStore]) -> bool:
+    """
+    :param vectorstore: A vector store
+    :return: True if the texts of the vector store can be read to build a lexical index
+    """
+    return isinstance(vectorstore, NumpyVectorStore) or isinstance(getattr(vectorstore, "store", None), dict)
+
+
+def get_store_texts(vectorstore: VectorStore) -> Tuple[List[str], List[str]]:
+    """
+    :param vectorstore: An in-process vector store
+    :return: Ids and texts of all the documents of the vector store
+    """
+    if isinstance(vectorstore, NumpyVectorStore):
+        return list(vectorstore.ids), list(vectorstore.texts)
+    # InMemoryVectorStore keeps a dictionary of id to document record
+    records: Dict[str, Dict] = vectorstore.store
+    return list(records.keys()), [record["text"] for record in records.values()]
+
+
+class BM25Index:
+    """
+    Inverted index scoring documents with Okapi BM25, to find exact terms such as
+    identifiers, error codes or product references that embeddings often miss.
+
+    The postings of every term are arrays of rows and term frequencies, so that a query
+    is scored with a few vectorized operations per query term.
+    """
+
+    def __init__(
+        self,
+        ids: List[str],
+        doc_lengths: np.ndarray,
+        postings: Dict[str, Tuple[np.ndarray, np.ndarray]],
+        fingerprint: str = "",
+    ):
+        """
+        :param ids: Id of every document
+        :param doc_lengths: Number of terms of every document
+        :param postings: For every term, the rows of the documents containing it and its frequency in each
+        :param fingerprint: Fingerprint of the indexed documents, see fingerprint_texts()
+        """
+        self.ids: List[str] = ids
+        self.fingerprint: str = fingerprint
+        self.doc_lengths: np.ndarray = doc_lengths
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = postings
+        self.average_length: float = float(doc_lengths.mean()) if doc_lengths.size else 0.0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_texts(cls, ids: List[str], texts: List[str]) -> "BM25Index":
+        """
+        Index documents.
+
+        :param ids: Id of every document
+        :param texts: Text of every document
+        :return: The index
+        """
+        rows_by_term: Dict[str, List[int]] = {}
+        frequencies_by_term: Dict[str, List[int]] = {}
+        doc_lengths: List[int] = []
+        for row, text in enumerate(texts):
+            terms: List[str] = tokenize(text)
+            doc_lengths.append(len(terms))
+            for term, frequency in Counter(terms).items():
+                rows_by_term.setdefault(term, []).append(row)
+                frequencies_by_term.setdefault(term, []).append(frequency)
+
+        postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {
+            term: (np.asarray(rows, dtype=np.int32), np.asarray(frequencies_by_term[term], dtype=np.float32))
+            for term, rows in rows_by_term.items()
+        }
+        return cls(list(ids), np.asarray(doc_lengths, dtype=np.float32), postings, fingerprint_texts(ids, texts))
+
+    def search(self, query: str, k: int = 4) -> List[Tuple[str, float]]:
+        """
+        Find the documents best matching the terms of a query.
+
+        :param query: Query text
+        :param k: Number of documents to return
+        :return: List of (document id, BM25 score) pairs, best first. Documents sharing no term with the query
+            are not returned.
+        """
+        if not self.ids:
+            return []
+
+        scores: np.ndarray = np.zeros(len(self.ids), dtype=np.float32)
+        for term in set(tokenize(query)):
+            posting: Optional[Tuple[np.ndarray, np.ndarray]] = self.postings.get(term)
+            if posting is None:
+                continue
+            rows, frequencies = posting
+            idf: float = np.log1p((len(self.ids) - rows.size + 0.5) / (rows.size + 0.5))
+            length_norm: np.ndarray = 1 - BM25_B + BM25_B * self.doc_lengths[rows] / max(self.average_length, 1.0)
+            scores[rows] += idf * frequencies * (BM25_K1 + 1) / (frequencies + BM25_K1 * length_norm)
+
+        matches: np.ndarray = np.flatnonzero(scores > 0)
+        top: np.ndarray = matches[top_k_rows(scores[matches], k)]
+        return [(self.ids[row], float(scores[row])) for row in top]
+
+    def dump(self, path: str):
+        """
+        Persist the index as JSON. It is written to a temporary file first, so that readers never see a partial index.
+
+        :param path: Path of the JSON file
+        """
+        index: Dict = {
+            "ids": self.ids,
+            "fingerprint": self.fingerprint,
+            "doc_lengths": self.doc_lengths.astype(int).tolist(),
+            "postings": {
+                term: [rows.tolist(), frequencies.astype(int).tolist()]
+                for term, (rows, frequencies) in self.postings.items()
+            },
+        }
+        with open(path + ".tmp", "w", encoding="utf-8") as index_file:
+            json.dump(index, index_file)
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        """
+        Load an index persisted with dump().
+
+        :param path: Path of the JSON file
+        :return: The loaded index
+        :raises FileNotFoundError: If the index does not exist
+        """
+        with open(path, "r", encoding="utf-8") as index_file:
+            index: Dict = json.load(index_file)
+        postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {
+            term: (np.asarray(rows, dtype=np.int32), np.asarray(frequencies, dtype=np.float32))
+            for term, (rows, frequencies) in index["postings"].items()
+        }
+        return cls(
+            index["ids"], np.asarray(index["doc_lengths"], dtype=np.float32), postings, index.get("fingerprint", "")
+        )
+
+
+def get_lexical_index(vectorstore: VectorStore, path: Optional[str] = None, save: bool = False) -> BM25Index:
+    """
+    Get the lexical index of an in-process vector store, built once per store.
+
+    The index persisted at the path is used if it indexes the same documents, with the same texts, as the store.
+    Otherwise the index is built from the texts of the store.
+
+    :param vectorstore: An in-process vector store
+    :param path: Path of the JSON file persisting the index, if any
+    :param save: Persist a newly built index to the path if True
+    :return: The lexical index of the vector store
+    """
+    with _INDEXES_LOCK:
+        index: Optional[BM25Index] = _INDEXES.get(vectorstore)
+    if index is not None:
+        return index
+
+    ids, texts = get_store_texts(vectorstore)
+    if path:
+        try:
+            index = BM25Index.load(path)
+            if index.fingerprint != fingerprint_texts(ids, texts):
+                logger.info("Lexical index at %s is stale. Rebuilding it.\n", path)
+                index = None
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError) as error:
+            logger.error("Invalid lexical index at %s: %s. Rebuilding it.\n", path, error)
+
+    if index is None:
+        index = BM25Index.from_texts(ids, texts)
+        logger.info("Built lexical index of %d documents\n", len(index))
+        if path and save:
+            try:
+                index.dump(path)
+            except OSError as os_error:
+                logger.error("Failed to save lexical index to %s: %s\n", path, os_error)
+
+    with _INDEXES_LOCK:
+        _INDEXES[vectorstore] = index
+    return index
@@ -0,0 +1,480 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+# END COPYRIGHT
+
+import asyncio
+import logging
+import math
+import os
+import threading
+from abc import ABC
+from abc import abstractmethod
+from collections import deque
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+from typing import Deque
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import Union
+from urllib.parse import parse_qsl
+from urllib.parse import urlencode
+from urllib.parse import urlsplit
+
+from neuro_san.interfaces.coded_tool import CodedTool
+
+from coded_tools.brave_search import BraveSearch
+from coded_tools.ddgs_search import DdgsSearch
+from coded_tools.google_search import GoogleSearch
+from coded_tools.google_serper import GoogleSerper
+from coded_tools.search_cache import SEARCH_ORIGIN
+from coded_tools.search_cache import SearchOrigin
+
+# Providers searched at once, and providers searched instead of the slow or failed ones, unless configured
+DEFAULT_PROVIDERS = ["brave_search", "google_search"]
+DEFAULT_BACKUP_PROVIDERS = ["ddgs_search"]
+# Number of providers which must have returned results, and number of distinct results, before returning
+DEFAULT_QUORUM = 2
+DEFAULT_MIN_RESULTS = 5
+DEFAULT_MAX_RESULTS = 10
+# Percentile of the latencies of a provider after which a backup request is sent
+DEFAULT_HEDGE_PERCENTILE = 90.0
+# Seconds a provider may take before a backup request is sent, until enough of its latencies are known
+DEFAULT_HEDGE_DELAY = 2.0
+# Seconds a meta search may take in total
+DEFAULT_TIMEOUT = float(os.getenv("META_SEARCH_TIMEOUT") or 10)
+# Number of recent latencies kept for every provider, and needed to estimate a percentile
+LATENCY_WINDOW = 100
+MIN_LATENCY_SAMPLES = 10
+# Constant of reciprocal rank fusion, damping the difference between the first ranks
+RRF_K = 60
+# Query parameters used for tracking, which do not change the page of a URL
+TRACKING_PARAMS = ("utm_", "gclid", "fbclid", "msclkid", "mc_cid", "mc_eid")
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SearchResult:
+    """A web page returned by a search provider."""
+
+    url: str
+    title: str
+    snippet: str
+
+
+class SearchProvider(ABC):  # pylint: disable=too-few-public-methods
+    """A search engine queried by the meta search."""
+
+    # Name of the provider, identifying its latencies and its results
+    name: str = ""
+
+    @abstractmethod
+    async def search(self, query: str, max_results: int) -> List[SearchResult]:
+        """
+        :param query: Search query
+        :param max_results: Maximum number of results
+        :return: The results, best first
+        :raises Exception: If the search failed
+        """
+        raise NotImplementedError
+
+
+class ToolSearchProvider(SearchProvider):  # pylint: disable=too-few-public-methods
+    """Searches with one of the search coded tools, so that it shares their pooled client and their cache."""
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def __init__(self, name: str, tool: CodedTool, query_arg: str, count_arg: str, max_count: int):
+        """
+        :param name: Name of the provider
+        :param tool: The search coded tool
+        :param query_arg: Argument of the tool holding the query
+        :param count_arg: Argument of the tool holding the number of results
+        :param max_count: Maximum number of results the provider returns at once
+        """
+        self.name = name
+        self.tool: CodedTool = tool
+        self.query_arg: str = query_arg
+        self.count_arg: str = count_arg
+        self.max_count: int = max_count
+
+    async def search(self, query: str, max_results: int) -> List[SearchResult]:
+        results: Union[List[Dict[str, Any]], Dict[str, Any], str] = await self.tool.async_invoke(
+            {self.query_arg: query, self.count_arg: min(max_results, self.max_count)}, {}
+        )
+        if isinstance(results, str):
+            raise RuntimeError(results)
+        if isinstance(results, dict):
+            # Google Serper returns the whole response, with the web results under "organic"
+            results = results.get("organic", [])
+
+        search_results: List[SearchResult] = []
+        for item in results:
+            # Google and Serper name the fields link and snippet, Brave url and description, DDGS href and body
+            url: Optional[str] = item.get("link") or item.get("url") or item.get("href")
+            if url:
+                snippet: str = item.get("snippet") or item.get("description") or item.get("body") or ""
+                search_results.append(SearchResult(url, item.get("title") or "", snippet))
+        return search_results[:max_results]
+
+
+# Search coded tool of every provider, with its query and result count arguments and its maximum result count
+_TOOL_PROVIDERS: Dict[str, Tuple[Callable[[], CodedTool], str, str, int]] = {
+    "brave_search": (BraveSearch, "search_terms", "count", 20),
+    "ddgs_search": (DdgsSearch, "search_terms", "max_results", 50),
+    "google_search": (GoogleSearch, "search_terms", "num", 10),
+    "google_serper": (GoogleSerper, "query", "k", 100),
+}
+
+
+def get_search_provider(name: str) -> SearchProvider:
+    """
+    :param name: "brave_search", "ddgs_search", "google_search" or "google_serper"
+    :return: The provider searching with the search tool of that name
+    :raises ValueError: If the provider is unknown
+    """
+    if name not in _TOOL_PROVIDERS:
+        raise ValueError(f"Unknown search provider {name}. Use one of {sorted(_TOOL_PROVIDERS)}.")
+    tool_class, query_arg, count_arg, max_count = _TOOL_PROVIDERS[name]
+    return ToolSearchProvider(name, tool_class(), query_arg, count_arg, max_count)
+
+
+class LatencyTracker:
+    """
+    Recent latencies of every provider, from which the meta search decides when to send backup requests.
+    Only searches which reached the provider and returned results are recorded, as results served from the cache
+    and quick failures would make every search look slow in comparison.
+    """
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        """
+        :param window: Number of recent latencies kept for every provider
+        """
+        self.window: int = window
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, provider: str, seconds: float):
+        """Record how long a search of a provider took."""
+        with self._lock:
+            self._latencies.setdefault(provider, deque(maxlen=self.window)).append(seconds)
+
+    def get_percentile(self, provider: str, percentile: float) -> Optional[float]:
+        """
+        :param provider: Name of the provider
+        :param percentile: Percentile, between 0 and 100
+        :return: The percentile of the recent latencies of the provider, or None if too few are known
+        """
+        with self._lock:
+            latencies: List[float] = sorted(self._latencies.get(provider, ()))
+        if len(latencies) < MIN_LATENCY_SAMPLES:
+            return None
+        index: int = min(len(latencies) - 1, max(0, math.ceil(percentile / 100 * len(latencies)) - 1))
+        return latencies[index]
+
+
+@dataclass
+class _Attempt:
+    """A running search of one provider."""
+
+    provider: SearchProvider
+    started: float
+    # Time after which a backup request is sent, or None if it was sent or is not needed
+    hedge_at: Optional[float]
+    # True if a backup request was sent for this search
+    backed_up: bool = False
+    # Where the results came from, filled in by the search cache
+    origin: SearchOrigin = field(default_factory=SearchOrigin)
+
+
+class FederatedSearch:  # pylint: disable=too-few-public-methods
+    """
+    Searches several providers at once and returns as soon as enough of them have answered,
+    so that the latency of a search is not the tail latency of one provider.
+
+    A primary provider taking longer than a percentile of its recent latencies, or failing, is backed up
+    by a request to the next backup provider. The search returns when a quorum of providers returned results
+    with a minimum number of distinct pages, when no search is left running, or at its deadline,
+    with the results received so far. Searches still running are then cancelled.
+    """
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def __init__(
+        self,
+        providers: List[SearchProvider],
+        backup_providers: Optional[List[SearchProvider]] = None,
+        latencies: Optional[LatencyTracker] = None,
+        hedge_percentile: float = DEFAULT_HEDGE_PERCENTILE,
+        quorum: int = DEFAULT_QUORUM,
+        min_results: int = DEFAULT_MIN_RESULTS,
+        timeout: float = DEFAULT_TIMEOUT,
+    ):
+        """
+        :param providers: Providers searched at once
+        :param backup_providers: Providers searched, in order, instead of slow or failed ones
+        :param latencies: Recent latencies of the providers. Those of the process by default.
+        :param hedge_percentile: Percentile of the latencies of a provider after which a backup request is sent
+        :param quorum: Number of providers which must have returned results
+        :param min_results: Number of distinct results needed
+        :param timeout: Seconds the search may take in total
+        """
+        self.providers: List[SearchProvider] = providers
+        self.backup_providers: List[SearchProvider] = backup_providers or []
+        self.latencies: LatencyTracker = latencies or PROVIDER_LATENCIES
+        self.hedge_percentile: float = hedge_percentile
+        self.quorum: int = min(quorum, len(self.providers) + len(self.backup_providers))
+        self.min_results: int = min_results
+        self.timeout: float = timeout
+
+    # pylint: disable=too-many-locals
+    async def search(self, query: str, max_results: int = DEFAULT_MAX_RESULTS) -> Dict[str, List[SearchResult]]:
+        """
+        :param query: Search query
+        :param max_results: Maximum number of results of every provider
+        :return: The results of every provider which returned some, in the order of the providers then of the backups,
+            so that results are fused the same way whichever provider answered first
+        """
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        deadline: float = loop.time() + self.timeout
+        backups: Deque[SearchProvider] = deque(self.backup_providers)
+        running: Dict[asyncio.Task, _Attempt] = {}
+        rankings: Dict[str, List[SearchResult]] = {}
+
+        def launch(provider: SearchProvider, hedge: bool):
+            now: float = loop.time()
+            attempt = _Attempt(provider, now, now + self._get_hedge_delay(provider) if hedge else None)
+            task: asyncio.Task = asyncio.ensure_future(
+                _search_with_origin(attempt.origin, provider.search(query, max_results))
+            )
+            task.add_done_callback(_retrieve_exception)
+            running[task] = attempt
+
+        def launch_backup(attempt: _Attempt, reason: str):
+            attempt.backed_up = True
+            attempt.hedge_at = None
+            if backups:
+                backup: SearchProvider = backups.popleft()
+                logger.info("Searching %s as %s %s\n", backup.name, attempt.provider.name, reason)
+                launch(backup, hedge=False)
+
+        for provider in self.providers:
+            launch(provider, hedge=True)
+        try:
+            while running and not self._is_complete(rankings):
+                hedge_times: List[float] = [attempt.hedge_at for attempt in running.values() if attempt.hedge_at]
+                wait: float = min([deadline] + hedge_times) - loop.time()
+                if loop.time() >= deadline:
+                    logger.warning("Meta search reached its deadline with %d providers answered\n", len(rankings))
+                    break
+                done, _ = await asyncio.wait(running, timeout=max(0.0, wait), return_when=asyncio.FIRST_COMPLETED)
+
+                for task in done:
+                    attempt: _Attempt = running.pop(task)
+                    results: List[SearchResult] = self._get_results(task, attempt, loop.time())
+                    if results:
+                        rankings[attempt.provider.name] = results
+                    elif not attempt.backed_up:
+                        launch_backup(attempt, "returned no results")
+
+                now: float = loop.time()
+                for attempt in list(running.values()):
+                    if attempt.hedge_at is not None and attempt.hedge_at <= now:
+                        launch_backup(attempt, f"is slower than {now - attempt.started:.2f} s")
+        finally:
+            for task in running:
+                task.cancel()
+        return {
+            provider.name: rankings[provider.name]
+            for provider in self.providers + self.backup_providers
+            if provider.name in rankings
+        }
+
+    def _get_hedge_delay(self, provider: SearchProvider) -> float:
+        """Seconds a search of a provider may take before a backup request is sent."""
+        delay: Optional[float] = self.latencies.get_percentile(provider.name, self.hedge_percentile)
+        return DEFAULT_HEDGE_DELAY if delay is None else delay
+
+    def _get_results(self, task: asyncio.Task, attempt: _Attempt, now: float) -> List[SearchResult]:
+        """Get the results of a finished search, recording the latency of its provider, or [] if it failed."""
+        if task.exception() is not None:
+            logger.warning("Search of %s failed: %s\n", attempt.provider.name, task.exception())
+            return []
+        results: List[SearchResult] = task.result()
+        if results and not attempt.origin.cached:
+            # The cache measured the call to the provider alone, without the work of the search tool around it
+            latency: Optional[float] = attempt.origin.latency
+            self.latencies.record(attempt.provider.name, now - attempt.started if latency is None else latency)
+        return results
+
+    def _is_complete(self, rankings: Dict[str, List[SearchResult]]) -> bool:
+        """True if enough providers returned enough distinct results."""
+        if len(rankings) < self.quorum:
+            return False
+        urls = {canonicalize_url(result.url) for results in rankings.values() for result in results}
+        return len(urls) >= self.min_results
+
+
+async def _search_with_origin(origin: SearchOrigin, search: Awaitable[List[SearchResult]]) -> List[SearchResult]:
+    """Run a search in the context of its task, where the search cache tells whether it served the results."""
+    SEARCH_ORIGIN.set(origin)
+    return await search
+
+
+def _retrieve_exception(task: asyncio.Task):
+    """Retrieve the exception of a search, so that searches failing after the meta search returned are not logged."""
+    if not task.cancelled():
+        task.exception()
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    :param url: URL of a page
+    :return: The URL without scheme, www prefix, fragment, trailing slash and tracking parameters,
+        and with sorted query parameters, so that the URLs of the same page returned by several providers match
+    """
+    parts = urlsplit(url.strip())
+    host: str = (parts.hostname or "").removeprefix("www.")
+    if parts.port and parts.port not in (80, 443):
+        host += f":{parts.port}"
+    params: List[Tuple[str, str]] = sorted(
+        (name, value)
+        for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not name.lower().startswith(TRACKING_PARAMS)
+    )
+    canonical_url: str = host + (parts.path.rstrip("/") or "/")
+    return canonical_url + "?" + urlencode(params) if params else canonical_url
+
+
+def fuse_results(rankings: Dict[str, List[SearchResult]], max_results: int) -> List[Dict[str, Any]]:
+    """
+    Merge the results of several providers with reciprocal rank fusion, so that pages ranked high
+    by several providers come first.
+
+    :param rankings: The results of every provider, best first
+    :param max_results: Maximum number of results
+    :return: The title, url, snippet, providers and score of the best distinct pages, best first
+    """
+    fused: Dict[str, Dict[str, Any]] = {}
+    for provider, results in rankings.items():
+        for rank, result in enumerate(results):
+            key: str = canonicalize_url(result.url)
+            entry: Optional[Dict[str, Any]] = fused.get(key)
+            if entry is None:
+                entry = {"title": result.title, "url": result.url, "snippet": "", "providers": [], "score": 0.0}
+                fused[key] = entry
+            # A page returned twice by the same provider only counts at its best rank
+            if provider not in entry["providers"]:
+                entry["providers"].append(provider)
+                entry["score"] += 1.0 / (RRF_K + rank + 1)
+            if len(result.snippet) > len(entry["snippet"]):
+                entry["snippet"] = result.snippet
+
+    best: List[Dict[str, Any]] = sorted(fused.values(), key=lambda item: -item["score"])[:max_results]
+    for entry in best:
+        entry["score"] = round(entry["score"], 4)
+    return best
+
+
+class MetaSearch(CodedTool):
+    """
+    CodedTool implementation which searches the web with several search providers at once,
+    sending backup requests for the slow or failed ones, and merges their results.
+    """
+
+    def __init__(self, providers: Optional[Dict[str, SearchProvider]] = None):
+        """
+        :param providers: The providers by name. Providers of the search tools are created on first use otherwise.
+        """
+        self.providers: Dict[str, SearchProvider] = providers if providers is not None else {}
+
+    async def async_invoke(self, args: Dict[str, Any], sly_data: Dict[str, Any]) -> Union[List[Dict[str, Any]], str]:
+        """
+        :param args: An argument dictionary whose keys are the parameters
+                to the coded tool and whose values are the values passed for them
+                by the calling agent.  This dictionary is to be treated as read-only.
+
+                The argument dictionary expects the following keys:
+                    "search_terms"
+
+                The following keys are optional:
+                    "providers" names of the providers searched at once
+                    "backup_providers" names of the providers searched, in order, instead of slow or failed ones
+                    "quorum" number of providers which must have returned results
+                    "min_results" number of distinct results needed before returning
+                    "max_results" maximum number of results
+                    "hedge_percentile" percentile of the latencies of a provider after which a backup is searched
+                    "timeout" seconds the search may take in total
+
+        :param sly_data: A dictionary whose keys are defined by the agent hierarchy,
+                but whose values are meant to be kept out of the chat stream.
+
+                This dictionary is largely to be treated as read-only.
+                It is possible to add key/value pairs to this dict that do not
+                yet exist as a bulletin board, as long as the responsibility
+                for which coded_tool publishes new entries is well understood
+                by the agent chain implementation and the coded_tool implementation
+                adding the data is not invoke()-ed more than once.
+
+                Keys expected for this implementation are:
+                    None
+
+        :return:
+            In case of successful execution:
+                A list of dictionary of search results, with the providers which returned them and their score
+            otherwise:
+                a text string an error message in the format:
+                "Error: <error message>"
+        """
+        query: str = args.get("search_terms") or args.get("query")
+        if not query:
+            return "Error: No 'search_terms' provided."
+
+        try:
+            providers: List[SearchProvider] = self._get_providers(args.get("providers", DEFAULT_PROVIDERS))
+            backup_providers: List[SearchProvider] = self._get_providers(
+                args.get("backup_providers", DEFAULT_BACKUP_PROVIDERS)
+            )
+        except ValueError as error:
+            return f"Error: {error}"
+
+        max_results: int = int(args.get("max_results", DEFAULT_MAX_RESULTS))
+        federated_search = FederatedSearch(
+            providers,
+            backup_providers,
+            hedge_percentile=float(args.get("hedge_percentile", DEFAULT_HEDGE_PERCENTILE)),
+            quorum=int(args.get("quorum", DEFAULT_QUORUM)),
+            min_results=int(args.get("min_results", DEFAULT_MIN_RESULTS)),
+            timeout=float(args.get("timeout", DEFAULT_TIMEOUT)),
+        )
+
+        logger.info(">>>>>>>>>>>>>>>>>>>MetaSearch>>>>>>>>>>>>>>>>>>")
+        logger.info("MetaSearch Terms: %s", query)
+        rankings: Dict[str, List[SearchResult]] = await federated_search.search(query, max_results)
+        if not rankings:
+            return "Error: No search provider returned results."
+        logger.info("MetaSearch Providers: %s", list(rankings))
+        return fuse_results(rankings, max_results)
+
+    def _get_providers(self, names: List[str]) -> List[SearchProvider]:
+        """Get the providers of the given names, creating those of the search tools on first use."""
+        providers: List[SearchProvider] = []
+        for name in names:
+            if name not in self.providers:
+                self.providers[name] = get_search_provider(name)
+            providers.append(self.providers[name])
+        return providers
+
+
+# Recent latencies of the providers, shared by all the meta searches of the process
+PROVIDER_LATENCIES = LatencyTracker()
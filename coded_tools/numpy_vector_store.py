@@ -0,0 +1,509 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+# END COPYRIGHT
+
+import json
+import logging
+import os
+import uuid
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+from typing import Union
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from coded_tools.query_cache import bump_index_version
+
+# Suffix of the side file holding the ids, texts and metadata of the rows of the matrix
+DOCS_SUFFIX = ".docs.jsonl"
+# Smallest norm a vector is divided by when normalizing, so that zero vectors stay zero
+MIN_NORM = 1e-12
+# Tolerance on the norm of the rows of a loaded matrix before it is normalized again
+NORM_TOLERANCE = 1e-3
+# Number of rows of a loaded matrix whose norm is checked, so that loading does not read the whole matrix
+NORM_SAMPLE_SIZE = 64
+# Smallest number of rows allocated for the matrix, which then grows by GROWTH_FACTOR when full
+MIN_CAPACITY = 1024
+GROWTH_FACTOR = 2
+
+# Metadata filter: either a mapping of metadata keys to a value, or to a list of accepted values,
+# or a callable taking the metadata of a document and returning whether it is kept
+MetadataFilter = Union[Dict[str, Any], Callable[[Dict[str, Any]], bool]]
+
+logger = logging.getLogger(__name__)
+
+
+def get_docs_path(path: str) -> str:
+    """
+    :param path: Path of the ".npy" matrix file
+    :return: Path of the side file holding the chunk ids, texts and metadata
+    """
+    return os.path.splitext(path)[0] + DOCS_SUFFIX
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """
+    :param vectors: Matrix of shape (number of vectors, dimensions)
+    :return: float32 matrix whose rows have a unit L2 norm. Zero rows stay zero.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms: np.ndarray = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, MIN_NORM)
+
+
+def top_k_rows(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Select the indexes of the highest scores without sorting all of them.
+
+    :param scores: Scores of shape (number of rows,)
+    :param k: Number of indexes to return
+    :return: Indexes of the k highest scores, highest first
+    """
+    if k <= 0 or scores.size == 0:
+        return np.empty(0, dtype=np.int64)
+    if k < scores.size:
+        top: np.ndarray = np.argpartition(-scores, k - 1)[:k]
+    else:
+        top = np.arange(scores.size)
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+def _metadata_key(value: Any) -> str:
+    """Canonical form of a metadata value, so that values of any type can be compared by code."""
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+class NumpyVectorStore(VectorStore):  # pylint: disable=too-many-public-methods,too-many-instance-attributes
+    """
+    Vector store keeping all embeddings in one contiguous float32 matrix.
+
+    It is persisted as a ".npy" file, which is memory-mapped when loaded so that
+    several server workers share the same pages, plus a JSON lines side file
+    with the id, text and metadata of every row.
+    Rows are L2-normalized when added, so that cosine similarities of a query, or of a
+    batch of queries, with all the rows are a single matrix product. The top k rows are
+    selected with argpartition, and metadata filters are applied beforehand as boolean masks.
+    Added rows are written to spare rows of a buffer which grows geometrically, so that adding
+    in small batches does not copy the whole matrix every time.
+    """
+
+    # pylint: disable=too-many-arguments
+    # pylint: disable=too-many-positional-arguments
+    def __init__(
+        self,
+        embedding: Embeddings,
+        vectors: Optional[np.ndarray] = None,
+        ids: Optional[List[str]] = None,
+        texts: Optional[List[str]] = None,
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+    ):
+        """
+        :param embedding: Embedding model used for the documents and the queries
+        :param vectors: L2-normalized matrix of shape (number of documents, dimensions), possibly memory-mapped
+        :param ids: Id of each row
+        :param texts: Text of each row
+        :param metadatas: Metadata of each row
+        """
+        self.embedding: Embeddings = embedding
+        self.vectors: Optional[np.ndarray] = vectors
+        self.ids: List[str] = ids or []
+        self.texts: List[str] = texts or []
+        self.metadatas: List[Dict[str, Any]] = metadatas or []
+        # Per metadata key, the code of the value of each row and the code of each value
+        self._columns: Dict[str, Tuple[np.ndarray, Dict[str, int]]] = {}
+        # Row of every id, built when documents are fetched by id
+        self._rows: Optional[Dict[str, int]] = None
+        # Buffer whose leading rows are the matrix, as long as the matrix is the view _buffered of it
+        self._buffer: Optional[np.ndarray] = None
+        self._buffered: Optional[np.ndarray] = None
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def memory_bytes(self) -> int:
+        """Bytes of the matrix scanned by searches."""
+        return self.vectors.nbytes if self.vectors is not None else 0
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        *,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        """Embed texts and add them to the store, replacing rows with the same ids."""
+        texts = list(texts)
+        return self.add_vectors(self.embedding.embed_documents(texts), texts, metadatas, ids)
+
+    async def aadd_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        *,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        """Asynchronously embed texts and add them to the store, replacing rows with the same ids."""
+        texts = list(texts)
+        return self.add_vectors(await self.embedding.aembed_documents(texts), texts, metadatas, ids)
+
+    def add_vectors(
+        self,
+        vectors: Sequence[Sequence[float]],
+        texts: List[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        ids: Optional[List[str]] = None,
+    ) -> List[str]:
+        """
+        Add already embedded texts to the store, replacing rows with the same ids.
+
+        :param vectors: Embedding of each text
+        :param texts: Texts to add
+        :param metadatas: Metadata of each text
+        :param ids: Id of each text. Random ids are generated if None.
+        :return: Ids of the added texts
+        """
+        ids = [text_id or str(uuid.uuid4()) for text_id in ids] if ids else [str(uuid.uuid4()) for _ in texts]
+        metadatas = metadatas or [{} for _ in texts]
+        if not texts:
+            return []
+
+        self.delete(ids)
+        self._append_rows(normalize_rows(vectors))
+        self.ids.extend(ids)
+        self.texts.extend(texts)
+        self.metadatas.extend(metadatas)
+        self._columns.clear()
+        self._rows = None
+        bump_index_version(self)
+        return ids
+
+    def _append_rows(self, rows: np.ndarray):
+        """
+        Append rows to the matrix, in the spare rows of its buffer if it has enough of them,
+        else in a new buffer with room to grow. A memory-mapped matrix is only read into memory once.
+
+        :param rows: L2-normalized rows
+        """
+        n_rows: int = 0 if self.vectors is None else self.vectors.shape[0]
+        needed: int = n_rows + rows.shape[0]
+        if self.vectors is None or self.vectors is not self._buffered or needed > self._buffer.shape[0]:
+            capacity: int = max(needed, GROWTH_FACTOR * n_rows, MIN_CAPACITY)
+            buffer: np.ndarray = np.empty((capacity, rows.shape[1]), dtype=np.float32)
+            if n_rows:
+                buffer[:n_rows] = self.vectors
+            self._buffer = buffer
+        # Rows below n_rows are never written, so earlier views of the matrix, e.g. held by a search, stay valid
+        self._buffer[n_rows:needed] = rows
+        self.vectors = self._buffered = self._buffer[:needed]
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        """Delete the rows with the given ids."""
+        if not ids or self.vectors is None:
+            return True
+
+        to_delete = set(ids)
+        if to_delete.isdisjoint(self.ids):
+            return True
+        keep: List[int] = [row for row, row_id in enumerate(self.ids) if row_id not in to_delete]
+        self._keep_rows(keep)
+        return True
+
+    def _keep_rows(self, keep: List[int]):
+        """
+        Keep only the given rows, in the given order.
+
+        :param keep: Indexes of the rows to keep
+        """
+        self.vectors = self.vectors[keep]
+        self.ids = [self.ids[row] for row in keep]
+        self.texts = [self.texts[row] for row in keep]
+        self.metadatas = [self.metadatas[row] for row in keep]
+        self._columns.clear()
+        self._rows = None
+        bump_index_version(self)
+
+    async def adelete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        return self.delete(ids, **kwargs)
+
+    def get_by_ids(self, ids: Sequence[str], /) -> List[Document]:
+        if self._rows is None:
+            self._rows = {row_id: row for row, row_id in enumerate(self.ids)}
+        return [self._document(self._rows[doc_id]) for doc_id in ids if doc_id in self._rows]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, **kwargs)]
+
+    async def asimilarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in await self.asimilarity_search_with_score(query, k, **kwargs)]
+
+    # pylint: disable=arguments-differ
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self.embedding.embed_query(query), k, **kwargs)
+
+    # pylint: disable=arguments-differ
+    async def asimilarity_search_with_score(
+        self, query: str, k: int = 4, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(await self.embedding.aembed_query(query), k, **kwargs)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k, **kwargs)]
+
+    def similarity_search_with_score_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[MetadataFilter] = None,  # pylint: disable=redefined-builtin
+        **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        """
+        Find the rows most similar to a query vector.
+
+        :param embedding: Query vector
+        :param k: Number of documents to return
+        :param filter: Optional metadata filter the documents must match, see MetadataFilter
+        :return: List of (document, cosine similarity) pairs, most similar first
+        """
+        return self.similarity_search_with_score_by_vectors([embedding], k, filter, **kwargs)[0]
+
+    # pylint: disable=unused-argument
+    def similarity_search_with_score_by_vectors(
+        self,
+        embeddings: Sequence[Sequence[float]],
+        k: int = 4,
+        filter: Optional[MetadataFilter] = None,  # pylint: disable=redefined-builtin
+        **kwargs: Any,
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        Find the rows most similar to each of several query vectors with one matrix product.
+
+        :param embeddings: Query vectors
+        :param k: Number of documents to return per query
+        :param filter: Optional metadata filter the documents must match, see MetadataFilter
+        :return: For each query, a list of (document, cosine similarity) pairs, most similar first
+        """
+        if self.vectors is None or not self.ids or len(embeddings) == 0:
+            return [[] for _ in embeddings]
+
+        # Restrict the candidates to the rows matching the filter before scoring
+        rows: Optional[np.ndarray] = np.flatnonzero(self._filter_mask(filter)) if filter else None
+        return self._score_rows(normalize_rows(embeddings), rows, k)
+
+    def _score_rows(
+        self, queries: np.ndarray, rows: Optional[np.ndarray], k: int
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        Score candidate rows against normalized query vectors with one matrix product.
+
+        :param queries: L2-normalized query vectors of shape (number of queries, dimensions)
+        :param rows: Indexes of the candidate rows, or None for all the rows
+        :param k: Number of documents to return per query
+        :return: For each query, a list of (document, cosine similarity) pairs, most similar first
+        """
+        if rows is not None and rows.size == 0:
+            return [[] for _ in queries]
+
+        # Shape (number of candidates, number of queries)
+        vectors: np.ndarray = self.vectors if rows is None else self.vectors[rows]
+        scores: np.ndarray = vectors @ queries.T
+
+        results: List[List[Tuple[Document, float]]] = []
+        for query_scores in scores.T:
+            top: np.ndarray = top_k_rows(query_scores, k)
+            top_rows: np.ndarray = top if rows is None else rows[top]
+            results.append([(self._document(row), float(score)) for row, score in zip(top_rows, query_scores[top])])
+        return results
+
+    def batch_similarity_search_with_score(
+        self, queries: List[str], k: int = 4, **kwargs: Any
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        Search several queries at once, embedding them in one call and scoring them in one matrix product.
+
+        :param queries: Query strings
+        :param k: Number of documents to return per query
+        :return: For each query, a list of (document, cosine similarity) pairs, most similar first
+        """
+        if not queries:
+            return []
+        return self.similarity_search_with_score_by_vectors(self.embedding.embed_documents(queries), k, **kwargs)
+
+    async def abatch_similarity_search_with_score(
+        self, queries: List[str], k: int = 4, **kwargs: Any
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        Asynchronously search several queries at once, embedding them in one call and scoring them
+        in one matrix product.
+
+        :param queries: Query strings
+        :param k: Number of documents to return per query
+        :return: For each query, a list of (document, cosine similarity) pairs, most similar first
+        """
+        if not queries:
+            return []
+        embeddings: List[List[float]] = await self.embedding.aembed_documents(queries)
+        return self.similarity_search_with_score_by_vectors(embeddings, k, **kwargs)
+
+    def _filter_mask(self, metadata_filter: MetadataFilter) -> np.ndarray:
+        """
+        :param metadata_filter: Metadata filter, see MetadataFilter
+        :return: Boolean mask of the rows matching the filter
+        """
+        if callable(metadata_filter):
+            return np.fromiter(
+                (bool(metadata_filter(metadata)) for metadata in self.metadatas), dtype=bool, count=len(self.ids)
+            )
+
+        mask: np.ndarray = np.ones(len(self.ids), dtype=bool)
+        for key, value in metadata_filter.items():
+            codes, values = self._get_column(key)
+            if isinstance(value, (list, tuple, set, frozenset)):
+                accepted: List[int] = [values[code] for code in map(_metadata_key, value) if code in values]
+                mask &= np.isin(codes, accepted)
+            else:
+                mask &= codes == values.get(_metadata_key(value), -1)
+        return mask
+
+    def _get_column(self, key: str) -> Tuple[np.ndarray, Dict[str, int]]:
+        """
+        Encode the values of a metadata key as integer codes, so that filters on it are vectorized.
+        Columns are cached until the rows change.
+
+        :param key: Metadata key
+        :return: Tuple of the code of the value of each row, and the code of each value
+        """
+        column: Optional[Tuple[np.ndarray, Dict[str, int]]] = self._columns.get(key)
+        if column is None:
+            values: Dict[str, int] = {}
+            codes: np.ndarray = np.fromiter(
+                (values.setdefault(_metadata_key(metadata.get(key)), len(values)) for metadata in self.metadatas),
+                dtype=np.int64,
+                count=len(self.metadatas),
+            )
+            column = (codes, values)
+            self._columns[key] = column
+        return column
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        # Scores are already cosine similarities
+        return lambda score: score
+
+    def _document(self, row: int) -> Document:
+        """Build the document of a row."""
+        return Document(id=self.ids[row], page_content=self.texts[row], metadata=self.metadatas[row])
+
+    def dump(self, path: str):
+        """
+        Persist the store as a float32 ".npy" matrix and a JSON lines side file.
+        Both files are written to temporary files first, so that readers never see a partial store.
+
+        :param path: Path of the ".npy" file
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        vectors = self.vectors if self.vectors is not None else np.zeros((0, 0), dtype=np.float32)
+
+        docs_path: str = get_docs_path(path)
+        with open(docs_path + ".tmp", "w", encoding="utf-8") as docs_file:
+            for row_id, text, metadata in zip(self.ids, self.texts, self.metadatas):
+                docs_file.write(json.dumps({"id": row_id, "text": text, "metadata": metadata}, default=str) + "\n")
+        with open(path + ".tmp", "wb") as vectors_file:
+            np.save(vectors_file, np.ascontiguousarray(vectors, dtype=np.float32))
+
+        os.replace(docs_path + ".tmp", docs_path)
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path: str, embedding: Embeddings, mmap: bool = True) -> "NumpyVectorStore":
+        """
+        Load a store persisted with dump().
+
+        :param path: Path of the ".npy" file
+        :param embedding: Embedding model used for the queries and new documents
+        :param mmap: Memory-map the matrix instead of reading it into memory
+        :return: The loaded store
+        :raises FileNotFoundError: If the store does not exist
+        """
+        vectors: np.ndarray = np.load(path, mmap_mode="r" if mmap else None)
+
+        ids: List[str] = []
+        texts: List[str] = []
+        metadatas: List[Dict[str, Any]] = []
+        with open(get_docs_path(path), "r", encoding="utf-8") as docs_file:
+            for line in docs_file:
+                row: Dict[str, Any] = json.loads(line)
+                ids.append(row["id"])
+                texts.append(row["text"])
+                metadatas.append(row["metadata"])
+
+        if len(ids) != vectors.shape[0]:
+            raise ValueError(f"Vector store at {path} has {vectors.shape[0]} vectors but {len(ids)} documents")
+
+        # Stores are dumped normalized, but normalize in memory anything else rather than return wrong scores.
+        # Only rows spread over the matrix are checked, as reading them all would page in the whole memory map.
+        if ids:
+            sample: np.ndarray = np.unique(np.linspace(0, len(ids) - 1, num=NORM_SAMPLE_SIZE, dtype=np.int64))
+            norms: np.ndarray = np.linalg.norm(vectors[sample], axis=1)
+            if not np.allclose(norms[norms > MIN_NORM], 1.0, atol=NORM_TOLERANCE):
+                logger.warning("Vector store at %s is not normalized. Normalizing it in memory.\n", path)
+                vectors = normalize_rows(vectors)
+
+        store = cls(embedding, vectors if ids else None, ids, texts, metadatas)
+        store._load_index(path)
+        return store
+
+    def _load_index(self, path: str):
+        """
+        Load any index persisted next to the store by dump(). The matrix itself needs none.
+
+        :param path: Path of the ".npy" file
+        """
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        *,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> "NumpyVectorStore":
+        store = cls(embedding)
+        store.add_texts(texts, metadatas, ids=ids)
+        return store
+
+    @classmethod
+    async def afrom_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        *,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> "NumpyVectorStore":
+        store = cls(embedding)
+        await store.aadd_texts(texts, metadatas, ids=ids)
+        return store
@@ -14,6 +14,7 @@ from typing import Any
 from neuro_san.interfaces.coded_tool import CodedTool
 
 from coded_tools.openai_tool import OpenAITool
+from coded_tools.search_cache import SEARCH_CACHE
 
 
 class OpenAIWebSearch(CodedTool):
@@ -35,6 +36,8 @@ class OpenAIWebSearch(CodedTool):
                 - from user
                     - "openai_model" (str): OpenAI model to call the tool. Default to gpt-4o-2024-08-06.
                     - "additional_kwargs" (dict): Any additional arguments for the tool.
+                    - "cache_ttl_seconds" (float): Seconds the results are served from the search cache.
+                      0 to always search.
 
         :param sly_data: A dictionary whose keys are defined by the agent hierarchy,
                 but whose values are meant to be kept out of the chat stream.
@@ -71,4 +74,10 @@ class OpenAIWebSearch(CodedTool):
         # See https://platform.openai.com/docs/guides/tools-web-search?api-mode=responses
         additional_kwargs: dict[str, Any] = args.get("additional_kwargs", {})
 
-        return await OpenAITool.arun(query, "web_search_preview", openai_model, **additional_kwargs)
+        return await SEARCH_CACHE.get_or_search(
+            "openai_web_search",
+            query,
+            {"openai_model": openai_model, "additional_kwargs": additional_kwargs},
+            lambda: OpenAITool.arun(query, "web_search_preview", openai_model, **additional_kwargs),
+            args.get("cache_ttl_seconds"),
+        )
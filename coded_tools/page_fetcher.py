@@ -0,0 +1,181 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+# END COPYRIGHT
+
+import asyncio
+import logging
+import os
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+
+import tiktoken
+from bs4 import BeautifulSoup
+
+from coded_tools.http_fetch_cache import HTTP_FETCH_CACHE
+from coded_tools.http_fetch_cache import FetchResult
+from coded_tools.token_chunker import get_encoding
+
+# Number of top search results whose page is fetched, and maximum number of tokens of their text in total
+DEFAULT_FETCH_TOP_N = 3
+DEFAULT_FETCH_MAX_TOKENS = 4000
+# Seconds to fetch and extract all the pages, pages not ready by then being left out
+DEFAULT_FETCH_TIMEOUT = float(os.getenv("SEARCH_FETCH_TIMEOUT") or 15)
+# Maximum number of pages downloaded at once
+DEFAULT_FETCH_CONCURRENCY = int(os.getenv("SEARCH_FETCH_CONCURRENCY") or 4)
+# Maximum number of bytes of a page, the download of larger pages being aborted
+MAX_PAGE_BYTES = 5 << 20
+# Elements which are not part of the main text of a page
+NON_CONTENT_TAGS = ["script", "style", "noscript", "template", "svg", "nav", "header", "footer", "aside", "form"]
+# Elements holding the text of a page
+TEXT_TAGS = ["h1", "h2", "h3", "p", "pre"]
+# Some sites refuse requests without the User-Agent of a browser
+FETCH_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/124.0 Safari/537.36"
+}
+
+logger = logging.getLogger(__name__)
+
+
+def extract_main_text(content: bytes, content_type: Optional[str]) -> str:
+    """
+    :param content: Content of a page
+    :param content_type: Content type of the page
+    :return: The main text of an HTML page, one paragraph per line, the content of a plain text page,
+        or an empty string for other pages
+    """
+    media_type: str = (content_type or "text/html").split(";")[0].strip().lower()
+    if media_type not in ("text/html", "application/xhtml+xml"):
+        return content.decode("utf-8", errors="replace") if media_type.startswith("text/") else ""
+
+    soup = BeautifulSoup(content, "html.parser")
+    for element in soup(NON_CONTENT_TAGS):
+        element.decompose()
+    # Prefer the element holding the article, like the news scrapers, falling back to the whole page
+    body = soup.find("article") or soup.find("main") or soup.find("div", class_="article-body") or soup.body or soup
+    paragraphs: List[str] = [" ".join(element.get_text(" ").split()) for element in body.find_all(TEXT_TAGS)]
+    if not any(paragraphs):
+        paragraphs = list(body.stripped_strings)
+    return "\n".join(paragraph for paragraph in paragraphs if paragraph)
+
+
+def truncate_to_budget(texts: List[str], max_tokens: int, encoding: Optional[tiktoken.Encoding] = None) -> List[str]:
+    """
+    Truncate texts so that they fit in a token budget together. The budget is shared equally,
+    the tokens left by the texts shorter than their share going to the longer ones.
+
+    :param texts: Texts to truncate
+    :param max_tokens: Maximum number of tokens of all the texts
+    :param encoding: Encoding counting the tokens. Defaults to the encoding of the OpenAI models.
+    :return: The truncated texts, in the same order
+    """
+    encoding = encoding or get_encoding()
+    tokens: List[List[int]] = [encoding.encode_ordinary(text) for text in texts]
+    truncated: List[str] = list(texts)
+    remaining: int = max_tokens
+    by_length: List[int] = sorted(range(len(texts)), key=lambda index: len(tokens[index]))
+    for position, index in enumerate(by_length):
+        share: int = remaining // (len(texts) - position)
+        if len(tokens[index]) > share:
+            truncated[index] = encoding.decode(tokens[index][:share])
+        remaining -= min(share, len(tokens[index]))
+    return truncated
+
+
+async def fetch_page_text(url: str, semaphore: asyncio.Semaphore) -> str:
+    """
+    :param url: URL of a page
+    :param semaphore: Limit of the pages downloaded at once
+    :return: The main text of the page
+    :raises httpx.HTTPError: If the page could not be fetched or is larger than MAX_PAGE_BYTES
+    """
+    async with semaphore:
+        result: FetchResult = await HTTP_FETCH_CACHE.fetch(url, headers=FETCH_HEADERS, max_bytes=MAX_PAGE_BYTES)
+
+    def read_main_text() -> str:
+        with open(result.path, "rb") as page_file:
+            return extract_main_text(page_file.read(MAX_PAGE_BYTES), result.content_type)
+
+    return await asyncio.to_thread(read_main_text)
+
+
+async def fetch_pages(
+    urls: List[str],
+    max_tokens: int = DEFAULT_FETCH_MAX_TOKENS,
+    timeout: float = DEFAULT_FETCH_TIMEOUT,
+    concurrency: int = DEFAULT_FETCH_CONCURRENCY,
+) -> Dict[str, str]:
+    """
+    Fetch pages concurrently and extract their main text, within one deadline and one token budget.
+
+    :param urls: URLs of the pages
+    :param max_tokens: Maximum number of tokens of the text of all the pages
+    :param timeout: Seconds to fetch and extract all the pages
+    :param concurrency: Maximum number of pages downloaded at once
+    :return: The text of every page fetched in time, by URL. Pages which failed or were not ready are left out.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    tasks: Dict[asyncio.Task, str] = {
+        asyncio.ensure_future(fetch_page_text(url, semaphore)): url for url in dict.fromkeys(urls)
+    }
+    if not tasks:
+        return {}
+    done, pending = await asyncio.wait(tasks, timeout=timeout)
+    for task in pending:
+        logger.warning("Page %s not fetched within %s seconds\n", tasks[task], timeout)
+        task.cancel()
+
+    texts: Dict[str, str] = {}
+    for task, url in tasks.items():
+        if task not in done:
+            continue
+        if task.exception() is not None:
+            logger.warning("Failed to fetch page %s: %s\n", url, task.exception())
+        elif task.result():
+            texts[url] = task.result()
+    return dict(zip(texts, truncate_to_budget(list(texts.values()), max_tokens)))
+
+
+async def add_page_contents(results: List[Dict[str, Any]], url_key: str, args: Dict[str, Any]):
+    """
+    Fetch the pages of the top search results, and add their text to the results as "content".
+
+    :param results: Search results, best first
+    :param url_key: Key of the URL in a search result
+    :param args: The argument dictionary of the search tool, with the optional keys "fetch_top_n",
+        "fetch_max_tokens" and "fetch_timeout"
+    """
+    top_results: List[Dict[str, Any]] = results[: int(args.get("fetch_top_n", DEFAULT_FETCH_TOP_N))]
+    texts: Dict[str, str] = await fetch_pages(
+        [result[url_key] for result in top_results if result.get(url_key)],
+        max_tokens=int(args.get("fetch_max_tokens", DEFAULT_FETCH_MAX_TOKENS)),
+        timeout=float(args.get("fetch_timeout", DEFAULT_FETCH_TIMEOUT)),
+    )
+    logger.info("Fetched %d of the top %d result pages\n", len(texts), len(top_results))
+    for result in top_results:
+        if result.get(url_key) in texts:
+            result["content"] = texts[result[url_key]]
+
+
+def add_page_contents_sync(results: List[Dict[str, Any]], url_key: str, args: Dict[str, Any]):
+    """
+    Fetch the pages of the top search results from synchronous code. See add_page_contents() for the arguments.
+    """
+
+    async def fetch():
+        try:
+            await add_page_contents(results, url_key, args)
+        finally:
+            # The client of the fetch cache is bound to this event loop
+            await HTTP_FETCH_CACHE.aclose()
+
+    asyncio.run(fetch())
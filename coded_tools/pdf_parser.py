@@ -0,0 +1,354 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+# END COPYRIGHT
+
+import asyncio
+import logging
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import CancelledError
+from concurrent.futures import Future
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from dataclasses import field
+from typing import AsyncIterator
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Literal
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+import pymupdf
+from pypdf import PdfReader
+
+# Number of worker processes parsing PDFs. Defaults to the number of CPUs.
+DEFAULT_MAX_WORKERS = int(os.getenv("PDF_PARSER_WORKERS") or 0) or None
+# Number of pages of a PDF parsed by one task, so that the pages of a large PDF are parsed in parallel
+DEFAULT_PAGES_PER_TASK = 32
+# Seconds a task may take to count or extract pages from when it starts, before its PDF is skipped
+DEFAULT_FILE_TIMEOUT = float(os.getenv("PDF_PARSER_TIMEOUT") or 120)
+# Workers abandon their pages between two pages past the timeout. A task still running after this many timeouts
+# is stuck in a page, and its worker is killed.
+STUCK_TIMEOUT_FACTOR = 2
+# Seconds between two checks of which tasks started, as the process pool does not tell
+WATCH_INTERVAL = 0.5
+# Number of times a task is submitted to pools broken by a crashed worker. Tasks lost when the workers of a pool
+# are killed for another task stuck in a page are submitted again without counting against it.
+MAX_ATTEMPTS = 3
+
+PdfEngine = Literal["pymupdf", "pypdf"]
+
+logger = logging.getLogger(__name__)
+
+_EXECUTOR: Optional[ProcessPoolExecutor] = None
+# New pool of every recycled pool, so that all the parsers of a recycled pool move to the same new one
+_REPLACEMENTS: "weakref.WeakKeyDictionary[ProcessPoolExecutor, ProcessPoolExecutor]" = weakref.WeakKeyDictionary()
+# Pools whose workers were killed for a task stuck in a page rather than broken by a crashed worker
+_KILLED: "weakref.WeakSet[ProcessPoolExecutor]" = weakref.WeakSet()
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def get_pdf_executor() -> ProcessPoolExecutor:
+    """
+    :return: The process pool shared by all the PDF parsers of the process
+    """
+    global _EXECUTOR  # pylint: disable=global-statement
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ProcessPoolExecutor(max_workers=DEFAULT_MAX_WORKERS)
+        return _EXECUTOR
+
+
+def recycle_pdf_executor(executor: ProcessPoolExecutor, stuck: bool = False) -> ProcessPoolExecutor:
+    """
+    Kill the workers of a process pool, e.g. one stuck in a page or broken by a crashed worker,
+    and get a new pool in its place. A pool is only recycled once, whichever parser asks first.
+
+    :param executor: The process pool to recycle
+    :param stuck: Whether the workers are killed for a task stuck in a page, rather than after a crash
+    :return: The new process pool, which replaces the shared pool if it was recycled
+    """
+    global _EXECUTOR  # pylint: disable=global-statement
+    with _EXECUTOR_LOCK:
+        replacement: Optional[ProcessPoolExecutor] = _REPLACEMENTS.get(executor)
+        # The replacement may itself have been recycled since
+        while replacement in _REPLACEMENTS:
+            replacement = _REPLACEMENTS[replacement]
+        if replacement is None:
+            if stuck:
+                _KILLED.add(executor)
+            # pylint: disable=protected-access
+            # A worker stuck in native code can only be stopped by killing it, and the pool does not expose them
+            processes: list = list((executor._processes or {}).values())
+            executor.shutdown(wait=False, cancel_futures=True)
+            for process in processes:
+                process.terminate()
+            replacement = ProcessPoolExecutor(max_workers=executor._max_workers)
+            _REPLACEMENTS[executor] = replacement
+            if _EXECUTOR is executor:
+                _EXECUTOR = replacement
+        return replacement
+
+
+def count_pages(path: str, engine: PdfEngine) -> int:
+    """
+    Count the pages of a PDF. Runs in a worker process.
+
+    :param path: Path of the PDF file
+    :param engine: Library used to read the PDF
+    :return: Number of pages
+    """
+    if engine == "pypdf":
+        return len(PdfReader(path).pages)
+    with pymupdf.open(path) as pdf:
+        return pdf.page_count
+
+
+def extract_pages(path: str, start: int, end: int, engine: PdfEngine, timeout: float) -> List[str]:
+    """
+    Extract the text of a range of pages of a PDF. Runs in a worker process.
+
+    :param path: Path of the PDF file
+    :param start: Index of the first page
+    :param end: Index after the last page
+    :param engine: Library used to read the PDF
+    :param timeout: Seconds after which the extraction is abandoned between two pages
+    :return: Text of each page
+    :raises TimeoutError: If the pages took longer than the timeout to extract
+    """
+    deadline: float = time.monotonic() + timeout
+    texts: List[str] = []
+
+    def check_deadline(page_index: int):
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Timed out extracting page {page_index + 1} of {path}")
+
+    if engine == "pypdf":
+        reader = PdfReader(path)
+        for page_index in range(start, end):
+            check_deadline(page_index)
+            texts.append(reader.pages[page_index].extract_text() or "")
+        return texts
+
+    with pymupdf.open(path) as pdf:
+        for page_index in range(start, end):
+            check_deadline(page_index)
+            texts.append(pdf[page_index].get_text())
+    return texts
+
+
+@dataclass
+class ParsedPdf:
+    """Text of every page of a PDF, or the reason it could not be parsed."""
+
+    path: str
+    pages: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+@dataclass
+class _PdfTasks:
+    """Progress of the parse of one PDF."""
+
+    path: str
+    # Position of the PDF in the paths to parse
+    index: int
+    # Text of the pages parsed so far, by index of the first page of their range
+    ranges: Dict[int, List[str]] = field(default_factory=dict)
+    # Number of page ranges still being parsed
+    remaining: int = 0
+    error: Optional[str] = None
+
+
+@dataclass
+class _Task:
+    """A task of the parse of one PDF: counting its pages, or extracting a range of them."""
+
+    pdf: _PdfTasks
+    # First page and page after the last one, or None to count the pages
+    pages: Optional[Tuple[int, int]]
+    executor: Optional[ProcessPoolExecutor] = None
+    # Number of pools broken by a crashed worker while the task was in them
+    crashes: int = 0
+    # When the task was first seen running, which its timeout runs from
+    started: Optional[float] = None
+
+
+class ParallelPdfParser:
+    """
+    Parses many PDFs, and the page ranges of large PDFs, in parallel in a process pool,
+    as PDF text extraction is CPU-bound and would hold the GIL and the event loop.
+
+    PDFs are returned in the order of their paths, or each as soon as all its pages are parsed. A task taking
+    longer than the timeout from when it started skips its PDF rather than stalling the others: workers abandon
+    their pages between two pages, and the workers of a task stuck in a page are killed and the pool recycled,
+    the tasks of the other PDFs, of this parser or of others sharing the pool, being submitted again to the new pool.
+    """
+
+    def __init__(
+        self,
+        engine: PdfEngine = "pymupdf",
+        pages_per_task: int = DEFAULT_PAGES_PER_TASK,
+        timeout: float = DEFAULT_FILE_TIMEOUT,
+        executor: Optional[ProcessPoolExecutor] = None,
+    ):
+        """
+        :param engine: Library used to read the PDFs
+        :param pages_per_task: Number of pages parsed by one task
+        :param timeout: Seconds a task may take to count or extract pages from when it starts,
+            before its PDF is skipped
+        :param executor: Process pool to parse in. Defaults to the pool shared by the process.
+        """
+        self.engine: PdfEngine = engine
+        self.pages_per_task: int = max(1, pages_per_task)
+        self.timeout: float = timeout
+        self.executor: ProcessPoolExecutor = executor or get_pdf_executor()
+
+    def parse(self, paths: List[str]) -> Iterator[ParsedPdf]:
+        """
+        Parse PDFs in parallel.
+
+        :param paths: Paths of the PDF files
+        :return: Iterator over the parsed PDFs in the order of their paths, each with its pages in order.
+            PDFs parsed before the ones ahead of them are held until their turn.
+        """
+        parsed_pdfs: Dict[int, ParsedPdf] = {}
+        next_index: int = 0
+        for index, parsed_pdf in self._parse(paths):
+            parsed_pdfs[index] = parsed_pdf
+            while next_index in parsed_pdfs:
+                yield parsed_pdfs.pop(next_index)
+                next_index += 1
+
+    def parse_as_completed(self, paths: List[str]) -> Iterator[ParsedPdf]:
+        """
+        Parse PDFs in parallel.
+
+        :param paths: Paths of the PDF files
+        :return: Iterator over the parsed PDFs, each as soon as it is parsed, with its pages in order
+        """
+        for _, parsed_pdf in self._parse(paths):
+            yield parsed_pdf
+
+    async def aparse(self, paths: List[str]) -> AsyncIterator[ParsedPdf]:
+        """
+        Asynchronously parse PDFs in parallel, waiting for the process pool in a thread
+        so that the event loop is not blocked.
+
+        :param paths: Paths of the PDF files
+        :return: Asynchronous iterator over the parsed PDFs in the order of their paths
+        """
+        parsed_pdfs: Iterator[ParsedPdf] = self.parse(paths)
+        while (parsed_pdf := await asyncio.to_thread(next, parsed_pdfs, None)) is not None:
+            yield parsed_pdf
+
+    def _parse(self, paths: List[str]) -> Iterator[Tuple[int, ParsedPdf]]:
+        """
+        Parse PDFs in parallel.
+
+        :param paths: Paths of the PDF files
+        :return: Iterator over the positions of the parsed PDFs in the paths and the parsed PDFs,
+            each as soon as it is parsed
+        """
+        running: Dict[Future, _Task] = {}
+        for index, path in enumerate(paths):
+            self._submit(running, _Task(_PdfTasks(path, index), None))
+
+        while running:
+            for future in self._wait(running):
+                task: _Task = running.pop(future)
+                parsed_pdf: Optional[ParsedPdf] = self._finish(running, future, task)
+                if parsed_pdf is not None:
+                    yield task.pdf.index, parsed_pdf
+
+            now: float = time.monotonic()
+            stuck: List[Future] = [
+                future
+                for future, task in running.items()
+                if task.started is not None and now - task.started > STUCK_TIMEOUT_FACTOR * self.timeout
+            ]
+            for future in stuck:
+                task = running.pop(future)
+                logger.warning("Killing the PDF workers stuck on %s\n", task.pdf.path)
+                task.pdf.error = f"Timed out after {self.timeout:.0f}s"
+                yield task.pdf.index, self._fail(running, task.pdf)
+            if stuck:
+                # The tasks lost with the killed workers come back broken or cancelled, and are submitted again
+                self.executor = recycle_pdf_executor(self.executor, stuck=True)
+
+    def _submit(self, running: Dict[Future, _Task], task: _Task):
+        """Submit a task to the process pool."""
+        task.executor = self.executor
+        task.started = None
+        if task.pages is None:
+            future: Future = self.executor.submit(count_pages, task.pdf.path, self.engine)
+        else:
+            future = self.executor.submit(extract_pages, task.pdf.path, *task.pages, self.engine, self.timeout)
+        running[future] = task
+
+    def _wait(self, running: Dict[Future, _Task]) -> Set[Future]:
+        """Wait for tasks to finish, until the next task is stuck or it is time to check which tasks started."""
+        now: float = time.monotonic()
+        for future, task in running.items():
+            if task.started is None and future.running():
+                task.started = now
+        deadlines: List[float] = [
+            task.started + STUCK_TIMEOUT_FACTOR * self.timeout for task in running.values() if task.started is not None
+        ]
+        timeout: float = min([now + WATCH_INTERVAL] + deadlines) - now
+        done, _ = wait(running, timeout=max(0.0, timeout), return_when=FIRST_COMPLETED)
+        return done
+
+    def _finish(self, running: Dict[Future, _Task], future: Future, task: _Task) -> Optional[ParsedPdf]:
+        """Record the result of a finished task, submitting the page ranges of a counted PDF."""
+        pdf: _PdfTasks = task.pdf
+        try:
+            result = future.result()
+        except (BrokenProcessPool, CancelledError) as error:
+            # The worker crashed, or was killed for a task stuck in a page, possibly by another parser sharing the pool
+            self.executor = recycle_pdf_executor(task.executor)
+            if task.executor not in _KILLED:
+                task.crashes += 1
+            if task.crashes < MAX_ATTEMPTS:
+                self._submit(running, task)
+                return None
+            pdf.error = str(error) or type(error).__name__
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            pdf.error = str(error) or type(error).__name__
+        if pdf.error:
+            return self._fail(running, pdf)
+
+        if task.pages is None:
+            for start in range(0, result, self.pages_per_task):
+                self._submit(running, _Task(pdf, (start, min(result, start + self.pages_per_task))))
+                pdf.remaining += 1
+        else:
+            pdf.ranges[task.pages[0]] = result
+            pdf.remaining -= 1
+        if pdf.remaining:
+            return None
+        return ParsedPdf(pdf.path, [text for start in sorted(pdf.ranges) for text in pdf.ranges[start]])
+
+    @staticmethod
+    def _fail(running: Dict[Future, _Task], pdf: _PdfTasks) -> ParsedPdf:
+        """Drop the other tasks of a PDF which could not be parsed, and report why."""
+        for future, task in list(running.items()):
+            if task.pdf is pdf:
+                future.cancel()
+                del running[future]
+        logger.error("Skipping PDF %s: %s\n", pdf.path, pdf.error)
+        return ParsedPdf(pdf.path, error=pdf.error)
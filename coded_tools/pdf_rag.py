@@ -11,19 +11,26 @@
 #
 # END COPYRIGHT
 
+import asyncio
 import logging
 import os
 from typing import Any
+from typing import AsyncIterator
 from typing import Dict
 from typing import List
+from typing import Optional
+from urllib.parse import urlparse
 
-from langchain_community.document_loaders import PyMuPDFLoader
+import httpx
 from langchain_core.documents import Document
 from langchain_core.vectorstores import VectorStore
 from neuro_san.interfaces.coded_tool import CodedTool
 
 from coded_tools.base_rag import BaseRag
 from coded_tools.base_rag import PostgresConfig
+from coded_tools.http_fetch_cache import HTTP_FETCH_CACHE
+from coded_tools.index_manifest import fingerprint_locations
+from coded_tools.pdf_parser import ParallelPdfParser
 
 INVALID_PATH_PATTERN = r"[<>:\"|?*\x00-\x1F]"
 
@@ -43,8 +50,31 @@ class PdfRag(CodedTool, BaseRag):
         :param args: Dictionary containing:
           "query": search string
           "urls": list of pdf files
-          "save_vector_store": save to JSON file if True
-          "vector_store_path": relative path to this file
+          "vector_store_type": "in_memory", "numpy", "ivf", "int8", "pq" or "postgres"
+          "ivf_n_probe": number of lists probed per query by the "ivf" vector store
+          "rescore_factor": candidates rescored with full precision per result by the "int8" and "pq" vector stores
+          "save_vector_store": save to the vector store file if True
+          "vector_store_path": ".json" or ".npy" file, relative path to this file
+          "embedding_cache_path": SQLite file caching chunk embeddings, relative path to this file
+          "incremental_indexing": only re-index the sources that changed if True
+          "streaming_ingestion": load, split, embed and store documents as concurrent stages if True
+          "chunk_size": number of tokens per chunk
+          "chunk_overlap": number of tokens shared by consecutive chunks
+          "retrieval_mode": "dense", or "hybrid" to fuse the similarity search with a lexical search
+          "rrf_k": constant of the reciprocal rank fusion of the hybrid retrieval mode
+          "reranker": "cross_encoder" or "lexical" to rescore the retrieved candidates
+          "rerank_candidates": number of candidates fetched and rescored by the reranker
+          "query_cache": serve the results of queries asked before from the query cache if True,
+              by default for in-process vector stores only
+          "semantic_cache_threshold": minimum cosine similarity of a cached query to serve its result
+          "max_result_tokens": maximum number of tokens of the retrieved passages returned
+          "namespace": namespace the documents are indexed into, e.g. one per tenant or source
+          "namespaces": list of namespaces searched by queries, defaults to the namespace
+          "embedding_provider": "openai", or "local" to embed on the CPU with a sentence-transformers model
+          "embedding_model": name of the embedding model, defaults to the default model of the provider
+          "embedding_dimensions": number of dimensions of the vectors
+          "dimension_reduction": "matryoshka" or "pca" to reduce local vectors to the dimensions
+          "embedding_precision": "float32", "float16" or "int8" precision of the cached vectors
 
         :param sly_data: A dictionary whose keys are defined by the agent
             hierarchy, but whose values are meant to be kept out of the
@@ -75,12 +105,56 @@ class PdfRag(CodedTool, BaseRag):
         # Vector store type
         vector_store_type: str = args.get("vector_store_type", "in_memory")
 
-        # Save the generated vector store as a JSON file if True
+        # Save the generated vector store to the vector store file if True
         self.save_vector_store = args.get("save_vector_store", False)
 
+        # Only re-index the sources that changed since the vector store was built if True
+        self.incremental_indexing = args.get("incremental_indexing", False)
+
+        # Stream documents through loading, splitting, embedding and storage instead of loading them all first
+        self.streaming_ingestion = args.get("streaming_ingestion", False)
+
+        # Number of tokens per chunk and shared by consecutive chunks
+        self.configure_chunking(args.get("chunk_size"), args.get("chunk_overlap"))
+
+        # Fuse the similarity search with a lexical search to find exact terms such as identifiers
+        self.configure_retrieval(args.get("retrieval_mode"), args.get("rrf_k"))
+
+        # Rescore over-fetched candidates and keep the best ones
+        self.configure_reranking(args.get("reranker"), args.get("rerank_candidates"))
+
+        # Serve the results of queries asked before, or similar to queries asked before, from the query cache
+        self.configure_query_cache(args.get("query_cache"), args.get("semantic_cache_threshold"))
+
+        # Merge overlapping chunks, drop near-duplicates and fit the passages in a token budget
+        self.configure_result_packing(args.get("max_result_tokens"))
+
+        # Number of lists probed per query by the ivf vector store, trading latency for recall
+        if vector_store_type == "ivf" and args.get("ivf_n_probe"):
+            self.search_kwargs = {"n_probe": int(args.get("ivf_n_probe"))}
+
+        # Number of candidates rescored with full precision per result by the quantized vector stores, 0 to not rescore
+        if vector_store_type in ("int8", "pq") and args.get("rescore_factor") is not None:
+            self.search_kwargs = {"rescore_factor": int(args.get("rescore_factor"))}
+
         # Configure the vector store path
         self.configure_vector_store_path(args.get("vector_store_path"))
 
+        # Index into the shard of a namespace, and search the shards of the given namespaces
+        self.configure_namespaces(args.get("namespace"), args.get("namespaces"))
+
+        # Embed with OpenAI or a local model, reducing the vectors to fewer dimensions if set
+        self.configure_embeddings(
+            args.get("embedding_provider"),
+            args.get("embedding_model"),
+            args.get("embedding_dimensions"),
+            args.get("dimension_reduction"),
+            args.get("embedding_precision"),
+        )
+
+        # Persist chunk embeddings so that unchanged chunks are not embedded again
+        self.configure_embedding_cache(args.get("embedding_cache_path"))
+
         # For PostgreSQL vector store
         if vector_store_type == "postgres":
             postgres_config = PostgresConfig(
@@ -109,18 +183,70 @@ class PdfRag(CodedTool, BaseRag):
         :param loader_args: Dictionary containing 'urls' (list of PDF file URLs)
         :return: List of loaded PDF documents
         """
-        docs: List[Document] = []
-        urls: List[str] = loader_args.get("urls", [])
+        return [doc async for doc in self.lazy_load_documents(loader_args)]
+
+    async def lazy_load_documents(self, loader_args: Dict[str, Any]) -> AsyncIterator[Document]:
+        """
+        Load PDF documents from URLs page by page.
 
-        for url in urls:
-            try:
-                loader = PyMuPDFLoader(file_path=url)
-                doc: List[Document] = await loader.aload()
-                docs.extend(doc)
+        :param loader_args: Dictionary containing 'urls' (list of PDF file URLs)
+        :return: Asynchronous iterator over the loaded PDF pages
+        """
+        urls: List[str] = loader_args.get("urls", [])
+        paths: List[str] = await asyncio.gather(*(self._get_local_path(url) for url in urls))
+
+        # URLs serving the same content share one cached file, which is parsed once
+        urls_by_path: Dict[str, List[str]] = {}
+        for path, url in zip(paths, urls):
+            urls_by_path.setdefault(path, []).append(url)
+
+        # PDFs are parsed in parallel in a process pool, and returned in order as soon as they are parsed
+        async for parsed_pdf in ParallelPdfParser().aparse(list(urls_by_path)):
+            for url in urls_by_path[parsed_pdf.path]:
+                if parsed_pdf.error:
+                    logger.error("Failed to load PDF file from %s: %s", url, parsed_pdf.error)
+                    continue
+                for page, text in enumerate(parsed_pdf.pages):
+                    yield Document(
+                        page_content=text,
+                        metadata={"source": url, "file_path": url, "page": page, "total_pages": len(parsed_pdf.pages)},
+                    )
                 logger.info("Successfully loaded PDF file from %s", url)
-            except FileNotFoundError:
-                logger.error("File not found: %s", url)
-            except ValueError as e:
-                logger.error("Invalid file path or unsupported input: %s – %s", url, e)
 
-        return docs
+    @staticmethod
+    async def _get_local_path(url: str) -> str:
+        """
+        Fetch a remote PDF into the HTTP cache, so that worker processes can parse it from a local file.
+        A PDF fetched before is only downloaded again if the server reports it changed.
+
+        :param url: URL or local path of the PDF
+        :return: Local path of the PDF, or the URL itself if it could not be fetched
+        """
+        if urlparse(url).scheme not in ("http", "https"):
+            return url
+
+        try:
+            return (await HTTP_FETCH_CACHE.fetch(url)).path
+        except (httpx.HTTPError, OSError) as error:
+            # e.g. the cache directory is not writable, or its disk is full
+            logger.error("Failed to download PDF file from %s: %s", url, error)
+            return url
+
+    async def fingerprint_sources(self, loader_args: Dict[str, Any]) -> Dict[str, Optional[str]]:
+        """
+        Fingerprint each PDF from its HTTP validators, or from its modification time and size for local files.
+
+        :param loader_args: Dictionary containing 'urls' (list of PDF file URLs)
+        :return: Dictionary of URL to fingerprint, None for the PDFs that could not be reached, without the gone ones
+        """
+        return await fingerprint_locations(loader_args.get("urls", []))
+
+    def select_sources(self, loader_args: Dict[str, Any], sources: List[str]) -> Dict[str, Any]:
+        """
+        Restrict the loader arguments to the given PDF URLs.
+
+        :param loader_args: Dictionary containing 'urls' (list of PDF file URLs)
+        :param sources: PDF URLs to load
+        :return: Loader arguments with only the given URLs
+        """
+        return {**loader_args, "urls": sources}
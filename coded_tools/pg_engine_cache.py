@@ -0,0 +1,143 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+# END COPYRIGHT
+
+import logging
+import os
+import threading
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+# pylint: disable=import-error
+from langchain_core.embeddings import Embeddings
+from langchain_postgres import PGEngine
+from langchain_postgres import PGVectorStore
+from langchain_postgres.v2.hybrid_search_config import HybridSearchConfig
+from sqlalchemy import text
+
+# Number of connections kept open per database, and opened beyond it under load
+DEFAULT_POOL_SIZE = int(os.getenv("POSTGRES_POOL_SIZE") or 5)
+DEFAULT_MAX_OVERFLOW = int(os.getenv("POSTGRES_MAX_OVERFLOW") or 10)
+# Seconds after which a pooled connection is replaced, so that connections dropped by the server are not reused
+DEFAULT_POOL_RECYCLE = int(os.getenv("POSTGRES_POOL_RECYCLE") or 1800)
+
+logger = logging.getLogger(__name__)
+
+_ENGINES: Dict[Tuple[str, int, int], PGEngine] = {}
+_ENGINES_LOCK = threading.Lock()
+
+
+def get_pg_engine(
+    connection_string: str, pool_size: Optional[int] = None, max_overflow: Optional[int] = None
+) -> PGEngine:
+    """
+    Get the engine of a database, created once per process so that its pool of connections
+    stays warm between invocations instead of connecting again for every query.
+
+    All the engines run their queries on the single background event loop of PGEngine,
+    so they can be shared by callers running on different event loops.
+
+    :param connection_string: SQLAlchemy URL of the database
+    :param pool_size: Number of connections kept open. Defaults to POSTGRES_POOL_SIZE.
+    :param max_overflow: Number of connections opened beyond the pool size under load.
+        Defaults to POSTGRES_MAX_OVERFLOW.
+    :return: The engine shared by all the callers with the same connection string and pool configuration
+    """
+    pool_size = DEFAULT_POOL_SIZE if pool_size is None else pool_size
+    max_overflow = DEFAULT_MAX_OVERFLOW if max_overflow is None else max_overflow
+    key: Tuple[str, int, int] = (connection_string, pool_size, max_overflow)
+
+    with _ENGINES_LOCK:
+        engine: Optional[PGEngine] = _ENGINES.get(key)
+        if engine is None:
+            engine = PGEngine.from_connection_string(
+                url=connection_string,
+                pool_size=pool_size,
+                max_overflow=max_overflow,
+                pool_recycle=DEFAULT_POOL_RECYCLE,
+                pool_pre_ping=True,
+            )
+            _ENGINES[key] = engine
+            logger.info("Created PostgreSQL engine with a pool of %d connections\n", pool_size)
+        return engine
+
+
+async def close_pg_engines():
+    """Close the connections of all the shared engines, e.g. when the server shuts down."""
+    with _ENGINES_LOCK:
+        engines: List[PGEngine] = list(_ENGINES.values())
+        _ENGINES.clear()
+    for engine in engines:
+        await engine.close()
+
+
+async def open_existing_vector_store(
+    pg_engine: PGEngine, table_name: str, embeddings: Embeddings
+) -> Optional[PGVectorStore]:
+    """
+    Open the vector store of a table if the table exists. This only reads the columns of the table
+    from the information schema, so opening an existing table runs no DDL.
+
+    :param pg_engine: Engine of the database
+    :param table_name: Name of the vector store table
+    :param embeddings: Embedding model of the vector store
+    :return: The vector store, or None if the table does not exist
+    """
+    try:
+        return await PGVectorStore.create(engine=pg_engine, table_name=table_name, embedding_service=embeddings)
+    except ValueError:
+        # PGVectorStore reports a missing table as missing columns
+        return None
+
+
+async def create_full_text_index(pg_engine: PGEngine, table_name: str, embeddings: Embeddings):
+    """
+    Create a GIN index over the full-text search vector of the content of a new table,
+    so that hybrid searches do not scan the whole table.
+
+    :param pg_engine: Engine of the database
+    :param table_name: Name of the vector store table
+    :param embeddings: Embedding model of the vector store
+    """
+    # Only used to create the index: a store created with a hybrid search configuration
+    # would run every search as a hybrid search
+    indexing_store: PGVectorStore = await PGVectorStore.create(
+        engine=pg_engine,
+        table_name=table_name,
+        embedding_service=embeddings,
+        hybrid_search_config=HybridSearchConfig(index_name=f"{table_name}_tsv_index"),
+    )
+    await indexing_store.aapply_hybrid_search_index()
+
+
+async def create_namespace_index(pg_engine: PGEngine, table_name: str, metadata_key: str = "namespace"):
+    """
+    Create a B-tree index over a key of the JSON metadata of a table, so that searches
+    filtered on the namespace of the chunks only read the rows of the namespace.
+
+    :param pg_engine: Engine of the database
+    :param table_name: Name of the vector store table
+    :param metadata_key: Key of the JSON metadata to index
+    """
+    # DDL cannot take bind parameters, so the identifiers and the key are quoted here
+    table: str = table_name.replace('"', '""')
+    index: str = f"{table_name}_{metadata_key}_index".replace('"', '""')
+    key: str = metadata_key.replace("'", "''")
+    statement = text(f'CREATE INDEX IF NOT EXISTS "{index}" ON "{table}" ((langchain_metadata->>\'{key}\'))')
+
+    async def execute():
+        async with pg_engine._pool.connect() as conn:  # pylint: disable=protected-access
+            await conn.execute(statement)
+            await conn.commit()
+
+    # Run on the background event loop of the engine, like the DDL of PGEngine
+    await pg_engine._run_as_async(execute())  # pylint: disable=protected-access
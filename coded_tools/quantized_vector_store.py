@@ -0,0 +1,554 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+# END COPYRIGHT
+
+import asyncio
+import logging
+import os
+import time
+from abc import abstractmethod
+from dataclasses import dataclass
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from coded_tools.numpy_vector_store import MetadataFilter
+from coded_tools.numpy_vector_store import NumpyVectorStore
+from coded_tools.numpy_vector_store import normalize_rows
+from coded_tools.numpy_vector_store import top_k_rows
+
+# Suffix of the file holding the codes of the rows and the codebook they were encoded with
+CODES_SUFFIX = ".codes.npz"
+# Candidates rescored with the full-precision vectors per returned document. 0 returns the compressed scores.
+DEFAULT_RESCORE_FACTOR = int(os.getenv("QUANTIZED_RESCORE_FACTOR") or 8)
+# Below this number of rows, searches scan the full-precision rows, which is fast enough and exact
+DEFAULT_MIN_TRAIN_SIZE = 1024
+# Dimensions of every subvector of product quantization, encoded in one byte: 4 float32 values, so 16x smaller
+PQ_SUBVECTOR_DIMENSIONS = 4
+# Centroids per subspace of product quantization, so that a code fits in one byte
+PQ_CENTROIDS = 256
+# Number of k-means iterations, and rows sampled, when training the product quantization codebook
+TRAINING_ITERATIONS = 10
+TRAINING_SAMPLE_SIZE = 65536
+# The codebook is trained again once the store grew by this factor since it was trained
+RETRAIN_GROWTH = 4
+# Number of rows encoded or scored per block, to bound the memory of the decoded values
+SCORE_BLOCK_SIZE = 8192
+
+logger = logging.getLogger(__name__)
+
+
+def get_codes_path(path: str) -> str:
+    """
+    :param path: Path of the ".npy" matrix file
+    :return: Path of the file holding the codes and the codebook
+    """
+    return os.path.splitext(path)[0] + CODES_SUFFIX
+
+
+@dataclass
+class QuantizationBenchmark:
+    """Memory and recall of searches in the compressed domain against exact searches, and the search time of both."""
+
+    quantization: str
+    rescore_factor: int
+    recall: float
+    # Bytes of the codes and codebook, and of the full-precision matrix
+    memory_bytes: int
+    full_precision_bytes: int
+    seconds: float
+    exact_seconds: float
+
+    @property
+    def compression(self) -> float:
+        """How many times smaller the searched index is than the full-precision matrix."""
+        return self.full_precision_bytes / max(1, self.memory_bytes)
+
+
+class QuantizedVectorStore(NumpyVectorStore):
+    """
+    NumpyVectorStore searching compressed codes of the rows instead of their float32 vectors.
+
+    Searches score all the candidate rows in the compressed domain, then rescore the best
+    k * rescore_factor of them with their full-precision vectors and keep the best k.
+    The full-precision matrix is still persisted, and memory-mapped once dumped or loaded, so that
+    only the pages of the rescored rows are read while the codes stay in memory.
+    A trained store which is never dumped keeps its full-precision matrix in memory.
+
+    The codebook is trained once the store holds min_train_size rows, and trained again once
+    it grew by RETRAIN_GROWTH. Rows added in between are encoded with the current codebook.
+    The codes and the codebook are persisted next to the matrix, so a loaded store does not retrain.
+    Subclasses define the quantization.
+    """
+
+    # Name of the quantization, persisted with the codes
+    quantization: str = ""
+
+    # pylint: disable=too-many-arguments
+    # pylint: disable=too-many-positional-arguments
+    def __init__(
+        self,
+        embedding: Embeddings,
+        vectors: Optional[np.ndarray] = None,
+        ids: Optional[List[str]] = None,
+        texts: Optional[List[str]] = None,
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        rescore_factor: int = DEFAULT_RESCORE_FACTOR,
+        min_train_size: int = DEFAULT_MIN_TRAIN_SIZE,
+    ):
+        """
+        :param embedding: Embedding model used for the documents and the queries
+        :param vectors: L2-normalized matrix of shape (number of documents, dimensions), possibly memory-mapped
+        :param ids: Id of each row
+        :param texts: Text of each row
+        :param metadatas: Metadata of each row
+        :param rescore_factor: Default number of candidates rescored per returned document, 0 to not rescore
+        :param min_train_size: Number of rows from which the codebook is trained
+        """
+        super().__init__(embedding, vectors, ids, texts, metadatas)
+        self.rescore_factor: int = rescore_factor
+        self.min_train_size: int = min_train_size
+        self.codebook: Dict[str, np.ndarray] = {}
+        self.codes: Optional[np.ndarray] = None
+        self._trained_size: int = 0
+        self._training: bool = False
+
+    @property
+    def is_trained(self) -> bool:
+        """True if searches score the codes rather than the full-precision rows."""
+        return self.codes is not None
+
+    def memory_bytes(self) -> int:
+        """Bytes of the codes and codebook, plus the full-precision matrix unless it is memory-mapped."""
+        if not self.is_trained:
+            return super().memory_bytes()
+        index: int = self.codes.nbytes + sum(array.nbytes for array in self.codebook.values())
+        return index if isinstance(self.vectors, np.memmap) else index + super().memory_bytes()
+
+    def train(self, seed: int = 0):
+        """
+        Train the codebook on a sample of the rows, and encode every row.
+
+        :param seed: Seed of the sampling and of the training
+        """
+        vectors: Optional[np.ndarray] = self.vectors
+        if len(self) > 0:
+            self._set_codebook(vectors, *self._fit(vectors, seed))
+
+    async def atrain(self, seed: int = 0):
+        """
+        Train the codebook like train(), in a thread so that the event loop is not blocked.
+        Only one training runs at once, and rows added or deleted meanwhile are encoded once it is done.
+
+        :param seed: Seed of the sampling and of the training
+        """
+        vectors: Optional[np.ndarray] = self.vectors
+        if len(self) == 0 or self._training:
+            return
+        self._training = True
+        try:
+            self._set_codebook(vectors, *await asyncio.to_thread(self._fit, vectors, seed))
+        finally:
+            self._training = False
+
+    def _fit(self, vectors: np.ndarray, seed: int) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+        """
+        Train the codebook on a sample of rows, and encode the rows with it, without changing the store.
+
+        :param vectors: L2-normalized rows
+        :param seed: Seed of the sampling and of the training
+        :return: The arrays of the codebook by name, and the codes of the rows
+        """
+        n_rows: int = vectors.shape[0]
+        rng = np.random.default_rng(seed)
+        sample_size: int = min(n_rows, TRAINING_SAMPLE_SIZE)
+        sample: np.ndarray = np.asarray(vectors[np.sort(rng.choice(n_rows, sample_size, replace=False))])
+        codebook: Dict[str, np.ndarray] = self._train_codebook(sample, rng)
+        return codebook, self._encode_rows(vectors, codebook)
+
+    def _set_codebook(self, vectors: np.ndarray, codebook: Dict[str, np.ndarray], codes: np.ndarray):
+        """
+        Search the codes of a trained codebook.
+
+        :param vectors: Rows the codebook was trained on
+        :param codebook: Arrays of the trained codebook by name
+        :param codes: Codes of the rows
+        """
+        if self.vectors is not vectors:
+            # Rows were added or deleted while training
+            codes = self._encode_rows(self.vectors, codebook)
+        self.codebook = codebook
+        self.codes = codes
+        self._trained_size = len(self)
+        logger.info("Trained %s codebook over %d rows\n", self.quantization, len(self))
+
+    @abstractmethod
+    def _train_codebook(self, sample: np.ndarray, rng: np.random.Generator) -> Dict[str, np.ndarray]:
+        """
+        :param sample: Sample of the L2-normalized rows
+        :param rng: Random generator of the training
+        :return: Arrays of the codebook by name
+        """
+
+    @abstractmethod
+    def _encode(self, vectors: np.ndarray, codebook: Dict[str, np.ndarray]) -> np.ndarray:
+        """
+        :param vectors: L2-normalized vectors
+        :param codebook: Arrays of the codebook by name
+        :return: Codes of the vectors
+        """
+
+    @abstractmethod
+    def _score_codes(self, codes: np.ndarray, queries: np.ndarray) -> np.ndarray:
+        """
+        :param codes: Codes of rows
+        :param queries: L2-normalized query vectors of shape (number of queries, dimensions)
+        :return: Approximate cosine similarities of shape (number of rows, number of queries)
+        """
+
+    def _encode_rows(self, vectors: np.ndarray, codebook: Dict[str, np.ndarray]) -> np.ndarray:
+        """Encode vectors block by block, so that a memory-mapped matrix is not read into memory at once."""
+        blocks: List[np.ndarray] = [
+            self._encode(np.asarray(vectors[start : start + SCORE_BLOCK_SIZE]), codebook)
+            for start in range(0, vectors.shape[0], SCORE_BLOCK_SIZE)
+        ]
+        return np.concatenate(blocks)
+
+    def add_vectors(
+        self,
+        vectors: Sequence[Sequence[float]],
+        texts: List[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        ids: Optional[List[str]] = None,
+    ) -> List[str]:
+        """
+        Add already embedded texts to the store, replacing rows with the same ids, and encode them.
+        """
+        added_ids: List[str] = super().add_vectors(vectors, texts, metadatas, ids)
+        if self._encode_added_rows(len(added_ids)):
+            self.train()
+        return added_ids
+
+    async def aadd_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        *,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        """Asynchronously embed texts and add them to the store, training the codebook in a thread when it is due."""
+        texts = list(texts)
+        vectors: List[List[float]] = await self.embedding.aembed_documents(texts)
+        added_ids: List[str] = super().add_vectors(vectors, texts, metadatas, ids)
+        if self._encode_added_rows(len(added_ids)):
+            await self.atrain()
+        return added_ids
+
+    def _encode_added_rows(self, count: int) -> bool:
+        """
+        Encode the rows just added with the current codebook, if trained, so that every row
+        has its codes even while the codebook is trained again.
+
+        :param count: Number of rows just added, at the end of the matrix
+        :return: True if the codebook is due to be trained
+        """
+        if count == 0:
+            return False
+        if self.is_trained:
+            new_codes: np.ndarray = self._encode_rows(self.vectors[len(self) - count :], self.codebook)
+            self.codes = np.concatenate([self.codes, new_codes])
+            return len(self) >= self._trained_size * RETRAIN_GROWTH
+        return len(self) >= self.min_train_size
+
+    def _keep_rows(self, keep: List[int]):
+        super()._keep_rows(keep)
+        if self.codes is not None:
+            self.codes = self.codes[keep]
+
+    def similarity_search_with_score_by_vectors(
+        self,
+        embeddings: Sequence[Sequence[float]],
+        k: int = 4,
+        filter: Optional[MetadataFilter] = None,  # pylint: disable=redefined-builtin
+        rescore_factor: Optional[int] = None,
+        **kwargs: Any,
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        Find the rows most similar to each of several query vectors, scoring their codes.
+
+        :param embeddings: Query vectors
+        :param k: Number of documents to return per query
+        :param filter: Optional metadata filter the documents must match, see MetadataFilter
+        :param rescore_factor: Number of candidates rescored with full precision per returned document,
+            0 to return the compressed scores. Defaults to the rescore_factor of the store.
+        :return: For each query, a list of (document, cosine similarity) pairs, most similar first
+        """
+        if not self.is_trained or self.vectors is None or len(embeddings) == 0:
+            return super().similarity_search_with_score_by_vectors(embeddings, k, filter, **kwargs)
+
+        rows: Optional[np.ndarray] = np.flatnonzero(self._filter_mask(filter)) if filter else None
+        if rows is not None and rows.size == 0:
+            return [[] for _ in embeddings]
+        rescore_factor = self.rescore_factor if rescore_factor is None else rescore_factor
+
+        queries: np.ndarray = normalize_rows(embeddings)
+        results: List[List[Tuple[Document, float]]] = []
+        for query, scores in zip(queries, self._score_candidates(queries, rows).T):
+            candidates: np.ndarray = top_k_rows(scores, k * max(rescore_factor, 1))
+            candidate_rows: np.ndarray = candidates if rows is None else rows[candidates]
+            if rescore_factor > 0:
+                top_rows, top_scores = self._rescore(query, candidate_rows, k)
+            else:
+                top_rows, top_scores = candidate_rows, scores[candidates]
+            results.append([(self._document(row), float(score)) for row, score in zip(top_rows, top_scores)])
+        return results
+
+    def _rescore(self, query: np.ndarray, rows: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score candidate rows with their full-precision vectors.
+
+        :param query: L2-normalized query vector
+        :param rows: Indexes of the candidate rows
+        :param k: Number of rows to keep
+        :return: The k best rows and their cosine similarities, most similar first
+        """
+        # Only the rescored rows of a memory-mapped matrix are read, in row order
+        order: np.ndarray = np.argsort(rows)
+        exact: np.ndarray = np.empty(rows.size, dtype=np.float32)
+        exact[order] = np.asarray(self.vectors[rows[order]]) @ query
+        top: np.ndarray = top_k_rows(exact, k)
+        return rows[top], exact[top]
+
+    def _score_candidates(self, queries: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+        """
+        Approximate scores of the candidate rows, or of all the rows if None, scored block by block
+        for all the queries at once.
+
+        :return: Scores of shape (number of candidates, number of queries)
+        """
+        codes: np.ndarray = self.codes if rows is None else self.codes[rows]
+        return np.concatenate(
+            [
+                self._score_codes(codes[start : start + SCORE_BLOCK_SIZE], queries)
+                for start in range(0, codes.shape[0], SCORE_BLOCK_SIZE)
+            ]
+        )
+
+    def dump(self, path: str):
+        """
+        Persist the store as a float32 ".npy" matrix, a JSON lines side file and, if trained, the codes.
+        A trained store then memory-maps the persisted matrix instead of keeping it in memory.
+
+        :param path: Path of the ".npy" file
+        """
+        super().dump(path)
+
+        codes_path: str = get_codes_path(path)
+        if not self.is_trained:
+            if os.path.exists(codes_path):
+                os.remove(codes_path)
+            return
+
+        with open(codes_path + ".tmp", "wb") as codes_file:
+            np.savez(
+                codes_file,
+                quantization=np.asarray(self.quantization),
+                codes=self.codes,
+                trained_size=np.asarray(self._trained_size),
+                **self.codebook,
+            )
+        os.replace(codes_path + ".tmp", codes_path)
+        # Searches only read the rescored rows of the matrix
+        self.vectors = np.load(path, mmap_mode="r")
+
+    def _load_index(self, path: str):
+        """
+        Load the codes and codebook persisted by dump(). They are trained again if missing or stale.
+
+        :param path: Path of the ".npy" file
+        """
+        try:
+            with np.load(get_codes_path(path)) as saved:
+                if str(saved["quantization"]) == self.quantization and saved["codes"].shape[0] == len(self):
+                    self.codes = saved["codes"]
+                    self._trained_size = int(saved["trained_size"])
+                    self.codebook = {
+                        name: saved[name]
+                        for name in saved.files
+                        if name not in ("quantization", "codes", "trained_size")
+                    }
+        except FileNotFoundError:
+            pass
+
+        if not self.is_trained and len(self) >= self.min_train_size:
+            logger.info("%s codes of %s are missing or stale. Training them.\n", self.quantization, path)
+            self.train()
+
+
+class Int8VectorStore(QuantizedVectorStore):
+    """
+    Scalar quantization: every dimension of a row is stored as one signed byte, scaled by the largest
+    absolute value of that dimension in the training sample. 4x smaller than float32.
+    Scores are the products of the codes with the query multiplied by the scales.
+    """
+
+    quantization = "int8"
+
+    def _train_codebook(self, sample: np.ndarray, rng: np.random.Generator) -> Dict[str, np.ndarray]:
+        scales: np.ndarray = np.abs(sample).max(axis=0) / 127.0
+        return {"scales": np.where(scales > 0, scales, 1.0).astype(np.float32)}
+
+    def _encode(self, vectors: np.ndarray, codebook: Dict[str, np.ndarray]) -> np.ndarray:
+        # Values of rows added after training may exceed the trained range
+        return np.clip(np.round(vectors / codebook["scales"]), -127, 127).astype(np.int8)
+
+    def _score_codes(self, codes: np.ndarray, queries: np.ndarray) -> np.ndarray:
+        return codes.astype(np.float32) @ (queries * self.codebook["scales"]).T
+
+
+class PqVectorStore(QuantizedVectorStore):
+    """
+    Product quantization: rows are split into subvectors of PQ_SUBVECTOR_DIMENSIONS dimensions, and every
+    subvector is stored as the one-byte index of its nearest centroid among PQ_CENTROIDS trained by k-means
+    in its subspace. 16x smaller than float32 with 4-dimensional subvectors.
+    Scores are sums of the products of the query subvectors with the centroids, looked up in a table per query.
+    """
+
+    quantization = "pq"
+
+    def _train_codebook(self, sample: np.ndarray, rng: np.random.Generator) -> Dict[str, np.ndarray]:
+        dimensions: int = sample.shape[1]
+        n_subvectors: int = get_n_subvectors(dimensions)
+        subvectors: np.ndarray = sample.reshape(sample.shape[0], n_subvectors, dimensions // n_subvectors)
+        n_centroids: int = min(PQ_CENTROIDS, sample.shape[0])
+
+        centroids: List[np.ndarray] = []
+        for subspace in range(n_subvectors):
+            points: np.ndarray = subvectors[:, subspace]
+            subspace_centroids: np.ndarray = points[rng.choice(points.shape[0], n_centroids, replace=False)]
+            for _ in range(TRAINING_ITERATIONS):
+                labels: np.ndarray = _nearest_centroids(points, subspace_centroids)
+                sums: np.ndarray = np.zeros_like(subspace_centroids)
+                np.add.at(sums, labels, points)
+                counts: np.ndarray = np.bincount(labels, minlength=n_centroids)
+                # Restart empty centroids from random points of the sample
+                empty: np.ndarray = counts == 0
+                sums[empty] = points[rng.choice(points.shape[0], int(empty.sum()))]
+                counts[empty] = 1
+                subspace_centroids = sums / counts[:, np.newaxis]
+            centroids.append(subspace_centroids)
+        return {"centroids": np.stack(centroids).astype(np.float32)}
+
+    def _encode(self, vectors: np.ndarray, codebook: Dict[str, np.ndarray]) -> np.ndarray:
+        centroids: np.ndarray = codebook["centroids"]
+        subvectors: np.ndarray = vectors.reshape(vectors.shape[0], centroids.shape[0], centroids.shape[2])
+        return np.stack(
+            [
+                _nearest_centroids(subvectors[:, subspace], centroids[subspace])
+                for subspace in range(centroids.shape[0])
+            ],
+            axis=1,
+        ).astype(np.uint8)
+
+    def _score_codes(self, codes: np.ndarray, queries: np.ndarray) -> np.ndarray:
+        centroids: np.ndarray = self.codebook["centroids"]
+        if queries.shape[0] == 1:
+            # Products of the query subvectors with the centroids of their subspace, looked up by code
+            table: np.ndarray = np.einsum(
+                "scd,sd->sc", centroids, queries[0].reshape(centroids.shape[:1] + centroids.shape[2:])
+            )
+            return table[np.arange(centroids.shape[0]), codes].sum(axis=1)[:, np.newaxis]
+        # Several queries share the decoding of the block into its centroids
+        decoded: np.ndarray = centroids[np.arange(centroids.shape[0]), codes].reshape(codes.shape[0], -1)
+        return decoded @ queries.T
+
+
+def get_n_subvectors(dimensions: int) -> int:
+    """
+    :param dimensions: Number of dimensions of the vectors
+    :return: Number of subvectors of product quantization, dividing the dimensions into subvectors
+        of PQ_SUBVECTOR_DIMENSIONS dimensions, or of the closest larger size that divides them
+    """
+    for size in range(PQ_SUBVECTOR_DIMENSIONS, dimensions + 1):
+        if dimensions % size == 0:
+            return dimensions // size
+    return 1
+
+
+def _nearest_centroids(points: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """
+    :param points: Points of shape (number of points, dimensions)
+    :param centroids: Centroids of shape (number of centroids, dimensions)
+    :return: Index of the nearest centroid of every point by Euclidean distance
+    """
+    return np.argmax(points @ centroids.T - 0.5 * np.sum(centroids * centroids, axis=1), axis=1)
+
+
+def benchmark_quantization(
+    store: QuantizedVectorStore,
+    queries: Sequence[Sequence[float]],
+    k: int = 4,
+    rescore_factors: Sequence[int] = (0, DEFAULT_RESCORE_FACTOR),
+) -> List[QuantizationBenchmark]:
+    """
+    Measure the memory of the codes and the recall of searches in the compressed domain
+    against exact searches of the full-precision rows, to choose a quantization and a rescore factor.
+
+    :param store: Trained store
+    :param queries: Query vectors, e.g. embeddings of typical questions
+    :param k: Number of documents returned per query
+    :param rescore_factors: Rescore factors to measure, 0 for compressed scores only
+    :return: Memory, recall and search time of every rescore factor
+    """
+    # pylint: disable=too-many-locals
+    start: float = time.perf_counter()
+    exact: List[List[Tuple[Document, float]]] = NumpyVectorStore.similarity_search_with_score_by_vectors(
+        store, queries, k
+    )
+    exact_seconds: float = time.perf_counter() - start
+    expected: List[set] = [{doc.id for doc, _ in results} for results in exact]
+    full_precision_bytes: int = len(store) * store.vectors.shape[1] * np.dtype(np.float32).itemsize
+    memory_bytes: int = store.codes.nbytes + sum(array.nbytes for array in store.codebook.values())
+
+    benchmarks: List[QuantizationBenchmark] = []
+    for rescore_factor in rescore_factors:
+        start = time.perf_counter()
+        approximate: List[List[Tuple[Document, float]]] = store.similarity_search_with_score_by_vectors(
+            queries, k, rescore_factor=rescore_factor
+        )
+        seconds: float = time.perf_counter() - start
+
+        found: int = sum(len(ids & {doc.id for doc, _ in results}) for ids, results in zip(expected, approximate))
+        recall: float = found / max(1, sum(len(ids) for ids in expected))
+        benchmark = QuantizationBenchmark(
+            store.quantization, rescore_factor, recall, memory_bytes, full_precision_bytes, seconds, exact_seconds
+        )
+        benchmarks.append(benchmark)
+        logger.info(
+            "%s rescore_factor=%d: %.1f MB (%.1fx smaller), recall@%d %.3f, %.2f ms vs %.2f ms exact\n",
+            store.quantization,
+            rescore_factor,
+            memory_bytes / 1e6,
+            benchmark.compression,
+            k,
+            recall,
+            seconds * 1000,
+            exact_seconds * 1000,
+        )
+    return benchmarks
@@ -0,0 +1,246 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+# END COPYRIGHT
+
+import itertools
+import logging
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict
+from typing import Hashable
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+import numpy as np
+from langchain_core.vectorstores import VectorStore
+
+# Seconds a query result is served before the query is run again
+DEFAULT_TTL = 3600.0
+# Maximum number of query results kept in the process
+DEFAULT_MAX_ENTRIES = 1024
+# Characters stripped from both ends of a query before it is matched
+QUERY_PUNCTUATION = " \t\n?!.,;:"
+
+logger = logging.getLogger(__name__)
+
+# Version of every vector store, a new store (e.g. a rebuilt one) or a store whose documents changed
+# getting a new version
+_INDEX_VERSIONS: "weakref.WeakKeyDictionary[VectorStore, int]" = weakref.WeakKeyDictionary()
+_INDEX_VERSION_COUNTER = itertools.count(1)
+_INDEX_VERSIONS_LOCK = threading.Lock()
+
+
+def get_index_version(vectorstore: VectorStore) -> int:
+    """
+    :param vectorstore: A vector store
+    :return: Version of the index. A rebuilt vector store is a new object, so it gets a new version,
+        and a vector store gets a new version whenever bump_index_version() is called on it.
+    """
+    with _INDEX_VERSIONS_LOCK:
+        version: Optional[int] = _INDEX_VERSIONS.get(vectorstore)
+        if version is None:
+            version = next(_INDEX_VERSION_COUNTER)
+            _INDEX_VERSIONS[vectorstore] = version
+        return version
+
+
+def bump_index_version(vectorstore: VectorStore):
+    """
+    Give a vector store a new version, so that results cached for its previous documents are no longer served.
+    Called after every addition or deletion of documents.
+
+    :param vectorstore: A vector store whose documents changed
+    """
+    with _INDEX_VERSIONS_LOCK:
+        _INDEX_VERSIONS[vectorstore] = next(_INDEX_VERSION_COUNTER)
+
+
+def normalize_query(query: str) -> str:
+    """
+    :param query: Query text
+    :return: The query lowercased, with collapsed whitespace and without surrounding punctuation
+    """
+    return " ".join(query.casefold().split()).strip(QUERY_PUNCTUATION)
+
+
+@dataclass
+class QueryCacheStats:
+    """Counters of a query cache."""
+
+    exact_hits: int = 0
+    semantic_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of the lookups served from the cache."""
+        lookups: int = self.exact_hits + self.semantic_hits + self.misses
+        return (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0
+
+
+@dataclass
+class _Entry:
+    """Result of a query, the normalized embedding of the query if any, and when the result was cached."""
+
+    result: str
+    vector: Optional[np.ndarray]
+    created: float
+
+
+class QueryCache:
+    """
+    Process-wide cache of the results of queries to vector stores, so that the nearly identical
+    questions agents ask again and again do not each cost a retrieval, and for exact hits a query embedding.
+
+    Results are cached per scope, which identifies the index version and the retrieval configuration,
+    so that results of a rebuilt or updated vector store are never served. A lookup hits on the normalized
+    query text, or, given the query embedding and a threshold, on the cached query whose embedding
+    is most similar if its cosine similarity reaches the threshold.
+    Entries expire after a TTL and the least recently used entries are evicted beyond a maximum count.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        :param ttl: Seconds a query result is served before the query is run again
+        :param max_entries: Maximum number of query results kept
+        """
+        self.ttl: float = ttl
+        self.max_entries: int = max_entries
+        self.stats = QueryCacheStats()
+        self._entries: OrderedDict[Tuple[Hashable, str], _Entry] = OrderedDict()
+        # Normalized queries cached in every scope, for semantic lookups
+        self._scopes: Dict[Hashable, Dict[str, None]] = {}
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        scope: Hashable,
+        query: str,
+        vector: Optional[Sequence[float]] = None,
+        threshold: Optional[float] = None,
+    ) -> Optional[str]:
+        """
+        Look up the result of a query.
+
+        :param scope: Index version and retrieval configuration the result must have been cached for
+        :param query: Query text
+        :param vector: Embedding of the query, for semantic lookups
+        :param threshold: Minimum cosine similarity of a cached query for a semantic hit. Semantic lookups are
+            disabled if None.
+        :return: The cached result, or None on a miss
+        """
+        normalized: str = normalize_query(query)
+        with self._lock:
+            entry: Optional[_Entry] = self._get_entry((scope, normalized))
+            if entry is not None:
+                self.stats.exact_hits += 1
+                return entry.result
+
+            if vector is not None and threshold is not None:
+                entry = self._get_similar_entry(scope, _normalize_vector(vector), threshold)
+                if entry is not None:
+                    self.stats.semantic_hits += 1
+                    return entry.result
+
+            self.stats.misses += 1
+            return None
+
+    def put(self, scope: Hashable, query: str, result: str, vector: Optional[Sequence[float]] = None):
+        """
+        Cache the result of a query.
+
+        :param scope: Index version and retrieval configuration of the result
+        :param query: Query text
+        :param result: Result of the query
+        :param vector: Embedding of the query, for semantic lookups
+        """
+        key: Tuple[Hashable, str] = (scope, normalize_query(query))
+        normalized_vector: Optional[np.ndarray] = _normalize_vector(vector) if vector is not None else None
+        with self._lock:
+            self._entries[key] = _Entry(result, normalized_vector, time.monotonic())
+            self._entries.move_to_end(key)
+            self._scopes.setdefault(scope, {})[key[1]] = None
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.stats.evictions += 1
+
+    def invalidate(self, scope: Optional[Hashable] = None):
+        """
+        Drop cached results.
+
+        :param scope: Scope of the results to drop. All results are dropped if None.
+        """
+        with self._lock:
+            if scope is None:
+                self._entries.clear()
+                self._scopes.clear()
+                return
+            for normalized in list(self._scopes.get(scope, {})):
+                self._remove((scope, normalized))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _get_entry(self, key: Tuple[Hashable, str]) -> Optional[_Entry]:
+        """Get a live entry for the key, dropping it if it expired."""
+        entry: Optional[_Entry] = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry.created > self.ttl:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _get_similar_entry(self, scope: Hashable, vector: np.ndarray, threshold: float) -> Optional[_Entry]:
+        """Get the live entry of the scope whose query embedding is the most similar, if similar enough."""
+        keys: List[Tuple[Hashable, str]] = [
+            (scope, normalized)
+            for normalized in self._scopes.get(scope, {})
+            if self._entries[(scope, normalized)].vector is not None
+        ]
+        if not keys:
+            return None
+
+        similarities: np.ndarray = np.stack([self._entries[key].vector for key in keys]) @ vector
+        best: int = int(np.argmax(similarities))
+        if similarities[best] < threshold:
+            return None
+        logger.info("Serving cached result of a query with similarity %.3f\n", similarities[best])
+        return self._get_entry(keys[best])
+
+    def _remove(self, key: Tuple[Hashable, str]):
+        """Remove an entry and its reference in its scope."""
+        self._entries.pop(key, None)
+        scope_queries: Optional[Dict[str, None]] = self._scopes.get(key[0])
+        if scope_queries is not None:
+            scope_queries.pop(key[1], None)
+            if not scope_queries:
+                del self._scopes[key[0]]
+
+
+def _normalize_vector(vector: Sequence[float]) -> np.ndarray:
+    """L2-normalize a vector, so that dot products are cosine similarities."""
+    array: np.ndarray = np.asarray(vector, dtype=np.float32)
+    norm: float = float(np.linalg.norm(array))
+    return array / norm if norm > 0 else array
+
+
+QUERY_CACHE = QueryCache(
+    ttl=float(os.getenv("QUERY_CACHE_TTL") or DEFAULT_TTL),
+    max_entries=int(os.getenv("QUERY_CACHE_MAX_ENTRIES") or DEFAULT_MAX_ENTRIES),
+)
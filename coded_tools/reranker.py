@@ -0,0 +1,271 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+# END COPYRIGHT
+
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+from abc import ABC
+from abc import abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pydantic import ConfigDict
+
+from coded_tools.lexical_index import BM25Index
+from coded_tools.query_cache import normalize_query
+
+# The cross-encoder reranker is optional, the lexical reranker being used without it
+try:
+    from sentence_transformers import CrossEncoder
+except ImportError:
+    CrossEncoder = None
+
+# Small cross-encoder trained on MS MARCO passages, fast enough on CPU for a few dozen candidates
+DEFAULT_CROSS_ENCODER_MODEL = os.getenv("RERANK_CROSS_ENCODER_MODEL") or "cross-encoder/ms-marco-MiniLM-L-6-v2"
+# Number of candidates fetched from the vector store and rescored
+DEFAULT_RERANK_CANDIDATES = 20
+# Number of (query, candidate) pairs scored at once by the cross-encoder
+RERANK_BATCH_SIZE = 32
+# Maximum number of scores kept in the process
+DEFAULT_MAX_CACHED_SCORES = int(os.getenv("RERANK_CACHE_MAX_ENTRIES") or 10000)
+
+logger = logging.getLogger(__name__)
+
+# Loaded cross-encoder of every model, shared by all the tools
+_CROSS_ENCODERS: Dict[str, "CrossEncoder"] = {}
+_CROSS_ENCODERS_LOCK = threading.Lock()
+
+
+class Scorer(ABC):  # pylint: disable=too-few-public-methods
+    """Scores the relevance of candidate passages to a query."""
+
+    # Name of the scorer, part of the key of its cached scores
+    name: str = ""
+    # True if the score of a candidate does not depend on the other candidates, so that it can be cached
+    cacheable: bool = True
+
+    @abstractmethod
+    def score(self, query: str, texts: List[str]) -> List[float]:
+        """
+        :param query: Query text
+        :param texts: Texts of the candidates
+        :return: Relevance of every candidate, higher is better
+        """
+        raise NotImplementedError
+
+
+class CrossEncoderScorer(Scorer):  # pylint: disable=too-few-public-methods
+    """Scores candidates with a local cross-encoder, reading the query and the candidate together."""
+
+    def __init__(self, model: str = DEFAULT_CROSS_ENCODER_MODEL, batch_size: int = RERANK_BATCH_SIZE):
+        """
+        :param model: Name or path of the sentence-transformers cross-encoder
+        :param batch_size: Number of pairs scored at once
+        :raises ImportError: If sentence-transformers is not installed
+        """
+        if CrossEncoder is None:
+            raise ImportError(
+                "The sentence-transformers package is not installed. "
+                "Please install it using 'pip install sentence-transformers'."
+            )
+        self.name = f"cross_encoder:{model}"
+        self.model: str = model
+        self.batch_size: int = batch_size
+
+    def score(self, query: str, texts: List[str]) -> List[float]:
+        with _CROSS_ENCODERS_LOCK:
+            cross_encoder = _CROSS_ENCODERS.get(self.model)
+            if cross_encoder is None:
+                cross_encoder = CrossEncoder(self.model, device="cpu")
+                _CROSS_ENCODERS[self.model] = cross_encoder
+        scores = cross_encoder.predict([(query, text) for text in texts], batch_size=self.batch_size)
+        return [float(score) for score in scores]
+
+
+class LexicalScorer(Scorer):  # pylint: disable=too-few-public-methods
+    """
+    Deterministic scorer needing no model: BM25 over the candidates, so that candidates
+    containing the rare terms of the query, such as identifiers, are ranked first.
+    """
+
+    name = "lexical"
+    # Term weights depend on the candidates, and scoring is cheap
+    cacheable = False
+
+    def score(self, query: str, texts: List[str]) -> List[float]:
+        keys: List[str] = [str(row) for row in range(len(texts))]
+        scores: Dict[str, float] = dict(BM25Index.from_texts(keys, texts).search(query, len(texts)))
+        return [scores.get(key, 0.0) for key in keys]
+
+
+def get_scorer(reranker: str) -> Scorer:
+    """
+    :param reranker: "cross_encoder" or "lexical"
+    :return: The scorer. The lexical scorer is used if the cross-encoder is not available.
+    """
+    if reranker == "cross_encoder":
+        if CrossEncoder is not None:
+            return CrossEncoderScorer()
+        logger.warning("sentence-transformers is not installed. Reranking with the lexical scorer.\n")
+    return LexicalScorer()
+
+
+class RerankScoreCache:
+    """
+    Process-wide cache of the scores of (query, chunk) pairs, so that a chunk retrieved again
+    for a query asked before is not scored again. The least recently used scores are evicted.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_CACHED_SCORES):
+        """
+        :param max_entries: Maximum number of scores kept
+        """
+        self.max_entries: int = max_entries
+        self._scores: OrderedDict[Tuple[str, str, str], float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, str, str]) -> Optional[float]:
+        """
+        :param key: Scorer name, normalized query and chunk key
+        :return: The cached score, or None
+        """
+        with self._lock:
+            score: Optional[float] = self._scores.get(key)
+            if score is not None:
+                self._scores.move_to_end(key)
+            return score
+
+    def put(self, key: Tuple[str, str, str], score: float):
+        """Cache a score."""
+        with self._lock:
+            self._scores[key] = score
+            self._scores.move_to_end(key)
+            while len(self._scores) > self.max_entries:
+                self._scores.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+
+@dataclass
+class RerankStats:
+    """Latency counters of the reranked queries of one tool."""
+
+    queries: int = 0
+    candidates: int = 0
+    cached_scores: int = 0
+    retrieval_ms: float = 0.0
+    rerank_ms: float = 0.0
+
+    def record(self, candidates: int, cached_scores: int, retrieval_ms: float, rerank_ms: float):
+        """Record a reranked query."""
+        self.queries += 1
+        self.candidates += candidates
+        self.cached_scores += cached_scores
+        self.retrieval_ms += retrieval_ms
+        self.rerank_ms += rerank_ms
+
+    def __str__(self) -> str:
+        queries: int = max(self.queries, 1)
+        return (
+            f"{self.queries} queries, {self.candidates / queries:.1f} candidates, "
+            f"{self.retrieval_ms / queries:.1f} ms retrieval and {self.rerank_ms / queries:.1f} ms reranking per query"
+        )
+
+
+def chunk_key(doc: Document) -> str:
+    """
+    Key of a chunk in the score cache: its id with a hash of its text, as incremental indexing
+    gives the chunks of a changed source the same ids.
+    """
+    return f"{doc.id or ''}:{hashlib.sha256(doc.page_content.encode('utf-8')).hexdigest()}"
+
+
+class RerankingRetriever(BaseRetriever):
+    """
+    Retriever rescoring the candidates of a first-stage retriever, which should return more candidates
+    than the number of documents kept, and returning the best ones.
+    """
+
+    retriever: BaseRetriever
+    scorer: Scorer
+    # Number of documents to return
+    k: int = 4
+    # Name of the tool, to report latencies per tool
+    tool_name: str = ""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        start: float = time.perf_counter()
+        candidates: List[Document] = self.retriever.invoke(query)
+        return self._rerank(query, candidates, start)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        start: float = time.perf_counter()
+        candidates: List[Document] = await self.retriever.ainvoke(query)
+        # Scoring with a model is CPU-bound, so it runs out of the event loop
+        return await asyncio.to_thread(self._rerank, query, candidates, start)
+
+    def _rerank(self, query: str, candidates: List[Document], start: float) -> List[Document]:
+        """Score the candidates not scored before in one batch, and keep the best ones."""
+        retrieved: float = time.perf_counter()
+        normalized: str = normalize_query(query)
+        keys: List[Tuple[str, str, str]] = [(self.scorer.name, normalized, chunk_key(doc)) for doc in candidates]
+        scores: List[Optional[float]] = [
+            RERANK_SCORE_CACHE.get(key) if self.scorer.cacheable else None for key in keys
+        ]
+
+        missing: List[int] = [index for index, score in enumerate(scores) if score is None]
+        if missing:
+            new_scores: List[float] = self.scorer.score(query, [candidates[index].page_content for index in missing])
+            for index, score in zip(missing, new_scores):
+                scores[index] = score
+                if self.scorer.cacheable:
+                    RERANK_SCORE_CACHE.put(keys[index], score)
+
+        # Ties keep the first-stage order
+        order: List[int] = sorted(range(len(candidates)), key=lambda index: -scores[index])
+        done: float = time.perf_counter()
+
+        stats: RerankStats = RERANK_STATS.setdefault(self.tool_name, RerankStats())
+        stats.record(
+            len(candidates), len(candidates) - len(missing), 1000 * (retrieved - start), 1000 * (done - retrieved)
+        )
+        logger.info(
+            "%s reranked %d candidates (%d scores cached) with %s in %.1f ms after %.1f ms retrieval. %s\n",
+            self.tool_name,
+            len(candidates),
+            len(candidates) - len(missing),
+            self.scorer.name,
+            1000 * (done - retrieved),
+            1000 * (retrieved - start),
+            stats,
+        )
+        return [candidates[index] for index in order[: self.k]]
+
+
+RERANK_SCORE_CACHE = RerankScoreCache()
+# Latency counters of every tool
+RERANK_STATS: Dict[str, RerankStats] = {}
@@ -0,0 +1,554 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+# END COPYRIGHT
+
+import asyncio
+import hashlib
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from abc import ABC
+from abc import abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+import pymupdf
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from coded_tools.query_cache import normalize_query
+
+# SQLite file holding the query results and documents fetched from Wikipedia and arXiv
+DEFAULT_CACHE_PATH = os.getenv("RESEARCH_CACHE_PATH") or os.path.join(
+    tempfile.gettempdir(), "neuro_san_research_cache.sqlite"
+)
+# Seconds a query result or document is served before it is fetched again
+DEFAULT_TTL = float(os.getenv("RESEARCH_CACHE_TTL_SECONDS") or 24 * 3600)
+# Number of documents fetched concurrently for one query
+DEFAULT_FETCH_CONCURRENCY = int(os.getenv("RESEARCH_FETCH_CONCURRENCY") or 4)
+# Number of times two documents must have been returned together before one prefetches the other
+PREFETCH_MIN_CO_REQUESTS = 2
+# Maximum number of documents prefetched after one query
+PREFETCH_MAX_DOCUMENTS = 4
+# Maximum query lengths accepted by the Wikipedia and arXiv search APIs
+WIKIPEDIA_MAX_QUERY_LENGTH = 300
+ARXIV_MAX_QUERY_LENGTH = 300
+
+logger = logging.getLogger(__name__)
+
+
+class ResearchSource(ABC):
+    """
+    A searchable collection of documents, e.g. the pages of one Wikipedia edition.
+    Searching returns the ids of the matching documents, which are then fetched one by one,
+    so that the documents shared by several queries are fetched and cached once.
+    """
+
+    # Name of the collection, which prefixes the ids of its documents in the cache
+    name: str = ""
+
+    @property
+    def params(self) -> Dict[str, Any]:
+        """Parameters changing the result of a search, which are part of the cache key of the queries."""
+        return {}
+
+    @abstractmethod
+    def search(self, query: str) -> List[str]:
+        """
+        :param query: Search query
+        :return: Ids of the matching documents, best first
+        """
+
+    @abstractmethod
+    def fetch(self, doc_id: str) -> Optional[Document]:
+        """
+        :param doc_id: Id of a document
+        :return: The document, or None if it no longer exists
+        """
+
+    def present(self, document: Document) -> Document:
+        """
+        :param document: A cached document, as fetched
+        :return: The document as returned to the caller, e.g. truncated
+        """
+        return document
+
+
+class ResearchCache:
+    """
+    Persistent cache of the documents fetched from a research source, and of the ids returned by its searches,
+    in a SQLite file so that they survive process restarts. Entries older than the TTL are fetched again,
+    but still served if the source cannot be reached.
+
+    It also counts how often two documents are returned together, so that the documents frequently
+    requested with the ones of a query can be refreshed before they expire.
+    """
+
+    def __init__(self, path: Optional[str] = DEFAULT_CACHE_PATH):
+        """
+        :param path: Absolute path of the SQLite file. Memory-only cache if None.
+        """
+        self.path: Optional[str] = path
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def get_query(self, key: str) -> Optional[Tuple[List[str], float]]:
+        """
+        :param key: Cache key of a query
+        :return: Ids of the documents returned by the query and the time they were fetched, or None
+        """
+        rows: List[tuple] = self._select("SELECT doc_ids, fetched FROM queries WHERE key = ?", (key,))
+        return (json.loads(rows[0][0]), rows[0][1]) if rows else None
+
+    def put_query(self, key: str, doc_ids: List[str]):
+        """Store the ids of the documents returned by a query."""
+        self._write(
+            "INSERT OR REPLACE INTO queries (key, doc_ids, fetched) VALUES (?, ?, ?)",
+            [(key, json.dumps(doc_ids), time.time())],
+        )
+
+    def get_documents(self, doc_ids: List[str]) -> Dict[str, Tuple[Document, float]]:
+        """
+        :param doc_ids: Ids of documents
+        :return: Dictionary of the ids that were found, to their document and the time it was fetched
+        """
+        if not doc_ids:
+            return {}
+        placeholders: str = ",".join("?" * len(doc_ids))
+        rows: List[tuple] = self._select(
+            f"SELECT doc_id, document, fetched FROM documents WHERE doc_id IN ({placeholders})", tuple(doc_ids)
+        )
+        return {doc_id: (Document(**json.loads(document)), fetched) for doc_id, document, fetched in rows}
+
+    def put_document(self, doc_id: str, document: Document):
+        """Store a fetched document."""
+        serialized: str = json.dumps(
+            {"page_content": document.page_content, "metadata": document.metadata}, default=str
+        )
+        self._write(
+            "INSERT OR REPLACE INTO documents (doc_id, document, fetched) VALUES (?, ?, ?)",
+            [(doc_id, serialized, time.time())],
+        )
+
+    def record_co_requests(self, doc_ids: List[str]):
+        """Count every pair of documents returned by the same query."""
+        pairs: List[tuple] = list(itertools.permutations(dict.fromkeys(doc_ids), 2))
+        if pairs:
+            self._write(
+                "INSERT INTO co_requests (doc_id, other_id, count) VALUES (?, ?, 1) "
+                "ON CONFLICT (doc_id, other_id) DO UPDATE SET count = count + 1",
+                pairs,
+            )
+
+    def get_co_requested(self, doc_ids: List[str], min_count: int, limit: int) -> List[str]:
+        """
+        :param doc_ids: Ids of documents
+        :param min_count: Minimum number of times another document must have been returned with them
+        :param limit: Maximum number of ids to return
+        :return: Ids of the other documents most often returned with them
+        """
+        if not doc_ids:
+            return []
+        placeholders: str = ",".join("?" * len(doc_ids))
+        rows: List[tuple] = self._select(
+            f"SELECT other_id, SUM(count) AS total FROM co_requests WHERE doc_id IN ({placeholders}) "
+            f"AND other_id NOT IN ({placeholders}) GROUP BY other_id HAVING total >= ? ORDER BY total DESC LIMIT ?",
+            (*doc_ids, *doc_ids, min_count, limit),
+        )
+        return [row[0] for row in rows]
+
+    def _select(self, sql: str, parameters: tuple) -> List[tuple]:
+        """Run a query, fetching its rows before another thread uses the connection."""
+        with self._lock:
+            return self._connect().execute(sql, parameters).fetchall()
+
+    def _write(self, sql: str, parameters: List[tuple]):
+        """Run a statement for every set of parameters, and commit."""
+        with self._lock:
+            self._connect().executemany(sql, parameters)
+            self._connection.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the SQLite file on first use, so that importing the module does not create it."""
+        if self._connection is None:
+            if self.path:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._connection = sqlite3.connect(self.path or ":memory:", check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS queries "
+                "(key TEXT PRIMARY KEY, doc_ids TEXT NOT NULL, fetched REAL NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS documents "
+                "(doc_id TEXT PRIMARY KEY, document TEXT NOT NULL, fetched REAL NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS co_requests "
+                "(doc_id TEXT NOT NULL, other_id TEXT NOT NULL, count INTEGER NOT NULL, "
+                "PRIMARY KEY (doc_id, other_id))"
+            )
+            self._connection.commit()
+            logger.info("Using research cache at: %s\n", self.path)
+        return self._connection
+
+
+def get_query_key(source: ResearchSource, query: str) -> str:
+    """
+    :param source: A research source
+    :param query: Search query
+    :return: Cache key of the query on the source with its parameters
+    """
+    key: str = json.dumps([source.name, normalize_query(query), source.params], sort_keys=True)
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+# Documents are prefetched on a small pool of threads, so that they outlive the event loop of the query
+_PREFETCH_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="research_prefetch")
+_PREFETCHING: Set[str] = set()
+_PREFETCHING_LOCK = threading.Lock()
+
+
+class CachedResearchRetriever(BaseRetriever):
+    """
+    Retriever searching a research source through a persistent cache.
+    Repeated queries and documents shared by several queries are served locally until they expire,
+    and the documents of a query that are not cached are fetched concurrently.
+    """
+
+    source: ResearchSource
+    cache: ResearchCache
+    # Seconds a query result or document is served before it is fetched again
+    ttl: float = DEFAULT_TTL
+    # Number of documents fetched concurrently
+    concurrency: int = DEFAULT_FETCH_CONCURRENCY
+    # True to refresh, in the background, the documents frequently returned with the ones of a query
+    prefetch: bool = False
+    # False to raise when a document that is not cached cannot be fetched, True to skip it
+    continue_on_failure: bool = True
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        doc_ids: List[str] = self._search(query)
+        documents: Dict[str, Optional[Document]] = self._get_cached(doc_ids)
+        missing: List[str] = [doc_id for doc_id in doc_ids if doc_id not in documents]
+        with ThreadPoolExecutor(max_workers=max(1, self.concurrency)) as executor:
+            documents.update(zip(missing, executor.map(self._fetch, missing)))
+        return self._finish(doc_ids, documents)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        doc_ids: List[str] = await asyncio.to_thread(self._search, query)
+        documents: Dict[str, Optional[Document]] = self._get_cached(doc_ids)
+        missing: List[str] = [doc_id for doc_id in doc_ids if doc_id not in documents]
+        semaphore = asyncio.Semaphore(max(1, self.concurrency))
+
+        async def fetch(doc_id: str) -> Optional[Document]:
+            async with semaphore:
+                return await asyncio.to_thread(self._fetch, doc_id)
+
+        documents.update(zip(missing, await asyncio.gather(*(fetch(doc_id) for doc_id in missing))))
+        return self._finish(doc_ids, documents)
+
+    def _search(self, query: str) -> List[str]:
+        """
+        :param query: Search query
+        :return: Ids of the documents returned by the query, from the cache if they have not expired
+        """
+        key: str = get_query_key(self.source, query)
+        cached: Optional[Tuple[List[str], float]] = self.cache.get_query(key)
+        if cached is not None and time.time() - cached[1] < self.ttl:
+            return cached[0]
+
+        try:
+            doc_ids: List[str] = self.source.search(query)
+        except Exception as exception:  # pylint: disable=broad-exception-caught
+            if cached is None:
+                raise
+            logger.warning("Search of %s failed: %s. Serving the expired result.\n", self.source.name, exception)
+            return cached[0]
+
+        self.cache.put_query(key, doc_ids)
+        return doc_ids
+
+    def _get_cached(self, doc_ids: List[str], max_age: Optional[float] = None) -> Dict[str, Optional[Document]]:
+        """
+        :param doc_ids: Ids of documents
+        :param max_age: Maximum age in seconds of the documents. Defaults to the TTL.
+        :return: Dictionary of the ids of the cached documents that are not older, to their document
+        """
+        max_age = self.ttl if max_age is None else max_age
+        now: float = time.time()
+        cached: Dict[str, Tuple[Document, float]] = self.cache.get_documents(self._cache_ids(doc_ids))
+        return {
+            doc_id: cached[cache_id][0]
+            for doc_id, cache_id in zip(doc_ids, self._cache_ids(doc_ids))
+            if cache_id in cached and now - cached[cache_id][1] < max_age
+        }
+
+    def _fetch(self, doc_id: str) -> Optional[Document]:
+        """
+        :param doc_id: Id of a document
+        :return: The fetched document, the expired cached one if it cannot be fetched, or None
+        """
+        cache_id: str = self._cache_id(doc_id)
+        try:
+            document: Optional[Document] = self.source.fetch(doc_id)
+        except Exception as exception:  # pylint: disable=broad-exception-caught
+            cached: Optional[Tuple[Document, float]] = self.cache.get_documents([cache_id]).get(cache_id)
+            if cached is not None:
+                logger.warning(
+                    "Failed to fetch %s from %s: %s. Serving the expired copy.\n", doc_id, self.source.name, exception
+                )
+                return cached[0]
+            if not self.continue_on_failure:
+                raise
+            logger.error("Failed to fetch %s from %s: %s\n", doc_id, self.source.name, exception)
+            return None
+
+        if document is not None:
+            self.cache.put_document(cache_id, document)
+        return document
+
+    def _finish(self, doc_ids: List[str], documents: Dict[str, Optional[Document]]) -> List[Document]:
+        """
+        Record the documents returned together, start prefetching the ones often returned with them,
+        and present the documents in the order of the search.
+        """
+        found: List[str] = [doc_id for doc_id in doc_ids if documents.get(doc_id) is not None]
+        self.cache.record_co_requests(self._cache_ids(found))
+        if self.prefetch:
+            self._start_prefetch(found)
+        return [self.source.present(documents[doc_id]) for doc_id in found]
+
+    def _start_prefetch(self, doc_ids: List[str]):
+        """
+        Fetch, in the background, the documents frequently returned with the given ones that are not cached
+        or are past half their TTL, so that they are fresh when a later query returns them.
+        """
+        prefix: str = self._cache_id("")
+        candidates: List[str] = [
+            cache_id[len(prefix) :]
+            for cache_id in self.cache.get_co_requested(
+                self._cache_ids(doc_ids), PREFETCH_MIN_CO_REQUESTS, PREFETCH_MAX_DOCUMENTS
+            )
+            if cache_id.startswith(prefix)
+        ]
+        cached: Dict[str, Optional[Document]] = self._get_cached(candidates, self.ttl / 2)
+        for doc_id in candidates:
+            cache_id: str = self._cache_id(doc_id)
+            with _PREFETCHING_LOCK:
+                if doc_id in cached or cache_id in _PREFETCHING:
+                    continue
+                _PREFETCHING.add(cache_id)
+            _PREFETCH_EXECUTOR.submit(self._prefetch, doc_id)
+
+    def _prefetch(self, doc_id: str):
+        """Fetch a document into the cache."""
+        try:
+            if self._fetch(doc_id) is not None:
+                logger.debug("Prefetched %s from %s\n", doc_id, self.source.name)
+        except Exception as exception:  # pylint: disable=broad-exception-caught
+            logger.debug("Failed to prefetch %s from %s: %s\n", doc_id, self.source.name, exception)
+        finally:
+            with _PREFETCHING_LOCK:
+                _PREFETCHING.discard(self._cache_id(doc_id))
+
+    def _cache_id(self, doc_id: str) -> str:
+        """Id of a document in the cache, which is shared by all the sources."""
+        return f"{self.source.name}:{doc_id}"
+
+    def _cache_ids(self, doc_ids: List[str]) -> List[str]:
+        return [self._cache_id(doc_id) for doc_id in doc_ids]
+
+
+class _LanguageGate:  # pylint: disable=too-few-public-methods
+    """
+    The wikipedia package keeps the language of its requests in a global, so requests to different editions
+    must not overlap. Requests to the same edition still run concurrently.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._lang: Optional[str] = None
+        self._active: int = 0
+
+    @contextmanager
+    def use(self, client: Any, lang: str) -> Iterator[None]:
+        """Wait until no request to another edition runs, then switch the client to the language."""
+        with self._condition:
+            while self._active and self._lang != lang:
+                self._condition.wait()
+            if self._lang != lang:
+                client.set_lang(lang)
+                self._lang = lang
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._active -= 1
+                self._condition.notify_all()
+
+
+_WIKIPEDIA_LANGUAGE = _LanguageGate()
+
+
+class WikipediaSource(ResearchSource):
+    """
+    Pages of one Wikipedia edition, with the same content and metadata as the WikipediaRetriever of langchain.
+    """
+
+    def __init__(self, lang: str = "en", top_k_results: int = 3, doc_content_chars_max: int = 4000):
+        """
+        :param lang: Language code of the Wikipedia edition
+        :param top_k_results: Number of pages returned by a search
+        :param doc_content_chars_max: Maximum number of characters of a page returned to the caller
+        """
+        try:
+            import wikipedia  # pylint: disable=import-outside-toplevel
+        except ImportError as exception:
+            raise ImportError(
+                "Could not import wikipedia python package. Please install it with `pip install wikipedia`."
+            ) from exception
+        self.client = wikipedia
+        self.lang: str = lang
+        self.name: str = f"wikipedia/{lang}"
+        self.top_k_results: int = top_k_results
+        self.doc_content_chars_max: int = doc_content_chars_max
+
+    @property
+    def params(self) -> Dict[str, Any]:
+        return {"top_k_results": self.top_k_results}
+
+    def search(self, query: str) -> List[str]:
+        with _WIKIPEDIA_LANGUAGE.use(self.client, self.lang):
+            titles: List[str] = self.client.search(query[:WIKIPEDIA_MAX_QUERY_LENGTH], results=self.top_k_results)
+        return titles[: self.top_k_results]
+
+    def fetch(self, doc_id: str) -> Optional[Document]:
+        try:
+            with _WIKIPEDIA_LANGUAGE.use(self.client, self.lang):
+                page = self.client.page(title=doc_id, auto_suggest=False)
+                # The content and summary of a page are loaded lazily
+                content, summary = page.content, page.summary
+        except (self.client.exceptions.PageError, self.client.exceptions.DisambiguationError):
+            return None
+        return Document(page_content=content, metadata={"title": doc_id, "summary": summary, "source": page.url})
+
+    def present(self, document: Document) -> Document:
+        return Document(page_content=document.page_content[: self.doc_content_chars_max], metadata=document.metadata)
+
+
+class ArxivSource(ResearchSource):
+    """
+    Papers of arXiv, with the same content and metadata as the ArxivRetriever of langchain.
+    The metadata of a search result is kept until its paper is fetched, so that the paper is not looked up again.
+    """
+
+    def __init__(
+        self,
+        top_k_results: int = 3,
+        get_full_documents: bool = True,
+        doc_content_chars_max: Optional[int] = 4000,
+        load_all_available_meta: bool = False,
+    ):
+        """
+        :param top_k_results: Number of papers returned by a search
+        :param get_full_documents: True to return the full text of the papers, False for their abstracts
+        :param doc_content_chars_max: Maximum number of characters of a paper returned to the caller
+        :param load_all_available_meta: True to return all the metadata of the papers
+        """
+        try:
+            import arxiv  # pylint: disable=import-outside-toplevel
+        except ImportError as exception:
+            raise ImportError(
+                "Could not import arxiv python package. Please install it with `pip install arxiv`."
+            ) from exception
+        self.arxiv = arxiv
+        self.name: str = "arxiv/full" if get_full_documents else "arxiv/abstract"
+        self.top_k_results: int = top_k_results
+        self.get_full_documents: bool = get_full_documents
+        self.doc_content_chars_max: Optional[int] = doc_content_chars_max
+        self.load_all_available_meta: bool = load_all_available_meta
+        self._results: Dict[str, Any] = {}
+
+    @property
+    def params(self) -> Dict[str, Any]:
+        return {"top_k_results": self.top_k_results}
+
+    def search(self, query: str) -> List[str]:
+        if self.get_full_documents:
+            # Like langchain, remove the ":" and "-" of full text queries, as they can cause search problems
+            query = query.replace(":", "").replace("-", "")
+        results = list(
+            self.arxiv.Client().results(
+                self.arxiv.Search(query[:ARXIV_MAX_QUERY_LENGTH], max_results=self.top_k_results)
+            )
+        )
+        for result in results:
+            self._results[result.get_short_id()] = result
+        return [result.get_short_id() for result in results]
+
+    def fetch(self, doc_id: str) -> Optional[Document]:
+        result = self._results.pop(doc_id, None)
+        if result is None:
+            result = next(self.arxiv.Client().results(self.arxiv.Search(id_list=[doc_id])), None)
+            if result is None:
+                return None
+
+        text: str = result.summary
+        if self.get_full_documents:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                with pymupdf.open(result.download_pdf(dirpath=tmp_dir)) as pdf:
+                    text = "".join(page.get_text() for page in pdf)
+
+        metadata: Dict[str, Any] = {
+            "Published": str(result.updated.date()),
+            "Title": result.title,
+            "Authors": ", ".join(author.name for author in result.authors),
+            "Summary": result.summary,
+            "entry_id": result.entry_id,
+            "published_first_time": str(result.published.date()),
+            "comment": result.comment,
+            "journal_ref": result.journal_ref,
+            "doi": result.doi,
+            "primary_category": result.primary_category,
+            "categories": result.categories,
+            "links": [link.href for link in result.links],
+        }
+        return Document(page_content=text, metadata=metadata)
+
+    def present(self, document: Document) -> Document:
+        # All the metadata is cached, and only the minimal one is returned unless all of it is requested
+        metadata: Dict[str, Any] = document.metadata
+        if not self.load_all_available_meta:
+            metadata = {key: metadata[key] for key in ("Published", "Title", "Authors", "Summary") if key in metadata}
+        content: str = document.page_content
+        if self.doc_content_chars_max is not None:
+            content = content[: self.doc_content_chars_max]
+        return Document(page_content=content, metadata=metadata)
+
+
+RESEARCH_CACHE = ResearchCache()
@@ -0,0 +1,166 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+# END COPYRIGHT
+
+import logging
+import re
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Any
+from typing import Dict
+from typing import FrozenSet
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import tiktoken
+from langchain_core.documents import Document
+
+from coded_tools.token_chunker import get_encoding
+
+# Passages whose word shingles overlap at least this much (Jaccard similarity) are near-duplicates
+NEAR_DUPLICATE_THRESHOLD = 0.8
+# Number of words per shingle when comparing passages
+SHINGLE_SIZE = 3
+# A passage is only truncated to fit the budget if at least this many tokens of it fit
+MIN_TRUNCATED_TOKENS = 32
+# Separator between passages in the packed text
+PASSAGE_SEPARATOR = "\n\n"
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Passage:
+    """Text of one or more merged chunks of a document, with the best rank of the chunks."""
+
+    text: str
+    metadata: Dict[str, Any]
+    rank: int
+    # Character offsets of the passage in its document, if known
+    start: Optional[int] = None
+    end: Optional[int] = None
+    shingles: FrozenSet[Tuple[str, ...]] = field(default_factory=frozenset)
+
+    @property
+    def source(self) -> str:
+        """Header naming where the passage comes from."""
+        source: str = str(self.metadata.get("source") or self.metadata.get("title") or "unknown source")
+        page: Any = self.metadata.get("page")
+        if isinstance(page, int):
+            # Pages are numbered from 0 by the loaders
+            return f"[Source: {source}, page {page + 1}]"
+        return f"[Source: {source}]"
+
+
+@dataclass
+class PackedResults:
+    """Passages that fit in the token budget, and their text with a source header each."""
+
+    passages: List[Passage]
+    text: str
+    tokens: int
+
+
+def _document_key(doc: Document) -> Tuple[str, str]:
+    """Identify the document a chunk was split from."""
+    return str(doc.metadata.get("source", "")), str(doc.metadata.get("page", ""))
+
+
+def _shingles(text: str) -> FrozenSet[Tuple[str, ...]]:
+    """Word shingles of a text, ignoring case and punctuation."""
+    words: List[str] = re.findall(r"\w+", text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return frozenset([tuple(words)])
+    return frozenset(tuple(words[index : index + SHINGLE_SIZE]) for index in range(len(words) - SHINGLE_SIZE + 1))
+
+
+def _is_near_duplicate(passage: Passage, kept: List[Passage]) -> bool:
+    """True if the passage is mostly the same text as a kept passage."""
+    for other in kept:
+        union: int = len(passage.shingles | other.shingles)
+        if union and len(passage.shingles & other.shingles) / union >= NEAR_DUPLICATE_THRESHOLD:
+            return True
+    return False
+
+
+def merge_chunks(docs: List[Document]) -> List[Passage]:
+    """
+    Merge the overlapping or adjacent chunks of each document into single passages, using the
+    character offsets recorded as "start_index" by the chunker. Chunks without offsets are kept as they are.
+
+    :param docs: Retrieved chunks, best first
+    :return: Passages, ordered by the rank of their best chunk
+    """
+    passages: List[Passage] = []
+    chunks_by_document: Dict[Tuple[str, str], List[Tuple[int, int, Document]]] = {}
+    for rank, doc in enumerate(docs):
+        start: Any = doc.metadata.get("start_index")
+        if isinstance(start, int):
+            chunks_by_document.setdefault(_document_key(doc), []).append((start, rank, doc))
+        else:
+            passages.append(Passage(doc.page_content, dict(doc.metadata), rank))
+
+    for chunks in chunks_by_document.values():
+        current: Optional[Passage] = None
+        for start, rank, doc in sorted(chunks, key=lambda chunk: (chunk[0], chunk[1])):
+            end: int = start + len(doc.page_content)
+            if current is not None and start <= current.end:
+                # Append the part of the chunk beyond the passage, if any
+                current.text += doc.page_content[current.end - start :]
+                current.end = max(current.end, end)
+                current.rank = min(current.rank, rank)
+                continue
+            current = Passage(doc.page_content, dict(doc.metadata), rank, start, end)
+            passages.append(current)
+
+    return sorted(passages, key=lambda passage: passage.rank)
+
+
+def pack_results(
+    docs: List[Document], max_tokens: Optional[int] = None, encoding: Optional[tiktoken.Encoding] = None
+) -> PackedResults:
+    """
+    Post-process retrieved chunks for a prompt: merge overlapping chunks of the same document,
+    drop near-duplicates, and keep the best passages that fit in a token budget.
+
+    :param docs: Retrieved chunks, best first
+    :param max_tokens: Maximum number of tokens of the packed text, headers included. No limit if None.
+    :param encoding: Encoding counting the tokens. Defaults to the encoding of the OpenAI models.
+    :return: The packed passages and their text
+    """
+    encoding = encoding or get_encoding()
+    separator_tokens: int = len(encoding.encode_ordinary(PASSAGE_SEPARATOR))
+
+    kept: List[Passage] = []
+    parts: List[str] = []
+    tokens: int = 0
+    for passage in merge_chunks(docs):
+        passage.shingles = _shingles(passage.text)
+        if _is_near_duplicate(passage, kept):
+            continue
+
+        part: str = f"{passage.source}\n{passage.text.strip()}"
+        part_tokens: List[int] = encoding.encode_ordinary(part)
+        cost: int = len(part_tokens) + (separator_tokens if parts else 0)
+        if max_tokens is not None and tokens + cost > max_tokens:
+            available: int = max_tokens - tokens - (separator_tokens if parts else 0)
+            if available < MIN_TRUNCATED_TOKENS:
+                # Smaller passages ranked lower may still fit
+                continue
+            part = encoding.decode(part_tokens[:available])
+            cost = available + (separator_tokens if parts else 0)
+
+        kept.append(passage)
+        parts.append(part)
+        tokens += cost
+
+    logger.info("Packed %d retrieved chunks into %d passages of %d tokens\n", len(docs), len(kept), tokens)
+    return PackedResults(kept, PASSAGE_SEPARATOR.join(parts), tokens)
@@ -0,0 +1,354 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+# END COPYRIGHT
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+from typing import Dict
+from typing import Optional
+from typing import Tuple
+
+from coded_tools.query_cache import normalize_query
+
+# Seconds search results are served before the search is run again
+DEFAULT_TTL = float(os.getenv("SEARCH_CACHE_TTL_SECONDS") or 600)
+# Maximum number of search results kept in memory
+DEFAULT_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES") or 1024)
+# SQLite file of the search results kept on disk, shared by the processes of the machine. No disk tier if unset.
+DEFAULT_CACHE_PATH = os.getenv("SEARCH_CACHE_PATH")
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SearchCacheStats:
+    """Counters of the searches of one provider."""
+
+    memory_hits: int = 0
+    disk_hits: int = 0
+    # Searches which waited for the identical search already running instead of calling the provider
+    coalesced: int = 0
+    misses: int = 0
+    # Seconds the provider took for the results served from the cache
+    saved_seconds: float = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of the searches which did not call the provider."""
+        searches: int = self.memory_hits + self.disk_hits + self.coalesced + self.misses
+        return (self.memory_hits + self.disk_hits + self.coalesced) / searches if searches else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.hit_rate:.0%} hit rate ({self.memory_hits} memory hits, {self.disk_hits} disk hits, "
+            f"{self.coalesced} coalesced, {self.misses} misses), {self.saved_seconds:.1f} s saved"
+        )
+
+
+@dataclass
+class SearchOrigin:
+    """
+    Where the results of a search came from, filled in by the cache for the caller which set SEARCH_ORIGIN,
+    so that the latency of a provider can be measured on its real searches only.
+    """
+
+    # True if the results were served from the cache, or by the identical search already running
+    cached: bool = False
+    # Seconds the provider took, if the caller ran the search
+    latency: Optional[float] = None
+
+
+# Origin of the results of the searches of the current context. The object is shared with the copies
+# of the context, so it is also filled in by the searches run in a thread.
+SEARCH_ORIGIN: ContextVar[Optional[SearchOrigin]] = ContextVar("search_origin", default=None)
+
+
+@dataclass
+class _Entry:
+    """Results of a search, how long the provider took for them, and when they were cached."""
+
+    results: Any
+    latency: float
+    created: float
+
+
+class SearchCache:  # pylint: disable=too-many-instance-attributes
+    """
+    Process-wide cache of the results of the search tools, so that the same search fired by several agents
+    of a network within seconds calls the search provider once.
+
+    Results are cached by provider, normalized query and search parameters, in memory with the least recently used
+    entries evicted beyond a maximum count, and optionally in a SQLite file which outlives the process.
+    Entries expire after a TTL. Identical searches running at once, from any thread or event loop,
+    share one call to the provider. Only non-empty results are cached, the tools returning a text for errors.
+    """
+
+    def __init__(
+        self,
+        ttl: float = DEFAULT_TTL,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        path: Optional[str] = DEFAULT_CACHE_PATH,
+    ):
+        """
+        :param ttl: Default seconds search results are served before the search is run again
+        :param max_entries: Maximum number of search results kept in memory
+        :param path: Path of the SQLite file of the disk tier. No disk tier if None.
+        """
+        self.ttl: float = ttl
+        self.max_entries: int = max_entries
+        self.path: Optional[str] = path
+        # Counters of every provider
+        self.stats: Dict[str, SearchCacheStats] = {}
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._in_flight: Dict[str, Future] = {}
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    async def get_or_search(
+        self,
+        provider: str,
+        query: str,
+        params: Optional[Dict[str, Any]],
+        search: Callable[[], Awaitable[Any]],
+        ttl: Optional[float] = None,
+    ) -> Any:
+        """
+        Get the cached results of a search, or run it.
+
+        :param provider: Name of the search provider
+        :param query: Search query
+        :param params: Other parameters of the search changing its results
+        :param search: Coroutine function running the search
+        :param ttl: Seconds the results are served from the cache. Default TTL of the cache if None,
+            and the search is always run if 0.
+        :return: The results of the search
+        """
+        ttl = self.ttl if ttl is None else float(ttl)
+        if ttl <= 0:
+            return await search()
+
+        key: str = get_search_key(provider, query, params)
+        results, future, is_leader = self._lookup(provider, key, ttl)
+        if future is None:
+            return results
+        if not is_leader:
+            return await asyncio.wrap_future(future)
+
+        # The search is not cancelled with the caller, as other callers may be waiting for its results
+        task: asyncio.Task = asyncio.ensure_future(self._run_search(provider, key, search))
+        task.add_done_callback(lambda done: self._settle(key, future, done))
+        return await asyncio.shield(task)
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def get_or_search_sync(
+        self,
+        provider: str,
+        query: str,
+        params: Optional[Dict[str, Any]],
+        search: Callable[[], Any],
+        ttl: Optional[float] = None,
+    ) -> Any:
+        """
+        Get the cached results of a search, or run it, from synchronous code.
+        See get_or_search() for the arguments and the return value, search being a plain function.
+        """
+        ttl = self.ttl if ttl is None else float(ttl)
+        if ttl <= 0:
+            return search()
+
+        key: str = get_search_key(provider, query, params)
+        results, future, is_leader = self._lookup(provider, key, ttl)
+        if future is None:
+            return results
+        if not is_leader:
+            return future.result()
+
+        try:
+            start: float = time.monotonic()
+            results = search()
+            latency: float = time.monotonic() - start
+            _set_origin(False, latency)
+            self._put(key, results, latency)
+        except BaseException as exception:
+            self._finish(key, future, exception=exception)
+            raise
+        self._finish(key, future, results=results)
+        return results
+
+    def invalidate(self):
+        """Drop the cached results, in memory and on disk."""
+        with self._lock:
+            self._entries.clear()
+            if self.path is not None:
+                self._connect().execute("DELETE FROM results")
+                self._connection.commit()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _lookup(self, provider: str, key: str, ttl: float) -> Tuple[Any, Optional[Future], bool]:
+        """
+        Look up a search in memory, then on disk, then among the running searches.
+
+        :return: A tuple of the cached results, the future of the running search or None if the results are cached,
+            and whether the caller should run the search, having registered the future
+        """
+        with self._lock:
+            stats: SearchCacheStats = self.stats.setdefault(provider, SearchCacheStats())
+            entry: Optional[_Entry] = self._entries.get(key)
+            if entry is not None and time.time() - entry.created <= ttl:
+                self._entries.move_to_end(key)
+                stats.memory_hits += 1
+            else:
+                entry = self._read(key, ttl)
+                if entry is not None:
+                    self._store(key, entry)
+                    stats.disk_hits += 1
+            if entry is not None:
+                stats.saved_seconds += entry.latency
+                _set_origin(True)
+                logger.info("Serving cached %s results. %s\n", provider, stats)
+                return entry.results, None, False
+
+            future: Optional[Future] = self._in_flight.get(key)
+            if future is not None:
+                stats.coalesced += 1
+                _set_origin(True)
+                logger.info("Waiting for the same %s search already running. %s\n", provider, stats)
+                return None, future, False
+
+            stats.misses += 1
+            future = Future()
+            # Running futures cannot be cancelled by a waiting caller
+            future.set_running_or_notify_cancel()
+            self._in_flight[key] = future
+            return None, future, True
+
+    async def _run_search(self, provider: str, key: str, search: Callable[[], Awaitable[Any]]) -> Any:
+        """Run a search and cache its results."""
+        start: float = time.monotonic()
+        results: Any = await search()
+        latency: float = time.monotonic() - start
+        logger.debug("Searched %s in %.2f s\n", provider, latency)
+        # The task runs in a copy of the context of the caller, sharing its origin
+        _set_origin(False, latency)
+        self._put(key, results, latency)
+        return results
+
+    def _settle(self, key: str, future: Future, task: asyncio.Task):
+        """Pass the outcome of a search to the callers waiting for it."""
+        if task.cancelled():
+            self._finish(key, future, exception=asyncio.CancelledError())
+        elif task.exception() is not None:
+            self._finish(key, future, exception=task.exception())
+        else:
+            self._finish(key, future, results=task.result())
+
+    def _finish(self, key: str, future: Future, results: Any = None, exception: Optional[BaseException] = None):
+        """Stop coalescing a search, and pass its outcome to the callers waiting for it."""
+        with self._lock:
+            self._in_flight.pop(key, None)
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(results)
+
+    def _put(self, key: str, results: Any, latency: float):
+        """Cache the results of a search, unless they are empty or an error message."""
+        if not results or isinstance(results, str):
+            return
+        entry = _Entry(results, latency, time.time())
+        with self._lock:
+            self._store(key, entry)
+            self._write(key, entry)
+
+    def _store(self, key: str, entry: _Entry):
+        """Keep an entry in memory, evicting the least recently used ones beyond the maximum count."""
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _read(self, key: str, ttl: float) -> Optional[_Entry]:
+        """Read a live entry from disk, if there is a disk tier."""
+        if self.path is None:
+            return None
+        row: Optional[tuple] = (
+            self._connect().execute("SELECT results, latency, created FROM results WHERE key = ?", (key,)).fetchone()
+        )
+        if row is None or time.time() - row[2] > ttl:
+            return None
+        return _Entry(json.loads(row[0]), row[1], row[2])
+
+    def _write(self, key: str, entry: _Entry):
+        """Write an entry to disk, if there is a disk tier and the results can be serialized."""
+        if self.path is None:
+            return
+        try:
+            serialized: str = json.dumps(entry.results)
+        except (TypeError, ValueError) as error:
+            logger.debug("Not writing search results to disk: %s\n", error)
+            return
+        self._connect().execute(
+            "INSERT OR REPLACE INTO results (key, results, latency, created) VALUES (?, ?, ?, ?)",
+            (key, serialized, entry.latency, entry.created),
+        )
+        self._connection.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the SQLite file on first use, so that importing the module does not create it."""
+        if self._connection is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS results "
+                "(key TEXT PRIMARY KEY, results TEXT NOT NULL, latency REAL NOT NULL, created REAL NOT NULL)"
+            )
+            self._connection.commit()
+            logger.info("Using search cache at: %s\n", self.path)
+        return self._connection
+
+
+def _set_origin(cached: bool, latency: Optional[float] = None):
+    """Tell the caller of a search, if it asked, where its results came from."""
+    origin: Optional[SearchOrigin] = SEARCH_ORIGIN.get()
+    if origin is not None:
+        origin.cached = cached
+        origin.latency = latency
+
+
+def get_search_key(provider: str, query: str, params: Optional[Dict[str, Any]]) -> str:
+    """
+    :param provider: Name of the search provider
+    :param query: Search query
+    :param params: Other parameters of the search changing its results
+    :return: Cache key of the search
+    """
+    key: str = json.dumps([provider, normalize_query(query), params or {}], sort_keys=True, default=str)
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+SEARCH_CACHE = SearchCache()
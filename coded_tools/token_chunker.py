@@ -0,0 +1,108 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+# END COPYRIGHT
+
+import logging
+from functools import lru_cache
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import tiktoken
+from langchain_core.documents import Document
+
+# Encoding of the OpenAI embedding models
+DEFAULT_ENCODING_NAME = "cl100k_base"
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def get_encoding(encoding_name: str = DEFAULT_ENCODING_NAME) -> tiktoken.Encoding:
+    """
+    :param encoding_name: Name of the tiktoken encoding
+    :return: The encoding, loaded once per process
+    """
+    return tiktoken.get_encoding(encoding_name)
+
+
+class TokenChunker:
+    """
+    Splits documents into overlapping windows of a fixed number of tokens.
+
+    Each document is encoded once, and the text of every window is sliced from the document
+    at the character offsets of its first and last tokens, so overlapping tokens are neither
+    encoded nor decoded twice.
+    """
+
+    def __init__(self, chunk_size: int, chunk_overlap: int, encoding: Optional[tiktoken.Encoding] = None):
+        """
+        :param chunk_size: Number of tokens per chunk
+        :param chunk_overlap: Number of tokens shared by consecutive chunks
+        :param encoding: Encoding counting the tokens. Defaults to the encoding of the OpenAI embedding models.
+        :raises ValueError: If the chunk size is not positive or the overlap is not smaller than the chunk size
+        """
+        if chunk_size <= 0:
+            raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+        if not 0 <= chunk_overlap < chunk_size:
+            raise ValueError(f"chunk_overlap must be between 0 and chunk_size - 1, got {chunk_overlap}")
+
+        self.chunk_size: int = chunk_size
+        self.chunk_overlap: int = chunk_overlap
+        self.encoding: tiktoken.Encoding = encoding or get_encoding()
+
+    def split_text(self, text: str) -> List[Tuple[int, str]]:
+        """
+        Split a text into overlapping windows of tokens.
+
+        :param text: Text to split
+        :return: List of (character offset, text) pairs of the chunks
+        """
+        tokens: List[int] = self.encoding.encode_ordinary(text)
+        if not tokens:
+            return []
+
+        decoded, offsets = self.encoding.decode_with_offsets(tokens)
+        # Offset after the last token, so that the last window runs to the end of the text
+        offsets.append(len(decoded))
+
+        chunks: List[Tuple[int, str]] = []
+        step: int = self.chunk_size - self.chunk_overlap
+        for start in range(0, len(tokens), step):
+            end: int = min(start + self.chunk_size, len(tokens))
+            chunk: str = decoded[offsets[start] : offsets[end]]
+            if chunk.strip():
+                chunks.append((offsets[start], chunk))
+            if end == len(tokens):
+                break
+        return chunks
+
+    def split_documents(self, docs: List[Document]) -> List[Document]:
+        """
+        Split documents into overlapping windows of tokens.
+
+        :param docs: Documents to split
+        :return: Chunks, with the metadata of their document and the character offset of the chunk as "start_index"
+        """
+        return [
+            Document(page_content=chunk, metadata={**doc.metadata, "start_index": start_index})
+            for doc in docs
+            for start_index, chunk in self.split_text(doc.page_content)
+        ]
+
+
+@lru_cache(maxsize=32)
+def get_token_chunker(chunk_size: int, chunk_overlap: int) -> TokenChunker:
+    """
+    :param chunk_size: Number of tokens per chunk
+    :param chunk_overlap: Number of tokens shared by consecutive chunks
+    :return: A chunker shared by all the callers with the same configuration
+    """
+    return TokenChunker(chunk_size, chunk_overlap)
@@ -0,0 +1,148 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+# END COPYRIGHT
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+from typing import Hashable
+from typing import Optional
+from typing import Tuple
+
+from langchain_core.vectorstores import VectorStore
+
+# Seconds a built vector store is served before it is rebuilt
+DEFAULT_TTL = 3600.0
+# Maximum number of vector stores kept in the process
+DEFAULT_MAX_ENTRIES = 16
+
+logger = logging.getLogger(__name__)
+
+
+def make_registry_key(*parts: Any) -> Tuple[str, str]:
+    """
+    Build a registry key from the parts identifying a vector store,
+    e.g. the tool, its sources, the splitter configuration and the embedding model.
+
+    :param parts: JSON-serializable values identifying the vector store. The first part names it in the logs.
+    :return: Hashable key which does not hold the parts themselves, as they may contain credentials
+    """
+    digest = hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    return str(parts[0]), digest
+
+
+@dataclass
+class _Entry:
+    """A vector store that is built or being built, and when its build started."""
+
+    task: "asyncio.Future[Optional[VectorStore]]"
+    created: float
+
+
+class VectorStoreRegistry:
+    """
+    Process-wide registry of built vector stores, so that RAG tools do not rebuild
+    their index on every invocation.
+
+    Construction is single-flight: concurrent requests for the same key wait on one build.
+    Entries expire after a TTL and the least recently used entries are evicted beyond a maximum count.
+    Builds that fail or return None are not cached.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        :param ttl: Seconds a built vector store is served before it is rebuilt
+        :param max_entries: Maximum number of vector stores kept
+        """
+        self.ttl: float = ttl
+        self.max_entries: int = max_entries
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+
+    async def get_or_build(
+        self, key: Hashable, build: Callable[[], Awaitable[Optional[VectorStore]]]
+    ) -> Optional[VectorStore]:
+        """
+        Get the vector store registered under the key, building it if needed.
+
+        :param key: Key identifying the vector store, see make_registry_key()
+        :param build: Coroutine function building the vector store
+        :return: The vector store, or None if the build failed
+        """
+        entry: Optional[_Entry] = self._get_entry(key)
+        if entry is None:
+            logger.info("Building vector store for %s\n", key[0] if isinstance(key, tuple) else key)
+            entry = _Entry(asyncio.ensure_future(build()), time.monotonic())
+            self._entries[key] = entry
+            self._evict()
+        else:
+            logger.info("Reusing vector store for %s\n", key[0] if isinstance(key, tuple) else key)
+
+        try:
+            # Shield the build, so that a cancelled caller does not cancel it for the others
+            vectorstore: Optional[VectorStore] = await asyncio.shield(entry.task)
+        except Exception:
+            self._discard(key, entry)
+            raise
+
+        if vectorstore is None:
+            self._discard(key, entry)
+        return vectorstore
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """
+        Drop a vector store from the registry, so that it is rebuilt on next use.
+
+        :param key: Key of the vector store to drop. All vector stores are dropped if None.
+        """
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _get_entry(self, key: Hashable) -> Optional[_Entry]:
+        """Get a live entry for the key, dropping it if it expired or belongs to another event loop."""
+        entry: Optional[_Entry] = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expired: bool = entry.task.done() and time.monotonic() - entry.created > self.ttl
+        if expired or entry.task.get_loop() is not asyncio.get_running_loop():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return entry
+
+    def _discard(self, key: Hashable, entry: _Entry):
+        """Remove the entry of a failed build, unless it was already replaced."""
+        if self._entries.get(key) is entry:
+            del self._entries[key]
+
+    def _evict(self):
+        """Evict the least recently used entries beyond the maximum count."""
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+VECTOR_STORE_REGISTRY = VectorStoreRegistry(
+    ttl=float(os.getenv("VECTOR_STORE_REGISTRY_TTL") or DEFAULT_TTL),
+    max_entries=int(os.getenv("VECTOR_STORE_REGISTRY_MAX_ENTRIES") or DEFAULT_MAX_ENTRIES),
+)
@@ -0,0 +1,242 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+# END COPYRIGHT
+
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.vectorstores import VectorStore
+
+from coded_tools.hybrid_retriever import DEFAULT_RRF_K
+from coded_tools.hybrid_retriever import reciprocal_rank_fusion
+from coded_tools.numpy_vector_store import NumpyVectorStore
+
+# Namespaces name files and are stored in metadata, so only simple names are allowed
+NAMESPACE_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+# Suffix of the manifest listing the shards of a vector store file
+SHARDS_MANIFEST_SUFFIX = ".shards.json"
+# Metadata key holding the namespace of every chunk
+NAMESPACE_METADATA_KEY = "namespace"
+# Maximum estimated memory of the shards loaded to serve queries of other namespaces
+DEFAULT_MAX_SHARD_BYTES = int(os.getenv("VECTOR_STORE_SHARD_MEMORY_MB") or 1024) * 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+def validate_namespace(namespace: str) -> str:
+    """
+    :param namespace: Name of a namespace
+    :return: The namespace
+    :raises ValueError: If the namespace is not 1 to 64 letters, digits, underscores or hyphens
+    """
+    if not isinstance(namespace, str) or not NAMESPACE_PATTERN.match(namespace):
+        raise ValueError(f"Invalid namespace {namespace!r}: use 1 to 64 letters, digits, '_' or '-'")
+    return namespace
+
+
+def get_shard_path(path: str, namespace: str) -> str:
+    """
+    :param path: Path of the vector store file
+    :param namespace: Name of a namespace
+    :return: Path of the file of the shard of the namespace, next to the vector store file
+    """
+    stem, extension = os.path.splitext(path)
+    return f"{stem}.{namespace}{extension}"
+
+
+def get_shards_manifest_path(path: str) -> str:
+    """
+    :param path: Path of the vector store file
+    :return: Path of the manifest listing its shards
+    """
+    return os.path.splitext(path)[0] + SHARDS_MANIFEST_SUFFIX
+
+
+def estimate_store_bytes(vectorstore: VectorStore) -> int:
+    """
+    :param vectorstore: An in-process vector store
+    :return: Rough number of bytes of memory used by its vectors and texts
+    """
+    if isinstance(vectorstore, NumpyVectorStore):
+        return vectorstore.memory_bytes() + sum(len(text) for text in vectorstore.texts)
+    # InMemoryVectorStore keeps a dictionary of id to document record, with vectors as lists of floats
+    records: Dict[str, Dict] = getattr(vectorstore, "store", {})
+    return sum(len(record["text"]) + 8 * len(record["vector"]) for record in records.values())
+
+
+class ShardManifest:
+    """
+    Lists the namespaces of a vector store file, with the file and the number of chunks of their shard.
+    """
+
+    def __init__(self, path: str, shards: Optional[Dict[str, Dict[str, Any]]] = None):
+        """
+        :param path: Path of the manifest file
+        :param shards: Shard of every namespace
+        """
+        self.path: str = path
+        self.shards: Dict[str, Dict[str, Any]] = shards or {}
+
+    @classmethod
+    def load(cls, path: str) -> "ShardManifest":
+        """
+        Load a manifest, or start an empty one if it does not exist or cannot be read.
+
+        :param path: Path of the manifest file
+        :return: The manifest
+        """
+        try:
+            with open(path, "r", encoding="utf-8") as manifest_file:
+                return cls(path, json.load(manifest_file).get("shards", {}))
+        except FileNotFoundError:
+            return cls(path)
+        except (OSError, ValueError) as error:
+            logger.error("Failed to read shard manifest %s: %s. Starting a new one.\n", path, error)
+            return cls(path)
+
+    def record(self, namespace: str, shard_path: str, chunks: int):
+        """Record the shard of a namespace."""
+        self.shards[namespace] = {"file": os.path.basename(shard_path), "chunks": chunks, "updated": time.time()}
+
+    def save(self):
+        """Write the manifest to a temporary file, then replace the manifest with it."""
+        with open(self.path + ".tmp", "w", encoding="utf-8") as manifest_file:
+            json.dump({"shards": self.shards}, manifest_file, indent=2, sort_keys=True)
+        os.replace(self.path + ".tmp", self.path)
+
+
+@dataclass
+class _Shard:
+    """A loaded shard, its estimated memory and the modification time of its file when loaded."""
+
+    vectorstore: VectorStore
+    size: int
+    modified: float
+
+
+class ShardCache:
+    """
+    Process-wide cache of the shards loaded to serve queries of other namespaces than the one
+    a tool indexes. Shards are loaded independently, and reloaded when their file changes.
+    The least recently used shards are evicted once their estimated memory exceeds a cap.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_SHARD_BYTES):
+        """
+        :param max_bytes: Maximum estimated memory of the loaded shards
+        """
+        self.max_bytes: int = max_bytes
+        self._shards: OrderedDict[str, _Shard] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: str, load: Callable[[str], VectorStore]) -> Optional[VectorStore]:
+        """
+        Get the shard persisted at a path, loading it if needed.
+
+        :param path: Path of the shard file
+        :param load: Function loading a shard from its path
+        :return: The shard, or None if it does not exist
+        """
+        try:
+            modified: float = os.path.getmtime(path)
+        except OSError:
+            logger.warning("Shard %s does not exist\n", path)
+            return None
+
+        with self._lock:
+            shard: Optional[_Shard] = self._shards.get(path)
+            if shard is not None and shard.modified == modified:
+                self._shards.move_to_end(path)
+                return shard.vectorstore
+
+        vectorstore: VectorStore = load(path)
+        self.put(path, vectorstore, modified)
+        return vectorstore
+
+    def put(self, path: str, vectorstore: VectorStore, modified: Optional[float] = None):
+        """
+        Register the shard of a path, e.g. right after it was built and saved.
+
+        :param path: Path of the shard file
+        :param vectorstore: The shard
+        :param modified: Modification time of the shard file. Read from the file if None.
+        """
+        if modified is None:
+            try:
+                modified = os.path.getmtime(path)
+            except OSError:
+                return
+
+        with self._lock:
+            self._shards[path] = _Shard(vectorstore, estimate_store_bytes(vectorstore), modified)
+            self._shards.move_to_end(path)
+            self._evict()
+
+    def evict(self, path: str):
+        """Drop the shard of a path."""
+        with self._lock:
+            self._shards.pop(path, None)
+
+    @property
+    def size(self) -> int:
+        """Estimated memory of the loaded shards."""
+        return sum(shard.size for shard in self._shards.values())
+
+    def __len__(self) -> int:
+        return len(self._shards)
+
+    def _evict(self):
+        """Evict the least recently used shards beyond the memory cap, keeping at least the last one."""
+        while len(self._shards) > 1 and self.size > self.max_bytes:
+            path, _ = self._shards.popitem(last=False)
+            logger.info("Evicted shard %s from memory\n", path)
+
+
+class MultiShardRetriever(BaseRetriever):
+    """
+    Retriever querying the retrievers of several shards concurrently, and merging their results
+    by reciprocal rank fusion, as the scores of lexical searches are not comparable across shards.
+    """
+
+    retrievers: List[BaseRetriever]
+    # Number of documents to return
+    k: int = 4
+    rrf_k: int = DEFAULT_RRF_K
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        rankings: List[List[Document]] = [retriever.invoke(query) for retriever in self.retrievers]
+        return reciprocal_rank_fusion(rankings, self.k, self.rrf_k)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        rankings: List[List[Document]] = await asyncio.gather(
+            *(retriever.ainvoke(query) for retriever in self.retrievers)
+        )
+        return reciprocal_rank_fusion(rankings, self.k, self.rrf_k)
+
+
+SHARD_CACHE = ShardCache()
@@ -13,10 +13,13 @@ import logging
 from typing import Any
 from typing import Dict
 
-from langchain_community.retrievers import WikipediaRetriever
 from neuro_san.interfaces.coded_tool import CodedTool
 
 from .base_rag import BaseRag
+from .research_cache import DEFAULT_TTL
+from .research_cache import RESEARCH_CACHE
+from .research_cache import CachedResearchRetriever
+from .research_cache import WikipediaSource
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
@@ -36,6 +39,10 @@ class WikipediaRag(CodedTool):
             "lang": language code for Wikipedia articles (default is "en")
             "top_k_results": number of top results to return (default is 3)
             "doc_content_chars_max": maximum number of characters to keep in each document (default is 4000)
+            "cache_ttl_seconds": seconds the search results and pages are served from the local cache
+                before they are fetched again (default is RESEARCH_CACHE_TTL_SECONDS or one day)
+            "prefetch": whether to refresh, in the background, the cached pages frequently returned
+                with the ones of the query before they expire (default is False)
 
         :param sly_data: A dictionary whose keys are defined by the agent
             hierarchy, but whose values are meant to be kept out of the
@@ -61,11 +68,17 @@ class WikipediaRag(CodedTool):
             logger.error("Missing required input: 'query' (retrieval question).")
             return "❌ Missing required input: 'query'."
 
-        # Initialize WikipediaRetriever with the provided arguments
-        retriever = WikipediaRetriever(
+        # Search Wikipedia through the persistent cache, fetching the pages that are not cached concurrently
+        source = WikipediaSource(
             lang=str(args.get("lang", "en")),
             top_k_results=int(args.get("top_k_results", 3)),
             doc_content_chars_max=int(args.get("doc_content_chars_max", 4000)),
         )
+        retriever = CachedResearchRetriever(
+            source=source,
+            cache=RESEARCH_CACHE,
+            ttl=float(args.get("cache_ttl_seconds", DEFAULT_TTL)),
+            prefetch=bool(args.get("prefetch", False)),
+        )
 
         return await BaseRag.query_retriever(retriever, query)
@@ -0,0 +1,129 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from typing import Set
+from unittest import TestCase
+
+from coded_tools.async_http_client import AsyncHttpClient
+from coded_tools.brave_search import BraveSearch
+from coded_tools.google_search import GoogleSearch
+
+SEARCH_RESPONSE = {
+    "items": [{"title": "Neuro SAN", "link": "https://example.com/neuro-san", "snippet": "Agent networks"}],
+    "web": {"results": [{"title": "Neuro SAN", "url": "https://example.com/neuro-san", "description": "Agents"}]},
+}
+
+
+class SearchHandler(BaseHTTPRequestHandler):
+    """Serve a search response over keep-alive connections, recording connections and concurrent requests."""
+
+    protocol_version = "HTTP/1.1"
+    # Client ports of the connections served, and number of requests served at once
+    client_ports: Set[int] = set()
+    running: int = 0
+    max_running: int = 0
+    lock = threading.Lock()
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Serve the search response, after the delay of the path if any."""
+        with self.lock:
+            SearchHandler.client_ports.add(self.client_address[1])
+            SearchHandler.running += 1
+            SearchHandler.max_running = max(SearchHandler.max_running, SearchHandler.running)
+        if self.path.startswith("/slow"):
+            time.sleep(0.2)
+        with self.lock:
+            SearchHandler.running -= 1
+
+        content: bytes = json.dumps(SEARCH_RESPONSE).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Keep the test output quiet."""
+
+
+class TestAsyncHttpClient(TestCase):
+    """
+    Unit tests for the pooled asynchronous HTTP client, and the search tools using it, against a local HTTP server.
+    """
+
+    def setUp(self):
+        SearchHandler.client_ports = set()
+        SearchHandler.running = 0
+        SearchHandler.max_running = 0
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), SearchHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.client = AsyncHttpClient(provider_concurrency=2, http2=False)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connections_are_kept_alive(self):
+        """
+        Sequential requests should reuse one connection.
+        """
+
+        async def search() -> list:
+            results = [await self.client.get_json("search", f"{self.base_url}/search", 5.0) for _ in range(5)]
+            await self.client.aclose()
+            return results
+
+        results = asyncio.run(search())
+        self.assertEqual(results[-1], SEARCH_RESPONSE)
+        self.assertEqual(len(SearchHandler.client_ports), 1)
+
+    def test_provider_limit_and_deadline(self):
+        """
+        Requests to a provider should not exceed its limit, and the deadline should include waiting for the limit.
+        """
+
+        async def search():
+            await asyncio.gather(
+                *(
+                    self.client.get_json("slow", f"{self.base_url}/slow", 5.0, params={"q": index})
+                    for index in range(6)
+                )
+            )
+            self.assertEqual(SearchHandler.max_running, 2)
+
+            # The third request waits for the first two, so does not complete before its deadline
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.gather(*(self.client.get_json("slow", f"{self.base_url}/slow", 0.3) for _ in range(3)))
+            await self.client.aclose()
+
+        asyncio.run(search())
+
+    def test_search_tools_run_on_the_event_loop(self):
+        """
+        The search tools should search natively on the event loop, with the same results as their sync path.
+        """
+        google = GoogleSearch()
+        brave = BraveSearch()
+        args = {"search_terms": "neuro san", "google_url": self.base_url, "brave_url": self.base_url}
+
+        google_results = asyncio.run(google.async_invoke(args, {}))
+        self.assertEqual(google_results, [SEARCH_RESPONSE["items"][0]])
+        self.assertEqual(google_results, google.invoke(args, {}))
+
+        brave_results = asyncio.run(brave.async_invoke(args, {}))
+        self.assertEqual(brave_results[0]["url"], "https://example.com/neuro-san")
+        self.assertEqual(brave_results, brave.invoke(args, {}))
+        self.assertEqual(asyncio.run(brave.async_invoke({}, {})), "Error: No 'search terms' or 'q' provided.")
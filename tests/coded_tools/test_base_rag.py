@@ -0,0 +1,233 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+import asyncio
+import os
+import tempfile
+from typing import Any
+from typing import Dict
+from typing import List
+from unittest import TestCase
+from unittest.mock import patch
+
+import tiktoken
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from coded_tools.base_rag import BaseRag
+from coded_tools.index_manifest import fingerprint_locations
+from coded_tools.query_cache import QUERY_CACHE
+from coded_tools.query_cache import bump_index_version
+from coded_tools.vector_store_registry import VECTOR_STORE_REGISTRY
+
+# Byte-level encoding with one token per byte, which needs no download
+BYTE_ENCODING = tiktoken.Encoding(
+    name="bytes",
+    pat_str=r"\S+|\s+",
+    mergeable_ranks={bytes([byte]): byte for byte in range(256)},
+    special_tokens={},
+)
+
+
+class TextFileRag(BaseRag):
+    """
+    BaseRag implementation over local text files, recording which files were loaded.
+    """
+
+    def __init__(self):
+        with patch.dict(os.environ, {"OPENAI_API_KEY": "fake-key"}):
+            super().__init__()
+        self.embeddings = DeterministicFakeEmbedding(size=8)
+        self.loaded_paths: List[str] = []
+        self.vectorstore = None
+
+    async def load_documents(self, loader_args: Dict[str, Any]) -> List[Document]:
+        docs: List[Document] = []
+        for path in loader_args.get("paths", []):
+            self.loaded_paths.append(path)
+            with open(path, "r", encoding="utf-8") as text_file:
+                docs.append(Document(page_content=text_file.read(), metadata={"source": path}))
+        return docs
+
+    def _split_documents(self, docs: List[Document]) -> List[Document]:
+        # Keep each file as a single chunk, so that no tokenizer has to be downloaded
+        return docs
+
+    async def fingerprint_sources(self, loader_args: Dict[str, Any]) -> Dict[str, str]:
+        return await fingerprint_locations(loader_args.get("paths", []))
+
+    def select_sources(self, loader_args: Dict[str, Any], sources: List[str]) -> Dict[str, Any]:
+        return {**loader_args, "paths": sources}
+
+
+class TestBaseRag(TestCase):
+    """
+    Unit tests for BaseRag class.
+    """
+
+    def setUp(self):
+        """Create a directory with text files to index."""
+        # pylint: disable=consider-using-with
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.paths = [os.path.join(self.tmp_dir.name, f"doc_{index}.txt") for index in range(3)]
+        for index, path in enumerate(self.paths):
+            self._write(path, f"Document {index} is about topic {index}.")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    @staticmethod
+    def _write(path: str, text: str):
+        with open(path, "w", encoding="utf-8") as text_file:
+            text_file.write(text)
+
+    def _build(self, paths: List[str]) -> TextFileRag:
+        """Build the vector store incrementally from the given files and return the tool used."""
+        rag = TextFileRag()
+        rag.incremental_indexing = True
+        rag.save_vector_store = True
+        rag.configure_vector_store_path(os.path.join(self.tmp_dir.name, "store.json"))
+        rag.vectorstore = asyncio.run(rag.generate_vector_store({"paths": paths}))
+        return rag
+
+    def test_incremental_indexing_only_loads_changed_sources(self):
+        """
+        Only new or modified files should be loaded again, and the chunks of removed files should be deleted.
+        """
+        rag = self._build(self.paths)
+        self.assertEqual(sorted(rag.loaded_paths), sorted(self.paths))
+
+        rag = self._build(self.paths)
+        self.assertEqual(rag.loaded_paths, [])
+
+        self._write(self.paths[1], "Document 1 was rewritten with much longer content.")
+        os.utime(self.paths[1], ns=(1, 1))
+        rag = self._build(self.paths[:2])
+        self.assertEqual(rag.loaded_paths, [self.paths[1]])
+
+        sources = {doc["metadata"]["source"] for doc in rag.vectorstore.store.values()}
+        texts = [doc["text"] for doc in rag.vectorstore.store.values()]
+        self.assertEqual(sources, set(self.paths[:2]))
+        self.assertIn("Document 1 was rewritten with much longer content.", texts)
+
+    def test_unreachable_sources_are_kept(self):
+        """
+        A source which fails to be fingerprinted should keep its chunks, and a source which is gone should not.
+        """
+        self._build(self.paths)
+        stat = os.stat
+
+        def flaky_stat(path, *args, **kwargs):
+            if path == self.paths[1]:
+                raise PermissionError(path)
+            return stat(path, *args, **kwargs)
+
+        os.remove(self.paths[2])
+        with patch("coded_tools.index_manifest.os.stat", flaky_stat):
+            rag = self._build(self.paths)
+        self.assertEqual(rag.loaded_paths, [])
+        self.assertEqual({doc["metadata"]["source"] for doc in rag.vectorstore.store.values()}, set(self.paths[:2]))
+
+        # Once reachable again, the unchanged source is not indexed again
+        rag = self._build(self.paths)
+        self.assertEqual(rag.loaded_paths, [])
+
+    def test_manifest_is_not_saved_without_the_store(self):
+        """
+        Sources indexed into a store that failed to save should be indexed again by the next build.
+        """
+        self._build(self.paths[:2])
+        with patch("langchain_community.vectorstores.InMemoryVectorStore.dump", side_effect=OSError("disk full")):
+            rag = self._build(self.paths)
+        self.assertEqual(rag.loaded_paths, [self.paths[2]])
+
+        rag = self._build(self.paths)
+        self.assertEqual(rag.loaded_paths, [self.paths[2]])
+        self.assertEqual({doc["metadata"]["source"] for doc in rag.vectorstore.store.values()}, set(self.paths))
+
+    def test_streaming_ingestion_stores_all_chunks(self):
+        """
+        Streaming ingestion should store the same chunks as loading all the documents first,
+        splitting and upserting them in several batches.
+        """
+        rag = TextFileRag()
+        rag.streaming_ingestion = True
+
+        with patch("coded_tools.base_rag.STREAM_BATCH_SIZE", 2):
+            vectorstore = asyncio.run(rag.generate_vector_store({"paths": self.paths}))
+
+        self.assertEqual(rag.loaded_paths, self.paths)
+        self.assertEqual(
+            sorted(doc["text"] for doc in vectorstore.store.values()),
+            [f"Document {index} is about topic {index}." for index in range(3)],
+        )
+
+    def test_query_results_are_cached_per_index(self):
+        """
+        A repeated query should be served from the query cache until the vector store is rebuilt.
+        """
+        rag = TextFileRag()
+        QUERY_CACHE.invalidate()
+        vectorstore = asyncio.run(rag.generate_vector_store({"paths": self.paths}))
+
+        with (
+            patch("coded_tools.result_packer.get_encoding", return_value=BYTE_ENCODING),
+            patch.object(BaseRag, "retrieve_documents", wraps=BaseRag.retrieve_documents) as retrieve_documents,
+        ):
+            first = asyncio.run(rag.query_vectorstore(vectorstore, "What is topic 1?"))
+            second = asyncio.run(rag.query_vectorstore(vectorstore, "  what is TOPIC 1 "))
+            self.assertEqual(first, second)
+            self.assertEqual(retrieve_documents.call_count, 1)
+
+            VECTOR_STORE_REGISTRY.invalidate()
+            rebuilt = asyncio.run(rag.generate_vector_store({"paths": self.paths}))
+            self.assertEqual(asyncio.run(rag.query_vectorstore(rebuilt, "What is topic 1?")), first)
+            self.assertEqual(retrieve_documents.call_count, 2)
+
+            # Documents added in place give the vector store a new version
+            asyncio.run(rebuilt.aadd_documents([Document(page_content="Topic 1 has news.")]))
+            bump_index_version(rebuilt)
+            self.assertIn("Topic 1 has news.", asyncio.run(rag.query_vectorstore(rebuilt, "What is topic 1?")))
+            self.assertEqual(retrieve_documents.call_count, 3)
+
+    def test_namespaces_are_sharded_and_queried_together(self):
+        """
+        Every namespace should be saved to its own shard, and a query should merge the shards of its namespaces.
+        """
+        store_path = os.path.join(self.tmp_dir.name, "store.json")
+        for namespace, paths in (("first", self.paths[:2]), ("second", self.paths[2:])):
+            rag = TextFileRag()
+            rag.save_vector_store = True
+            rag.configure_vector_store_path(store_path)
+            rag.configure_namespaces(namespace, ["first", "second"])
+            vectorstore = asyncio.run(rag.generate_vector_store({"paths": paths}))
+
+        self.assertTrue(os.path.exists(os.path.join(self.tmp_dir.name, "store.first.json")))
+        self.assertTrue(os.path.exists(os.path.join(self.tmp_dir.name, "store.second.json")))
+        self.assertFalse(os.path.exists(store_path))
+
+        with patch("coded_tools.result_packer.get_encoding", return_value=BYTE_ENCODING):
+            result = asyncio.run(rag.query_vectorstore(vectorstore, "What is topic 1?"))
+        for index in range(3):
+            self.assertIn(f"Document {index} is about topic {index}.", result)
+
+    def test_reranking_returns_the_best_candidates(self):
+        """
+        The reranker should rescore the over-fetched candidates and return the best k.
+        """
+        rag = TextFileRag()
+        rag.configure_query_cache(False)
+        rag.configure_reranking("lexical", rerank_candidates=3)
+        rag.search_kwargs = {"k": 1}
+        vectorstore = asyncio.run(rag.generate_vector_store({"paths": self.paths}))
+
+        with patch("coded_tools.result_packer.get_encoding", return_value=BYTE_ENCODING):
+            result = asyncio.run(rag.query_vectorstore(vectorstore, "Which document is about topic 2?"))
+        self.assertIn("Document 2 is about topic 2.", result)
+        self.assertNotIn("Document 0", result)
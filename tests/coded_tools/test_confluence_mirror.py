@@ -0,0 +1,203 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from typing import Any
+from typing import Dict
+from typing import Iterator
+from typing import List
+from unittest import TestCase
+
+from coded_tools.confluence_mirror import ConfluenceMirror
+from coded_tools.confluence_mirror import get_mirror_path
+
+BASE_URL = "https://example.atlassian.net/wiki"
+
+
+class FakeResponse:
+    """Streamed response of the fake Confluence session."""
+
+    def __init__(self, content: bytes):
+        self.content: bytes = content
+
+    def __enter__(self) -> "FakeResponse":
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def raise_for_status(self):
+        """Responses of the fake session always succeed."""
+
+    def iter_content(self, block_size: int) -> Iterator[bytes]:
+        """Yield the content in blocks."""
+        for start in range(0, len(self.content), block_size):
+            yield self.content[start : start + block_size]
+
+
+class FakeConfluence:  # pylint: disable=too-many-instance-attributes
+    """Stand-in for the Confluence REST client, with pages, attachments and request counts."""
+
+    def __init__(self, n_pages: int):
+        self.pages: Dict[str, Dict[str, Any]] = {}
+        for index in range(n_pages):
+            self.edit(str(index), f"<p>Body of page <b>{index}</b></p>")
+        self.attachments: Dict[str, List[Dict[str, Any]]] = {}
+        self.files: Dict[str, bytes] = {}
+        self.page_fetches: List[str] = []
+        self.downloads: List[str] = []
+        self.running: int = 0
+        self.max_running: int = 0
+        self.session = self
+        self._lock = threading.Lock()
+
+    def edit(self, page_id: str, body: str):
+        """Create a page, or save a new version of it."""
+        version: int = self.pages.get(page_id, {}).get("version", {}).get("number", 0) + 1
+        self.pages[page_id] = {
+            "id": page_id,
+            "title": f"Page {page_id}",
+            "version": {"number": version, "when": f"2025-01-0{version}"},
+            "body": {"storage": {"value": body}},
+            "_links": {"webui": f"/spaces/DEMO/pages/{page_id}"},
+        }
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def attach(self, page_id: str, attachment_id: str, title: str, content: bytes, version: int = 1):
+        """Attach a text file to a page."""
+        self.attachments.setdefault(page_id, [])
+        self.attachments[page_id] = [item for item in self.attachments[page_id] if item["id"] != attachment_id]
+        link: str = f"/download/attachments/{page_id}/{title}?version={version}"
+        self.attachments[page_id].append(
+            {
+                "id": attachment_id,
+                "title": title,
+                "version": {"number": version},
+                "metadata": {"mediaType": "text/plain"},
+                "_links": {"download": link},
+            }
+        )
+        self.files[BASE_URL + link] = content
+
+    def get_all_pages_from_space(self, space: str, start: int, limit: int, expand: str) -> List[Dict[str, Any]]:
+        """List the version of the pages of the space."""
+        # pylint: disable=unused-argument
+        ids: List[str] = sorted(self.pages, key=int)[start : start + limit]
+        return [{key: value for key, value in self.pages[page_id].items() if key != "body"} for page_id in ids]
+
+    def get_page_by_id(self, page_id: str, expand: str) -> Dict[str, Any]:
+        """Get a page with its body, counting the pages fetched at once."""
+        # pylint: disable=unused-argument
+        with self._lock:
+            self.page_fetches.append(page_id)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(0.01)
+        with self._lock:
+            self.running -= 1
+        return self.pages[page_id]
+
+    def get_attachments_from_content(self, page_id: str) -> Dict[str, Any]:
+        """List the attachments of a page."""
+        return {"results": self.attachments.get(page_id, [])}
+
+    def get(self, url: str, stream: bool) -> FakeResponse:
+        """Stream an attachment."""
+        # pylint: disable=unused-argument
+        self.downloads.append(url)
+        return FakeResponse(self.files[url])
+
+
+class TestConfluenceMirror(TestCase):
+    """
+    Unit tests for the local mirror of a Confluence space.
+    """
+
+    def setUp(self):
+        # pylint: disable=consider-using-with
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = get_mirror_path(BASE_URL, "DEMO", self.tmp_dir.name)
+        self.confluence = FakeConfluence(n_pages=150)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _mirror(self, **kwargs) -> ConfluenceMirror:
+        return ConfluenceMirror(self.confluence, BASE_URL, self.path, concurrency=4, sync_interval=0, **kwargs)
+
+    def test_only_changed_pages_are_fetched(self):
+        """
+        The first sync should fetch every page concurrently, and later syncs only the new and changed pages.
+        """
+        fingerprints = asyncio.run(self._mirror().sync("DEMO"))
+        self.assertEqual(len(fingerprints), 150)
+        self.assertEqual(len(self.confluence.page_fetches), 150)
+        self.assertEqual(self.confluence.max_running, 4)
+        self.assertTrue(self.path.startswith(os.path.join(self.tmp_dir.name, "example.atlassian.net")))
+
+        self.confluence.page_fetches.clear()
+        self.confluence.edit("7", "<p>New body</p>")
+        self.confluence.edit("150", "<p>New page</p>")
+        del self.confluence.pages["3"]
+
+        # A new mirror on the same directory, e.g. after a restart, reads the versions it has
+        mirror = self._mirror()
+        fingerprints = asyncio.run(mirror.sync("DEMO"))
+        self.assertEqual(sorted(self.confluence.page_fetches), ["150", "7"])
+        self.assertNotIn("3", fingerprints)
+        self.assertEqual(fingerprints["7"], "2|2025-01-02")
+
+        documents = list(mirror.load(["7", "3", "8"]))
+        self.assertEqual([doc.metadata["id"] for doc in documents], ["7", "8"])
+
+        async def aload():
+            return [doc async for doc in mirror.aload(["7", "3", "8"])]
+
+        self.assertEqual(asyncio.run(aload()), documents)
+        self.assertEqual(documents[0].page_content, "New body")
+        self.assertEqual(documents[1].page_content, "Body of page 8")
+        self.assertEqual(documents[1].metadata["source"], BASE_URL + "/spaces/DEMO/pages/8")
+
+    def test_recent_sync_is_not_listed_again(self):
+        """
+        A mirror synced within the sync interval should not list the space again.
+        """
+        mirror = ConfluenceMirror(self.confluence, BASE_URL, self.path, sync_interval=60)
+        asyncio.run(mirror.sync("DEMO"))
+        self.confluence.edit("1", "<p>Changed</p>")
+        self.assertEqual(asyncio.run(mirror.sync("DEMO"))["1"], "1|2025-01-01")
+
+    def test_attachments_are_streamed_to_disk(self):
+        """
+        Attachments should be written to disk, appended to their page, and only downloaded again when changed.
+        """
+        self.confluence.attach("1", "a1", "notes.txt", b"Meeting notes " * 10_000)
+        self.confluence.attach("1", "a2", "todo.txt", b"Fix the build")
+        mirror = self._mirror(include_attachments=True)
+        asyncio.run(mirror.sync("DEMO"))
+
+        attachment_dir = mirror.get_attachment_dir("1")
+        self.assertEqual(sorted(os.listdir(attachment_dir)), ["a1_notes.txt", "a2_todo.txt"])
+        self.assertEqual(os.path.getsize(os.path.join(attachment_dir, "a1_notes.txt")), 140_000)
+        (document,) = mirror.load(["1"])
+        self.assertTrue(document.page_content.startswith("Body of page 1\n\nnotes.txt\nMeeting notes"))
+        self.assertTrue(document.page_content.endswith("\n\ntodo.txt\nFix the build"))
+
+        # A new version of a page only downloads its changed attachments, and removes the deleted ones
+        self.confluence.downloads.clear()
+        self.confluence.attachments["1"] = [item for item in self.confluence.attachments["1"] if item["id"] == "a2"]
+        self.confluence.attach("1", "a2", "todo.txt", b"Ship it", version=2)
+        self.confluence.edit("1", "<p>Body of page 1</p>")
+        asyncio.run(mirror.sync("DEMO"))
+        self.assertEqual(len(self.confluence.downloads), 1)
+        self.assertEqual(os.listdir(attachment_dir), ["a2_todo.txt"])
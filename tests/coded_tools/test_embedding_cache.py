@@ -0,0 +1,103 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+import asyncio
+import os
+import tempfile
+from typing import List
+from unittest import TestCase
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from coded_tools.embedding_cache import CachedEmbeddings
+from coded_tools.embedding_cache import EmbeddingCache
+from coded_tools.embedding_cache import embedding_cache_key
+
+
+class CountingEmbedding(DeterministicFakeEmbedding):
+    """
+    Fake embedding model that records the texts it was asked to embed.
+    """
+
+    embedded_texts: List[str] = []
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.embedded_texts.extend(texts)
+        return super().embed_documents(texts)
+
+
+class TestEmbeddingCache(TestCase):
+    """
+    Unit tests for EmbeddingCache and CachedEmbeddings classes.
+    """
+
+    def test_key_depends_on_model_dimensions_and_text(self):
+        """
+        The cache key should change whenever the model, the dimensions or the text change.
+        """
+        key = embedding_cache_key("model", 8, "text")
+        self.assertEqual(key, embedding_cache_key("model", 8, "text"))
+        self.assertNotEqual(key, embedding_cache_key("other-model", 8, "text"))
+        self.assertNotEqual(key, embedding_cache_key("model", 16, "text"))
+        self.assertNotEqual(key, embedding_cache_key("model", 8, "other text"))
+
+    def test_only_new_chunks_are_embedded(self):
+        """
+        Chunks that were embedded before should be served from the cache.
+        """
+        model = CountingEmbedding(size=8, embedded_texts=[])
+        embeddings = CachedEmbeddings(model, model="fake", dimensions=8, cache=EmbeddingCache())
+
+        first = embeddings.embed_documents(["a", "b"])
+        second = asyncio.run(embeddings.aembed_documents(["b", "c", "a"]))
+
+        self.assertEqual(model.embedded_texts, ["a", "b", "c"])
+        self.assertEqual(second[0], first[1])
+        self.assertEqual(second[2], first[0])
+
+    def test_cache_persists_to_sqlite(self):
+        """
+        Vectors written by one cache should be readable by a new cache on the same file.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "cache", "embeddings.sqlite")
+            EmbeddingCache(path).put_many({"key": [0.5, -1.0, 2.0]})
+
+            found = EmbeddingCache(path).get_many(["key", "missing"])
+
+        self.assertEqual(found, {"key": [0.5, -1.0, 2.0]})
+
+    def test_memory_lru_is_bounded(self):
+        """
+        The in-memory LRU should evict the least recently used vectors.
+        """
+        cache = EmbeddingCache(max_memory_entries=2)
+        cache.put_many({"a": [1.0], "b": [2.0]})
+        cache.get_many(["a"])
+        cache.put_many({"c": [3.0]})
+
+        self.assertEqual(set(cache.get_many(["a", "b", "c"])), {"a", "c"})
+
+    def test_reduced_precision_is_persisted_compactly(self):
+        """
+        float16 and int8 vectors should be approximations of the vectors, each precision in its own table.
+        """
+        vector: List[float] = [0.5, -0.25, 0.125, -1.0]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "embeddings.sqlite")
+            for precision in ("float16", "int8"):
+                stored = EmbeddingCache(path, precision=precision).put_many({"key": vector})
+                found = EmbeddingCache(path, precision=precision).get_many(["key"])
+                self.assertEqual(found, stored)
+                for value, expected in zip(found["key"], vector):
+                    self.assertAlmostEqual(value, expected, delta=0.01)
+
+            self.assertEqual(EmbeddingCache(path).get_many(["key"]), {})
+        with self.assertRaises(ValueError):
+            EmbeddingCache(precision="int4")
@@ -0,0 +1,134 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+import asyncio
+import time
+from typing import List
+from unittest import TestCase
+from unittest.mock import patch
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from coded_tools.embedding_pipeline import EmbeddingPipeline
+from coded_tools.embedding_pipeline import make_batches
+
+
+class RateLimitedError(Exception):
+    """Error of an embedding model over its rate limit."""
+
+    status_code = 429
+
+
+class FlakyEmbeddings(DeterministicFakeEmbedding):
+    """Fake embedding model which is rate limited on its first calls and records its batches."""
+
+    rate_limited_calls: int = 0
+    in_flight: int = 0
+    max_in_flight: int = 0
+    batches: List[List[str]] = []
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            if self.rate_limited_calls > 0:
+                self.rate_limited_calls -= 1
+                raise RateLimitedError()
+            self.batches.append(texts)
+            return self.embed_documents(texts)
+        finally:
+            self.in_flight -= 1
+
+
+class FailingEmbeddings(DeterministicFakeEmbedding):
+    """Fake embedding model failing on the batches with a bad text, and slow on the others."""
+
+    cancelled: int = 0
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if "bad" in texts:
+            raise ValueError("bad input")
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return self.embed_documents(texts)
+
+
+class TestEmbeddingPipeline(TestCase):
+    """
+    Unit tests for EmbeddingPipeline class.
+    """
+
+    def test_make_batches_respects_the_token_budget(self):
+        """
+        Batches should cover all the texts in order, within the token budget unless a text exceeds it alone.
+        """
+        texts = ["a" * 40, "b" * 40, "c" * 200, "d" * 4, "e" * 4]
+
+        self.assertEqual(make_batches(texts, max_batch_tokens=25), [(0, 2), (2, 3), (3, 5)])
+        self.assertEqual(make_batches(texts, max_batch_tokens=1000, max_batch_size=2), [(0, 2), (2, 4), (4, 5)])
+        self.assertEqual(make_batches([]), [])
+
+    def test_concurrent_batches_keep_the_order(self):
+        """
+        Embeddings should be returned in the order of the texts whatever the order the batches complete in.
+        """
+        embeddings = FlakyEmbeddings(size=8, batches=[])
+        pipeline = EmbeddingPipeline(embeddings, max_batch_tokens=10, max_concurrency=3)
+        texts = [f"text {index}" for index in range(20)]
+
+        vectors = asyncio.run(pipeline.aembed_documents(texts))
+
+        self.assertEqual(vectors, embeddings.embed_documents(texts))
+        self.assertGreater(len(embeddings.batches), 1)
+        self.assertLessEqual(embeddings.max_in_flight, 3)
+
+    @patch("coded_tools.embedding_pipeline.BASE_BACKOFF", 0.001)
+    def test_rate_limited_batches_are_retried(self):
+        """
+        Rate-limited batches should be retried after a backoff until they succeed.
+        """
+        embeddings = FlakyEmbeddings(size=8, batches=[], rate_limited_calls=3)
+        pipeline = EmbeddingPipeline(embeddings, max_batch_tokens=10, max_concurrency=4)
+        texts = [f"text {index}" for index in range(8)]
+
+        vectors = asyncio.run(pipeline.aembed_documents(texts))
+
+        self.assertEqual(vectors, embeddings.embed_documents(texts))
+        self.assertEqual(embeddings.rate_limited_calls, 0)
+
+    def test_other_errors_are_raised(self):
+        """
+        Errors other than rate limits should not be retried.
+        """
+        pipeline = EmbeddingPipeline(FlakyEmbeddings(size=8, batches=[]), max_batch_tokens=10)
+
+        with patch.object(FlakyEmbeddings, "aembed_documents", side_effect=ValueError("bad input")):
+            with self.assertRaises(ValueError):
+                asyncio.run(pipeline.aembed_documents(["text 1", "text 2"]))
+
+    def test_failed_batch_cancels_the_others(self):
+        """
+        A batch failing with an error other than a rate limit should cancel the batches still in flight.
+        """
+        embeddings = FailingEmbeddings(size=8)
+        pipeline = EmbeddingPipeline(embeddings, max_batch_size=1, max_concurrency=4)
+
+        async def embed() -> int:
+            with self.assertRaises(ValueError):
+                await pipeline.aembed_documents(["text 1", "text 2", "bad", "text 3"])
+            return embeddings.cancelled
+
+        start = time.monotonic()
+        # The other batches are cancelled by the time the error is raised, not when the event loop closes
+        self.assertEqual(asyncio.run(embed()), 3)
+        self.assertLess(time.monotonic() - start, 1.0)
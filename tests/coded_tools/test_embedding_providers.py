@@ -0,0 +1,121 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+import asyncio
+import hashlib
+import os
+import tempfile
+from typing import List
+from unittest import TestCase
+
+import numpy as np
+
+from coded_tools.embedding_cache import EmbeddingCache
+from coded_tools.embedding_providers import EmbeddingConfig
+from coded_tools.embedding_providers import LocalEmbeddings
+from coded_tools.embedding_providers import ReducedEmbeddings
+from coded_tools.embedding_providers import create_embeddings
+
+DIMENSIONS = 16
+
+
+class FakeEncoder:
+    """Deterministic stand-in for a sentence-transformers model, recording the size of every batch."""
+
+    def __init__(self):
+        self.batch_sizes: List[int] = []
+
+    def encode(self, texts: List[str], normalize_embeddings: bool = False, **kwargs) -> np.ndarray:
+        """Encode every text into a vector seeded by its hash."""
+        # pylint: disable=unused-argument
+        self.batch_sizes.append(len(texts))
+        vectors = np.stack(
+            [
+                np.random.default_rng(int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16)).normal(
+                    size=DIMENSIONS
+                )
+                for text in texts
+            ]
+        )
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True) if normalize_embeddings else vectors
+
+    @staticmethod
+    def get_sentence_embedding_dimension() -> int:
+        """Number of dimensions of the vectors."""
+        return DIMENSIONS
+
+
+class TestEmbeddingProviders(TestCase):
+    """
+    Unit tests for the local embedding model and the dimension reduction of the vectors.
+    """
+
+    def setUp(self):
+        self.texts: List[str] = [f"document {index}" for index in range(40)]
+        self.local = LocalEmbeddings(model="fake", batch_size=16, encoder=FakeEncoder())
+
+    def test_local_embeddings_are_batched_in_order(self):
+        """
+        Texts should be encoded in batches, concurrently, and returned normalized and in order.
+        """
+        vectors = asyncio.run(self.local.aembed_documents(self.texts))
+
+        self.assertEqual(sorted(self.local.encoder.batch_sizes), [8, 16, 16])
+        self.assertEqual(len(vectors), len(self.texts))
+        self.assertEqual(vectors[5], self.local.embed_query(self.texts[5]))
+        self.assertAlmostEqual(float(np.linalg.norm(vectors[0])), 1.0, places=5)
+        self.assertEqual(self.local.dimensions, DIMENSIONS)
+
+    def test_matryoshka_keeps_the_first_dimensions(self):
+        """
+        Matryoshka reduction should keep the first dimensions of the vectors, normalized.
+        """
+        reduced = ReducedEmbeddings(self.local, 4, "matryoshka", None)
+        full = np.asarray(self.local.embed_query("query"))
+        vector = np.asarray(reduced.embed_query("query"))
+
+        self.assertEqual(vector.shape, (4,))
+        np.testing.assert_allclose(vector, full[:4] / np.linalg.norm(full[:4]), rtol=1e-5)
+
+    def test_local_dimensions_need_a_reduction(self):
+        """
+        Dimensions configured for a local model without a reduction to them should be rejected rather than ignored.
+        """
+        config = EmbeddingConfig(provider="local", model="fake", dimensions=4)
+        with self.assertRaisesRegex(ValueError, "needs dimension_reduction"):
+            create_embeddings(config, EmbeddingCache())
+
+    def test_pca_projection_is_fitted_once_and_persisted(self):
+        """
+        The PCA projection should be fitted on a training sample, saved, and reused for queries by other instances.
+        Nothing should be embedded before it is fitted.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "store.pca.npz")
+            reduced = ReducedEmbeddings(self.local, 8, "pca", path)
+            with self.assertRaisesRegex(ValueError, "not fitted"):
+                reduced.embed_query("query")
+            with self.assertRaisesRegex(ValueError, "at least 8 documents, got 4"):
+                reduced.fit(self.texts[:4])
+            self.assertFalse(reduced.is_fitted)
+
+            asyncio.run(reduced.afit(self.texts))
+            self.assertTrue(reduced.is_fitted)
+            self.assertTrue(os.path.exists(path))
+            # Batches smaller than the dimensions are reduced once the projection is fitted
+            self.assertEqual(len(reduced.embed_documents(self.texts[:2])[0]), 8)
+
+            vectors = asyncio.run(reduced.aembed_documents(self.texts))
+            self.assertEqual(len(vectors[0]), 8)
+
+            # Documents embedded later are projected the same way, and their projections keep the neighbours
+            other = ReducedEmbeddings(self.local, 8, "pca", path)
+            np.testing.assert_allclose(other.embed_documents(self.texts[:1]), vectors[:1], atol=1e-5)
+            scores = np.asarray(vectors) @ np.asarray(other.embed_query(self.texts[3]))
+            self.assertEqual(int(np.argmax(scores)), 3)
@@ -0,0 +1,210 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from typing import Dict
+from typing import List
+from unittest import TestCase
+
+import httpx
+
+from coded_tools.http_fetch_cache import ContentTooLargeError
+from coded_tools.http_fetch_cache import HttpFetchCache
+
+# Content served by the test server, by path
+PAGES: Dict[str, bytes] = {
+    "/a.html": b"<html>same page</html>",
+    "/b.html": b"<html>same page</html>",
+    "/c.html": b"<html>other page</html>",
+    "/big.html": b"<html>" + b"x" * 100000 + b"</html>",
+}
+
+
+class ETagHandler(BaseHTTPRequestHandler):
+    """Serve the pages with an ETag, answering 304 to matching conditional requests."""
+
+    # Paths and status codes of the requests served
+    requests: List[tuple] = []
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Serve a page, without its length for the paths under /stream, and after a delay for /slow."""
+        if self.path == "/slow":
+            time.sleep(2.0)
+        if self.path.startswith("/stream"):
+            self.requests.append((self.path, 200))
+            self.send_response(200)
+            self.end_headers()
+            self.wfile.write(PAGES[self.path[len("/stream") :]])
+            return
+        content: bytes = PAGES.get(self.path)
+        if content is None:
+            self._respond(404)
+            return
+        etag: str = f'"{len(content)}-{content[-10:].hex()}"'
+        if self.headers.get("If-None-Match") == etag:
+            self._respond(304)
+            return
+        self.requests.append((self.path, 200))
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _respond(self, status: int):
+        self.requests.append((self.path, status))
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Keep the test output quiet."""
+
+
+class TestHttpFetchCache(TestCase):
+    """
+    Unit tests for the HTTP fetch cache, against a local HTTP server.
+    """
+
+    def setUp(self):
+        # pylint: disable=consider-using-with
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        ETagHandler.requests = []
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), ETagHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.cache = HttpFetchCache(cache_dir=self.tmp_dir.name)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp_dir.cleanup()
+
+    def _fetch(self, *paths: str, max_bytes: int = None):
+        """Fetch the pages concurrently in a new event loop."""
+
+        async def fetch_all():
+            try:
+                return await asyncio.gather(
+                    *(self.cache.fetch(self.base_url + path, max_bytes=max_bytes) for path in paths)
+                )
+            finally:
+                await self.cache.aclose()
+
+        return asyncio.run(fetch_all())
+
+    def test_conditional_get_serves_cached_copy(self):
+        """
+        A page fetched before should be revalidated, and served from the cache on 304 Not Modified.
+        """
+        (first,) = self._fetch("/a.html")
+        self.assertFalse(first.from_cache)
+        with open(first.path, "rb") as page_file:
+            self.assertEqual(page_file.read(), PAGES["/a.html"])
+
+        (second,) = self._fetch("/a.html")
+        self.assertTrue(second.from_cache)
+        self.assertEqual(second.path, first.path)
+        self.assertEqual(ETagHandler.requests, [("/a.html", 200), ("/a.html", 304)])
+
+    def test_same_content_is_stored_once(self):
+        """
+        URLs serving the same content should share one file.
+        """
+        first, second, other = self._fetch("/a.html", "/b.html", "/c.html")
+        self.assertEqual(first.path, second.path)
+        self.assertNotEqual(first.path, other.path)
+        self.assertTrue(first.path.endswith(".html"))
+
+    def test_unreachable_server_serves_cached_copy(self):
+        """
+        A cached page should still be served when the server cannot be reached, and an uncached one should fail.
+        """
+        (first,) = self._fetch("/a.html")
+        self.server.shutdown()
+        self.server.server_close()
+
+        (second,) = self._fetch("/a.html")
+        self.assertTrue(second.from_cache)
+        self.assertEqual(second.content_hash, first.content_hash)
+        with self.assertRaises(httpx.HTTPError):
+            self._fetch("/c.html")
+
+    def test_caches_sharing_a_directory_record_a_url_at_once(self):
+        """
+        Caches of several processes sharing a directory should be able to record the same URL at the same time.
+        """
+        (page,) = self._fetch("/a.html")
+        caches = [HttpFetchCache(cache_dir=self.tmp_dir.name) for _ in range(4)]
+        metadata = {"path": page.path, "content_hash": page.content_hash}
+
+        def record(cache: HttpFetchCache):
+            for _ in range(200):
+                cache._write_metadata(page.url, metadata)  # pylint: disable=protected-access
+
+        with ThreadPoolExecutor(max_workers=len(caches)) as threads:
+            for recorded in [threads.submit(record, cache) for cache in caches]:
+                recorded.result()
+
+        self.assertEqual(caches[0].get_cached(page.url).path, page.path)
+        self.assertEqual(len(os.listdir(os.path.join(self.tmp_dir.name, "urls"))), 1)
+
+    def test_large_document_is_aborted(self):
+        """
+        A document larger than the limit should fail without being cached, whether or not its length is announced.
+        """
+        for path in ("/big.html", "/stream/big.html"):
+            with self.assertRaises(ContentTooLargeError):
+                self._fetch(path, max_bytes=1000)
+            self.assertIsNone(self.cache.get_cached(self.base_url + path))
+        self.assertEqual(os.listdir(os.path.join(self.tmp_dir.name, "blobs")), [])
+
+        (page,) = self._fetch("/stream/a.html", max_bytes=1000)
+        self.assertEqual(os.path.getsize(page.path), len(PAGES["/a.html"]))
+
+    def test_abandoned_fetch_is_cancelled(self):
+        """
+        A download nobody waits for any more should stop, freeing its slot of the host.
+        """
+        self.cache = HttpFetchCache(cache_dir=self.tmp_dir.name, max_connections_per_host=1)
+
+        async def fetch_after_timeout():
+            try:
+                with self.assertRaises(asyncio.TimeoutError):
+                    await asyncio.wait_for(self.cache.fetch(self.base_url + "/slow"), timeout=0.2)
+                return await asyncio.wait_for(self.cache.fetch(self.base_url + "/a.html"), timeout=1.0)
+            finally:
+                await self.cache.aclose()
+
+        self.assertFalse(asyncio.run(fetch_after_timeout()).from_cache)
+
+    def test_old_and_least_recently_used_documents_are_evicted(self):
+        """
+        Documents older than the maximum age, then the least recently used ones beyond the maximum size,
+        should be evicted.
+        """
+        self.cache = HttpFetchCache(cache_dir=self.tmp_dir.name, max_cache_bytes=len(PAGES["/c.html"]), max_age=3600)
+        first, other = self._fetch("/a.html", "/c.html")
+        os.utime(first.path, (time.time() - 600, time.time() - 600))
+        os.utime(other.path, (time.time() - 300, time.time() - 300))
+        self.cache.prune()
+        self.assertIsNone(self.cache.get_cached(first.url))
+        self.assertIsNotNone(self.cache.get_cached(other.url))
+
+        os.utime(other.path, (time.time() - 7200, time.time() - 7200))
+        self.cache.prune()
+        self.assertIsNone(self.cache.get_cached(other.url))
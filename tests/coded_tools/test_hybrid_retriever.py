@@ -0,0 +1,60 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+import asyncio
+from unittest import TestCase
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from coded_tools.hybrid_retriever import HybridRetriever
+from coded_tools.hybrid_retriever import get_postgres_hybrid_search_config
+from coded_tools.hybrid_retriever import reciprocal_rank_fusion
+from coded_tools.lexical_index import get_lexical_index
+from coded_tools.numpy_vector_store import NumpyVectorStore
+
+
+class TestHybridRetriever(TestCase):
+    """
+    Unit tests for the hybrid retriever and reciprocal rank fusion.
+    """
+
+    def test_reciprocal_rank_fusion(self):
+        """Documents ranked well by both rankings come first, and duplicates are merged."""
+        docs = {name: Document(id=name, page_content=name) for name in "abcd"}
+        fused = reciprocal_rank_fusion([[docs["a"], docs["b"], docs["c"]], [docs["b"], docs["d"]]], k=3, rrf_k=60)
+        self.assertEqual([doc.id for doc in fused], ["b", "a", "d"])
+
+    def test_exact_identifier_is_retrieved(self):
+        """An identifier the fake embeddings cannot match is still retrieved through the lexical index."""
+        texts = [f"Filler document number {index} about shipping." for index in range(50)]
+        texts.append("Invoice INV-77813 was paid in full.")
+        ids = [f"doc_{index}" for index in range(len(texts))]
+        store = NumpyVectorStore.from_texts(texts, DeterministicFakeEmbedding(size=8), ids=ids)
+
+        retriever = HybridRetriever(vectorstore=store, lexical_index=get_lexical_index(store), k=4)
+        results = asyncio.run(retriever.ainvoke("status of INV-77813"))
+        self.assertEqual(len(results), 4)
+        self.assertIn("doc_50", [doc.id for doc in results])
+        self.assertEqual(len({doc.id for doc in results}), 4)
+
+    def test_more_documents_than_the_candidates(self):
+        """Asking for more documents than the candidates of each ranking takes that many from each ranking."""
+        texts = [f"Filler document number {index} about shipping." for index in range(50)]
+        texts.append("Invoice INV-77813 was paid in full.")
+        ids = [f"doc_{index}" for index in range(len(texts))]
+        store = NumpyVectorStore.from_texts(texts, DeterministicFakeEmbedding(size=8), ids=ids)
+
+        retriever = HybridRetriever(vectorstore=store, lexical_index=get_lexical_index(store), k=30)
+        results = asyncio.run(retriever.ainvoke("status of INV-77813"))
+        self.assertEqual(len({doc.id for doc in results}), 30)
+        self.assertIn("doc_50", [doc.id for doc in results])
+
+        config = get_postgres_hybrid_search_config(k=30)
+        self.assertEqual((config.primary_top_k, config.secondary_top_k), (30, 30))
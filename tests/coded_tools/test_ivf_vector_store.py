@@ -0,0 +1,136 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+import asyncio
+import os
+import tempfile
+import threading
+from unittest import TestCase
+from unittest.mock import patch
+
+import numpy as np
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from coded_tools.ivf_vector_store import IvfVectorStore
+from coded_tools.ivf_vector_store import benchmark_recall
+
+DIMENSIONS = 16
+N_ROWS = 2000
+
+
+def clustered_vectors(rng: np.random.Generator, n_rows: int) -> np.ndarray:
+    """Vectors gathered around a few random directions, like embeddings of a few topics."""
+    topics = rng.normal(size=(20, DIMENSIONS))
+    return topics[rng.integers(0, len(topics), n_rows)] + 0.3 * rng.normal(size=(n_rows, DIMENSIONS))
+
+
+class TestIvfVectorStore(TestCase):
+    """
+    Unit tests for IvfVectorStore class.
+    """
+
+    def setUp(self):
+        self.rng = np.random.default_rng(42)
+        self.store = IvfVectorStore(DeterministicFakeEmbedding(size=DIMENSIONS), n_lists=32, min_train_size=1000)
+        self.store.add_vectors(
+            clustered_vectors(self.rng, N_ROWS),
+            [f"chunk {row}" for row in range(N_ROWS)],
+            ids=list(map(str, range(N_ROWS))),
+        )
+        self.queries = clustered_vectors(self.rng, 50)
+
+    def test_recall_benchmark(self):
+        """
+        Probing more lists should not lower the recall, and probing all of them should be an exact search.
+        """
+        self.assertTrue(self.store.is_trained)
+
+        benchmarks = benchmark_recall(self.store, self.queries, k=10, n_probes=(1, 8, 32))
+        recalls = [benchmark.recall for benchmark in benchmarks]
+
+        self.assertEqual(recalls, sorted(recalls))
+        self.assertGreater(recalls[1], 0.8)
+        self.assertEqual(recalls[2], 1.0)
+
+    def test_incremental_insert_and_delete(self):
+        """
+        Rows added after training should be assigned to a list and found, and deleted rows should not be.
+        """
+        new_vector = self.rng.normal(size=(1, DIMENSIONS))
+        self.store.add_vectors(new_vector, ["new chunk"], ids=["new"])
+
+        self.assertEqual(len(self.store.assignments), N_ROWS + 1)
+        self.assertEqual(self.store.similarity_search_by_vector(new_vector[0], k=1)[0].id, "new")
+
+        self.store.delete(["new"])
+        self.assertEqual(len(self.store.assignments), N_ROWS)
+        self.assertNotEqual(self.store.similarity_search_by_vector(new_vector[0], k=1)[0].id, "new")
+
+    def test_dump_and_load_keep_the_index(self):
+        """
+        A loaded store should reuse the persisted centroids and return the same results.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "store.npy")
+            self.store.dump(path)
+            loaded = IvfVectorStore.load(path, self.store.embedding)
+
+            np.testing.assert_array_equal(loaded.centroids, self.store.centroids)
+            np.testing.assert_array_equal(loaded.assignments, self.store.assignments)
+            for query in self.queries[:5]:
+                self.assertEqual(
+                    [doc.id for doc in loaded.similarity_search_by_vector(query, k=5, n_probe=4)],
+                    [doc.id for doc in self.store.similarity_search_by_vector(query, k=5, n_probe=4)],
+                )
+
+    def test_index_is_trained_off_the_event_loop(self):
+        """
+        Adding texts asynchronously should train the index in a thread, and index the rows added meanwhile.
+        """
+        store = IvfVectorStore(DeterministicFakeEmbedding(size=DIMENSIONS), n_lists=8, min_train_size=100)
+        texts = [f"chunk {row}" for row in range(110)]
+        fit = store._fit  # pylint: disable=protected-access
+        started, release = threading.Event(), threading.Event()
+        threads = []
+
+        def blocking_fit(vectors, seed):
+            threads.append(threading.get_ident())
+            started.set()
+            release.wait(5)
+            return fit(vectors, seed)
+
+        async def add():
+            training = asyncio.ensure_future(store.aadd_texts(texts[:100]))
+            await asyncio.to_thread(started.wait, 5)
+            # The event loop is free while training, and a second training is not started
+            await store.aadd_texts(texts[100:])
+            release.set()
+            await training
+
+        with patch.object(store, "_fit", blocking_fit):
+            asyncio.run(add())
+
+        self.assertEqual(len(threads), 1)
+        self.assertNotEqual(threads[0], threading.get_ident())
+        self.assertTrue(store.is_trained)
+        self.assertEqual(len(store.assignments), 110)
+        self.assertEqual(store.similarity_search(texts[105], k=1)[0].page_content, texts[105])
+
+    def test_rows_added_during_a_training_are_assigned(self):
+        """
+        Rows added while the index is trained again should be assigned to the current lists, and deletable.
+        """
+        self.store._training = True  # pylint: disable=protected-access
+        texts = [f"new chunk {row}" for row in range(3 * N_ROWS)]
+        asyncio.run(self.store.aadd_texts(texts, ids=[f"new {row}" for row in range(3 * N_ROWS)]))
+        self.assertEqual(len(self.store.assignments), 4 * N_ROWS)
+
+        self.store.delete(["0", "new 5"])
+        self.assertEqual(len(self.store.assignments), 4 * N_ROWS - 2)
+        self.assertEqual(self.store.similarity_search(texts[7], k=1, n_probe=32)[0].id, "new 7")
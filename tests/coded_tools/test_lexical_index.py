@@ -0,0 +1,69 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+import os
+import tempfile
+from unittest import TestCase
+
+from langchain_community.vectorstores import InMemoryVectorStore
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from coded_tools.lexical_index import BM25Index
+from coded_tools.lexical_index import get_lexical_index
+from coded_tools.lexical_index import tokenize
+from coded_tools.numpy_vector_store import NumpyVectorStore
+
+TEXTS = [
+    "The refund policy applies to all orders.",
+    "Error ERR-404 means the page was not found.",
+    "Orders with SKU_1234 ship within two days.",
+    "The policy number is POL-2023-0042.",
+]
+IDS = [f"doc_{index}" for index in range(len(TEXTS))]
+
+
+class TestLexicalIndex(TestCase):
+    """
+    Unit tests for the BM25 lexical index.
+    """
+
+    def test_tokenize_keeps_identifiers(self):
+        """Identifiers are indexed whole and by their parts."""
+        self.assertEqual(tokenize("See ERR-404, now"), ["see", "err-404", "err", "404", "now"])
+        self.assertIn("sku_1234", tokenize("SKU_1234"))
+
+    def test_search_finds_exact_terms(self):
+        """Documents containing the exact identifier rank first, and documents without any query term are skipped."""
+        index = BM25Index.from_texts(IDS, TEXTS)
+        self.assertEqual(index.search("what does ERR-404 mean", k=2)[0][0], "doc_1")
+        self.assertEqual(index.search("POL-2023-0042", k=4)[0][0], "doc_3")
+        self.assertEqual([doc_id for doc_id, _ in index.search("policy", k=4)], ["doc_0", "doc_3"])
+        self.assertEqual(index.search("unrelated words"), [])
+
+    def test_dump_and_load(self):
+        """A persisted index is reused while the store is unchanged and rebuilt once it changes."""
+        embedding = DeterministicFakeEmbedding(size=8)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "store.bm25.json")
+            store = NumpyVectorStore.from_texts(TEXTS, embedding, ids=IDS)
+            index = get_lexical_index(store, path, save=True)
+            self.assertIs(index, get_lexical_index(store, path))
+
+            loaded = BM25Index.load(path)
+            self.assertEqual(loaded.search("SKU_1234"), index.search("SKU_1234"))
+            self.assertEqual(loaded.fingerprint, index.fingerprint)
+
+            # Same ids with a changed text: the persisted index is stale
+            changed = NumpyVectorStore.from_texts(TEXTS[:3] + ["The policy number is POL-9999."], embedding, ids=IDS)
+            self.assertEqual(get_lexical_index(changed, path, save=True).search("POL-9999")[0][0], "doc_3")
+
+    def test_in_memory_vector_store(self):
+        """The index is built from the texts of an InMemoryVectorStore too."""
+        store = InMemoryVectorStore.from_texts(TEXTS, DeterministicFakeEmbedding(size=8), ids=IDS)
+        self.assertEqual(get_lexical_index(store).search("ERR-404")[0][0], "doc_1")
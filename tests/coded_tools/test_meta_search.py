@@ -0,0 +1,174 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+import asyncio
+import time
+from typing import List
+from typing import Tuple
+from unittest import TestCase
+
+from coded_tools.meta_search import FederatedSearch
+from coded_tools.meta_search import LatencyTracker
+from coded_tools.meta_search import MetaSearch
+from coded_tools.meta_search import SearchProvider
+from coded_tools.meta_search import SearchResult
+from coded_tools.meta_search import canonicalize_url
+from coded_tools.search_cache import SearchCache
+
+
+class FakeProvider(SearchProvider):  # pylint: disable=too-few-public-methods
+    """Search provider returning fixed pages after a delay, recording whether it was searched and cancelled."""
+
+    def __init__(self, name: str, urls: List[str], delay: float = 0.0, failing: bool = False):
+        self.name = name
+        self.urls: List[str] = urls
+        self.delay: float = delay
+        self.failing: bool = failing
+        self.searched: bool = False
+        self.cancelled: bool = False
+
+    async def search(self, query: str, max_results: int) -> List[SearchResult]:
+        self.searched = True
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.failing:
+            raise ConnectionError("offline")
+        return [SearchResult(url, f"{self.name} {url}", f"About {query}") for url in self.urls[:max_results]]
+
+
+class CachedProvider(FakeProvider):  # pylint: disable=too-few-public-methods
+    """Fake provider whose searches go through a search cache, like the search tools."""
+
+    def __init__(self, name: str, urls: List[str], delay: float, cache: SearchCache):
+        super().__init__(name, urls, delay)
+        self.cache: SearchCache = cache
+
+    async def search(self, query: str, max_results: int) -> List[SearchResult]:
+        search = super().search
+        return await self.cache.get_or_search(self.name, query, None, lambda: search(query, max_results))
+
+
+class RecordingTracker(LatencyTracker):
+    """Latency tracker keeping every latency recorded."""
+
+    def __init__(self):
+        super().__init__()
+        self.recorded: List[Tuple[str, float]] = []
+
+    def record(self, provider: str, seconds: float):
+        self.recorded.append((provider, seconds))
+        super().record(provider, seconds)
+
+
+class TestMetaSearch(TestCase):
+    """
+    Unit tests for the meta search over several search providers.
+    """
+
+    def test_urls_are_canonicalized(self):
+        """
+        URLs of the same page should match, whatever their scheme, host prefix, tracking parameters or trailing slash.
+        """
+        self.assertEqual(
+            canonicalize_url("https://www.Example.com/docs/?b=2&utm_source=x&a=1#intro"),
+            canonicalize_url("http://example.com/docs?a=1&b=2"),
+        )
+        self.assertNotEqual(canonicalize_url("https://example.com/docs?a=1"), canonicalize_url("https://example.com/"))
+
+    def test_results_are_deduplicated_and_fused(self):
+        """
+        Pages returned by several providers should be merged and ranked above pages returned by one.
+        """
+        brave = FakeProvider("brave", ["https://a.com", "https://b.com/", "https://c.com"])
+        ddgs = FakeProvider("ddgs", ["https://b.com?utm_medium=search", "https://www.c.com", "https://d.com"])
+        tool = MetaSearch({"brave": brave, "ddgs": ddgs})
+
+        results = asyncio.run(
+            tool.async_invoke({"search_terms": "agents", "providers": ["brave", "ddgs"], "backup_providers": []}, {})
+        )
+        self.assertEqual([result["url"] for result in results[:2]], ["https://b.com/", "https://c.com"])
+        self.assertEqual(results[0]["providers"], ["brave", "ddgs"])
+        self.assertEqual(len(results), 4)
+        self.assertEqual(results[0]["snippet"], "About agents")
+
+        error = asyncio.run(tool.async_invoke({"search_terms": "agents", "providers": ["bing"]}, {}))
+        self.assertTrue(error.startswith("Error: Unknown search provider bing"))
+
+    def test_quorum_returns_without_slow_providers(self):
+        """
+        The search should return once a quorum of providers answered, cancelling the slow ones.
+        """
+        fast = FakeProvider("fast", [f"https://fast.com/{index}" for index in range(5)], delay=0.01)
+        other = FakeProvider("other", ["https://other.com"], delay=0.02)
+        slow = FakeProvider("slow", ["https://slow.com"], delay=5.0)
+
+        start = time.monotonic()
+        rankings = asyncio.run(FederatedSearch([fast, other, slow], quorum=2, min_results=5).search("agents"))
+        self.assertLess(time.monotonic() - start, 1.0)
+        self.assertEqual(list(rankings), ["fast", "other"])
+        self.assertTrue(slow.cancelled)
+
+    def test_slow_primary_is_hedged_after_its_latency_percentile(self):
+        """
+        A primary slower than its usual latency should be backed up, and a backup should not be sent early.
+        """
+        latencies = LatencyTracker()
+        for _ in range(20):
+            latencies.record("primary", 0.05)
+        primary = FakeProvider("primary", ["https://primary.com"], delay=5.0)
+        backup = FakeProvider("backup", ["https://backup.com"], delay=0.01)
+        unused = FakeProvider("unused", ["https://unused.com"])
+
+        start = time.monotonic()
+        search = FederatedSearch([primary], [backup, unused], latencies=latencies, quorum=1, min_results=1)
+        rankings = asyncio.run(search.search("agents"))
+        self.assertLess(time.monotonic() - start, 1.0)
+        self.assertEqual(list(rankings), ["backup"])
+        self.assertFalse(unused.searched)
+
+        # A primary answering within its usual latency is not backed up
+        primary.delay = 0.01
+        backup.searched = False
+        self.assertEqual(list(asyncio.run(search.search("agents"))), ["primary"])
+        self.assertFalse(backup.searched)
+
+    def test_failed_primary_is_replaced_and_deadline_is_kept(self):
+        """
+        A failed primary should be replaced by a backup, and the search should return what it has at its deadline.
+        """
+        failing = FakeProvider("failing", [], failing=True)
+        backup = FakeProvider("backup", ["https://backup.com"], delay=0.01)
+        slow = FakeProvider("slow", ["https://slow.com"], delay=5.0)
+
+        start = time.monotonic()
+        rankings = asyncio.run(FederatedSearch([failing, slow], [backup], quorum=2, timeout=0.3).search("agents"))
+        self.assertLess(time.monotonic() - start, 1.0)
+        self.assertEqual(list(rankings), ["backup"])
+
+        tool = MetaSearch({"slow": slow})
+        args = {"search_terms": "agents", "providers": ["slow"], "backup_providers": [], "timeout": 0.1}
+        self.assertEqual(asyncio.run(tool.async_invoke(args, {})), "Error: No search provider returned results.")
+
+    def test_only_real_searches_are_timed(self):
+        """
+        Results served from the cache, failures and empty results should not count as latencies of their provider.
+        """
+        latencies = RecordingTracker()
+        cached = CachedProvider("cached", ["https://cached.com"], 0.05, SearchCache(path=None))
+        failing = FakeProvider("failing", [], failing=True)
+        empty = FakeProvider("empty", [])
+        search = FederatedSearch([cached, failing, empty], latencies=latencies, quorum=1, min_results=1)
+
+        for _ in range(3):
+            self.assertEqual(list(asyncio.run(search.search("agents"))), ["cached"])
+        self.assertEqual([provider for provider, _ in latencies.recorded], ["cached"])
+        self.assertGreaterEqual(latencies.recorded[0][1], 0.05)
@@ -0,0 +1,149 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+import asyncio
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from coded_tools.numpy_vector_store import NumpyVectorStore
+from coded_tools.query_cache import get_index_version
+
+TEXTS = [f"chunk number {index}" for index in range(20)]
+
+
+class TestNumpyVectorStore(TestCase):
+    """
+    Unit tests for NumpyVectorStore class.
+    """
+
+    def setUp(self):
+        self.embedding = DeterministicFakeEmbedding(size=16)
+        self.store = NumpyVectorStore.from_texts(
+            TEXTS, self.embedding, [{"source": f"doc_{index % 2}"} for index in range(len(TEXTS))]
+        )
+
+    def test_search_returns_exact_match_first(self):
+        """
+        The text whose embedding equals the query embedding should rank first with a similarity of 1.
+        """
+        results = self.store.similarity_search_with_score("chunk number 7", k=3)
+
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[0][0].page_content, "chunk number 7")
+        self.assertAlmostEqual(results[0][1], 1.0, places=5)
+        self.assertGreaterEqual(results[1][1], results[2][1])
+
+    def test_dump_and_memory_mapped_load(self):
+        """
+        A dumped store should load back as a memory-mapped float32 matrix with the same documents.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "store.npy")
+            self.store.dump(path)
+            loaded = NumpyVectorStore.load(path, self.embedding)
+
+            self.assertIsInstance(loaded.vectors, np.memmap)
+            self.assertEqual(loaded.vectors.dtype, np.float32)
+            self.assertEqual(loaded.texts, self.store.texts)
+            self.assertEqual(loaded.metadatas, self.store.metadatas)
+            self.assertEqual(loaded.similarity_search("chunk number 3", k=1)[0].page_content, "chunk number 3")
+
+            # A matrix saved without normalization is normalized in memory
+            np.save(path, np.asarray(loaded.vectors) * 3.0)
+            rescaled = NumpyVectorStore.load(path, self.embedding)
+            self.assertNotIsInstance(rescaled.vectors, np.memmap)
+            np.testing.assert_allclose(np.linalg.norm(rescaled.vectors, axis=1), 1.0, rtol=1e-5)
+
+    def test_add_and_delete_by_id(self):
+        """
+        Adding a document with an existing id should replace it, and deleted documents should not be found.
+        Every change should give the store a new index version.
+        """
+        version = get_index_version(self.store)
+        asyncio.run(self.store.aadd_documents([Document(page_content="replaced", metadata={})], ids=["a"]))
+        self.assertNotEqual(get_index_version(self.store), version)
+        version = get_index_version(self.store)
+        asyncio.run(self.store.aadd_documents([Document(page_content="replacement", metadata={})], ids=["a"]))
+        self.assertEqual(len(self.store), len(TEXTS) + 1)
+        self.assertEqual(self.store.get_by_ids(["a"])[0].page_content, "replacement")
+
+        self.assertNotEqual(get_index_version(self.store), version)
+        version = get_index_version(self.store)
+
+        asyncio.run(self.store.adelete(ids=["a"]))
+        self.assertNotEqual(get_index_version(self.store), version)
+        self.assertEqual(len(self.store), len(TEXTS))
+        self.assertEqual(self.store.get_by_ids(["a"]), [])
+
+    def test_small_batches_do_not_copy_the_matrix_every_time(self):
+        """
+        Rows added in small batches should fill a buffer growing geometrically, and earlier views should stay valid.
+        """
+        store = NumpyVectorStore(self.embedding)
+        rng = np.random.default_rng(0)
+        batches = [rng.normal(size=(50, 16)) for _ in range(100)]
+        buffers = set()
+        views = []
+        for index, batch in enumerate(batches):
+            store.add_vectors(batch, [f"text {index} {row}" for row in range(50)])
+            buffers.add(id(store._buffer))  # pylint: disable=protected-access
+            views.append(store.vectors)
+
+        self.assertEqual(store.vectors.shape, (5000, 16))
+        self.assertLessEqual(len(buffers), 4)
+        np.testing.assert_allclose(store.vectors, np.vstack([views[0]] + [view[-50:] for view in views[1:]]))
+        self.assertEqual(views[0].shape, (50, 16))
+        np.testing.assert_allclose(np.linalg.norm(store.vectors, axis=1), 1.0, rtol=1e-5)
+
+    def test_rows_are_normalized_and_top_k_matches_full_sort(self):
+        """
+        Rows should be stored with a unit norm, and the argpartition top k should match a full sort of the scores.
+        """
+        np.testing.assert_allclose(np.linalg.norm(self.store.vectors, axis=1), 1.0, rtol=1e-5)
+
+        query = self.embedding.embed_query("some query")
+        scores = [score for _, score in self.store.similarity_search_with_score_by_vector(query, k=len(TEXTS))]
+        top_5 = [score for _, score in self.store.similarity_search_with_score_by_vector(query, k=5)]
+
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        np.testing.assert_allclose(top_5, scores[:5])
+
+    def test_metadata_filter(self):
+        """
+        Only documents matching a metadata filter should be returned, whatever its form.
+        """
+        by_value = self.store.similarity_search("chunk number 7", k=20, filter={"source": "doc_0"})
+        by_list = self.store.similarity_search("chunk number 7", k=20, filter={"source": ["doc_0", "missing"]})
+        by_callable = self.store.similarity_search(
+            "chunk number 7", k=20, filter=lambda meta: meta["source"] == "doc_0"
+        )
+
+        self.assertEqual(len(by_value), len(TEXTS) // 2)
+        self.assertTrue(all(doc.metadata["source"] == "doc_0" for doc in by_value))
+        self.assertEqual(by_value, by_list)
+        self.assertEqual(by_value, by_callable)
+        self.assertEqual(self.store.similarity_search("chunk number 7", filter={"source": "missing"}), [])
+
+    def test_batch_search_matches_single_searches(self):
+        """
+        Searching several queries in one matrix product should give the same results as searching them one by one.
+        """
+        queries = ["chunk number 1", "chunk number 12", "unrelated"]
+        batch = asyncio.run(self.store.abatch_similarity_search_with_score(queries, k=3))
+
+        self.assertEqual(len(batch), len(queries))
+        for query, results in zip(queries, batch):
+            single = self.store.similarity_search_with_score(query, k=3)
+            self.assertEqual([doc.id for doc, _ in results], [doc.id for doc, _ in single])
+            np.testing.assert_allclose([score for _, score in results], [score for _, score in single], rtol=1e-5)
@@ -0,0 +1,150 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+import asyncio
+import json
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from unittest import TestCase
+from unittest.mock import patch
+
+import tiktoken
+
+from coded_tools.google_search import GoogleSearch
+from coded_tools.http_fetch_cache import HttpFetchCache
+from coded_tools.page_fetcher import extract_main_text
+from coded_tools.page_fetcher import fetch_pages
+from coded_tools.page_fetcher import truncate_to_budget
+
+# One token per byte, so that budgets are easy to check without downloading an encoding
+BYTE_ENCODING = tiktoken.Encoding(
+    name="bytes",
+    pat_str=r"\S+|\s+",
+    mergeable_ranks={bytes([byte]): byte for byte in range(256)},
+    special_tokens={},
+)
+
+PAGE = b"""<html><head><script>track()</script><style>p {}</style></head><body>
+<nav><p>Home | About</p></nav>
+<article><h1>Neuro SAN</h1><p>Agent networks   talk to each other.</p><p>They use tools.</p></article>
+<footer><p>Copyright</p></footer></body></html>"""
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    """Serve HTML pages and a search response linking to them, counting the pages served at once."""
+
+    running: int = 0
+    max_running: int = 0
+    lock = threading.Lock()
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Serve the page of the path, after a delay for the slow pages."""
+        if self.path.startswith("/missing"):
+            self.send_error(404)
+            return
+        with self.lock:
+            PageHandler.running += 1
+            PageHandler.max_running = max(PageHandler.max_running, PageHandler.running)
+        time.sleep(2.0 if self.path.startswith("/slow") else 0.1)
+        with self.lock:
+            PageHandler.running -= 1
+
+        if self.path.startswith("/search"):
+            base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+            items = [{"title": path, "link": base_url + path, "snippet": ""} for path in ("/a", "/b", "/c")]
+            content, content_type = json.dumps({"items": items}).encode("utf-8"), "application/json"
+        else:
+            content, content_type = PAGE.replace(b"Neuro SAN", self.path.encode("utf-8")), "text/html; charset=utf-8"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Keep the test output quiet."""
+
+
+class TestPageFetcher(TestCase):
+    """
+    Unit tests for fetching the pages of search results, against a local HTTP server.
+    """
+
+    def setUp(self):
+        # pylint: disable=consider-using-with
+        PageHandler.running = 0
+        PageHandler.max_running = 0
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), PageHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.patches = [
+            patch("coded_tools.page_fetcher.HTTP_FETCH_CACHE", HttpFetchCache(cache_dir=self.tmp_dir.name)),
+            patch("coded_tools.page_fetcher.get_encoding", return_value=BYTE_ENCODING),
+        ]
+        for active_patch in self.patches:
+            active_patch.start()
+
+    def tearDown(self):
+        for active_patch in self.patches:
+            active_patch.stop()
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp_dir.cleanup()
+
+    def test_main_text_is_extracted(self):
+        """
+        The text of the article should be kept, without navigation, footer, scripts and styles.
+        """
+        self.assertEqual(
+            extract_main_text(PAGE, "text/html"), "Neuro SAN\nAgent networks talk to each other.\nThey use tools."
+        )
+        self.assertEqual(extract_main_text(b"plain text", "text/plain"), "plain text")
+        self.assertEqual(extract_main_text(b"%PDF-1.7", "application/pdf"), "")
+
+    def test_budget_is_shared(self):
+        """
+        Texts shorter than their share of the budget should leave the rest to the longer ones.
+        """
+        texts = truncate_to_budget(["a" * 10, "b" * 100, "c" * 100], 110, BYTE_ENCODING)
+        self.assertEqual([len(text) for text in texts], [10, 50, 50])
+
+    def test_pages_are_fetched_concurrently_within_deadline(self):
+        """
+        Pages should be fetched at once within the limit, and failed or late pages left out at the deadline.
+        """
+        paths = ["/1", "/2", "/3", "/4", "/missing", "/slow"]
+        start = time.monotonic()
+        texts = asyncio.run(fetch_pages([self.base_url + path for path in paths], 1000, timeout=1.0, concurrency=3))
+        self.assertLess(time.monotonic() - start, 1.5)
+        self.assertEqual(list(texts), [self.base_url + path for path in ("/1", "/2", "/3", "/4")])
+        self.assertTrue(texts[self.base_url + "/1"].startswith("/1\nAgent networks"))
+        self.assertEqual(PageHandler.max_running, 3)
+
+    def test_search_tool_fetch_mode(self):
+        """
+        The search tool should add the main text of the top result pages, within the token budget.
+        """
+        args = {
+            "search_terms": "neuro san",
+            "google_url": self.base_url + "/search",
+            "fetch": True,
+            "fetch_top_n": 2,
+            "fetch_max_tokens": 60,
+        }
+        results = asyncio.run(GoogleSearch().async_invoke(args, {}))
+        self.assertEqual([result["title"] for result in results], ["/a", "/b", "/c"])
+        self.assertEqual(results[0]["content"], "/a\nAgent networks talk to each")
+        self.assertEqual(results[1]["content"], "/b\nAgent networks talk to each")
+        self.assertNotIn("content", results[2])
+
+        self.assertEqual(GoogleSearch().invoke(args, {}), results)
@@ -0,0 +1,167 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+import asyncio
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+from unittest import TestCase
+from unittest.mock import patch
+
+import pymupdf
+
+from coded_tools.pdf_parser import ParallelPdfParser
+from coded_tools.pdf_parser import extract_pages
+
+
+def extract_pages_or_hang(path: str, start: int, end: int, engine: str, timeout: float) -> List[str]:
+    """
+    Extract pages, hanging in the first page of the PDFs named hung, like a parser stuck in native code,
+    and taking a while on the PDFs named slow.
+    """
+    if "hung" in os.path.basename(path):
+        time.sleep(60)
+    if "slow" in os.path.basename(path):
+        time.sleep(2)
+    return extract_pages(path, start, end, engine, timeout)
+
+
+class TestParallelPdfParser(TestCase):
+    """
+    Unit tests for ParallelPdfParser class.
+    """
+
+    def setUp(self):
+        """Create PDFs of a few pages each, and a file which is not a PDF."""
+        # pylint: disable=consider-using-with
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.executor = ProcessPoolExecutor(max_workers=2)
+        self.paths = [self._write_pdf(f"doc_{index}.pdf", index, 5) for index in range(3)]
+        self.broken_path = os.path.join(self.tmp_dir.name, "broken.pdf")
+        with open(self.broken_path, "w", encoding="utf-8") as broken_file:
+            broken_file.write("not a pdf")
+
+    def tearDown(self):
+        self.executor.shutdown(cancel_futures=True)
+        self.tmp_dir.cleanup()
+
+    def _write_pdf(self, name: str, doc_index: int, page_count: int) -> str:
+        path = os.path.join(self.tmp_dir.name, name)
+        with pymupdf.open() as pdf:
+            for page_index in range(page_count):
+                pdf.new_page().insert_text((72, 72), f"Document {doc_index} page {page_index}")
+            pdf.save(path)
+        return path
+
+    def test_pages_are_returned_in_order(self):
+        """
+        PDFs split into page ranges should come back with their pages in order, whatever the engine.
+        """
+        for engine in ("pymupdf", "pypdf"):
+            parser = ParallelPdfParser(engine=engine, pages_per_task=2, executor=self.executor)
+            parsed_pdfs = list(parser.parse(self.paths))
+
+            self.assertEqual([parsed_pdf.path for parsed_pdf in parsed_pdfs], self.paths)
+            for doc_index, parsed_pdf in enumerate(parsed_pdfs):
+                self.assertIsNone(parsed_pdf.error)
+                self.assertEqual(
+                    [page.strip() for page in parsed_pdf.pages],
+                    [f"Document {doc_index} page {page_index}" for page_index in range(5)],
+                )
+
+    def test_failed_pdfs_do_not_stop_the_others(self):
+        """
+        A file which cannot be parsed should be reported without affecting the other files.
+        """
+        parser = ParallelPdfParser(executor=self.executor)
+
+        async def parse():
+            return [parsed_pdf async for parsed_pdf in parser.aparse([self.paths[0], self.broken_path, self.paths[1]])]
+
+        parsed_pdfs = asyncio.run(parse())
+
+        self.assertEqual(
+            [parsed_pdf.path for parsed_pdf in parsed_pdfs], [self.paths[0], self.broken_path, self.paths[1]]
+        )
+        self.assertEqual([len(parsed_pdf.pages) for parsed_pdf in parsed_pdfs], [5, 0, 5])
+        self.assertIsNone(parsed_pdfs[0].error)
+        self.assertIsNotNone(parsed_pdfs[1].error)
+        self.assertIsNone(parsed_pdfs[2].error)
+
+    def test_timeout(self):
+        """
+        A PDF taking longer than the timeout should be skipped.
+        """
+        parser = ParallelPdfParser(timeout=0.0, executor=self.executor)
+
+        parsed_pdf = next(parser.parse(self.paths[:1]))
+        parser.executor.shutdown()
+
+        self.assertEqual(parsed_pdf.pages, [])
+        self.assertIn("Timed out", parsed_pdf.error)
+
+    def test_hung_page_does_not_hold_the_pool(self):
+        """
+        A task stuck in a page should skip its PDF and have its worker killed, the other PDFs being parsed.
+        """
+        hung_path = self._write_pdf("hung.pdf", 9, 2)
+        parser = ParallelPdfParser(timeout=0.5, executor=self.executor)
+
+        start = time.monotonic()
+        with patch("coded_tools.pdf_parser.extract_pages", extract_pages_or_hang):
+            parsed_pdfs = list(parser.parse_as_completed([hung_path] + self.paths))
+        parser.executor.shutdown()
+
+        self.assertLess(time.monotonic() - start, 10.0)
+        self.assertIsNot(parser.executor, self.executor)
+        self.assertEqual(sorted(parsed_pdf.path for parsed_pdf in parsed_pdfs[:-1]), sorted(self.paths))
+        self.assertEqual([len(parsed_pdf.pages) for parsed_pdf in parsed_pdfs[:-1]], [5, 5, 5])
+        self.assertEqual(parsed_pdfs[-1].path, hung_path)
+        self.assertIn("Timed out", parsed_pdfs[-1].error)
+
+    def test_pdfs_parsed_early_wait_for_their_turn(self):
+        """
+        PDFs parsed before the ones ahead of them should be held, and returned in the order of their paths.
+        """
+        hung_path = self._write_pdf("hung.pdf", 9, 2)
+        parser = ParallelPdfParser(timeout=0.5, executor=self.executor)
+
+        with patch("coded_tools.pdf_parser.extract_pages", extract_pages_or_hang):
+            parsed_pdfs = list(parser.parse([hung_path] + self.paths))
+        parser.executor.shutdown()
+
+        self.assertEqual([parsed_pdf.path for parsed_pdf in parsed_pdfs], [hung_path] + self.paths)
+        self.assertIn("Timed out", parsed_pdfs[0].error)
+        self.assertEqual([len(parsed_pdf.pages) for parsed_pdf in parsed_pdfs[1:]], [5, 5, 5])
+
+    def test_workers_killed_by_another_parser_do_not_count_as_crashes(self):
+        """
+        Tasks lost when another parser sharing the pool kills its workers should be submitted again,
+        however few attempts are allowed for crashes.
+        """
+        hung_path = self._write_pdf("hung.pdf", 9, 2)
+        slow_path = self._write_pdf("slow.pdf", 0, 5)
+        hung_parser = ParallelPdfParser(timeout=0.5, executor=self.executor)
+        slow_parser = ParallelPdfParser(executor=self.executor)
+
+        with patch("coded_tools.pdf_parser.extract_pages", extract_pages_or_hang):
+            with patch("coded_tools.pdf_parser.MAX_ATTEMPTS", 1):
+                with ThreadPoolExecutor(max_workers=2) as threads:
+                    slow_pdfs = threads.submit(lambda: list(slow_parser.parse([slow_path])))
+                    hung_pdfs = threads.submit(lambda: list(hung_parser.parse([hung_path])))
+                    slow_pdfs, hung_pdfs = slow_pdfs.result(), hung_pdfs.result()
+        hung_parser.executor.shutdown()
+
+        self.assertIn("Timed out", hung_pdfs[0].error)
+        self.assertIsNone(slow_pdfs[0].error)
+        self.assertEqual(len(slow_pdfs[0].pages), 5)
+        self.assertIs(slow_parser.executor, hung_parser.executor)
@@ -0,0 +1,151 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+import asyncio
+import os
+import tempfile
+import threading
+from unittest import TestCase
+from unittest.mock import patch
+
+import numpy as np
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from coded_tools.quantized_vector_store import Int8VectorStore
+from coded_tools.quantized_vector_store import PqVectorStore
+from coded_tools.quantized_vector_store import QuantizedVectorStore
+from coded_tools.quantized_vector_store import benchmark_quantization
+from coded_tools.quantized_vector_store import get_codes_path
+
+DIMENSIONS = 16
+N_ROWS = 2000
+
+
+def clustered_vectors(rng: np.random.Generator, n_rows: int) -> np.ndarray:
+    """Vectors gathered around a few random directions, like embeddings of a few topics."""
+    topics = rng.normal(size=(20, DIMENSIONS))
+    return topics[rng.integers(0, len(topics), n_rows)] + 0.3 * rng.normal(size=(n_rows, DIMENSIONS))
+
+
+class TestQuantizedVectorStore(TestCase):
+    """
+    Unit tests for the int8 and product quantization vector stores.
+    """
+
+    def setUp(self):
+        self.rng = np.random.default_rng(42)
+        self.vectors = clustered_vectors(self.rng, N_ROWS)
+        self.queries = clustered_vectors(self.rng, 50)
+
+    def _store(self, store_class: type) -> QuantizedVectorStore:
+        store: QuantizedVectorStore = store_class(DeterministicFakeEmbedding(size=DIMENSIONS), min_train_size=1000)
+        store.add_vectors(self.vectors, [f"chunk {row}" for row in range(N_ROWS)], ids=list(map(str, range(N_ROWS))))
+        return store
+
+    def test_int8_benchmark(self):
+        """
+        int8 codes should be 4x smaller than float32 and find almost all the exact nearest neighbours.
+        """
+        store = self._store(Int8VectorStore)
+        self.assertTrue(store.is_trained)
+        self.assertEqual(store.codes.nbytes * 4, store.vectors.nbytes)
+
+        benchmarks = benchmark_quantization(store, self.queries, k=10, rescore_factors=(0, 4))
+        compressed, rescored = benchmarks[0], benchmarks[1]
+        self.assertGreater(compressed.recall, 0.9)
+        self.assertGreaterEqual(rescored.recall, compressed.recall)
+        self.assertGreater(rescored.recall, 0.98)
+
+    def test_pq_benchmark(self):
+        """
+        Product quantization codes should be 16x smaller than float32, and rescoring should recover the recall.
+        """
+        store = self._store(PqVectorStore)
+        self.assertEqual(store.codes.nbytes * 16, store.vectors.nbytes)
+
+        benchmarks = benchmark_quantization(store, self.queries, k=10, rescore_factors=(0, 8))
+        compressed, rescored = benchmarks[0], benchmarks[1]
+        self.assertGreater(compressed.recall, 0.5)
+        self.assertGreater(rescored.recall, compressed.recall)
+        self.assertGreater(rescored.recall, 0.9)
+        self.assertGreater(rescored.compression, 1.0)
+
+    def test_persisted_codes_are_reused(self):
+        """
+        A loaded store should reuse the persisted codes and codebook, and return the same results.
+        """
+        store = self._store(PqVectorStore)
+        expected = store.similarity_search_with_score_by_vectors(self.queries[:5], k=3)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "store.npy")
+            store.dump(path)
+            self.assertTrue(os.path.exists(get_codes_path(path)))
+            self.assertIsInstance(store.vectors, np.memmap)
+            self.assertLess(store.memory_bytes(), store.vectors.nbytes)
+
+            loaded = PqVectorStore.load(path, DeterministicFakeEmbedding(size=DIMENSIONS))
+            np.testing.assert_array_equal(loaded.codes, store.codes)
+            np.testing.assert_array_equal(loaded.codebook["centroids"], store.codebook["centroids"])
+            self.assertLess(loaded.memory_bytes(), loaded.vectors.nbytes)
+
+            results = loaded.similarity_search_with_score_by_vectors(self.queries[:5], k=3)
+            self.assertEqual(
+                [[doc.id for doc, _ in result] for result in results],
+                [[doc.id for doc, _ in result] for result in expected],
+            )
+
+    def test_incremental_insert_and_delete(self):
+        """
+        Rows added after training should be encoded and found, and deleted rows should not be.
+        """
+        store = self._store(Int8VectorStore)
+        new_vector = self.rng.normal(size=DIMENSIONS)
+        store.add_vectors([new_vector], ["new chunk"], ids=["new"])
+        self.assertEqual(store.codes.shape[0], N_ROWS + 1)
+
+        (results,) = store.similarity_search_with_score_by_vectors([new_vector], k=1, rescore_factor=0)
+        self.assertEqual(results[0][0].id, "new")
+
+        store.delete(["new"])
+        self.assertEqual(store.codes.shape[0], N_ROWS)
+        (results,) = store.similarity_search_with_score_by_vectors([new_vector], k=1)
+        self.assertNotEqual(results[0][0].id, "new")
+
+    def test_codebook_is_trained_off_the_event_loop(self):
+        """
+        Adding texts asynchronously should train the codebook in a thread.
+        """
+        store = PqVectorStore(DeterministicFakeEmbedding(size=DIMENSIONS), min_train_size=300)
+        fit = store._fit  # pylint: disable=protected-access
+        threads = []
+
+        def recording_fit(vectors, seed):
+            threads.append(threading.get_ident())
+            return fit(vectors, seed)
+
+        with patch.object(store, "_fit", recording_fit):
+            asyncio.run(store.aadd_texts([f"chunk {row}" for row in range(300)]))
+
+        self.assertEqual(len(threads), 1)
+        self.assertNotEqual(threads[0], threading.get_ident())
+        self.assertEqual(store.codes.shape[0], 300)
+
+    def test_rows_added_during_a_training_are_encoded(self):
+        """
+        Rows added while the codebook is trained again should be encoded with the current one, and deletable.
+        """
+        store = self._store(PqVectorStore)
+        store._training = True  # pylint: disable=protected-access
+        texts = [f"new chunk {row}" for row in range(3 * N_ROWS)]
+        asyncio.run(store.aadd_texts(texts, ids=[f"new {row}" for row in range(3 * N_ROWS)]))
+        self.assertEqual(store.codes.shape[0], 4 * N_ROWS)
+
+        store.delete(["0", "new 5"])
+        self.assertEqual(store.codes.shape[0], 4 * N_ROWS - 2)
+        self.assertEqual(store.similarity_search(texts[7], k=1)[0].id, "new 7")
@@ -0,0 +1,60 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+from unittest import TestCase
+from unittest.mock import patch
+
+from coded_tools.query_cache import QueryCache
+from coded_tools.query_cache import normalize_query
+
+
+class TestQueryCache(TestCase):
+    """
+    Unit tests for the query cache.
+    """
+
+    def test_exact_hits_on_normalized_query(self):
+        """Queries differing only by case, whitespace and surrounding punctuation hit the same entry."""
+        self.assertEqual(normalize_query("  What is  ERR-404? "), "what is err-404")
+
+        cache = QueryCache()
+        cache.put("scope", "What is ERR-404?", "result")
+        self.assertEqual(cache.get("scope", "what is err-404"), "result")
+        self.assertIsNone(cache.get("other scope", "What is ERR-404?"))
+        self.assertEqual((cache.stats.exact_hits, cache.stats.misses), (1, 1))
+
+    def test_semantic_hits_within_threshold(self):
+        """A different query is served only if its embedding is similar enough and a threshold is given."""
+        cache = QueryCache()
+        cache.put("scope", "refund policy", "refunds", vector=[1.0, 0.0])
+
+        self.assertEqual(cache.get("scope", "how do refunds work", vector=[0.99, 0.1], threshold=0.95), "refunds")
+        self.assertIsNone(cache.get("scope", "how do refunds work", vector=[0.99, 0.1]))
+        self.assertIsNone(cache.get("scope", "shipping times", vector=[0.5, 0.8], threshold=0.95))
+        self.assertEqual(cache.stats.semantic_hits, 1)
+        self.assertEqual(cache.stats.misses, 2)
+
+    def test_expiry_and_eviction(self):
+        """Entries expire after the TTL and the least recently used ones are evicted beyond the maximum count."""
+        cache = QueryCache(ttl=10, max_entries=2)
+        with patch("coded_tools.query_cache.time.monotonic", return_value=0.0):
+            cache.put("scope", "a", "result a")
+            cache.put("scope", "b", "result b")
+            cache.get("scope", "a")
+            cache.put("scope", "c", "result c")
+        self.assertEqual(cache.stats.evictions, 1)
+
+        with patch("coded_tools.query_cache.time.monotonic", return_value=5.0):
+            self.assertIsNone(cache.get("scope", "b"))
+            self.assertEqual(cache.get("scope", "a"), "result a")
+        with patch("coded_tools.query_cache.time.monotonic", return_value=20.0):
+            self.assertIsNone(cache.get("scope", "c"))
+
+        cache.invalidate("scope")
+        self.assertEqual(len(cache), 0)
@@ -0,0 +1,83 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+import asyncio
+from typing import List
+from unittest import TestCase
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from coded_tools.numpy_vector_store import NumpyVectorStore
+from coded_tools.reranker import RERANK_SCORE_CACHE
+from coded_tools.reranker import RERANK_STATS
+from coded_tools.reranker import LexicalScorer
+from coded_tools.reranker import RerankingRetriever
+from coded_tools.reranker import Scorer
+
+TEXTS = [
+    "The printer shows a paper jam message.",
+    "Error ERR-404 means the spooler lost the job.",
+    "Restart the router to restore the connection.",
+    "Replace the toner cartridge when prints fade.",
+]
+
+
+class CountingScorer(LexicalScorer):  # pylint: disable=too-few-public-methods
+    """Lexical scorer recording the texts it scored, with cacheable scores like a cross-encoder."""
+
+    name = "counting"
+    cacheable = True
+
+    def __init__(self):
+        self.scored: List[str] = []
+
+    def score(self, query: str, texts: List[str]) -> List[float]:
+        self.scored.extend(texts)
+        return super().score(query, texts)
+
+
+class TestReranker(TestCase):
+    """
+    Unit tests for the reranking stage of the RAG tools.
+    """
+
+    def setUp(self):
+        self.vectorstore = NumpyVectorStore.from_texts(TEXTS, DeterministicFakeEmbedding(size=8))
+
+    def _retriever(self, scorer: Scorer, k: int = 1) -> RerankingRetriever:
+        return RerankingRetriever(
+            retriever=self.vectorstore.as_retriever(search_kwargs={"k": len(TEXTS)}),
+            scorer=scorer,
+            k=k,
+            tool_name="TestTool",
+        )
+
+    def test_lexical_scorer_ranks_matching_terms_first(self):
+        """
+        Candidates containing the terms of the query should get the highest scores.
+        """
+        scores = LexicalScorer().score("what does err-404 mean", TEXTS)
+        self.assertEqual(max(range(len(TEXTS)), key=lambda index: scores[index]), 1)
+        self.assertEqual(scores[2], 0.0)
+
+    def test_reranking_keeps_best_candidates_and_caches_scores(self):
+        """
+        The best candidates should be returned, and scores of (query, chunk) pairs should not be computed twice.
+        """
+        scorer = CountingScorer()
+        docs: List[Document] = asyncio.run(self._retriever(scorer).ainvoke("What is ERR-404?"))
+        self.assertEqual([doc.page_content for doc in docs], [TEXTS[1]])
+        self.assertEqual(len(scorer.scored), len(TEXTS))
+
+        docs = asyncio.run(self._retriever(scorer, k=2).ainvoke("what is err-404"))
+        self.assertEqual(docs[0].page_content, TEXTS[1])
+        self.assertEqual(len(scorer.scored), len(TEXTS))
+        self.assertGreaterEqual(len(RERANK_SCORE_CACHE), len(TEXTS))
+        self.assertGreaterEqual(RERANK_STATS["TestTool"].queries, 2)
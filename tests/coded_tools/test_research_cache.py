@@ -0,0 +1,140 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+import asyncio
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Dict
+from typing import List
+from typing import Optional
+from unittest import TestCase
+
+from langchain_core.documents import Document
+
+from coded_tools.research_cache import CachedResearchRetriever
+from coded_tools.research_cache import ResearchCache
+from coded_tools.research_cache import ResearchSource
+
+PAGES: Dict[str, List[str]] = {
+    "neural networks": ["Perceptron", "Backpropagation", "Deep learning"],
+    "training": ["Backpropagation", "Gradient descent"],
+    "learning": ["Deep learning", "Gradient descent"],
+}
+
+
+class FakeSource(ResearchSource):
+    """Research source with fixed search results, counting its calls and the fetches running at once."""
+
+    name = "fake"
+
+    def __init__(self):
+        self.searches: int = 0
+        self.fetches: List[str] = []
+        self.failing: bool = False
+        self.running: int = 0
+        self.max_running: int = 0
+        self._lock = threading.Lock()
+
+    def search(self, query: str) -> List[str]:
+        if self.failing:
+            raise ConnectionError("offline")
+        self.searches += 1
+        return PAGES[query]
+
+    def fetch(self, doc_id: str) -> Optional[Document]:
+        if self.failing:
+            raise ConnectionError("offline")
+        with self._lock:
+            self.fetches.append(doc_id)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(0.05)
+        with self._lock:
+            self.running -= 1
+        return Document(page_content=f"Article about {doc_id}", metadata={"title": doc_id})
+
+    def present(self, document: Document) -> Document:
+        return Document(page_content=document.page_content[:12], metadata=document.metadata)
+
+
+class TestResearchCache(TestCase):
+    """
+    Unit tests for the persistent cache of research sources.
+    """
+
+    def setUp(self):
+        # pylint: disable=consider-using-with
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "research.sqlite")
+        self.source = FakeSource()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _retriever(self, **kwargs) -> CachedResearchRetriever:
+        return CachedResearchRetriever(source=self.source, cache=ResearchCache(self.path), **kwargs)
+
+    def test_repeat_queries_are_served_from_disk(self):
+        """
+        Pages should be fetched concurrently once, and served from the file to a new cache for repeat queries.
+        """
+        documents = asyncio.run(self._retriever().ainvoke("neural networks"))
+        self.assertEqual([doc.metadata["title"] for doc in documents], PAGES["neural networks"])
+        self.assertEqual(documents[0].page_content, "Article abou")
+        self.assertEqual(self.source.max_running, 3)
+
+        # Another cache on the same file, e.g. after a restart, only fetches the page it does not have
+        documents = self._retriever().invoke("training")
+        self.assertEqual([doc.metadata["title"] for doc in documents], PAGES["training"])
+        self.assertEqual(self.source.searches, 2)
+        self.assertEqual(sorted(self.source.fetches), sorted(PAGES["neural networks"] + ["Gradient descent"]))
+
+        asyncio.run(self._retriever().ainvoke("Neural networks?"))
+        self.assertEqual(self.source.searches, 2)
+        self.assertEqual(len(self.source.fetches), 4)
+
+    def test_expired_entries_are_refreshed_or_served_when_offline(self):
+        """
+        Expired results should be fetched again, and served if the source cannot be reached.
+        """
+        self._retriever().invoke("training")
+        retriever = self._retriever(ttl=0.0)
+        retriever.invoke("training")
+        self.assertEqual(self.source.searches, 2)
+        self.assertEqual(len(self.source.fetches), 4)
+
+        self.source.failing = True
+        documents = retriever.invoke("training")
+        self.assertEqual([doc.metadata["title"] for doc in documents], PAGES["training"])
+        with self.assertRaises(ConnectionError):
+            retriever.invoke("learning")
+
+    def test_co_requested_pages_are_refreshed_ahead(self):
+        """
+        A page returned with the ones of a query in several queries should be refreshed past half its TTL.
+        """
+        retriever = self._retriever(ttl=100.0, prefetch=True)
+        retriever.invoke("training")
+        retriever.invoke("learning")
+
+        # Gradient descent was returned with both Backpropagation and Deep learning, but is still fresh
+        self.source.fetches.clear()
+        retriever.invoke("neural networks")
+        self.assertEqual(self.source.fetches, ["Perceptron"])
+
+        with sqlite3.connect(self.path) as connection:
+            connection.execute("UPDATE documents SET fetched = fetched - 60")
+        retriever.invoke("neural networks")
+        deadline = time.time() + 5
+        while "Gradient descent" not in self.source.fetches and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.source.fetches, ["Perceptron", "Gradient descent"])
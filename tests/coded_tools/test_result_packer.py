@@ -0,0 +1,68 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+from unittest import TestCase
+
+import tiktoken
+from langchain_core.documents import Document
+
+from coded_tools.result_packer import merge_chunks
+from coded_tools.result_packer import pack_results
+
+# Byte-level encoding with one token per byte, which needs no download
+BYTE_ENCODING = tiktoken.Encoding(
+    name="bytes",
+    pat_str=r"\S+|\s+",
+    mergeable_ranks={bytes([byte]): byte for byte in range(256)},
+    special_tokens={},
+)
+
+TEXT = "The quick brown fox jumps over the lazy dog near the river bank."
+
+
+def chunk(start: int, end: int, source: str = "doc.pdf", page: int = 0) -> Document:
+    """Chunk of TEXT with the metadata recorded by the chunker."""
+    return Document(page_content=TEXT[start:end], metadata={"source": source, "page": page, "start_index": start})
+
+
+class TestResultPacker(TestCase):
+    """
+    Unit tests for the packing of retrieved chunks.
+    """
+
+    def test_overlapping_chunks_are_merged(self):
+        """Overlapping and adjacent chunks of a document become one passage, ranked as their best chunk."""
+        other = Document(page_content="Unrelated text.", metadata={"source": "other.pdf"})
+        passages = merge_chunks([other, chunk(20, 45), chunk(0, 30), chunk(45, len(TEXT)), chunk(10, 30, page=1)])
+
+        self.assertEqual([passage.text for passage in passages], ["Unrelated text.", TEXT, TEXT[10:30]])
+        self.assertEqual([passage.rank for passage in passages], [0, 1, 4])
+        self.assertEqual((passages[1].start, passages[1].end), (0, len(TEXT)))
+
+    def test_near_duplicates_are_dropped(self):
+        """A passage repeating a better one, e.g. from another copy of the document, is dropped."""
+        copy = Document(page_content=TEXT + " Indeed.", metadata={"source": "copy.pdf"})
+        packed = pack_results([chunk(0, len(TEXT)), copy], encoding=BYTE_ENCODING)
+
+        self.assertEqual(len(packed.passages), 1)
+        self.assertEqual(packed.text, f"[Source: doc.pdf, page 1]\n{TEXT}")
+
+    def test_token_budget(self):
+        """Passages are kept in rank order until the budget is spent, truncating the last one if enough fits."""
+        docs = [
+            Document(page_content="a" * 100, metadata={"source": "a"}),
+            Document(page_content="b " * 200, metadata={"source": "b"}),
+            Document(page_content="c " * 10, metadata={"source": "c"}),
+        ]
+        packed = pack_results(docs, max_tokens=200, encoding=BYTE_ENCODING)
+
+        self.assertLessEqual(packed.tokens, 200)
+        self.assertEqual(len(BYTE_ENCODING.encode_ordinary(packed.text)), packed.tokens)
+        self.assertEqual([passage.metadata["source"] for passage in packed.passages], ["a", "b"])
+        self.assertTrue(packed.text.startswith("[Source: a]\n" + "a" * 100))
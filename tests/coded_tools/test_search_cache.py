@@ -0,0 +1,164 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+from typing import Dict
+from typing import List
+from unittest import TestCase
+
+from coded_tools.search_cache import SearchCache
+
+
+class FakeProvider:
+    """Search provider with fixed results, counting its calls."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay: float = delay
+        self.queries: List[str] = []
+        self._lock = threading.Lock()
+
+    def search(self, query: str) -> List[Dict[str, Any]]:
+        """Return one result for the query, after the delay."""
+        with self._lock:
+            self.queries.append(query)
+        time.sleep(self.delay)
+        return [{"title": query, "link": f"https://example.com/{len(self.queries)}"}]
+
+    async def asearch(self, query: str) -> List[Dict[str, Any]]:
+        """Return one result for the query, after the delay, without blocking the event loop."""
+        with self._lock:
+            self.queries.append(query)
+        await asyncio.sleep(self.delay)
+        return [{"title": query, "link": f"https://example.com/{len(self.queries)}"}]
+
+
+class TestSearchCache(TestCase):
+    """
+    Unit tests for the cache of the search tools.
+    """
+
+    def setUp(self):
+        # pylint: disable=consider-using-with
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "search.sqlite")
+        self.provider = FakeProvider()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _search(self, cache: SearchCache, query: str, params: Dict[str, Any] = None, ttl: float = None) -> Any:
+        return cache.get_or_search_sync("fake", query, params, lambda: self.provider.search(query), ttl)
+
+    def test_repeat_searches_are_cached(self):
+        """
+        Repeat searches should be served from memory by normalized query and parameters, until they expire.
+        """
+        cache = SearchCache(ttl=60.0)
+        results = self._search(cache, "neuro san")
+        self.assertEqual(self._search(cache, "Neuro  SAN?"), results)
+        self.assertNotEqual(self._search(cache, "neuro san", {"num": 5}), results)
+        self.assertEqual(self.provider.queries, ["neuro san", "neuro san"])
+
+        self._search(cache, "neuro san", ttl=0)
+        cache.get_or_search_sync("other", "neuro san", None, lambda: self.provider.search("neuro san"))
+        self.assertEqual(len(self.provider.queries), 4)
+
+        stats = cache.stats["fake"]
+        self.assertEqual((stats.memory_hits, stats.misses), (1, 2))
+        self.assertAlmostEqual(stats.hit_rate, 1 / 3)
+
+        cache.ttl = 0.05
+        time.sleep(0.1)
+        self._search(cache, "neuro san")
+        self.assertEqual(len(self.provider.queries), 5)
+
+    def test_errors_are_not_cached(self):
+        """
+        Empty results and error messages should not be cached.
+        """
+        cache = SearchCache()
+        for results in ([], "Error: offline", [{"title": "found"}]):
+            self.assertEqual(cache.get_or_search_sync("fake", "neuro san", None, lambda value=results: value), results)
+        self.assertEqual(cache.get_or_search_sync("fake", "neuro san", None, lambda: []), [{"title": "found"}])
+        self.assertEqual(cache.stats["fake"].misses, 3)
+
+    def test_least_recently_used_entries_are_evicted_to_disk(self):
+        """
+        Entries beyond the maximum count should be evicted from memory, and served from disk to any cache on the file.
+        """
+        cache = SearchCache(max_entries=2, path=self.path)
+        for query in ("one", "two", "one", "three"):
+            self._search(cache, query)
+        self.assertEqual(len(cache), 2)
+
+        self._search(cache, "two")
+        self.assertEqual(cache.stats["fake"].disk_hits, 1)
+
+        # Another cache on the same file, e.g. in another process
+        other_cache = SearchCache(path=self.path)
+        self._search(other_cache, "three")
+        self.assertEqual(self.provider.queries, ["one", "two", "three"])
+        self.assertEqual(other_cache.stats["fake"].disk_hits, 1)
+
+    def test_concurrent_searches_are_coalesced(self):
+        """
+        Identical searches running at once, on the event loop or in threads, should call the provider once.
+        """
+        self.provider.delay = 0.2
+        cache = SearchCache()
+
+        async def search() -> List[Any]:
+            return await asyncio.gather(
+                *(
+                    cache.get_or_search("fake", "neuro san", None, lambda: self.provider.asearch("neuro san"))
+                    for _ in range(5)
+                )
+            )
+
+        results = asyncio.run(search())
+        self.assertEqual(len(self.provider.queries), 1)
+        self.assertTrue(all(result == results[0] for result in results))
+        self.assertEqual(cache.stats["fake"].coalesced, 4)
+        self.assertGreater(cache.stats["fake"].hit_rate, 0.5)
+
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            results = list(executor.map(lambda _: self._search(cache, "agents"), range(5)))
+        self.assertEqual(self.provider.queries, ["neuro san", "agents"])
+        self.assertTrue(all(result == results[0] for result in results))
+
+        # Later hits count the time the provider took as saved
+        self._search(cache, "agents")
+        self.assertGreaterEqual(cache.stats["fake"].saved_seconds, 0.2)
+
+    def test_failed_search_is_passed_to_waiting_callers(self):
+        """
+        Callers waiting for a search should get its error, and a later search should call the provider again.
+        """
+        cache = SearchCache()
+
+        async def fail():
+            await asyncio.sleep(0.1)
+            raise ConnectionError("offline")
+
+        async def search() -> List[Any]:
+            return await asyncio.gather(
+                *(cache.get_or_search("fake", "neuro san", None, fail) for _ in range(3)), return_exceptions=True
+            )
+
+        errors = asyncio.run(search())
+        self.assertTrue(all(isinstance(error, ConnectionError) for error in errors))
+        self.assertEqual(cache.stats["fake"].coalesced, 2)
+        self._search(cache, "neuro san")
+        self.assertEqual(self.provider.queries, ["neuro san"])
@@ -0,0 +1,70 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+from unittest import TestCase
+
+import tiktoken
+from langchain_core.documents import Document
+
+from coded_tools.token_chunker import TokenChunker
+
+# Byte-level encoding with one token per byte, which needs no download
+BYTE_ENCODING = tiktoken.Encoding(
+    name="bytes",
+    pat_str=r"\S+|\s+",
+    mergeable_ranks={bytes([byte]): byte for byte in range(256)},
+    special_tokens={},
+)
+
+
+class TestTokenChunker(TestCase):
+    """
+    Unit tests for TokenChunker class.
+    """
+
+    def test_windows_follow_token_offsets(self):
+        """
+        Chunks should be overlapping windows of tokens sliced from the original text, with their offsets.
+        """
+        text = "abcdefghij"
+        chunker = TokenChunker(chunk_size=4, chunk_overlap=2, encoding=BYTE_ENCODING)
+
+        self.assertEqual(chunker.split_text(text), [(0, "abcd"), (2, "cdef"), (4, "efgh"), (6, "ghij")])
+
+    def test_multibyte_characters_are_not_split(self):
+        """
+        Chunks should be valid text even when a window boundary falls inside a multibyte character.
+        """
+        text = "héllo wörld"
+        chunker = TokenChunker(chunk_size=3, chunk_overlap=1, encoding=BYTE_ENCODING)
+
+        for start_index, chunk in chunker.split_text(text):
+            self.assertEqual(text[start_index : start_index + len(chunk)], chunk)
+        self.assertEqual(chunker.split_text(text)[-1][1][-1], "d")
+
+    def test_split_documents_keeps_metadata(self):
+        """
+        Chunks should keep the metadata of their document and record their offset.
+        """
+        chunker = TokenChunker(chunk_size=8, chunk_overlap=0, encoding=BYTE_ENCODING)
+        docs = [Document(page_content="0123456789abcdef", metadata={"source": "a.pdf", "page": 3})]
+
+        chunks = chunker.split_documents(docs)
+
+        self.assertEqual([chunk.page_content for chunk in chunks], ["01234567", "89abcdef"])
+        self.assertEqual(chunks[1].metadata, {"source": "a.pdf", "page": 3, "start_index": 8})
+
+    def test_invalid_configuration(self):
+        """
+        The overlap should be smaller than the chunk size.
+        """
+        with self.assertRaises(ValueError):
+            TokenChunker(chunk_size=10, chunk_overlap=10, encoding=BYTE_ENCODING)
+        with self.assertRaises(ValueError):
+            TokenChunker(chunk_size=0, chunk_overlap=0, encoding=BYTE_ENCODING)
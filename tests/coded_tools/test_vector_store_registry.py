@@ -0,0 +1,98 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+import asyncio
+from unittest import TestCase
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.vectorstores import InMemoryVectorStore
+
+from coded_tools.vector_store_registry import VectorStoreRegistry
+from coded_tools.vector_store_registry import make_registry_key
+
+
+class TestVectorStoreRegistry(TestCase):
+    """
+    Unit tests for VectorStoreRegistry class.
+    """
+
+    def setUp(self):
+        self.builds = 0
+
+    async def _build(self):
+        """Slow build of an empty vector store, counting the builds."""
+        self.builds += 1
+        await asyncio.sleep(0.01)
+        return InMemoryVectorStore(embedding=DeterministicFakeEmbedding(size=4))
+
+    def test_concurrent_requests_share_one_build(self):
+        """
+        Concurrent requests for the same key should wait on a single build and get the same store.
+        """
+        registry = VectorStoreRegistry()
+        key = make_registry_key("tool", ["a.pdf"])
+
+        async def run():
+            return await asyncio.gather(*(registry.get_or_build(key, self._build) for _ in range(5)))
+
+        stores = asyncio.run(run())
+
+        self.assertEqual(self.builds, 1)
+        self.assertTrue(all(store is stores[0] for store in stores))
+
+    def test_different_keys_and_expired_entries_are_rebuilt(self):
+        """
+        Other keys should get their own store, and expired entries should be rebuilt.
+        """
+        registry = VectorStoreRegistry(ttl=0.0)
+
+        async def run():
+            await registry.get_or_build(make_registry_key("tool", ["a.pdf"]), self._build)
+            await registry.get_or_build(make_registry_key("tool", ["b.pdf"]), self._build)
+            await asyncio.sleep(0.01)
+            await registry.get_or_build(make_registry_key("tool", ["a.pdf"]), self._build)
+
+        asyncio.run(run())
+
+        self.assertEqual(self.builds, 3)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        """
+        The registry should not keep more entries than its maximum.
+        """
+        registry = VectorStoreRegistry(max_entries=2)
+
+        async def run():
+            for source in ["a.pdf", "b.pdf", "c.pdf"]:
+                await registry.get_or_build(make_registry_key("tool", [source]), self._build)
+            await registry.get_or_build(make_registry_key("tool", ["a.pdf"]), self._build)
+
+        asyncio.run(run())
+
+        self.assertEqual(len(registry), 2)
+        self.assertEqual(self.builds, 4)
+
+    def test_failed_builds_are_not_cached(self):
+        """
+        A build returning None should be retried on the next request.
+        """
+        registry = VectorStoreRegistry()
+        key = make_registry_key("tool", ["a.pdf"])
+
+        async def failed_build():
+            self.builds += 1
+
+        async def run():
+            await registry.get_or_build(key, failed_build)
+            return await registry.get_or_build(key, self._build)
+
+        store = asyncio.run(run())
+
+        self.assertIsNotNone(store)
+        self.assertEqual(self.builds, 2)
@@ -0,0 +1,107 @@
+# Copyright (C) 2023-2025 Cognizant Digital Business, Evolutionary AI.
+# All Rights Reserved.
+# Issued under the Academic Public License.
+#
+# You can be released from the terms, and requirements of the Academic Public
+# License by purchasing a commercial license.
+# Purchase of a commercial license is mandatory for any use of the
+# neuro-san-studio SDK Software in commercial settings.
+#
+import asyncio
+import os
+import tempfile
+from typing import List
+from unittest import TestCase
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from coded_tools.numpy_vector_store import NumpyVectorStore
+from coded_tools.vector_store_shards import MultiShardRetriever
+from coded_tools.vector_store_shards import ShardCache
+from coded_tools.vector_store_shards import ShardManifest
+from coded_tools.vector_store_shards import estimate_store_bytes
+from coded_tools.vector_store_shards import get_shard_path
+from coded_tools.vector_store_shards import validate_namespace
+
+
+class TestVectorStoreShards(TestCase):
+    """
+    Unit tests for the shards of namespaced vector stores.
+    """
+
+    def setUp(self):
+        # pylint: disable=consider-using-with
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.embeddings = DeterministicFakeEmbedding(size=8)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _save_shard(self, namespace: str, texts: List[str]) -> str:
+        """Save a shard of the given texts and return its path."""
+        path = get_shard_path(os.path.join(self.tmp_dir.name, "store.npy"), namespace)
+        NumpyVectorStore.from_texts(texts, self.embeddings).dump(path)
+        return path
+
+    def test_validate_namespace(self):
+        """
+        Namespaces should be simple names, as they name shard files.
+        """
+        self.assertEqual(validate_namespace("tenant_1-docs"), "tenant_1-docs")
+        for namespace in ("", "../etc", "a b", "x" * 65):
+            with self.assertRaises(ValueError):
+                validate_namespace(namespace)
+
+    def test_shard_path_and_manifest(self):
+        """
+        Shards should be next to the vector store file, and recorded in the manifest.
+        """
+        self.assertEqual(get_shard_path("/data/store.npy", "faq"), "/data/store.faq.npy")
+
+        manifest_path = os.path.join(self.tmp_dir.name, "store.shards.json")
+        manifest = ShardManifest.load(manifest_path)
+        manifest.record("faq", "/data/store.faq.npy", 3)
+        manifest.save()
+
+        loaded = ShardManifest.load(manifest_path)
+        self.assertEqual(loaded.shards["faq"]["file"], "store.faq.npy")
+        self.assertEqual(loaded.shards["faq"]["chunks"], 3)
+
+    def test_shard_cache_reloads_and_evicts(self):
+        """
+        Shards should be loaded once, reloaded when their file changes,
+        and the least recently used shard evicted beyond the memory cap.
+        """
+        first_path = self._save_shard("first", ["alpha", "beta"])
+        second_path = self._save_shard("second", ["gamma"])
+        loads: List[str] = []
+
+        def load(path: str) -> NumpyVectorStore:
+            loads.append(path)
+            return NumpyVectorStore.load(path, self.embeddings)
+
+        cache = ShardCache()
+        first = cache.get(first_path, load)
+        self.assertIs(cache.get(first_path, load), first)
+        self.assertEqual(loads, [first_path])
+
+        os.utime(first_path, ns=(1, 1))
+        self.assertIsNot(cache.get(first_path, load), first)
+        self.assertEqual(loads, [first_path, first_path])
+
+        cache.max_bytes = estimate_store_bytes(first) + 1
+        cache.get(second_path, load)
+        self.assertEqual(len(cache), 1)
+        self.assertIsNone(cache.get(os.path.join(self.tmp_dir.name, "missing.npy"), load))
+
+    def test_multi_shard_retriever_merges_shards(self):
+        """
+        Results of every shard should be merged.
+        """
+        first = NumpyVectorStore.from_texts(["alpha", "beta"], self.embeddings)
+        second = NumpyVectorStore.from_texts(["gamma"], self.embeddings)
+        retriever = MultiShardRetriever(retrievers=[first.as_retriever(), second.as_retriever()], k=3)
+
+        docs: List[Document] = asyncio.run(retriever.ainvoke("alpha"))
+        self.assertEqual(sorted(doc.page_content for doc in docs), ["alpha", "beta", "gamma"])